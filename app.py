@@ -1,705 +1,115 @@
+import io
+import json
+import os
+
 import streamlit as st
-import random
-from dataclasses import dataclass, asdict
-from typing import List, Optional
 
 import plotly.graph_objects as go
 
-# ---------- Page config & global CSS ----------
-
-st.set_page_config(page_title="National Collector RPG", layout="wide")
-
-st.markdown(
-    """
-    <style>
-    .stApp {
-        background-image: radial-gradient(circle at top left, #ffffff 0, #f7f7ff 50%, #f0f0ff 100%);
-    }
-    .stTable tbody tr:nth-child(even) {
-        background-color: #fafaff;
-    }
-    .stTable th {
-        background-color: #f0f0ff !important;
-    }
-    button[kind="primary"] {
-        border-radius: 999px !important;
-        font-weight: 600 !important;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
+from collector_rpg import actions, render
+from collector_rpg.rules import (
+    ATTR_BUDGET,
+    STARTING_CASH_RANGE,
+    SUBJECT_BUDGET,
+    Encounter,
+    as_of,
+    compute_collection_value,
+    has_big_deal,
+    influencer_unlocked,
+    init_state,
+    level_band,
+    pin_run_config,
+    stage_unlocked,
+    whale_unlocked,
 )
+from collector_rpg.analytics import get_analytics
+from collector_rpg.catalog import get_catalog
+from collector_rpg.charts import collection_figures
+from collector_rpg.config import get_config
+from collector_rpg.encounter import MOVES, boss_entry, table_kind
+from collector_rpg.collection_io import FORMATS, CollectionFileError, export_collection, format_for
+from collector_rpg.daily import get_schedule, next_table, today
+from collector_rpg.floor import STAMINA_MAX, get_floor, walk_cost
+from collector_rpg.leaderboard import CATEGORIES, get_leaderboard, score_key
+from collector_rpg.market import BLOCKS_PER_DAY, TIME_BLOCKS, get_market, tick_for
+from collector_rpg.optimizer import optimize_lot
+from collector_rpg.sessions import STORE_ERRORS, SessionSync, VersionConflict, get_session_store
+from collector_rpg.sweep import MAX_SWEEP_ENCOUNTERS, SweepRules
+from collector_rpg.telemetry import emit
+from collector_rpg.tradenight import get_trade_night
+from collector_rpg.undo import Timeline
 
-# ---------- Data models ----------
-
-@dataclass
-class Card:
-    name: str
-    player: str
-    year: int
-    set_name: str
-    true_value: float
-    ask_price: float
-
-
-@dataclass
-class Encounter:
-    npc_type: str
-    mood: str
-    zone: str
-    cards: List[Card]
-    round: int
-    active: bool
-    history: List[str]
-
-
-# ---------- Core constants ----------
-
-ZONES = [
-    "Vintage Alley",
-    "Modern Showcases",
-    "Dollar Boxes",
-    "Corporate Pavilion",
-    "Trade Night",
-]
-
-NPC_TYPES = ["Dealer", "Kid Collector", "Flipper", "PC Supercollector"]
-MOODS = ["happy", "neutral", "grumpy"]
-
-ZONE_META = {
-    "Vintage Alley": {"icon": "📜", "color": "#b08968"},
-    "Modern Showcases": {"icon": "💎", "color": "#1d3557"},
-    "Dollar Boxes": {"icon": "📦", "color": "#2a9d8f"},
-    "Corporate Pavilion": {"icon": "🏢", "color": "#6c757d"},
-    "Trade Night": {"icon": "🌙", "color": "#ffb703"},
-}
-
-NPC_META = {
-    "Dealer": {"icon": "🧢"},
-    "Kid Collector": {"icon": "🧒"},
-    "Flipper": {"icon": "💼"},
-    "PC Supercollector": {"icon": "🏆"},
-}
-
-NPC_BEHAVIOR = {
-    "Dealer": {"overask": (1.2, 1.4), "min_pct": 0.9},
-    "Kid Collector": {"overask": (1.0, 1.2), "min_pct": 0.8},
-    "Flipper": {"overask": (1.25, 1.5), "min_pct": 0.95},
-    "PC Supercollector": {"overask": (1.15, 1.3), "min_pct": 0.85},
-}
-
-GYMS = [
-    {
-        "id": "vintage_titan",
-        "name": "Vintage Titan Table",
-        "boss": "Vintage Titan",
-        "zone": "Vintage Alley",
-        "required_level": 2,
-        "description": "A legendary vintage dealer who only respects sharp negotiation on 50s and 60s cardboard.",
-    },
-    {
-        "id": "chrome_master",
-        "name": "Chrome Master Showcase",
-        "boss": "Chrome Master",
-        "zone": "Modern Showcases",
-        "required_level": 2,
-        "description": "A slab-heavy modern guru with cases full of Prizm, Select, and Optic.",
-    },
-    {
-        "id": "dollar_box_duke",
-        "name": "Dollar Box Gauntlet",
-        "boss": "Dollar Box Duke",
-        "zone": "Dollar Boxes",
-        "required_level": 3,
-        "description": "The master of value boxes, where sleepers hide and margins are made.",
-    },
-    {
-        "id": "trade_night_boss",
-        "name": "Trade Night Main Event",
-        "boss": "Trade Night Boss",
-        "zone": "Trade Night",
-        "required_level": 3,
-        "description": "Runs the biggest trade night; binder-for-binder deals only.",
-    },
-]
-
-ELITE_FOUR = [
-    {
-        "id": "box_breaker",
-        "name": "Influencer 1: Box Breaker",
-        "boss": "Box Breaker",
-        "description": "A streamer who wants you to buy wax instead of singles—can you negotiate a fair rip?",
-        "required_level": 4,
-    },
-    {
-        "id": "content_flipper",
-        "name": "Influencer 2: Content Flipper",
-        "boss": "Content Flipper",
-        "description": "Lives by comps and thumbnails; can you get a real deal past the content?",
-        "required_level": 5,
-    },
-    {
-        "id": "analytics_nerd",
-        "name": "Influencer 3: Analytics Nerd",
-        "boss": "Analytics Nerd",
-        "description": "Charts, pop reports, and spreadsheets—your every move is being modeled.",
-        "required_level": 6,
-    },
-    {
-        "id": "show_vlogger",
-        "name": "Influencer 4: Show Vlogger",
-        "boss": "Show Vlogger",
-        "description": "Cares about the story of the deal more than the margin; style matters.",
-        "required_level": 7,
-    },
-]
-
-CHAMPION = {
-    "id": "national_whale",
-    "name": "The National Whale",
-    "boss": "The National Whale",
-    "description": "The biggest buyer in the room with impossible showcases and zero tolerance for weak deals.",
-    "required_level": 8,
-}
-
-# ---------- Special tactics ----------
-
-SPECIAL_TACTICS = {
-    "Negotiation": {
-        "name": "Anchor & Walk‑Back",
-        "description": "Start with a strong anchor and walk back smoothly without killing the deal.",
-    },
-    "People Skills": {
-        "name": "Dealer Whisperer",
-        "description": "Read body language to know exactly when to push and when to ease off.",
-    },
-    "Card Knowledge": {
-        "name": "Set Historian",
-        "description": "Drop deep set facts that make your valuation hard to argue.",
-    },
-    "Hustle": {
-        "name": "Speed Round",
-        "description": "Scan the table faster and surface more options.",
-    },
-}
-
-# ---------- Game helpers ----------
-
-def base_player_state():
-    return {
-        "name": "",
-        "favorite": "",
-        "cash": 1000.0,
-        "stamina": 100,
-        "day": 1,
-        "time_block": "Morning",
-        "xp": 0,
-        "level": 1,
-        "goals": {
-            "target_pc_card": "",
-            "profit_target": 400.0,
-        },
-        "collection": [],
-        "profit": 0.0,
-        "build_locked": False,
-        "badges": [],
-        "elite_defeated": [],
-        "champion_defeated": False,
-        "attributes": {
-            "Negotiation": 50,
-            "People Skills": 50,
-            "Card Knowledge": 50,
-            "Hustle": 50,
-        },
-        "subjects": {
-            "Vintage Baseball": 0,
-            "Vintage Football": 0,
-            "Vintage Basketball": 0,
-            "Vintage Hockey": 0,
-            "Modern Baseball": 0,
-            "Modern Football": 0,
-            "Modern Basketball": 0,
-            "Modern Hockey": 0,
-            "Soccer": 0,
-            "Other / TCG / Non‑sport": 0,
-        },
-        "unlocked_tactics": [],
-        "max_cards_visible": 2,
-    }
-
-
-def init_state():
-    st.session_state.player = base_player_state()
-    st.session_state.encounter: Optional[Encounter] = None
-
-
-def advance_flavor_time():
-    time_order = ["Morning", "Afternoon", "Evening"]
-    p = st.session_state.player
-    idx = time_order.index(p["time_block"])
-    if idx < len(time_order) - 1:
-        p["time_block"] = time_order[idx + 1]
-    else:
-        p["time_block"] = "Morning"
-        p["day"] += 1
-
-
-def compute_action_budget(player: dict) -> int:
-    """Number of tactical actions allowed in an encounter."""
-    lvl = player["level"]
-    attrs = player["attributes"]
-    avg_attr = (attrs["Negotiation"] + attrs["People Skills"] +
-                attrs["Card Knowledge"] + attrs["Hustle"]) / 4.0
-    return int(4 + lvl // 2 + avg_attr / 40)  # base 4, +level, +up to ~+3 from stats
-
-
-def add_xp(amount: int):
-    p = st.session_state.player
-    old_level = p["level"]
-
-    p["xp"] += amount
-    thresholds = [0, 50, 150, 300, 500, 750]
-    new_level = p["level"]
-    for i, t in enumerate(thresholds, start=1):
-        if p["xp"] >= t:
-            new_level = i
-
-    if new_level > old_level:
-        p["level"] = new_level
-        advance_flavor_time()
-
-        # Passive skill growth
-        attrs = p["attributes"]
-        growth = 3
-        for key in attrs:
-            attrs[key] = min(100, attrs[key] + growth)
-
-        # See more cards at the table (up to 5 baseline)
-        p["max_cards_visible"] = min(5, p.get("max_cards_visible", 2) + 1)
-
-        # Unlock a special tactic based on current top attribute
-        top_attr = max(attrs, key=lambda k: attrs[k])
-        tactic = SPECIAL_TACTICS.get(top_attr)
-        if tactic:
-            if tactic["name"] not in [t["name"] for t in p["unlocked_tactics"]]:
-                p["unlocked_tactics"].append(
-                    {"name": tactic["name"], "from_attr": top_attr, "level": new_level}
-                )
-
-
-def subject_score_for_zone(zone: str, subjects: dict) -> float:
-    if zone == "Vintage Alley":
-        total = (
-            subjects["Vintage Baseball"] +
-            subjects["Vintage Football"] +
-            subjects["Vintage Basketball"] +
-            subjects["Vintage Hockey"]
-        )
-        return total / 400.0
-    if zone == "Modern Showcases":
-        total = (
-            subjects["Modern Baseball"] +
-            subjects["Modern Football"] +
-            subjects["Modern Basketball"] +
-            subjects["Modern Hockey"] +
-            subjects["Soccer"]
-        )
-        return total / 500.0
-    if zone == "Dollar Boxes":
-        total = (
-            subjects["Modern Baseball"] +
-            subjects["Modern Football"] +
-            subjects["Modern Basketball"] +
-            subjects["Modern Hockey"] +
-            subjects["Soccer"] +
-            subjects["Other / TCG / Non‑sport"]
-        )
-        return total / 600.0
-    if zone == "Corporate Pavilion":
-        return sum(subjects.values()) / 1000.0
-    if zone == "Trade Night":
-        total = sum(subjects.values()) + subjects["Other / TCG / Non‑sport"]
-        return total / 1100.0
-    return 0.0
-
-
-def grant_xp_for_deal(zone: str, margin: float, is_trade: bool, is_sale: bool = False):
-    player = st.session_state.player
-    attrs = player["attributes"]
-    subjects = player["subjects"]
-    hustle = attrs["Hustle"]
-
-    base = 5
-
-    zone_factor = {
-        "Dollar Boxes": 0.8,
-        "Vintage Alley": 1.1,
-        "Modern Showcases": 1.0,
-        "Corporate Pavilion": 1.0,
-        "Trade Night": 1.1,
-    }.get(zone, 1.0)
-
-    margin_xp = max(0.0, margin / 20.0)
-    margin_xp = min(margin_xp, 40.0)
-
-    trade_bonus = 1.3 if is_trade else 1.0
-    if is_sale:
-        trade_bonus = 0.9
-
-    hustle_bonus = 1.0 + hustle / 500.0
-    zone_subj = subject_score_for_zone(zone, subjects)
-    lane_bonus = 1.0 + 0.5 * zone_subj
-
-    total_xp = int((base + margin_xp) * zone_factor * trade_bonus * hustle_bonus * lane_bonus)
-    if total_xp > 0:
-        add_xp(total_xp)
-
-
-def generate_cards_for_zone(zone: str, npc_type: str) -> List[Card]:
-    base_cards = []
-    if zone == "Vintage Alley":
-        base_cards = [
-            ("HOF RB Rookie", "Legend RB", 1958, "Topps", 500.0),
-            ("Iconic OF RC", "Legend OF", 1952, "Topps", 1500.0),
-        ]
-    elif zone == "Modern Showcases":
-        base_cards = [
-            ("Star QB Rookie", "Star QB", 2020, "Prizm", 250.0),
-            ("Young Star RC", "Young Star", 2022, "Select", 120.0),
-        ]
-    elif zone == "Dollar Boxes":
-        base_cards = [
-            ("Sleeper WR", "WR Prospect", 2023, "Donruss", 5.0),
-            ("Bench Shooter", "Role Player", 2021, "Hoops", 2.0),
-        ]
-    elif zone == "Corporate Pavilion":
-        base_cards = [
-            ("Show Exclusive", "Promo Player", 2025, "National Promo", 40.0),
-        ]
-    else:
-        base_cards = [
-            ("PC Parallel", "Your PC Guy", 2019, "Optic", 80.0),
-            ("Random RC", "Random Rookie", 2021, "Mosaic", 25.0),
-        ]
-
-    behavior = NPC_BEHAVIOR.get(npc_type, {"overask": (1.1, 1.4)})
-    lo, hi = behavior["overask"]
-
-    cards = []
-    for name, player_name, year, set_name, true_value in base_cards:
-        ask = round(true_value * random.uniform(lo, hi), 2)
-        cards.append(Card(name, player_name, year, set_name, true_value, ask))
-    return cards
-
-
-def init_encounter_state(enc: Encounter, tough_multiplier: float = 1.0):
-    enc.npc_hp = int(100 * tough_multiplier)
-    enc.npc_max_hp = int(100 * tough_multiplier)
-    enc.price_factor = 1.0 * tough_multiplier
-    enc.patience = 5 + int(2 * tough_multiplier)
-
-    # per-encounter action meta
-    enc.pancake_used = False
-    enc.actions_used = 0
-    enc.max_actions = 999  # will be set when encounter starts
-
-
-def start_encounter(zone: str):
-    """Regular floor encounter (non-boss)."""
-    npc_type = random.choice(NPC_TYPES)
-    mood = random.choice(MOODS)
-    cards = generate_cards_for_zone(zone, npc_type)
-    enc = Encounter(
-        npc_type=npc_type,
-        mood=mood,
-        zone=zone,
-        cards=cards,
-        round=1,
-        active=True,
-        history=[f"You approach a {npc_type} in {zone}. They seem {mood}."],
-    )
-    init_encounter_state(enc)
-    enc.max_actions = compute_action_budget(st.session_state.player)
-    enc.mode = "normal"
-    st.session_state.encounter = enc
-
-
-def has_big_deal(stage_id: str) -> bool:
-    return stage_id in st.session_state.player["badges"]
-
-
-def mark_big_deal(stage_id: str):
-    if stage_id not in st.session_state.player["badges"]:
-        st.session_state.player["badges"].append(stage_id)
-        add_xp(50)
-
-
-def mark_influencer_won(influencer_id: str):
-    if influencer_id not in st.session_state.player["elite_defeated"]:
-        st.session_state.player["elite_defeated"].append(influencer_id)
-        add_xp(75)
-
-
-def mark_whale_won():
-    if not st.session_state.player["champion_defeated"]:
-        st.session_state.player["champion_defeated"] = True
-        add_xp(100)
-
-
-def start_stage_battle(stage_id: str):
-    gym = next(g for g in GYMS if g["id"] == stage_id)
-    npc_type = "PC Supercollector"
-    mood = random.choice(MOODS)
-    zone = gym["zone"]
+# ---------- Page config & global CSS ----------
 
-    cards = generate_cards_for_zone(zone, npc_type)
-    for c in cards:
-        c.true_value *= 2
-        c.ask_price = round(c.true_value * random.uniform(1.1, 1.3), 2)
+st.set_page_config(page_title="National Collector RPG", layout="wide")
 
-    enc = Encounter(
-        npc_type=npc_type,
-        mood=mood,
-        zone=zone,
-        cards=cards,
-        round=1,
-        active=True,
-        history=[f"You sit down at the {gym['name']} with {gym['boss']}."],
-    )
-    init_encounter_state(enc, tough_multiplier=1.3)
-    enc.max_actions = compute_action_budget(st.session_state.player)
-    enc.mode = f"stage:{stage_id}"
-    st.session_state.encounter = enc
-
-
-def start_influencer_battle(influencer_id: str):
-    elite = next(e for e in ELITE_FOUR if e["id"] == influencer_id)
-    npc_type = "Dealer"
-    mood = "neutral"
-    zone = "Modern Showcases"
-    cards = generate_cards_for_zone(zone, npc_type)
-    for c in cards:
-        c.true_value *= 3
-        c.ask_price = round(c.true_value * random.uniform(1.05, 1.25), 2)
-
-    enc = Encounter(
-        npc_type=npc_type,
-        mood=mood,
-        zone=zone,
-        cards=cards,
-        round=1,
-        active=True,
-        history=[f"You’re on camera with {elite['boss']} ({elite['name']})."],
-    )
-    init_encounter_state(enc, tough_multiplier=1.6)
-    enc.max_actions = compute_action_budget(st.session_state.player)
-    enc.mode = f"influencer:{influencer_id}"
-    st.session_state.encounter = enc
-
-
-def start_whale_battle():
-    champ = CHAMPION
-    npc_type = "PC Supercollector"
-    mood = "neutral"
-    zone = "Modern Showcases"
-    cards = generate_cards_for_zone(zone, npc_type)
-    for c in cards:
-        c.true_value *= 4
-        c.ask_price = round(c.true_value * random.uniform(1.05, 1.2), 2)
-
-    enc = Encounter(
-        npc_type=npc_type,
-        mood=mood,
-        zone=zone,
-        cards=cards,
-        round=1,
-        active=True,
-        history=[f"You approach {champ['boss']} – the biggest buyer in the room."],
-    )
-    init_encounter_state(enc, tough_multiplier=2.0)
-    enc.max_actions = compute_action_budget(st.session_state.player)
-    enc.mode = "whale"
-    st.session_state.encounter = enc
-
-
-def evaluate_offer(offer: float) -> str:
-    enc = st.session_state.encounter
-    player = st.session_state.player
-    total_true = sum(c.true_value for c in enc.cards)
-
-    attrs = player["attributes"]
-    subjects = player["subjects"]
-    neg = attrs["Negotiation"]
-
-    behavior = NPC_BEHAVIOR.get(enc.npc_type, {"min_pct": 0.85})
-    base_min_pct = behavior["min_pct"]
-
-    zone_subj = subject_score_for_zone(enc.zone, subjects)
-    if enc.npc_type == "PC Supercollector":
-        base_min_pct -= 0.03 * zone_subj
-    elif enc.npc_type == "Flipper":
-        modern_focus = (
-            subjects["Modern Baseball"] +
-            subjects["Modern Football"] +
-            subjects["Modern Basketball"] +
-            subjects["Modern Hockey"] +
-            subjects["Soccer"]
-        ) / 500.0
-        base_min_pct -= 0.02 * modern_focus
-
-    mood_factor = {
-        "happy": base_min_pct - 0.05,
-        "neutral": base_min_pct,
-        "grumpy": base_min_pct + 0.05,
-    }[enc.mood]
-
-    hp_factor = max(0.5, enc.npc_hp / enc.npc_max_hp)
-    effective_min_pct = mood_factor * enc.price_factor * hp_factor
-
-    neg_discount = (neg - 50) / 500.0
-    zone_subj_discount = zone_subj * 0.08
-
-    threshold_pct = max(0.6, effective_min_pct - neg_discount - zone_subj_discount)
-    threshold = total_true * threshold_pct
-
-    if offer >= threshold:
-        return "accept"
-    elif offer >= threshold * 0.8:
-        return "counter"
-    else:
-        return "reject"
+st.markdown(render.GLOBAL_CSS, unsafe_allow_html=True)
 
+COLLECTION_TABLE_ROWS = 200
+TRADE_POLL_SECONDS = 5
 
-def finalize_deal(price_paid: float):
-    enc = st.session_state.encounter
-    player = st.session_state.player
-    total_true = sum(c.true_value for c in enc.cards)
+# ---------- Initialize state ----------
+# Runs live in the shared session store under the id in the URL, so any
+# worker can pick one up.
+
+run_in_url = st.query_params.get("run")
+sync = st.session_state.get("_session_sync")
+if sync is None or (run_in_url and run_in_url != sync.run_id):
+    sync = SessionSync(get_session_store(), run_in_url or "")
+    pulled = bool(run_in_url) and sync.pull(st.session_state)
+    if not pulled:
+        init_state()
+        sync = SessionSync(get_session_store(), st.session_state.player["run_id"])
+    st.session_state["_session_sync"] = sync
+else:
+    pulled = sync.pull(st.session_state)
+if pulled or "timeline" not in st.session_state:
+    # Undo history stays with the browser session, so start it again from the loaded run
+    st.session_state.timeline = Timeline()
+    if st.session_state.player["build_locked"]:
+        st.session_state.timeline.reset(st.session_state)
 
-    player["cash"] -= price_paid
-    player["profit"] += (total_true - price_paid)
+# ---------- Header/banner ----------
 
-    for c in enc.cards:
-        player["collection"].append(asdict(c))
+st.markdown(render.BANNER, unsafe_allow_html=True)
 
-    enc.active = False
-    enc.history.append(
-        f"Deal done at ${price_paid:.2f}. Estimated value ${total_true:.2f}."
-    )
+# Balance tables for this rerun: the ones the run locked in under, or the live
+# ones before it locks in (an edit to the config file shows up on the next rerun)
+p = st.session_state.player
+pin_run_config(p)
+cfg = get_config()
+if sync.run_id != p["run_id"]:  # "Reset run" started a new one
+    sync = st.session_state["_session_sync"] = SessionSync(get_session_store(), p["run_id"])
+if run_in_url != p["run_id"]:
+    st.query_params["run"] = p["run_id"]
 
-    margin = total_true - price_paid
-    grant_xp_for_deal(enc.zone, margin, is_trade=False, is_sale=False)
-
-    # Boss win conditions
-    mode = getattr(enc, "mode", None)
-    if mode:
-        kind, ident = mode.split(":", 1) if ":" in mode else (mode, "")
-        total_true_all = total_true
-        margin_pct = margin / total_true_all if total_true_all > 0 else 0.0
-
-        if kind == "stage":
-            # Big table win if you at least break even
-            if margin >= 0:
-                mark_big_deal(ident)
-                enc.history.append("You’ve proven yourself at this major table. Big deal closed!")
-        elif kind == "influencer":
-            # Influencer win if ~10%+ edge
-            if margin_pct >= 0.10:
-                mark_influencer_won(ident)
-                enc.history.append("Chat loves it – you out‑negotiated the influencer on stream.")
-        elif kind == "whale":
-            # Whale win if big dollar or high % margin
-            if margin >= 200 or margin_pct >= 0.15:
-                mark_whale_won()
-                enc.history.append("You land a legendary margin against the National Whale.")
-
-def compute_collection_value(card_dicts):
-    return sum(c.get("true_value", 0) for c in card_dicts)
-
-
-def apply_move(move: str):
-    enc = st.session_state.encounter
-    npc = enc.npc_type
-    attrs = st.session_state.player["attributes"]
-
-    people = attrs["People Skills"]
-    knowledge = attrs["Card Knowledge"]
-    hustle = attrs["Hustle"]
-
-    social_mul = 0.8 + people / 100.0
-    knowledge_mul = 0.8 + knowledge / 100.0
-    hustle_mul = 0.8 + hustle / 150.0
-
-    hp_delta = 0
-    price_delta = 0.0
-    patience_delta = 0
-    line = ""
-
-    if move == "friendly_chat":
-        base = -10
-        if npc in ["Kid Collector", "PC Supercollector"]:
-            base = -18
-        hp_delta = int(base * social_mul)
-        line = f"{npc}: 'Love talking cards.' (Deal resistance drops.)"
-    elif move == "point_flaws":
-        base_hp = -15
-        base_price = -0.06
-        if npc in ["Dealer", "Flipper"]:
-            base_hp = -22
-            base_price = -0.08
-        hp_delta = int(base_hp * knowledge_mul)
-        price_delta = base_price * knowledge_mul
-        line = f"{npc}: 'Fair point.' (Price softens.)"
-    elif move == "lowball_probe":
-        base_hp = -8
-        base_price = 0.05
-        base_patience = -1
-        if npc not in ["Dealer", "Flipper"]:
-            base_hp = 15
-            base_patience = -2
-        hp_delta = int(base_hp * social_mul)
-        price_delta = base_price
-        patience_delta = int(base_patience * hustle_mul)
-        line = f"{npc}: 'That's low.'"
-    elif move == "show_comp":
-        base_hp = -12
-        base_price = -0.05
-        hp_delta = int(base_hp * knowledge_mul)
-        price_delta = base_price * knowledge_mul
-        line = f"{npc}: 'Those comps are solid.'"
-
-    enc.npc_hp = max(0, min(enc.npc_max_hp, enc.npc_hp + hp_delta))
-    enc.price_factor = max(0.7, enc.price_factor + price_delta)
-    enc.patience += patience_delta
-    enc.history.append(line)
-
-    if enc.patience <= 0 and enc.active:
-        enc.active = False
-        enc.history.append(f"{npc} has had enough and walks away from the table.")
+# ---------- Trade Night fills ----------
+# Fills are settled on every rerun, and while the run has orders open a
+# fragment (registered at the end of the script) polls the mailbox, so a
+# fill shows up without the player clicking.
 
 
-# ---------- Initialize state ----------
+def settle_trades() -> bool:
+    """Settle what the market sent; notices wait in session state until drawn."""
+    settled = actions.settle_fills()
+    notices = st.session_state.setdefault("_trade_notices", [])
+    for msg in settled:
+        if msg["type"] == "fill":
+            verb = "bought" if msg["side"] == "bid" else "sold"
+            notices.append(f"Trade Night: you {verb} {msg['row']['name']} for ${msg['price']:.2f}.")
+    return bool(settled)
 
-if "player" not in st.session_state:
-    init_state()
 
-# ---------- Header/banner ----------
+@st.fragment(run_every=TRADE_POLL_SECONDS)
+def trade_night_mailbox():
+    if settle_trades():
+        st.rerun()  # cash, collection and HUD all changed
 
-st.markdown(
-    """
-    <div style="
-        padding:0.45rem 0.9rem;
-        background:linear-gradient(90deg,#ffeb99,#ffd6cc);
-        border-radius:0.6rem;
-        border:1px solid #f0c36a;
-        margin-bottom:0.8rem;">
-        <span style="color:#b22222; font-weight:700;">National Collector RPG</span>
-        <span style="color:#555; margin-left:0.4rem;">• The National Sports Collectors Convention</span>
-    </div>
-    """,
-    unsafe_allow_html=True,
-)
 
-p = st.session_state.player
+if p["build_locked"]:
+    settle_trades()
+    for notice in st.session_state.pop("_trade_notices", []):
+        st.info(notice)
 
 # ---------- Sidebar / HUD ----------
 
@@ -719,15 +129,17 @@ with st.sidebar:
     st.markdown("---")
 
     st.markdown("**Level & XP**")
-    thresholds = [0, 50, 150, 300, 500, 750, 1100]
     lvl = p["level"]
     xp = p["xp"]
-    prev_t = thresholds[max(0, lvl - 1)]
-    next_t = thresholds[min(len(thresholds) - 1, lvl)]
-    span = max(1, next_t - prev_t)
-    pct_to_next = min(1.0, (xp - prev_t) / span)
-    st.write(f"Level {lvl} • XP {xp}/{next_t}")
-    st.progress(pct_to_next)
+    prev_t, next_t = level_band(lvl)
+    if next_t is None:
+        st.write(f"Level {lvl} • XP {xp} (max level)")
+        st.progress(1.0)
+    else:
+        span = max(1, next_t - prev_t)
+        pct_to_next = min(1.0, max(0.0, (xp - prev_t) / span))
+        st.write(f"Level {lvl} • XP {xp}/{next_t}")
+        st.progress(pct_to_next)
 
     st.markdown("---")
 
@@ -795,15 +207,20 @@ with st.sidebar:
         st.session_state["_force_page"] = "Collection & Results"
 
     st.markdown("**Milestones**")
-    st.caption(f"Big deals closed: {len(p['badges'])}/{len(GYMS)}")
-    st.caption(f"Influencers beat: {len(p['elite_defeated'])}/{len(ELITE_FOUR)}")
+    st.caption(f"Big deals closed: {len(p['badges'])}/{len(cfg.gyms)}")
+    st.caption(f"Influencers beat: {len(p['elite_defeated'])}/{len(cfg.elite_four)}")
     whale = "✅" if p["champion_defeated"] else "❌"
     st.caption(f"National Whale beaten: {whale}")
 
 # ---------- Page selection ----------
 
+# The Analytics page is server-wide ops data; only operators' deployments show it
+OPERATOR = os.environ.get("COLLECTOR_RPG_OPERATOR", "").lower() in ("1", "on", "true")
+
 if p["build_locked"]:
-    page_options = ["Show Floor", "Encounter", "Boss Battles", "Big Stages & Legends", "Collection & Results"]
+    page_options = ["Show Floor", "Encounter", "Boss Battles", "Big Stages & Legends", "Collection & Results", "Leaderboard"]
+    if OPERATOR:
+        page_options.append("Analytics")
 else:
     page_options = ["Intro & Build", "Show Floor", "Encounter", "Boss Battles", "Big Stages & Legends", "Collection & Results"]
 
@@ -817,6 +234,267 @@ page = st.radio("Go to", page_options, index=default_index, horizontal=True)
 if not p["build_locked"]:
     page = "Intro & Build"
 
+if st.session_state.get("_last_page") != page:
+    st.session_state["_last_page"] = page
+    emit("page_view", p["run_id"], page)
+
+# ---------- Encounter panel ----------
+TURN_SLOTS = 4  # moves one planned turn can queue
+MOVE_LABELS = {move.name: move.label for move in MOVES}
+
+# The Encounter and Boss Battles pages draw the same panel; these are the differences
+DESKS = {
+    False: {
+        "key": "regular",
+        "label": "",
+        "appears": "A {npc} appears.",
+        "resistance": "Deal resistance",
+        "resistance_short": "Deal resistance",
+        "more": "You sense there are more cards in the case…",
+        "moves": "Your moves",
+        "actions": "encounter actions",
+        "pancake_again": "on this encounter",
+        "max_offer": 10000.0,
+        "offer_step": 5.0,
+        "tactic_prompt": "Pick a special tactic for this round",
+        "cherry_pick": True,
+        "left": "You leave this dealer and head back to the floor.",
+    },
+    True: {
+        "key": "boss",
+        "label": " (boss)",
+        "appears": "{npc} – boss encounter.",
+        "resistance": "Boss deal resistance",
+        "resistance_short": "Resistance",
+        "more": "You see more heat in the case…",
+        "moves": "Boss moves",
+        "actions": "boss‑encounter actions",
+        "pancake_again": "in this boss battle",
+        "max_offer": 50000.0,
+        "offer_step": 25.0,
+        "tactic_prompt": "Pick a special tactic for this boss",
+        "cherry_pick": False,
+        "left": "You leave this boss encounter and head back to the floor.",
+    },
+}
+
+
+def card_offer_key(index: int, card) -> str:
+    """Widget key for a per-card offer; stable across reruns and reloads of the run."""
+    return f"card_offer_{index}_{card.card_id}"
+
+
+def encounter_panel(enc: Encounter, boss: bool):
+    desk = DESKS[boss]
+    label = desk["label"]
+    left_col, right_col = st.columns([3, 2], gap="large")
+
+    with left_col:
+        st.image("003_image.png", use_column_width=True)
+
+        zone_meta = cfg.zone_info.get(enc.zone, {"icon": "🎪"})
+        npc_meta = cfg.npc_info.get(enc.npc_type, {"icon": "🙂"})
+
+        st.markdown(
+            render.encounter_header(p["day"], p["time_block"], enc.zone, zone_meta["icon"], npc_meta["icon"],
+                                    desk["appears"].format(npc=enc.npc_type), enc.mood),
+            unsafe_allow_html=True,
+        )
+
+        hp_ratio = enc.npc_hp / enc.npc_max_hp if enc.npc_max_hp > 0 else 0
+        st.markdown(render.gauge_label(desk["resistance"]), unsafe_allow_html=True)
+        st.progress(hp_ratio)
+        st.caption(f"{desk['resistance_short']}: {enc.npc_hp}/{enc.npc_max_hp} • Patience left: {enc.patience}")
+
+        st.markdown("#### Recent conversation")
+        for line in enc.history[-5:]:
+            st.write("•", line)
+
+        st.markdown("#### Cards on the table")
+
+        visible = p.get("max_cards_visible", 2)
+        cards_to_show = enc.cards[:visible]
+
+        st.table(
+            [
+                {
+                    "Index": i,
+                    "Card": c.name,
+                    "Player": c.player,
+                    "Year": c.year,
+                    "Set": c.set_name,
+                    "Ask ($)": c.ask_price,
+                }
+                for i, c in enumerate(cards_to_show)
+            ]
+        )
+
+        if len(enc.cards) > visible:
+            st.caption(f"{desk['more']} (showing {visible} of {len(enc.cards)}).")
+
+    with right_col:
+        st.markdown(f"### {desk['moves']}")
+
+        remaining_actions = max(0, enc.max_actions - enc.actions_used)
+        st.caption(f"{desk['actions'].capitalize()} left: {remaining_actions}")
+        st.markdown(
+            f"- Core moves left (chat / flaws / probe / comps): **{remaining_actions}**\n"
+            f"- Pancake Analytics uses left: **{0 if enc.pancake_used else 1}**\n"
+            f"- Special tactics uses left: **{remaining_actions}**"
+        )
+
+        # Card selector for Pancake Analytics
+        pancake_idx = st.selectbox(
+            "Card to consult Pancake Analytics on",
+            options=list(range(len(enc.cards))),
+            format_func=lambda i: f"{enc.cards[i].name} ({enc.cards[i].set_name} {enc.cards[i].year})",
+            key=f"pancake_card_idx_{desk['key']}",
+        )
+
+        total_ask = sum(c.ask_price for c in enc.cards)
+        offer = st.number_input(
+            "Cash offer",
+            0.0, desk["max_offer"], min(total_ask, p["cash"]),
+            step=desk["offer_step"],
+            key=f"cash_offer_input_{desk['key']}",
+        )
+
+        # Three moves on the first row, the last one beside the offer and walk-away buttons
+        b_row1 = st.columns(3, gap="small")
+        pancake_btn = st.button(f"Consult Pancake Analytics{label}")
+        b_row2 = st.columns(3, gap="small")
+        pressed = [
+            move.name for col, move in zip(b_row1 + b_row2[:1], MOVES)
+            if col.button(f"{move.label}{label}")
+        ]
+        make_offer = b_row2[1].button(f"Make offer{label}")
+        walk = b_row2[2].button(f"Walk away{label}")
+
+        # Core moves: consume actions
+        actions.apply_actions([["move", name] for name in pressed])
+
+        # Queue a turn of moves (and an offer) and play it in one rerun
+        with st.expander(f"Plan a turn{label}"):
+            with st.form(f"turn_plan_{desk['key']}", border=False):
+                slots = [
+                    st.selectbox(
+                        f"Move {n + 1}",
+                        options=[None] + list(MOVE_LABELS),
+                        format_func=lambda name: "(none)" if name is None else MOVE_LABELS[name],
+                        key=f"turn_move_{desk['key']}_{n}",
+                    )
+                    for n in range(TURN_SLOTS)
+                ]
+                end_with_offer = st.checkbox("Finish with a cash offer", key=f"turn_offer_on_{desk['key']}")
+                turn_offer = st.number_input(
+                    "Turn offer",
+                    0.0, desk["max_offer"], min(total_ask, p["cash"]),
+                    step=desk["offer_step"],
+                    key=f"turn_offer_{desk['key']}",
+                )
+                play = st.form_submit_button(f"Play turn{label}", disabled=not enc.active)
+
+            queued = [name for name in slots if name is not None]
+            if play and (queued or end_with_offer):
+                if end_with_offer and turn_offer > p["cash"]:
+                    st.error("You don't have that much cash.")
+                else:
+                    results, _, lines = actions.play_turn(queued, turn_offer if end_with_offer else None)
+                    played = sum(results)
+                    st.caption(f"Played {played} of {len(queued)} queued move(s).")
+                    for line in lines:
+                        st.write("•", line)
+
+        # Pancake Analytics: only once per encounter, costs an action
+        if pancake_btn:
+            if enc.pancake_used:
+                st.warning(f"You already consulted Pancake Analytics {desk['pancake_again']}.")
+            elif enc.actions_used >= enc.max_actions:
+                st.warning(f"You’ve used all your {desk['actions']}.")
+            else:
+                target = enc.cards[pancake_idx]
+                est = actions.consult_pancake(pancake_idx)
+                st.info(
+                    f"Pancake Analytics estimate for {target.name} is "
+                    f"${est.value[0]:.2f} (range ${est.low[0]:.2f}–${est.high[0]:.2f}, "
+                    f"ask is ${target.ask_price:.2f})."
+                )
+
+        # Special tactics unlocked by leveling
+        if p["unlocked_tactics"]:
+            st.markdown("#### Special tactics")
+
+            names = [t["name"] for t in p["unlocked_tactics"]]
+            chosen = st.selectbox(
+                desk["tactic_prompt"],
+                options=["(None)"] + names,
+                key=f"special_tactic_select_{desk['key']}",
+            )
+
+            use_tactic = st.button(f"Use special tactic{label}")
+
+            if use_tactic and chosen != "(None)" and enc.active:
+                if enc.actions_used >= enc.max_actions:
+                    st.warning(f"You’ve used all your {desk['actions']}.")
+                elif actions.use_tactic(chosen):
+                    st.success(f"Special tactic '{chosen}' used this round.")
+
+        # Boss win conditions are checked when the deal closes
+        if make_offer and enc.active:
+            if offer > p["cash"]:
+                st.error("You don't have that much cash.")
+            else:
+                result, counter = actions.make_offer(offer)
+                if result == "accept":
+                    st.success("They accept your offer!")
+                elif result == "counter":
+                    st.info(f"They counter at ${counter:.2f}.")
+                else:
+                    st.warning("They reject your offer.")
+
+        # Per-card offers: cherry-pick part of the table
+        if desk["cherry_pick"]:
+            with st.expander("Per-card offers (cherry-pick)"):
+                offer_cards = enc.cards[:visible]
+
+                if st.button("Suggest offers within my cash", disabled=not enc.active):
+                    plan = optimize_lot(enc, p, p["cash"], list(range(len(offer_cards))))
+                    suggested = dict(plan.picks)
+                    for i, c in enumerate(offer_cards):
+                        st.session_state[card_offer_key(i, c)] = suggested.get(i, 0.0)
+                    st.caption(
+                        f"Suggested offers on {len(plan.picks)} card(s) for ${plan.total_offer:.2f} • "
+                        f"expected margin ${plan.expected_margin:.2f}"
+                    )
+
+                card_offers = {}
+                for i, c in enumerate(offer_cards):
+                    card_offers[i] = st.number_input(
+                        f"{c.name} ({c.set_name} {c.year}) • ask ${c.ask_price:.2f}",
+                        0.0, 50000.0, step=1.0,
+                        key=card_offer_key(i, c),
+                    )
+
+                per_card = st.button("Make per-card offers", disabled=not enc.active)
+                if per_card and enc.active:
+                    offers = {i: o for i, o in card_offers.items() if o > 0}
+                    if not offers:
+                        st.warning("Put an offer on at least one card.")
+                    elif sum(offers.values()) > p["cash"]:
+                        st.error("You don't have that much cash.")
+                    else:
+                        verdicts = actions.make_card_offers(offers)
+                        accepted = [i for i, v in verdicts.items() if v == "accept"]
+                        if accepted:
+                            spent = sum(offers[i] for i in accepted)
+                            st.success(f"They take {len(accepted)} of your offers for ${spent:.2f}.")
+                        if len(accepted) < len(offers):
+                            st.info(f"{len(offers) - len(accepted)} offer(s) declined.")
+
+        if walk and actions.walk_away():
+            st.write(desk["left"])
+
+
 # ---------- Pages ----------
 
 if page == "Intro & Build":
@@ -849,7 +527,7 @@ if page == "Intro & Build":
         st.markdown("### Core attributes (0–100)")
 
         attrs = p["attributes"]
-        attr_budget = 250
+        attr_budget = ATTR_BUDGET
         current_attr_total = sum(attrs.values())
         attr_remaining = attr_budget - current_attr_total
         st.caption(f"Points to allocate: {attr_remaining} (budget {attr_budget})")
@@ -868,7 +546,7 @@ if page == "Intro & Build":
         st.markdown("### Subject lanes (0–100 per lane)")
 
         subj = p["subjects"]
-        subj_budget = 300
+        subj_budget = SUBJECT_BUDGET
         current_subj_total = sum(subj.values())
         subj_remaining = subj_budget - current_subj_total
         st.caption(f"Subject points left: {subj_remaining} (budget {subj_budget})")
@@ -907,13 +585,43 @@ if page == "Intro & Build":
         )
         p["cash"] = st.number_input(
             "Starting cash",
-            100.0, 10000.0, float(p["cash"]), step=100.0,
+            *STARTING_CASH_RANGE, float(p["cash"]), step=100.0,
+        )
+        daily_on = st.checkbox(
+            f"Play today's Daily National ({today()})",
+            value=p["daily"] is not None,
+            help="Everyone gets the same tables in the same order today. Free roam, bins and sweeps are closed.",
         )
+        p["daily"] = today() if daily_on else None
+
+        with st.expander("Bring your own collection"):
+            st.caption(
+                "Start the trip with cards you already own: a CSV, JSON lines or Parquet file with "
+                "name, player, year, set, true_value and ask_price (paid and zone are optional). "
+                "Runs that start with imported cards aren't ranked on the leaderboard."
+            )
+            upload = st.file_uploader("Collection file", type=["csv", "jsonl", "ndjson", "parquet"])
+            if upload is not None and st.button("Add these cards"):
+                try:
+                    report = actions.seed_collection(upload, format_for(upload.name))
+                except CollectionFileError as exc:
+                    st.error(str(exc))
+                else:
+                    st.success(f"Added {report.added:,} of {report.read:,} cards.")
+                    if report.truncated:
+                        st.warning("The file was longer than the import limit; the rest was skipped.")
+                    if report.rejected:
+                        st.warning(f"Skipped {report.rejected:,} rows:\n\n" + "\n\n".join(report.errors))
+            if p.get("imported"):
+                st.caption(f"{p['imported']:,} imported cards in your collection.")
 
         start_disabled = attr_remaining != 0 or subj_remaining != 0 or not p["name"]
         if st.button("Lock in build and start trip", disabled=start_disabled):
-            p["build_locked"] = True
-            st.success("Build locked! Head to the Show Floor to start making deals.")
+            problems = actions.lock_build()
+            if problems:
+                st.error(" ".join(problems))
+            else:
+                st.success("Build locked! Head to the Show Floor to start making deals.")
 
 elif page == "Show Floor":
     st.title("Show Floor")
@@ -926,270 +634,247 @@ elif page == "Show Floor":
         with left_col:
             st.image("002_image.png", use_column_width=True)
 
-            st.markdown(
-                "<div style='margin-top:0.6rem; padding:0.6rem 0.8rem; "
-                "background-color:#ffffff; border-radius:0.7rem; "
-                "border:1px solid #e0e0ff;'>"
-                "<div style='font-size:0.85rem; color:#777; margin-bottom:0.25rem;'>"
-                "Where do you want to go?"
-                "</div>"
-                "</div>",
-                unsafe_allow_html=True,
-            )
-
-            zone = st.selectbox(" ", ZONES, label_visibility="collapsed")
-
-            if st.button("Walk to this zone"):
-                start_encounter(zone)
-                st.success(f"You walk over to {zone} and spot a potential deal.")
-                st.info("Switch to the 'Encounter' page to negotiate.")
-
-        with right_col:
-            st.markdown("### Zones")
-
-            for name in ZONES:
-                meta = ZONE_META[name]
+            if p["daily"] is not None:
+                schedule = get_schedule(p["daily"])
+                st.markdown(f"#### Daily National • {p['daily']}")
+                st.caption(
+                    "Every collector gets the same tables today, in the same order. "
+                    "Work them one at a time; free roam, bins and sweeps are closed."
+                )
+                st.progress(p["daily_next"] / len(schedule))
+                st.caption(f"Tables worked: {p['daily_next']} / {len(schedule)}")
+                upcoming = next_table(p)
+                if upcoming is None:
+                    st.success("You've worked every table on today's floor.")
+                elif st.button(f"Next table ({cfg.zone_info[upcoming.zone]['icon']} {upcoming.zone})"):
+                    actions.next_daily_table()
+                    st.info("Switch to the 'Encounter' page to negotiate.")
+            else:
                 st.markdown(
-                    f"""
-                    <div style="
-                        padding:0.6rem 0.9rem;
-                        margin-bottom:0.45rem;
-                        border-radius:0.7rem;
-                        border:1px solid #e0e0ff;
-                        background-color:#ffffff;">
-                        <span style="font-size:1.1rem; margin-right:0.4rem;">{meta['icon']}</span>
-                        <span style="font-weight:600;">{name}</span>
-                    </div>
-                    """,
+                    "<div style='margin-top:0.6rem; padding:0.6rem 0.8rem; "
+                    "background-color:#ffffff; border-radius:0.7rem; "
+                    "border:1px solid #e0e0ff;'>"
+                    "<div style='font-size:0.85rem; color:#777; margin-bottom:0.25rem;'>"
+                    "Where do you want to go?"
+                    "</div>"
+                    "</div>",
                     unsafe_allow_html=True,
                 )
 
-elif page == "Encounter":
-    st.title("Encounter")
-
-    enc: Encounter = st.session_state.encounter
-
-    if not p["build_locked"]:
-        st.warning("Head to 'Intro & Build' first to roll your collector build.")
-    elif enc is None or not enc.active or getattr(enc, "mode", "normal") != "normal":
-        st.write("No regular encounter. Go to Show Floor for dealers or Boss Battles for big stages.")
-    else:
-        # --- regular dealer encounter UI (same as before, using enc.mode == 'normal') ---
-        left_col, right_col = st.columns([3, 2], gap="large")
+                zone = st.selectbox(" ", cfg.zones, label_visibility="collapsed")
 
-        with left_col:
-            st.image("003_image.png", use_column_width=True)
+                if st.button("Walk to this zone"):
+                    actions.walk_to(zone)
+                    st.success(f"You walk over to {zone} and spot a potential deal.")
+                    st.info("Switch to the 'Encounter' page to negotiate.")
 
-            zone_meta = ZONE_META.get(enc.zone, {"icon": "🎪"})
-            npc_meta = NPC_META.get(enc.npc_type, {"icon": "🙂"})
+                if zone == "Trade Night":
+                    with st.expander("Trade Night market", expanded=bool(p["orders"])):
+                        st.caption(
+                            "Bid on and list cards against other collectors. Best price fills first, "
+                            "then whoever got there first. Cash and cards are held while an order is open."
+                        )
+                        catalog = get_catalog()
+                        listings = get_trade_night().listings()
+                        if listings:
+                            st.table(
+                                [
+                                    {
+                                        "Card": catalog.card(l["card_id"], 0.0).name,
+                                        "Set": catalog.card(l["card_id"], 0.0).set_name,
+                                        "Best ask ($)": l["best_ask"],
+                                        "Asks": l["asks"],
+                                        "Best bid ($)": l["best_bid"],
+                                        "Bids": l["bids"],
+                                    }
+                                    for l in listings
+                                ]
+                            )
+                        else:
+                            st.write("No orders on the board yet.")
+
+                        bid_col, ask_col = st.columns(2)
+                        with bid_col:
+                            bid_card = st.selectbox(
+                                "Bid on",
+                                [l["card_id"] for l in listings],
+                                format_func=lambda cid: catalog.card(cid, 0.0).name,
+                                key="tn_bid_card",
+                            )
+                            bid_price = st.number_input("Bid ($)", 0.0, 50000.0, step=1.0, key="tn_bid_price")
+                            if st.button("Post bid", disabled=bid_card is None or bid_price <= 0):
+                                if actions.post_bid(bid_card, bid_price) is None:
+                                    st.error("You don't have that much cash.")
+                        with ask_col:
+                            recent = range(max(0, len(p["collection"]) - COLLECTION_TABLE_ROWS), len(p["collection"]))
+                            sellable = [i for i in recent if p["collection"][i].get("card_id") is not None]
+                            ask_row = st.selectbox(
+                                "Sell",
+                                sellable,
+                                format_func=lambda i: f"{p['collection'][i]['name']} (paid ${p['collection'][i]['paid']:.2f})",
+                                key="tn_ask_row",
+                            )
+                            ask_price = st.number_input("Ask ($)", 0.0, 50000.0, step=1.0, key="tn_ask_price")
+                            if st.button("Post ask", disabled=ask_row is None or ask_price <= 0):
+                                actions.post_ask(ask_row, ask_price)
+
+                        if p["orders"]:
+                            st.markdown("**Your open orders**")
+                            for oid, held in list(p["orders"].items()):
+                                order_col, cancel_col = st.columns([3, 1])
+                                order_col.write(
+                                    f"{held['side'].capitalize()} • {catalog.card(held['card_id'], 0.0).name} • "
+                                    f"${held['price']:.2f}"
+                                )
+                                if cancel_col.button("Cancel", key=f"tn_cancel_{oid}"):
+                                    actions.cancel_order(int(oid))
+
+                if zone == "Dollar Boxes":
+                    with st.expander("Big Dollar Box bin", expanded=st.session_state.get("dollar_bin") is not None):
+                        if st.button("Find a big bin"):
+                            actions.find_bin()
+
+                        dbin = st.session_state.get("dollar_bin")
+                        if dbin is not None:
+                            if st.button("Scan the bin", disabled=dbin.scans_left <= 0):
+                                if not actions.scan_dollar_bin():
+                                    st.warning("Nothing left in this bin worth a second look.")
+                            st.caption(
+                                f"{len(dbin)} cards in the bin • {int(dbin.scanned.sum())} flipped • "
+                                f"scans left: {dbin.scans_left}"
+                            )
 
-            st.markdown(
-                f"""
-                <div style="
-                    margin-top:0.4rem;
-                    padding:0.4rem 0.7rem;
-                    background-color:#ffffff;
-                    border-radius:0.6rem;
-                    border:1px solid #e0e0ff;">
-                    <span style="color:#777;">Day {p['day']} • {p['time_block']} • </span>
-                    <span>{zone_meta['icon']} {enc.zone}</span><br/>
-                    <span style="color:#b20000;">{npc_meta['icon']} A {enc.npc_type} appears.</span>
-                    <span style="color:#555;"> They seem {enc.mood}.</span>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+                            shown = dbin.found[:actions.BIN_PICKS_SHOWN]
+                            if shown:
+                                st.table(
+                                    [
+                                        {
+                                            "Card": h["card"],
+                                            "Set": h["set"],
+                                            "Ask ($)": h["ask"],
+                                            "Your read ($)": h["read"],
+                                        }
+                                        for h in shown
+                                    ]
+                                )
+                                labels = {h["pos"]: f"{h['card']} ({h['set']}, ${h['ask']:.0f})" for h in shown}
+                                picks = st.multiselect(
+                                    "Pull to the counter",
+                                    options=list(labels),
+                                    format_func=labels.get,
+                                    max_selections=p.get("max_cards_visible", 2),
+                                    key="bin_picks",
+                                )
+                                if st.button("Take picks to the dealer", disabled=not picks):
+                                    actions.take_bin_picks(picks)
+                                    st.info("Switch to the 'Encounter' page to negotiate.")
+
+                with st.expander("Walk the aisles", expanded=p.get("floor_table") is not None):
+                    floor = get_floor()
+                    here = p.get("floor_table")
+                    where = "the entrance" if here is None else f"booth {floor.booth[here]} ({floor.zone_of(here)})"
+                    st.caption(
+                        f"{len(floor):,} tables on the floor. You're at {where} with {p['stamina']} stamina; "
+                        "walking costs stamina by distance."
+                    )
+                    for line in p.get("show_news", [])[-2:]:
+                        st.info(line)
+                    for table_id, meters in floor.nearby(here):
+                        near_zone = floor.zone_of(table_id)
+                        cost = walk_cost(meters)
+                        row_col, go_col = st.columns([3, 1])
+                        row_col.write(
+                            f"{cfg.zone_info[near_zone]['icon']} Booth {floor.booth[table_id]} • {near_zone} • "
+                            f"{meters:.0f} m • {cost} stamina"
+                        )
+                        if go_col.button("Walk over", key=f"visit_{table_id}", disabled=cost > p["stamina"]):
+                            if actions.visit_table(table_id):
+                                st.info("Switch to the 'Encounter' page to negotiate.")
+                            else:
+                                st.warning("That table is sold out.")
+
+                    booth_col, break_col = st.columns(2)
+                    with booth_col:
+                        booth = st.number_input("Head to booth", 0, int(floor.booth[-1]), 0, step=1, key="floor_booth")
+                        target = floor.table_at(int(booth))
+                        if st.button("Go", disabled=target is None):
+                            cost = walk_cost(floor.distance(here, target))
+                            if cost > p["stamina"]:
+                                st.warning(f"That's {cost} stamina away; take a break first.")
+                            elif actions.visit_table(target):
+                                st.info("Switch to the 'Encounter' page to negotiate.")
+                            else:
+                                st.warning("That table is sold out.")
+                    with break_col:
+                        if st.button("Take a break", disabled=p["stamina"] >= STAMINA_MAX):
+                            actions.take_break()
+
+                with st.expander("Auto-sweep: work many tables in one go"):
+                    st.caption(
+                        "Set your buy rules and the sweep works each table with the same offer "
+                        "logic as the Encounter page, then books everything at once."
+                    )
+                    sweep_zones = st.multiselect("Zones to sweep", cfg.zones, default=["Dollar Boxes"], key="sweep_zones")
+                    open_pct, max_pct = st.slider(
+                        "Offer range (% of ask)", 30, 100, (60, 80), step=5, key="sweep_pct_range"
+                    )
+                    sweep_col1, sweep_col2 = st.columns(2)
+                    with sweep_col1:
+                        sweep_n = st.number_input(
+                            "Tables to work", 1, MAX_SWEEP_ENCOUNTERS, 25, step=5, key="sweep_n"
+                        )
+                    with sweep_col2:
+                        sweep_reserve = st.number_input(
+                            "Keep at least this much cash", 0.0, 10000.0, 0.0, step=50.0, key="sweep_reserve"
+                        )
 
-            hp_ratio = enc.npc_hp / enc.npc_max_hp if enc.npc_max_hp > 0 else 0
-            st.markdown(
-                """
-                <div style="margin-top:0.5rem; margin-bottom:0.15rem; color:#777; font-size:0.8rem;">
-                    Deal resistance
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-            st.progress(hp_ratio)
-            st.caption(f"Deal resistance: {enc.npc_hp}/{enc.npc_max_hp} • Patience left: {enc.patience}")
-
-            st.markdown("#### Recent conversation")
-            for line in enc.history[-5:]:
-                st.write("•", line)
-
-            st.markdown("#### Cards on the table")
-
-            visible = p.get("max_cards_visible", 2)
-            cards_to_show = enc.cards[:visible]
-
-            st.table(
-                [
-                    {
-                        "Index": i,
-                        "Card": c.name,
-                        "Player": c.player,
-                        "Year": c.year,
-                        "Set": c.set_name,
-                        "Ask ($)": c.ask_price,
-                    }
-                    for i, c in enumerate(cards_to_show)
-                ]
-            )
+                    if st.button("Run sweep", disabled=not sweep_zones):
+                        st.session_state["last_sweep"] = actions.sweep(
+                            SweepRules(
+                                zones=tuple(sweep_zones),
+                                opening_pct=open_pct / 100.0,
+                                max_pct_of_ask=max_pct / 100.0,
+                                encounters=int(sweep_n),
+                                cash_reserve=sweep_reserve,
+                            )
+                        )
 
-            if len(enc.cards) > visible:
-                st.caption(f"You sense there are more cards in the case… (showing {visible} of {len(enc.cards)}).")
+                    summary = st.session_state.get("last_sweep")
+                    if summary:
+                        st.write(
+                            f"Worked {summary.encounters} tables: {summary.deals} deals, "
+                            f"{summary.walked} walked, {summary.skipped} skipped for cash."
+                        )
+                        st.write(
+                            f"Spent ${summary.spent:.2f} for ${summary.value:.2f} of value "
+                            f"(margin ${summary.margin:.2f}) • +{summary.xp} XP"
+                        )
+                        if summary.by_zone:
+                            st.table(list(summary.by_zone.values()))
 
         with right_col:
-            st.markdown("### Your moves")
+            st.markdown("### Zones")
 
-            remaining_actions = max(0, enc.max_actions - enc.actions_used)
-            st.caption(f"Encounter actions left: {remaining_actions}")
             st.markdown(
-                f"- Core moves left (chat / flaws / probe / comps): **{remaining_actions}**\n"
-                f"- Pancake Analytics uses left: **{0 if enc.pancake_used else 1}**\n"
-                f"- Special tactics uses left: **{remaining_actions}**"
-            )
-
-            # Card selector for Pancake Analytics
-            pancake_idx = st.selectbox(
-                "Card to consult Pancake Analytics on",
-                options=list(range(len(enc.cards))),
-                format_func=lambda i: f"{enc.cards[i].name} ({enc.cards[i].set_name} {enc.cards[i].year})",
-                key="pancake_card_idx_regular",
+                render.zone_cards(tuple((cfg.zone_info[name]["icon"], name) for name in cfg.zones)),
+                unsafe_allow_html=True,
             )
 
-            total_ask = sum(c.ask_price for c in enc.cards)
-            offer = st.number_input(
-                "Cash offer",
-                0.0, 10000.0, min(total_ask, p["cash"]),
-                step=5.0,
-                key="cash_offer_input_regular",
-            )
+            st.markdown("### Market pulse")
+            st.caption(f"Price index vs opening morning • Day {p['day']} • {p['time_block']}")
+            st.table(get_market().movers(tick_for(p["day"], p["time_block"])))
 
-            b_row1 = st.columns(3, gap="small")
-            friendly = b_row1[0].button("Friendly chat")
-            flaws = b_row1[1].button("Point out flaws")
-            lowball = b_row1[2].button("Lowball probe")
-
-            pancake_btn = st.button("Consult Pancake Analytics")
-
-            b_row2 = st.columns(3, gap="small")
-            comps = b_row2[0].button("Show comps")
-            make_offer = b_row2[1].button("Make offer")
-            walk = b_row2[2].button("Walk away")
-
-            # Core moves: consume actions
-            if friendly and enc.actions_used < enc.max_actions:
-                apply_move("friendly_chat")
-                enc.actions_used += 1
-            if flaws and enc.actions_used < enc.max_actions:
-                apply_move("point_flaws")
-                enc.actions_used += 1
-            if lowball and enc.actions_used < enc.max_actions:
-                apply_move("lowball_probe")
-                enc.actions_used += 1
-            if comps and enc.actions_used < enc.max_actions:
-                apply_move("show_comp")
-                enc.actions_used += 1
-
-            # Pancake Analytics: only once per encounter, costs an action
-            if pancake_btn:
-                if enc.pancake_used:
-                    st.warning("You already consulted Pancake Analytics on this encounter.")
-                elif enc.actions_used >= enc.max_actions:
-                    st.warning("You’ve used all your encounter actions.")
-                else:
-                    target = enc.cards[pancake_idx]
-                    enc.history.append(
-                        f"You quietly consult Pancake Analytics on {target.name} "
-                        f"({target.set_name} {target.year}). True value comes back at ${target.true_value:.2f}."
-                    )
-                    st.info(
-                        f"Pancake Analytics estimate for {target.name} is "
-                        f"${target.true_value:.2f} (ask is ${target.ask_price:.2f})."
-                    )
-                    enc.pancake_used = True
-                    enc.actions_used += 1
-
-            # Special tactics unlocked by leveling
-            if p["unlocked_tactics"]:
-                st.markdown("#### Special tactics")
-
-                names = [t["name"] for t in p["unlocked_tactics"]]
-                chosen = st.selectbox(
-                    "Pick a special tactic for this round",
-                    options=["(None)"] + names,
-                    key="special_tactic_select_regular",
-                )
-
-                use_tactic = st.button("Use special tactic")
-
-                if use_tactic and chosen != "(None)" and enc.active:
-                    if enc.actions_used >= enc.max_actions:
-                        st.warning("You’ve used all your encounter actions.")
-                    else:
-                        t = next(t for t in p["unlocked_tactics"] if t["name"] == chosen)
-                        origin = t["from_attr"]
-
-                        if origin == "Negotiation":
-                            enc.npc_hp = max(0, enc.npc_hp - 20)
-                            enc.history.append(
-                                f"You use {t['name']} and the dealer suddenly rethinks their anchor price."
-                            )
-                        elif origin == "People Skills":
-                            enc.mood = "happy"
-                            enc.history.append(
-                                f"You use {t['name']} and the table energy shifts in your favor."
-                            )
-                        elif origin == "Card Knowledge":
-                            enc.price_factor = max(0.75, enc.price_factor - 0.1)
-                            enc.history.append(
-                                f"You use {t['name']} and your detailed knowledge softens their pricing."
-                            )
-                        elif origin == "Hustle":
-                            old_visible = p.get("max_cards_visible", 2)
-                            p["max_cards_visible"] = min(6, old_visible + 1)
-                            enc.history.append(
-                                f"You use {t['name']} and quickly scan more of the case for hidden value."
-                            )
+elif page == "Encounter":
+    st.title("Encounter")
 
-                        enc.actions_used += 1
-                        st.success(f"Special tactic '{t['name']}' used this round.")
+    enc: Encounter = st.session_state.encounter
 
-            if make_offer and enc.active:
-                if offer > p["cash"]:
-                    st.error("You don't have that much cash.")
-                else:
-                    result = evaluate_offer(offer)
-                    if result == "accept":
-                        st.success("They accept your offer!")
-                        enc.history.append(f"You offer ${offer:.2f}. They accept.")
-                        finalize_deal(offer)
-                    elif result == "counter":
-                        counter = round(offer * random.uniform(1.05, 1.15), 2)
-                        enc.history.append(
-                            f"You offer ${offer:.2f}. They counter at ${counter:.2f}."
-                        )
-                        st.info(f"They counter at ${counter:.2f}.")
-                        enc.round += 1
-                    else:
-                        enc.history.append(
-                            f"You offer ${offer:.2f}. They reject and seem annoyed."
-                        )
-                        st.warning("They reject your offer.")
-                        enc.round += 1
-                        if enc.mood == "happy":
-                            enc.mood = "neutral"
-                        elif enc.mood == "neutral":
-                            enc.mood = "grumpy"
-
-            # --- trade & sell blocks identical to previous full script, omitted here for brevity ---
-            # You can keep the same trade / sell logic from the last version inside this Encounter page.
-
-            # Walk away
-            if walk and enc.active:
-                enc.history.append("You walk away from the table.")
-                enc.active = False
-                st.write("You leave this dealer and head back to the floor.")
+    if not p["build_locked"]:
+        st.warning("Head to 'Intro & Build' first to roll your collector build.")
+    elif enc is None or not enc.active or table_kind(enc)[0].boss:
+        st.write("No regular encounter. Go to Show Floor for dealers or Boss Battles for big stages.")
+    else:
+        encounter_panel(enc, boss=False)
 
 elif page == "Boss Battles":
     st.title("Boss Battles")
@@ -1198,236 +883,12 @@ elif page == "Boss Battles":
 
     if not p["build_locked"]:
         st.warning("Head to 'Intro & Build' first to roll your collector build.")
-    elif enc is None or not enc.active or getattr(enc, "mode", "normal") == "normal":
+    elif enc is None or not enc.active or not table_kind(enc)[0].boss:
         st.write("No active boss battle. Use Big Stages & Legends to challenge a big table, influencer, or the Whale.")
     else:
-        # Determine which boss
-        mode = getattr(enc, "mode", "")
-        kind, ident = mode.split(":", 1) if ":" in mode else (mode, "")
-
-        if kind == "stage":
-            gym = next(g for g in GYMS if g["id"] == ident)
-            st.subheader(gym["name"])
-            st.caption("Objective: Leave the table at least break‑even on value to earn the big‑deal badge.")
-        elif kind == "influencer":
-            elite = next(e for e in ELITE_FOUR if e["id"] == ident)
-            st.subheader(elite["name"])
-            st.caption("Objective: Close a deal with roughly 10% or better value edge to win the battle.")
-        elif kind == "whale":
-            st.subheader(CHAMPION["name"])
-            st.caption("Objective: Land a huge margin (big dollar or high percent) to beat the National Whale.")
-
-        left_col, right_col = st.columns([3, 2], gap="large")
-
-        with left_col:
-            st.image("003_image.png", use_column_width=True)
-
-            zone_meta = ZONE_META.get(enc.zone, {"icon": "🎪"})
-            npc_meta = NPC_META.get(enc.npc_type, {"icon": "🙂"})
-
-            st.markdown(
-                f"""
-                <div style="
-                    margin-top:0.4rem;
-                    padding:0.4rem 0.7rem;
-                    background-color:#ffffff;
-                    border-radius:0.6rem;
-                    border:1px solid #e0e0ff;">
-                    <span style="color:#777;">Day {p['day']} • {p['time_block']} • </span>
-                    <span>{zone_meta['icon']} {enc.zone}</span><br/>
-                    <span style="color:#b20000;">{npc_meta['icon']} {enc.npc_type} – boss encounter.</span>
-                    <span style="color:#555;"> They seem {enc.mood}.</span>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-            hp_ratio = enc.npc_hp / enc.npc_max_hp if enc.npc_max_hp > 0 else 0
-            st.markdown(
-                """
-                <div style="margin-top:0.5rem; margin-bottom:0.15rem; color:#777; font-size:0.8rem;">
-                    Boss deal resistance
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-            st.progress(hp_ratio)
-            st.caption(f"Resistance: {enc.npc_hp}/{enc.npc_max_hp} • Patience left: {enc.patience}")
-
-            st.markdown("#### Recent conversation")
-            for line in enc.history[-5:]:
-                st.write("•", line)
-
-            st.markdown("#### Cards on the table")
-
-            visible = p.get("max_cards_visible", 2)
-            cards_to_show = enc.cards[:visible]
-
-            st.table(
-                [
-                    {
-                        "Index": i,
-                        "Card": c.name,
-                        "Player": c.player,
-                        "Year": c.year,
-                        "Set": c.set_name,
-                        "Ask ($)": c.ask_price,
-                    }
-                    for i, c in enumerate(cards_to_show)
-                ]
-            )
-
-            if len(enc.cards) > visible:
-                st.caption(f"You see more heat in the case… (showing {visible} of {len(enc.cards)}).")
-
-        with right_col:
-            st.markdown("### Boss moves")
-
-            remaining_actions = max(0, enc.max_actions - enc.actions_used)
-            st.caption(f"Boss‑encounter actions left: {remaining_actions}")
-            st.markdown(
-                f"- Core moves left (chat / flaws / probe / comps): **{remaining_actions}**\n"
-                f"- Pancake Analytics uses left: **{0 if enc.pancake_used else 1}**\n"
-                f"- Special tactics uses left: **{remaining_actions}**"
-            )
-
-            pancake_idx = st.selectbox(
-                "Card to consult Pancake Analytics on",
-                options=list(range(len(enc.cards))),
-                format_func=lambda i: f"{enc.cards[i].name} ({enc.cards[i].set_name} {enc.cards[i].year})",
-                key="pancake_card_idx_boss",
-            )
-
-            total_ask = sum(c.ask_price for c in enc.cards)
-            offer = st.number_input(
-                "Cash offer",
-                0.0, 50000.0, min(total_ask, p["cash"]),
-                step=25.0,
-                key="cash_offer_input_boss",
-            )
-
-            b_row1 = st.columns(3, gap="small")
-            friendly = b_row1[0].button("Friendly chat (boss)")
-            flaws = b_row1[1].button("Point out flaws (boss)")
-            lowball = b_row1[2].button("Lowball probe (boss)")
-
-            pancake_btn = st.button("Consult Pancake Analytics (boss)")
-
-            b_row2 = st.columns(3, gap="small")
-            comps = b_row2[0].button("Show comps (boss)")
-            make_offer = b_row2[1].button("Make offer (boss)")
-            walk = b_row2[2].button("Walk away (boss)")
-
-            # Core moves consume boss action budget
-            if friendly and enc.actions_used < enc.max_actions:
-                apply_move("friendly_chat")
-                enc.actions_used += 1
-            if flaws and enc.actions_used < enc.max_actions:
-                apply_move("point_flaws")
-                enc.actions_used += 1
-            if lowball and enc.actions_used < enc.max_actions:
-                apply_move("lowball_probe")
-                enc.actions_used += 1
-            if comps and enc.actions_used < enc.max_actions:
-                apply_move("show_comp")
-                enc.actions_used += 1
-
-            # Pancake once per boss
-            if pancake_btn:
-                if enc.pancake_used:
-                    st.warning("You already consulted Pancake Analytics in this boss battle.")
-                elif enc.actions_used >= enc.max_actions:
-                    st.warning("You’ve used all your boss‑encounter actions.")
-                else:
-                    target = enc.cards[pancake_idx]
-                    enc.history.append(
-                        f"You consult Pancake Analytics on {target.name} "
-                        f"({target.set_name} {target.year}). True value comes back at ${target.true_value:.2f}."
-                    )
-                    st.info(
-                        f"Pancake Analytics estimate for {target.name} is "
-                        f"${target.true_value:.2f} (ask is ${target.ask_price:.2f})."
-                    )
-                    enc.pancake_used = True
-                    enc.actions_used += 1
-
-            # Special tactics
-            if p["unlocked_tactics"]:
-                st.markdown("#### Special tactics")
-
-                names = [t["name"] for t in p["unlocked_tactics"]]
-                chosen = st.selectbox(
-                    "Pick a special tactic for this boss",
-                    options=["(None)"] + names,
-                    key="special_tactic_select_boss",
-                )
-
-                use_tactic = st.button("Use special tactic (boss)")
-
-                if use_tactic and chosen != "(None)" and enc.active:
-                    if enc.actions_used >= enc.max_actions:
-                        st.warning("You’ve used all your boss‑encounter actions.")
-                    else:
-                        t = next(t for t in p["unlocked_tactics"] if t["name"] == chosen)
-                        origin = t["from_attr"]
-
-                        if origin == "Negotiation":
-                            enc.npc_hp = max(0, enc.npc_hp - 25)
-                            enc.history.append(
-                                f"You use {t['name']} and the boss dealer rethinks their anchor."
-                            )
-                        elif origin == "People Skills":
-                            enc.mood = "happy"
-                            enc.history.append(
-                                f"You use {t['name']} and instantly change the room’s energy."
-                            )
-                        elif origin == "Card Knowledge":
-                            enc.price_factor = max(0.7, enc.price_factor - 0.12)
-                            enc.history.append(
-                                f"You use {t['name']} and your deep knowledge shakes their confidence."
-                            )
-                        elif origin == "Hustle":
-                            old_visible = p.get("max_cards_visible", 2)
-                            p["max_cards_visible"] = min(6, old_visible + 1)
-                            enc.history.append(
-                                f"You use {t['name']} and quickly surface another key card from the case."
-                            )
-
-                        enc.actions_used += 1
-                        st.success(f"Special tactic '{t['name']}' used this round.")
-
-            # Offers work the same; win conditions handled in finalize_deal
-            if make_offer and enc.active:
-                if offer > p["cash"]:
-                    st.error("You don't have that much cash.")
-                else:
-                    result = evaluate_offer(offer)
-                    if result == "accept":
-                        st.success("They accept your offer!")
-                        enc.history.append(f"You offer ${offer:.2f}. They accept.")
-                        finalize_deal(offer)
-                    elif result == "counter":
-                        counter = round(offer * random.uniform(1.05, 1.15), 2)
-                        enc.history.append(
-                            f"You offer ${offer:.2f}. They counter at ${counter:.2f}."
-                        )
-                        st.info(f"They counter at ${counter:.2f}.")
-                        enc.round += 1
-                    else:
-                        enc.history.append(
-                            f"You offer ${offer:.2f}. They reject and seem annoyed."
-                        )
-                        st.warning("They reject your offer.")
-                        enc.round += 1
-                        if enc.mood == "happy":
-                            enc.mood = "neutral"
-                        elif enc.mood == "neutral":
-                            enc.mood = "grumpy"
-
-            if walk and enc.active:
-                enc.history.append("You back away from the boss table.")
-                enc.active = False
-                st.write("You leave this boss encounter and head back to the floor.")
+        st.subheader(boss_entry(enc)["name"])
+        st.caption(table_kind(enc)[0].objective)
+        encounter_panel(enc, boss=True)
 
 elif page == "Big Stages & Legends":
     st.title("Big Stages & Legends")
@@ -1437,7 +898,7 @@ elif page == "Big Stages & Legends":
     else:
         st.subheader("Major Tables (big deals)")
 
-        for gym in GYMS:
+        for gym in cfg.gyms:
             has = has_big_deal(gym["id"])
             unlocked = p["level"] >= gym["required_level"]
             status = "✅ Big deal done" if has else (
@@ -1445,40 +906,40 @@ elif page == "Big Stages & Legends":
             )
             st.markdown(f"**{gym['name']}** – {gym['boss']}  |  {status}")
             st.caption(gym["description"])
-            if unlocked and not has:
+            if stage_unlocked(p, gym["id"]):
                 if st.button(f"Sit down with {gym['boss']}", key=f"stage_{gym['id']}"):
-                    start_stage_battle(gym["id"])
+                    actions.sit_down(gym["id"])
                     st.success(f"You sit down at {gym['name']}! Go to the Boss Battles page.")
 
         st.divider()
         st.subheader("Influencer Battles")
 
-        for elite in ELITE_FOUR:
+        for elite in cfg.elite_four:
             has = elite["id"] in p["elite_defeated"]
-            unlocked = p["level"] >= elite["required_level"] and len(p["badges"]) >= len(GYMS)
+            unlocked = p["level"] >= elite["required_level"] and len(p["badges"]) >= len(cfg.gyms)
             status = "✅ Out‑negotiated" if has else (
                 "🔓 Ready" if unlocked else f"🔒 Requires level {elite['required_level']} + all big deals"
             )
             st.markdown(f"**{elite['name']}** – {elite['boss']}  |  {status}")
             st.caption(elite["description"])
-            if unlocked and not has:
+            if influencer_unlocked(p, elite["id"]):
                 if st.button(f"Go on stream with {elite['boss']}", key=f"influencer_{elite['id']}"):
-                    start_influencer_battle(elite["id"])
+                    actions.go_on_stream(elite["id"])
                     st.success(f"You’re live with {elite['boss']}! Go to the Boss Battles page.")
 
         st.divider()
         st.subheader("The National Whale")
 
-        champ_unlocked = len(p["elite_defeated"]) >= len(ELITE_FOUR)
+        champ_unlocked = len(p["elite_defeated"]) >= len(cfg.elite_four)
         champ_done = p["champion_defeated"]
         status = "✅ Deal done with the Whale" if champ_done else (
             "🔓 Ready" if champ_unlocked else "🔒 Out‑negotiate all four influencers first"
         )
-        st.markdown(f"**{CHAMPION['name']}** – {CHAMPION['boss']}  |  {status}")
-        st.caption(CHAMPION["description"])
-        if champ_unlocked and not champ_done:
+        st.markdown(f"**{cfg.champion['name']}** – {cfg.champion['boss']}  |  {status}")
+        st.caption(cfg.champion["description"])
+        if whale_unlocked(p):
             if st.button("Approach the National Whale"):
-                start_whale_battle()
+                actions.approach_whale()
                 st.success("You approach the National Whale! Go to the Boss Battles page.")
 
 elif page == "Collection & Results":
@@ -1486,17 +947,51 @@ elif page == "Collection & Results":
 
     st.subheader("Collection")
     if p["collection"]:
-        st.table(p["collection"])
+        shown = p["collection"].rows(limit=COLLECTION_TABLE_ROWS)
+        st.table(shown)
+        if len(p["collection"]) > len(shown):
+            st.caption(f"Showing your latest {len(shown)} of {len(p['collection'])} cards.")
+        fmt = st.selectbox("Export format", FORMATS, key="export_format")
+
+        def _export(collection=p["collection"], fmt=fmt) -> bytes:
+            # Built only when the button is clicked, not on every rerun
+            out = io.BytesIO()
+            export_collection(collection, out, fmt)
+            return out.getvalue()
+
+        st.download_button("Download collection", _export, file_name=f"collection.{fmt}", on_click="ignore")
     else:
         st.write("You haven't picked up any cards yet.")
 
+    if p["collection"]:
+        # Downsampled and cached by collection version, so the size is the same for any collection
+        charts = collection_figures(p["collection"], as_of(p))
+        curve_col, margin_col = st.columns(2)
+        with curve_col:
+            st.markdown("#### Portfolio over the trip")
+            st.plotly_chart(json.loads(charts["portfolio"]), use_container_width=True)
+        with margin_col:
+            st.markdown("#### Margin per card")
+            st.plotly_chart(json.loads(charts["margins"]), use_container_width=True)
+        st.markdown("#### What it's worth, by")
+        for tab, key in zip(st.tabs(["Zone", "Era", "Set"]), ("zone", "era", "set")):
+            with tab:
+                st.plotly_chart(json.loads(charts[key]), use_container_width=True)
+
     st.divider()
 
     st.subheader("Trip summary")
     st.write(f"Trip profit (estimated): ${p['profit']:.2f}")
+    if p["collection"]:
+        worth = compute_collection_value(p["collection"])
+        paid = float(p["collection"].column("paid").sum())
+        st.write(
+            f"Collection value today: ${worth.value:.2f} "
+            f"(range ${worth.low:.2f}–${worth.high:.2f}) • paid ${paid:.2f}"
+        )
     st.write(f"Level: {p['level']}  |  XP: {p['xp']}")
-    st.write(f"Big deals closed: {len(p['badges'])} / {len(GYMS)}")
-    st.write(f"Influencers out‑negotiated: {len(p['elite_defeated'])} / {len(ELITE_FOUR)}")
+    st.write(f"Big deals closed: {len(p['badges'])} / {len(cfg.gyms)}")
+    st.write(f"Influencers out‑negotiated: {len(p['elite_defeated'])} / {len(cfg.elite_four)}")
     st.write(f"National Whale beaten: {'Yes' if p['champion_defeated'] else 'No'}")
 
     hit_pc = any(
@@ -1516,3 +1011,162 @@ elif page == "Collection & Results":
             st.success("You found something that fits your PC goal. Story-worthy pickup achieved.")
         else:
             st.info("You might still be chasing that perfect PC card—but the hunt continues.")
+
+elif page == "Leaderboard":
+    st.header("Leaderboard")
+    st.caption("Best runs from every collector on this server. Your run is submitted as you play, "
+               "then replayed to check it; runs not checked yet are marked pending.")
+
+    board = get_leaderboard()
+    cols = st.columns(len(CATEGORIES))
+    for col, (cat, (_, _, label)) in zip(cols, CATEGORIES.items()):
+        with col:
+            st.subheader(label)
+            entries = board.top(cat)
+            if not entries:
+                st.write("No runs yet.")
+                continue
+            rows = []
+            for rank, e in enumerate(entries, start=1):
+                if cat == "whale":
+                    score = f"Day {e.score // BLOCKS_PER_DAY + 1} {TIME_BLOCKS[e.score % BLOCKS_PER_DAY]}"
+                elif cat == "profit":
+                    score = f"${e.score:,.2f}"
+                else:
+                    score = f"{e.score:,}"
+                rows.append({
+                    "#": rank,
+                    "Collector": e.name + (" (you)" if e.run_id == p["run_id"] else ""),
+                    "Score": score,
+                    "Level": e.level,
+                    "Verified": "✓" if e.verified else "pending",
+                })
+            st.table(rows)
+
+elif page == "Analytics" and OPERATOR:
+    st.header("Analytics")
+    board = get_analytics().dashboard()
+    st.caption(
+        f"Rolled up from {board.events:,.0f} game events across every run on this server. "
+        "New events show up within a few seconds."
+    )
+
+    st.subheader("Progress funnel")
+    labels = [label for label, _ in board.funnel]
+    funnel_fig = go.Figure(go.Funnel(y=labels, x=[runs for _, runs in board.funnel], textinfo="value+percent initial"))
+    funnel_fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), height=40 * len(labels) + 40)
+    st.plotly_chart(funnel_fig, use_container_width=True)
+
+    offer_col, zone_col = st.columns(2)
+    with offer_col:
+        st.subheader("Offer acceptance")
+        if not board.offers:
+            st.write("No offers yet.")
+        else:
+            npcs = sorted({o["npc_type"] for o in board.offers})
+            moods = [m for m in ("happy", "neutral", "grumpy") if any(o["mood"] == m for o in board.offers)]
+            by_cell = {(o["npc_type"], o["mood"]): o for o in board.offers}
+            rates, text = [], []
+            for mood in moods:
+                row_rates, row_text = [], []
+                for npc in npcs:
+                    o = by_cell.get((npc, mood))
+                    if o is None or not o["offers"]:
+                        row_rates.append(None)
+                        row_text.append("")
+                    else:
+                        rate = o["accepted"] / o["offers"]
+                        row_rates.append(rate)
+                        row_text.append(f"{rate:.0%} of {o['offers']:,}")
+                rates.append(row_rates)
+                text.append(row_text)
+            offer_fig = go.Figure(go.Heatmap(
+                z=rates, x=npcs, y=moods, text=text, texttemplate="%{text}",
+                zmin=0, zmax=1, colorscale="Blues", showscale=False,
+            ))
+            offer_fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), height=260)
+            st.plotly_chart(offer_fig, use_container_width=True)
+
+    with zone_col:
+        st.subheader("XP per hour by zone")
+        zones = [z for z in board.zones if z["hours"] > 0]
+        if not zones:
+            st.write("No time on the floor yet.")
+        else:
+            zone_fig = go.Figure(go.Bar(
+                x=[z["zone"] for z in zones],
+                y=[z["xp"] / z["hours"] for z in zones],
+                text=[f"{z['deals']:,} deals" for z in zones],
+            ))
+            zone_fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), height=260, yaxis_title="XP / hour")
+            st.plotly_chart(zone_fig, use_container_width=True)
+
+    cached = render.stats()
+    st.caption("Page fragment cache on this server: " + " • ".join(
+        f"{name.replace('_', ' ')} {c['hit_rate']:.0%} hits of {c['hits'] + c['misses']:,}" for name, c in cached.items()
+    ))
+
+# ---------- Undo & branches ----------
+# Drawn after the pages, so the buttons reflect the action that just ran
+
+if p["build_locked"]:
+    timeline = st.session_state.timeline
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("**Undo & what-ifs**")
+        undo_col, redo_col = st.columns(2)
+        with undo_col:
+            # Callbacks, so the HUD above already shows the restored run on this rerun
+            st.button("↶ Undo", key="undo_btn", disabled=not timeline.can_undo(st.session_state),
+                      on_click=timeline.undo, args=(st.session_state,), use_container_width=True)
+        with redo_col:
+            st.button("↷ Redo", key="redo_btn", disabled=not timeline.can_redo(),
+                      on_click=timeline.redo, args=(st.session_state,), use_container_width=True)
+        if p["orders"]:
+            st.caption("Undo is off while you have Trade Night orders open.")
+        elif timeline.undone:
+            st.caption("Your next move starts a new branch of this run.")
+        stats = timeline.stats()
+        st.caption(f"{stats['cursor']} step(s) back available • snapshots use {stats['bytes'] / 1024:.0f} KB")
+
+        with st.expander("Branches"):
+            branch_name = st.text_input("Save this moment as", key="branch_name", placeholder="e.g. before lowball")
+            if st.button("Save branch", key="save_branch", disabled=not branch_name.strip()):
+                if timeline.save_branch(branch_name.strip(), st.session_state) is None:
+                    st.warning("Can't save a branch while you have Trade Night orders open.")
+            if timeline.branches:
+                picked = st.selectbox("Saved branches", list(timeline.branches), key="branch_pick")
+                st.button("Switch to branch", key="switch_branch",
+                          on_click=timeline.switch_branch, args=(picked, st.session_state))
+                st.caption("Switching carries on from the branch as a new run.")
+
+# ---------- Leaderboard submission ----------
+
+# Nothing is submitted while steps are undone; a new move forks the run first.
+# Imported cards can't be replayed, so runs seeded with them aren't ranked.
+# Only a changed score is submitted, not every rerun.
+if p["build_locked"] and not st.session_state.timeline.undone and not p.get("imported"):
+    score = score_key(p)
+    if st.session_state.get("_submitted_score") != score:
+        get_leaderboard().submit(p)
+        st.session_state["_submitted_score"] = score
+
+# ---------- Save run ----------
+
+if sync.run_id != st.session_state.player["run_id"]:  # forked by an undo or a branch switch
+    sync = st.session_state["_session_sync"] = SessionSync(get_session_store(), st.session_state.player["run_id"])
+    st.query_params["run"] = sync.run_id
+try:
+    sync.push(st.session_state)
+except VersionConflict:
+    sync.pull(st.session_state)
+    st.warning("This run changed in another tab or window. Showing the latest version.")
+except STORE_ERRORS:
+    # The run is still in this session; the next rerun saves it again
+    st.warning("Couldn't reach the session store to save this run. Retrying on your next move.")
+
+# ---------- Trade Night mailbox ----------
+# Last, so an order placed on this rerun is already watched.
+
+if st.session_state.player["build_locked"] and st.session_state.player["orders"]:
+    trade_night_mailbox()
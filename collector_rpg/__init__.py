@@ -0,0 +1,7 @@
+"""Game engine for National Collector RPG, importable without the Streamlit UI."""
+
+import os
+from pathlib import Path
+
+# Local files the engine writes (comps arrays, leaderboard database, ...)
+DATA_DIR = Path(os.environ.get("COLLECTOR_RPG_DATA", Path(__file__).resolve().parent.parent / ".data"))
@@ -0,0 +1,623 @@
+"""Player actions: every change the pages make to a locked-in run.
+
+Each action checks that it is legal right now, applies the rules, and appends
+itself to ``player["log"]`` as a JSON-friendly list. Illegal actions do
+nothing and are not logged. Together with the run's seed, the log is enough
+to replay the run exactly (see ``verify``), so the pages must go through
+these functions rather than poke the encounter themselves. Logging an action
+also snapshots the run for undo (see ``undo``). ``apply_actions`` runs a list
+of actions in one call, with one snapshot for the lot. The moves, tactics and
+boss win conditions themselves are tables in ``encounter``.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .bins import bin_encounter, generate_bin, scan_bin
+from .daily import daily_encounter, daily_seed, next_table
+from .catalog import get_catalog
+from .config import get_config
+from .collection_io import ImportReport, import_collection
+from .encounter import MOVE_CODE, MOVE_NAMES, apply_move, apply_tactic, close_deal, table_kind
+from .floor import STAMINA_MAX, dealer_for, get_floor, mark_sold, start_show, table_encounter, walk_cost
+from .rules import (
+    advance_flavor_time,
+    as_of,
+    build_problems,
+    build_snapshot,
+    card_values,
+    evaluate_offer,
+    grant_xp_for_deal,
+    influencer_unlocked,
+    pin_run_config,
+    run_rng,
+    session,
+    stage_unlocked,
+    start_encounter,
+    start_influencer_battle,
+    start_stage_battle,
+    start_whale_battle,
+    whale_unlocked,
+)
+from .sessions import mark_changed
+from .sweep import SweepRules, SweepSummary, run_sweep, sweep_problems
+from .telemetry import emit
+from .undo import timeline_for
+from .tradenight import ASK, BID, get_broker, get_trade_night, mailbox
+from .valuation import Quote, get_valuation
+
+MOVES = MOVE_NAMES
+BIN_PICKS_SHOWN = 10
+# Trade Night involves other players' runs, so these can't be undone
+MARKET_ACTIONS = ("bid", "ask", "cancel", "settle")
+
+# Inside batched(): the actions logged since the last undo snapshot
+_batch: ContextVar = ContextVar("collector_rpg_batch", default=None)
+
+
+def _log(name: str, *args):
+    s = session()
+    s.player["log"].append([name, *args])
+    mark_changed(s.player)
+    timeline = timeline_for(s)
+    if timeline is None:
+        return
+    pending = _batch.get()
+    if name in MARKET_ACTIONS:
+        timeline.reset(s, name)
+        if pending is not None:
+            pending.clear()
+    elif pending is not None:
+        pending.append(name)
+    else:
+        timeline.record(s, name)
+
+
+def _locked() -> bool:
+    return session().player["build_locked"]
+
+
+def _free_roam() -> bool:
+    """Locked in and not on the Daily National, which fixes the floor."""
+    return _locked() and session().player["daily"] is None
+
+
+def _table():
+    """The active encounter, or None when there's nothing to act on."""
+    enc = session().encounter if _locked() else None
+    return enc if enc is not None and enc.active else None
+
+
+def _has_action(enc) -> bool:
+    return enc.actions_used < enc.max_actions
+
+
+def _sat_down():
+    """Report the encounter that just started."""
+    s = session()
+    enc = s.encounter
+    emit("encounter_start", s.player["run_id"], enc.zone, enc.npc_type, enc.mood, getattr(enc, "mode", "normal"))
+
+
+def _bought(enc, cards):
+    """Keep a floor table's stock in step with what this run bought there."""
+    table_id = getattr(enc, "table_id", None)
+    if table_id is not None:
+        mark_sold(session().player, table_id, [c.card_id for c in cards])
+
+
+def _mood_slide(enc):
+    if enc.mood == "happy":
+        enc.mood = "neutral"
+    elif enc.mood == "neutral":
+        enc.mood = "grumpy"
+
+
+# ---------- Build ----------
+
+def lock_build() -> List[str]:
+    """Lock in the build and start the trip; returns problems if it can't."""
+    s = session()
+    player = s.player
+    problems = build_problems(player)
+    if problems or player["build_locked"]:
+        return problems
+    player["build_locked"] = True
+    if player["daily"] is not None:
+        player["seed"] = daily_seed(player["daily"])
+    player["build"] = build_snapshot(player)
+    pin_run_config(player)
+    player["log"] = []
+    s.rng = random.Random(player["seed"])
+    start_show(player)
+    emit("run_start", player["run_id"], player["daily"])
+    timeline = timeline_for(s)
+    if timeline is not None:
+        timeline.reset(s)
+    return []
+
+
+def seed_collection(source, fmt: str) -> Optional[ImportReport]:
+    """Start the trip with cards from a collection file. Only before the build is locked."""
+    player = session().player
+    if player["build_locked"]:
+        return None
+    report = import_collection(player["collection"], source, fmt)
+    player["imported"] = player.get("imported", 0) + report.added
+    return report
+
+
+# ---------- Show floor ----------
+
+def walk_to(zone: str) -> bool:
+    if not _free_roam() or zone not in get_config().zone_code:
+        return False
+    start_encounter(zone)
+    _log("walk", zone)
+    _sat_down()
+    return True
+
+
+def visit_table(table_id: int) -> bool:
+    """Walk to a show floor table and sit down; the walk costs stamina by distance."""
+    s = session()
+    player = s.player
+    floor = get_floor()
+    if not _free_roam() or not isinstance(table_id, int) or not 0 <= table_id < len(floor):
+        return False
+    cost = walk_cost(floor.distance(player.get("floor_table"), table_id))
+    enc = table_encounter(dealer_for(player, table_id), player) if cost <= player["stamina"] else None
+    if enc is None:
+        return False
+    player["stamina"] -= cost
+    player["floor_table"] = table_id
+    s.encounter = enc
+    _log("visit", table_id)
+    _sat_down()
+    return True
+
+
+def take_break() -> bool:
+    """Get your stamina back; the show moves on a time block."""
+    player = session().player
+    if not _free_roam() or player["stamina"] >= STAMINA_MAX:
+        return False
+    player["stamina"] = STAMINA_MAX
+    advance_flavor_time()
+    _log("break")
+    return True
+
+
+def find_bin() -> bool:
+    s = session()
+    if not _free_roam():
+        return False
+    s.dollar_bin = generate_bin(s.player, rng=np.random.default_rng(run_rng().getrandbits(64)))
+    _log("find_bin")
+    return True
+
+
+def scan_dollar_bin() -> Optional[List[dict]]:
+    s = session()
+    dbin = getattr(s, "dollar_bin", None)
+    if not _locked() or dbin is None or dbin.scans_left <= 0:
+        return None
+    hits = scan_bin(dbin, s.player, rng=np.random.default_rng(run_rng().getrandbits(64)))
+    _log("scan_bin")
+    return hits
+
+
+def take_bin_picks(positions: List[int]) -> bool:
+    s = session()
+    dbin = getattr(s, "dollar_bin", None)
+    if not _locked() or dbin is None:
+        return False
+    shown = {h["pos"] for h in dbin.found[:BIN_PICKS_SHOWN]}
+    positions = [int(pos) for pos in positions]
+    if (not positions or len(positions) > s.player.get("max_cards_visible", 2)
+            or len(set(positions)) < len(positions) or not set(positions) <= shown):
+        return False
+    s.encounter = bin_encounter(dbin, positions, s.player)
+    _log("take_bin", positions)
+    _sat_down()
+    return True
+
+
+def sweep(rules: SweepRules) -> Optional[SweepSummary]:
+    if not _free_roam() or sweep_problems(rules):
+        return None
+    summary = run_sweep(rules)
+    _log("sweep", {**asdict(rules), "zones": list(rules.zones)})
+    return summary
+
+
+def next_daily_table() -> bool:
+    """Sit down at the next table on today's Daily National floor."""
+    s = session()
+    player = s.player
+    if not _locked() or player["daily"] is None:
+        return False
+    table = next_table(player)
+    if table is None:
+        return False
+    player["daily_next"] += 1
+    s.encounter = daily_encounter(table, player, player["daily_next"])
+    _log("daily_next")
+    _sat_down()
+    return True
+
+
+# ---------- Big stages ----------
+
+def sit_down(stage_id: str) -> bool:
+    if not _locked() or not stage_unlocked(session().player, stage_id):
+        return False
+    start_stage_battle(stage_id)
+    _log("stage", stage_id)
+    _sat_down()
+    return True
+
+
+def go_on_stream(influencer_id: str) -> bool:
+    if not _locked() or not influencer_unlocked(session().player, influencer_id):
+        return False
+    start_influencer_battle(influencer_id)
+    _log("influencer", influencer_id)
+    _sat_down()
+    return True
+
+
+def approach_whale() -> bool:
+    if not _locked() or not whale_unlocked(session().player):
+        return False
+    start_whale_battle()
+    _log("whale")
+    _sat_down()
+    return True
+
+
+# ---------- At the table ----------
+
+def move(name: str) -> bool:
+    enc = _table()
+    if enc is None or name not in MOVE_CODE or not _has_action(enc):
+        return False
+    emit("move", session().player["run_id"], name, enc.zone, enc.npc_type, enc.mood)
+    apply_move(name)
+    enc.actions_used += 1
+    _log("move", name)
+    return True
+
+
+def consult_pancake(idx: int) -> Optional[Quote]:
+    """Pancake Analytics on one card: once per encounter, costs an action."""
+    enc = _table()
+    if enc is None or enc.pancake_used or not _has_action(enc) or not 0 <= idx < len(enc.cards):
+        return None
+    target = enc.cards[idx]
+    est = card_values([target])
+    enc.history.append(
+        f"You {table_kind(enc)[0].pancake_verb} Pancake Analytics on {target.name} "
+        f"({target.set_name} {target.year}). True value comes back at ${est.value[0]:.2f}."
+    )
+    enc.pancake_used = True
+    enc.actions_used += 1
+    _log("pancake", idx)
+    return est
+
+
+def use_tactic(name: str) -> bool:
+    enc = _table()
+    player = session().player
+    tactic = next((t for t in player["unlocked_tactics"] if t["name"] == name), None)
+    if enc is None or tactic is None or not _has_action(enc):
+        return False
+    if not apply_tactic(tactic, table_kind(enc)[0].boss):
+        return False
+    enc.actions_used += 1
+    _log("tactic", name)
+    return True
+
+
+def make_offer(offer: float) -> Tuple[Optional[str], Optional[float]]:
+    """Cash offer on the whole table: (verdict, counter price if countered)."""
+    enc = _table()
+    if enc is None or not 0 <= offer <= session().player["cash"]:
+        return None, None
+
+    result = evaluate_offer(offer)
+    emit("offer", session().player["run_id"], result, enc.zone, enc.npc_type, enc.mood, offer)
+    counter = None
+    if result == "accept":
+        enc.history.append(f"You offer ${offer:.2f}. They accept.")
+        _bought(enc, enc.cards)
+        close_deal(offer)
+    elif result == "counter":
+        counter = round(offer * run_rng().uniform(1.05, 1.15), 2)
+        enc.history.append(f"You offer ${offer:.2f}. They counter at ${counter:.2f}.")
+        enc.round += 1
+    else:
+        enc.history.append(f"You offer ${offer:.2f}. They reject and seem annoyed.")
+        enc.round += 1
+        _mood_slide(enc)
+    _log("offer", offer)
+    return result, counter
+
+
+def make_card_offers(offers: Dict[int, float]) -> Optional[Dict[int, str]]:
+    """Offers on individual visible cards; the accepted ones close as one lot."""
+    enc = _table()
+    player = session().player
+    if enc is None:
+        return None
+    offer_cards = enc.cards[:player.get("max_cards_visible", 2)]
+    offers = {int(i): o for i, o in offers.items() if o > 0}
+    if (not offers or sum(offers.values()) > player["cash"]
+            or not all(0 <= i < len(offer_cards) for i in offers)):
+        return None
+
+    verdicts = {i: evaluate_offer(o, cards=[offer_cards[i]]) for i, o in offers.items()}
+    for i, verdict in verdicts.items():
+        emit("offer", player["run_id"], verdict, enc.zone, enc.npc_type, enc.mood, offers[i])
+    accepted = [i for i, v in verdicts.items() if v == "accept"]
+    enc.history.append(f"You make offers on {len(offers)} card(s). They take {len(accepted)}.")
+    enc.round += 1
+    if accepted:
+        prices = [offers[i] for i in accepted]
+        lot = [offer_cards[i] for i in accepted]
+        _bought(enc, lot)
+        close_deal(sum(prices), cards=lot, prices=prices)
+    if "reject" in verdicts.values():
+        _mood_slide(enc)
+    _log("card_offers", [[i, o] for i, o in offers.items()])
+    return verdicts
+
+
+def walk_away() -> bool:
+    enc = _table()
+    if enc is None:
+        return False
+    enc.history.append(table_kind(enc)[0].walk_line)
+    enc.active = False
+    _log("walk_away")
+    return True
+
+
+# ---------- Trade Night ----------
+#
+# Orders hold their cash or card in escrow in ``player["orders"]`` until they
+# fill or are cancelled. Fills come from other sessions, so they are logged as
+# they are settled. On replay a settle must match how the trade ledger
+# says that order of this run closed; the order side is replayed without
+# touching the live market.
+
+def _row_value(row: dict) -> float:
+    player = session().player
+    card_id = np.array([-1 if row.get("card_id") is None else row["card_id"]])
+    return float(get_valuation().value(card_id, np.array([row["true_value"]]), as_of(player)).value[0])
+
+
+def _hold_bid(card_id: int, price: float, order_id: int):
+    player = session().player
+    player["cash"] -= price
+    player["orders"][str(order_id)] = {"side": BID, "card_id": card_id, "price": price, "row": None}
+    _log("bid", card_id, price, order_id)
+
+
+def _hold_ask(row_index: int, price: float, order_id: int, row: dict):
+    player = session().player
+    player["orders"][str(order_id)] = {"side": ASK, "card_id": row["card_id"], "price": price, "row": row}
+    _log("ask", row_index, price, order_id)
+
+
+def _release(order_id: int):
+    player = session().player
+    held = player["orders"].pop(str(order_id))
+    if held["side"] == BID:
+        player["cash"] += held["price"]
+    else:
+        player["collection"].append(held["row"])
+
+
+def _valid_bid(card_id: int, price: float) -> bool:
+    return _free_roam() and 0 <= card_id < len(get_catalog()) and 0 < price <= session().player["cash"]
+
+
+def _valid_ask(row_index: int, price: float) -> bool:
+    collection = session().player["collection"]
+    return (_free_roam() and 0 <= row_index < len(collection) and price > 0
+            and collection[row_index].get("card_id") is not None)
+
+
+def post_bid(card_id: int, price: float) -> Optional[int]:
+    """Bid on a catalog card; the cash is held until it fills or you cancel."""
+    card_id, price = int(card_id), round(float(price), 2)
+    if not _valid_bid(card_id, price):
+        return None
+    player = session().player
+    order = get_trade_night().place(player["run_id"], BID, card_id, price)
+    _hold_bid(card_id, price, order.order_id)
+    settle_fills()
+    return order.order_id
+
+
+def post_ask(row_index: int, price: float) -> Optional[int]:
+    """List a collection card for sale; it leaves the collection while listed."""
+    row_index, price = int(row_index), round(float(price), 2)
+    if not _valid_ask(row_index, price):
+        return None
+    player = session().player
+    row = player["collection"].pop(row_index)
+    order = get_trade_night().place(player["run_id"], ASK, row["card_id"], price, row)
+    _hold_ask(row_index, price, order.order_id, row)
+    settle_fills()
+    return order.order_id
+
+
+def cancel_order(order_id: int) -> bool:
+    player = session().player
+    if str(order_id) not in player["orders"] or not get_trade_night().cancel(order_id, player["run_id"]):
+        settle_fills()  # it may have just filled
+        return False
+    _release(order_id)
+    _log("cancel", order_id)
+    return True
+
+
+def _settle(message: dict) -> bool:
+    player = session().player
+    held = player["orders"].get(str(message.get("order_id")))
+    if held is None:
+        return False
+    if message["type"] == "cancelled":
+        _release(message["order_id"])
+    elif message["type"] == "fill":
+        price = message["price"]
+        if held["side"] == BID:
+            if not 0 <= price <= held["price"] or message["row"].get("card_id") != held["card_id"]:
+                return False
+            row = {**message["row"], "paid": round(price, 2), "zone": "Trade Night"}
+            margin = _row_value(row) - price
+            player["cash"] += held["price"] - price  # refund a fill under the bid
+            player["collection"].append(row)
+            grant_xp_for_deal("Trade Night", margin, is_trade=True)
+        else:
+            if price < held["price"]:
+                return False
+            margin = price - _row_value(held["row"])
+            player["cash"] += price
+            grant_xp_for_deal("Trade Night", margin, is_trade=True, is_sale=True)
+        player["profit"] += margin
+        del player["orders"][str(message["order_id"])]
+    else:
+        return False
+    _log("settle", message)
+    return True
+
+
+def settle_fills() -> List[dict]:
+    """Apply every fill and cancellation the market has sent this run.
+
+    Orders that this worker's market doesn't hold (it restarted, or they were
+    placed on another worker) are closed as cancelled and their escrow comes
+    back, unless they closed first, in which case that close is settled.
+    """
+    player = session().player
+    if not _locked():
+        return []
+    broker = get_broker()
+    settled = [m for m in broker.poll(mailbox(player["run_id"])) if _settle(m)]
+    if player["orders"]:
+        live = {order.order_id for order in get_trade_night().open_orders(player["run_id"])}
+        for order_id in [int(k) for k in player["orders"] if int(k) not in live]:
+            if broker.close(order_id, player["run_id"], {"type": "cancelled", "order_id": order_id}):
+                _release(order_id)
+                _log("cancel", order_id)
+                continue
+            _, message = broker.closed(order_id)
+            if _settle(message):
+                settled.append(message)
+    return settled
+
+
+def _replay_bid(card_id: int, price: float, order_id: int):
+    if _valid_bid(card_id, price) and str(order_id) not in session().player["orders"]:
+        _hold_bid(card_id, price, order_id)
+
+
+def _replay_ask(row_index: int, price: float, order_id: int):
+    if _valid_ask(row_index, price) and str(order_id) not in session().player["orders"]:
+        _hold_ask(row_index, price, order_id, session().player["collection"].pop(row_index))
+
+
+def _replay_settle(message: dict) -> bool:
+    closed = get_broker().closed(message.get("order_id"))
+    if closed != (session().player["run_id"], message):
+        return False
+    return _settle(message)
+
+
+def _replay_cancel(order_id: int):
+    if str(order_id) in session().player["orders"]:
+        _release(order_id)
+        _log("cancel", order_id)
+
+
+# Log name -> how to replay it from its logged arguments
+ACTIONS = {
+    "walk": walk_to,
+    "visit": visit_table,
+    "break": take_break,
+    "daily_next": next_daily_table,
+    "find_bin": find_bin,
+    "scan_bin": scan_dollar_bin,
+    "take_bin": take_bin_picks,
+    "sweep": lambda rules: sweep(SweepRules(**{**rules, "zones": tuple(rules["zones"])})),
+    "stage": sit_down,
+    "influencer": go_on_stream,
+    "whale": approach_whale,
+    "move": move,
+    "pancake": consult_pancake,
+    "tactic": use_tactic,
+    "offer": make_offer,
+    "card_offers": lambda pairs: make_card_offers(dict(pairs)),
+    "walk_away": walk_away,
+    "bid": _replay_bid,
+    "ask": _replay_ask,
+    "cancel": _replay_cancel,
+    "settle": _replay_settle,
+}
+
+
+@contextmanager
+def batched():
+    """Take one undo snapshot for every action run inside, rather than one each."""
+    if _batch.get() is not None:
+        yield
+        return
+    pending = []
+    token = _batch.set(pending)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        timeline = timeline_for(session())
+        if pending and timeline is not None:
+            timeline.record(session(), pending[-1] if len(pending) == 1 else "batch")
+
+
+def apply_actions(batch: Iterable[Sequence]) -> list:
+    """Run ``[name, *args]`` actions in order, in one call; returns each one's result.
+
+    Actions take the same form as the log, so a bot or simulation can send a
+    whole plan, and a log slice can be run as-is. The batch is one undo step.
+    """
+    with batched():
+        return [ACTIONS[name](*args) for name, *args in batch]
+
+
+def play_turn(moves: Sequence[str], offer: Optional[float] = None
+              ) -> Tuple[List[bool], Optional[Tuple[Optional[str], Optional[float]]], List[str]]:
+    """Queued moves, then an optional cash offer, as one batch.
+
+    Moves past the table's remaining actions are dropped, and the offer is
+    only made if the table is still open. Returns each move played's result,
+    the offer's (verdict, counter) or None if it wasn't made, and the history
+    lines the turn added.
+    """
+    enc = _table()
+    if enc is None:
+        return [], None, []
+    before = len(enc.history)
+    plan = [["move", name] for name in moves][:max(0, enc.max_actions - enc.actions_used)]
+    offered = None
+    with batched():
+        results = apply_actions(plan)
+        if offer is not None and enc.active:
+            offered = make_offer(offer)
+    return results, offered, enc.history[before:]
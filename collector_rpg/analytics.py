@@ -0,0 +1,253 @@
+"""Running rollups of the telemetry stream for the Analytics page.
+
+The telemetry flusher hands every batch of events to ``Analytics.apply``.
+Each event updates a few counters in O(1), and a batch is added to the
+totals in SQLite in one transaction, so every worker feeds the same numbers.
+The page only reads these small tables. It never goes back to the raw event
+files, however many events have been written.
+
+Rollups kept:
+
+- the progress funnel: distinct runs that locked in a build, made a first
+  deal, won each big-deal stage, beat each influencer and beat the Whale
+- offer verdicts by ``npc_type`` and mood
+- XP and time spent by zone. Time is the gap from one of a run's events to
+  the next, charged to the zone it was in. Gaps are capped at
+  ``IDLE_CAP_SECONDS`` so an idle tab doesn't count.
+
+    python -m collector_rpg.analytics --rebuild   # recompute from the event files
+"""
+
+import argparse
+import sqlite3
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from . import DATA_DIR
+from .rules import CHAMPION, ELITE_FOUR, GYMS
+
+ANALYTICS_PATH = DATA_DIR / "analytics.sqlite3"
+IDLE_CAP_SECONDS = 300.0
+REBUILD_BATCH = 10_000
+
+# (step, label), in funnel order; a run's progress is a bitmask over these
+FUNNEL_STEPS: Tuple[Tuple[str, str], ...] = (
+    ("build", "Locked in a build"),
+    ("first_deal", "First deal"),
+    *((f"stage:{g['id']}", g["name"]) for g in GYMS),
+    *((f"influencer:{e['id']}", e["name"]) for e in ELITE_FOUR),
+    ("whale", CHAMPION["name"]),
+)
+STEP_BIT = {step: 1 << i for i, (step, _) in enumerate(FUNNEL_STEPS)}
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS funnel (step TEXT PRIMARY KEY, runs INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS offers (npc_type TEXT, mood TEXT, offers INTEGER NOT NULL, "
+    "accepted INTEGER NOT NULL, countered INTEGER NOT NULL, PRIMARY KEY (npc_type, mood))",
+    "CREATE TABLE IF NOT EXISTS zones (zone TEXT PRIMARY KEY, xp INTEGER NOT NULL, "
+    "seconds REAL NOT NULL, deals INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS progress (run_id TEXT PRIMARY KEY, steps INTEGER NOT NULL, "
+    "zone TEXT, last_ts REAL)",
+    "CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value REAL NOT NULL)",
+)
+
+FUNNEL_SQL = ("INSERT INTO funnel (step, runs) VALUES (?, ?) "
+              "ON CONFLICT(step) DO UPDATE SET runs = runs + excluded.runs")
+OFFERS_SQL = ("INSERT INTO offers (npc_type, mood, offers, accepted, countered) VALUES (?, ?, ?, ?, ?) "
+              "ON CONFLICT(npc_type, mood) DO UPDATE SET offers = offers + excluded.offers, "
+              "accepted = accepted + excluded.accepted, countered = countered + excluded.countered")
+ZONES_SQL = ("INSERT INTO zones (zone, xp, seconds, deals) VALUES (?, ?, ?, ?) "
+             "ON CONFLICT(zone) DO UPDATE SET xp = xp + excluded.xp, "
+             "seconds = seconds + excluded.seconds, deals = deals + excluded.deals")
+PROGRESS_SQL = "INSERT OR REPLACE INTO progress (run_id, steps, zone, last_ts) VALUES (?, ?, ?, ?)"
+TOTALS_SQL = ("INSERT INTO totals (name, value) VALUES (?, ?) "
+              "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value")
+
+
+class Rollup:
+    """One batch's worth of changes to the totals."""
+
+    def __init__(self, progress: Dict[str, list]):
+        self.progress = progress  # run_id -> [steps, zone, last_ts], updated in place
+        self.funnel: Dict[str, int] = defaultdict(int)
+        self.offers: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+        self.zones: Dict[str, list] = defaultdict(lambda: [0, 0.0, 0])
+        self.events = 0
+
+    def _reach(self, run: list, step: str):
+        bit = STEP_BIT.get(step)
+        if bit is not None and not run[0] & bit:
+            run[0] |= bit
+            self.funnel[step] += 1
+
+    def add(self, r: dict):
+        self.events += 1
+        run_id = r["run_id"]
+        if run_id is None:
+            return
+        run = self.progress.get(run_id)
+        if run is None:
+            run = self.progress[run_id] = [0, None, None]
+
+        ts = r["ts"]
+        if run[1] is not None and run[2] is not None and ts > run[2]:
+            self.zones[run[1]][1] += min(ts - run[2], IDLE_CAP_SECONDS)
+        run[2] = ts if run[2] is None else max(run[2], ts)
+
+        kind = r["kind"]
+        if kind == "encounter_start":
+            run[1] = r["zone"]
+        elif kind == "offer":
+            counts = self.offers[(r["npc_type"], r["mood"])]
+            counts[0] += 1
+            if r["verdict"] == "accept":
+                counts[1] += 1
+            elif r["verdict"] == "counter":
+                counts[2] += 1
+        elif kind == "deal":
+            zone = self.zones[r["zone"]]
+            zone[0] += r["xp"]
+            zone[2] += 1
+            if not r["is_sale"]:
+                self._reach(run, "first_deal")
+        elif kind == "run_start":
+            self._reach(run, "build")
+        elif kind == "boss_win":
+            self._reach(run, "whale" if r["boss"] == "whale" else f"{r['boss']}:{r['boss_id']}")
+
+
+@dataclass
+class Dashboard:
+    events: float
+    funnel: List[Tuple[str, int]]        # (label, runs) in funnel order
+    offers: List[dict]                   # npc_type, mood, offers, accepted, countered
+    zones: List[dict]                    # zone, xp, hours, deals
+
+
+class Analytics:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            for stmt in SCHEMA:
+                conn.execute(stmt)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _progress(conn: sqlite3.Connection, run_ids: List[str]) -> Dict[str, list]:
+        progress = {}
+        for i in range(0, len(run_ids), 500):
+            chunk = run_ids[i:i + 500]
+            rows = conn.execute(
+                f"SELECT run_id, steps, zone, last_ts FROM progress "
+                f"WHERE run_id IN ({', '.join('?' for _ in chunk)})", chunk,
+            )
+            for run_id, steps, zone, last_ts in rows:
+                progress[run_id] = [steps, zone, last_ts]
+        return progress
+
+    def apply(self, records: Iterable[dict]):
+        """Fold a batch of telemetry records into the totals."""
+        records = list(records)
+        if not records:
+            return
+        conn = self._conn()
+        # IMMEDIATE: the run progress read-modify-write must not interleave with another worker's
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            run_ids = list({r["run_id"] for r in records if r["run_id"] is not None})
+            rollup = Rollup(self._progress(conn, run_ids))
+            for r in records:
+                rollup.add(r)
+            conn.executemany(FUNNEL_SQL, rollup.funnel.items())
+            conn.executemany(OFFERS_SQL, [(npc, mood, *c) for (npc, mood), c in rollup.offers.items()])
+            conn.executemany(ZONES_SQL, [(zone, *z) for zone, z in rollup.zones.items()])
+            conn.executemany(PROGRESS_SQL, [(run_id, *run) for run_id, run in rollup.progress.items()])
+            conn.execute(TOTALS_SQL, ("events", rollup.events))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def dashboard(self) -> Dashboard:
+        conn = self._conn()
+        runs = dict(conn.execute("SELECT step, runs FROM funnel"))
+        events = conn.execute("SELECT value FROM totals WHERE name = 'events'").fetchone()
+        offers = [
+            dict(zip(("npc_type", "mood", "offers", "accepted", "countered"), row))
+            for row in conn.execute("SELECT npc_type, mood, offers, accepted, countered FROM offers "
+                                    "ORDER BY npc_type, mood")
+        ]
+        zones = [
+            {"zone": zone, "xp": xp, "hours": seconds / 3600.0, "deals": deals}
+            for zone, xp, seconds, deals in conn.execute("SELECT zone, xp, seconds, deals FROM zones ORDER BY zone")
+        ]
+        return Dashboard(
+            events=events[0] if events else 0,
+            funnel=[(label, runs.get(step, 0)) for step, label in FUNNEL_STEPS],
+            offers=offers,
+            zones=zones,
+        )
+
+    def reset(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        for table in ("funnel", "offers", "zones", "progress", "totals"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("COMMIT")
+
+
+@lru_cache(maxsize=1)
+def get_analytics() -> Analytics:
+    return Analytics(ANALYTICS_PATH)
+
+
+def rebuild(analytics: Analytics, paths: Iterable[Path]) -> int:
+    """Recompute the rollups from raw event files. Run it with the app stopped."""
+    from .telemetry import read_events
+
+    analytics.reset()
+    batch, n = [], 0
+    for record in read_events(paths):
+        batch.append(record)
+        if len(batch) >= REBUILD_BATCH:
+            analytics.apply(batch)
+            n += len(batch)
+            batch = []
+    analytics.apply(batch)
+    return n + len(batch)
+
+
+def main(argv=None):
+    from .telemetry import TELEMETRY_DIR, event_files
+
+    parser = argparse.ArgumentParser(description="Telemetry rollups for the Analytics page.")
+    parser.add_argument("--db", type=Path, default=ANALYTICS_PATH)
+    parser.add_argument("--events", type=Path, default=TELEMETRY_DIR, help="directory of event files")
+    parser.add_argument("--rebuild", action="store_true", help="recompute from the event files")
+    args = parser.parse_args(argv)
+
+    analytics = Analytics(args.db)
+    if args.rebuild:
+        print(f"Rebuilt from {rebuild(analytics, event_files(args.events)):,} events")
+    board = analytics.dashboard()
+    print(f"{board.events:,.0f} events")
+    for label, runs in board.funnel:
+        print(f"  {label:<32} {runs:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""Headless JSON/HTTP API for the game, for bots, load tests and other clients.
+
+    python -m collector_rpg.api --port 8765
+
+Routes (all bodies and responses are JSON):
+
+- ``POST /runs`` with ``{"build": {...}}``: lock in a build and start a run.
+  The build has the Intro page's fields (name, cash, attributes, subjects,
+  ...); anything left out keeps its default. ``"daily": true`` plays
+  today's Daily National. Returns the run id.
+- ``GET /runs/<run_id>``: what the player can see, including the open table
+  with its asks (true values stay hidden).
+- ``POST /runs/<run_id>/actions`` with ``{"action": "offer", "args": [250]}``,
+  or a list of those to apply in order: ``ACTIONS`` lists what can be taken.
+  They are the same functions the pages call (``walk`` runs
+  ``start_encounter``, ``move`` runs ``apply_move``, ``offer`` runs
+  ``evaluate_offer`` and ``close_deal``, ``stage``/``influencer``/``whale``
+  run the boss starters), so they are logged and replay-verifiable like a
+  UI run. An illegal action does nothing and comes back with ``ok: false``.
+  A list is one undo step.
+- ``GET /runs/<run_id>/floor``: the show floor table you're at and the
+  tables near it, with walking distance and stamina cost (``visit`` takes
+  a table id).
+- ``GET /runs/<run_id>/collection?rows=N``: collection size, value, range
+  and paid, plus the latest ``N`` rows.
+- ``GET /health``: live runs and store counters.
+
+Runs live in the session store the UI uses (``COLLECTOR_RPG_SESSIONS``), so
+a run started here can be opened in the browser with ``?run=<run_id>`` and
+the other way round. Each process keeps the runs it is serving in memory
+and writes changed ones to the store every ``FLUSH_INTERVAL_SECONDS``. A
+burst of actions costs one save, not one per action. The same flush
+submits them to the leaderboard. Use ``--flush-interval 0`` to save on
+every request.
+"""
+
+import argparse
+import copy
+import json
+import random
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from . import actions
+from .catalog import get_catalog
+from .comps import get_comps
+from .daily import today
+from .floor import get_floor, walk_cost
+from .leaderboard import get_leaderboard
+from .rules import BUILD_KEYS, RunState, base_player_state, bind_session, compute_collection_value
+from .sessions import SessionSync, VersionConflict, get_session_store
+from .valuation import get_valuation
+
+DEFAULT_PORT = 8765
+FLUSH_INTERVAL_SECONDS = 0.1
+MAX_LIVE_RUNS = 10_000
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH = 1_000
+HISTORY_SHOWN = 5
+
+# What clients may do; Trade Night fills only ever come from the market itself
+ACTIONS = {
+    name: actions.ACTIONS[name]
+    for name in ("walk", "visit", "break", "daily_next", "find_bin", "scan_bin", "take_bin", "sweep", "stage",
+                 "influencer", "whale", "move", "pancake", "tactic", "offer", "card_offers", "walk_away")
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def jsonable(obj):
+    """Action results (tuples, dataclasses, numpy values) as plain JSON types."""
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return jsonable(asdict(obj))
+    if isinstance(obj, dict):
+        return {str(k): jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+# ---------- Views ----------
+
+def encounter_view(enc, player: dict) -> Optional[dict]:
+    if enc is None:
+        return None
+    shown = player.get("max_cards_visible", 2)
+    return {
+        "zone": enc.zone,
+        "npc_type": enc.npc_type,
+        "mood": enc.mood,
+        "mode": getattr(enc, "mode", "normal"),
+        "active": enc.active,
+        "round": enc.round,
+        "actions_used": enc.actions_used,
+        "max_actions": enc.max_actions,
+        "npc_hp": enc.npc_hp,
+        "npc_max_hp": enc.npc_max_hp,
+        "pancake_used": enc.pancake_used,
+        "cards": [
+            {"name": c.name, "player": c.player, "year": c.year, "set_name": c.set_name,
+             "ask_price": c.ask_price, "card_id": c.card_id, "visible": i < shown}
+            for i, c in enumerate(enc.cards)
+        ],
+        "history": enc.history[-HISTORY_SHOWN:],
+    }
+
+
+def run_view(state) -> dict:
+    player = state.player
+    dbin = getattr(state, "dollar_bin", None)
+    return {
+        "run_id": player["run_id"],
+        "name": player["name"],
+        "cash": round(player["cash"], 2),
+        "profit": round(player["profit"], 2),
+        "xp": player["xp"],
+        "level": player["level"],
+        "day": player["day"],
+        "time_block": player["time_block"],
+        "stamina": player["stamina"],
+        "floor_table": player.get("floor_table"),
+        "daily": player["daily"],
+        "badges": list(player["badges"]),
+        "elite_defeated": list(player["elite_defeated"]),
+        "champion_defeated": player["champion_defeated"],
+        "tactics": [t["name"] for t in player["unlocked_tactics"]],
+        "cards": len(player["collection"]),
+        "actions": len(player["log"]),
+        "encounter": encounter_view(state.encounter, player),
+        "dollar_bin": None if dbin is None else {"scans_left": dbin.scans_left, "found": jsonable(dbin.found[:10])},
+    }
+
+
+def floor_view(state) -> dict:
+    player = state.player
+    floor = get_floor()
+    here = player.get("floor_table")
+    return {
+        "table": here,
+        "booth": None if here is None else int(floor.booth[here]),
+        "stamina": player["stamina"],
+        "news": list(player.get("show_news", [])[-HISTORY_SHOWN:]),
+        "nearby": [
+            {"table": t, "booth": int(floor.booth[t]), "zone": floor.zone_of(t),
+             "meters": round(d, 1), "stamina": walk_cost(d)}
+            for t, d in floor.nearby(here)
+        ],
+    }
+
+
+def collection_view(state, rows: int) -> dict:
+    player = state.player
+    collection = player["collection"]
+    worth = compute_collection_value(collection, player)
+    return {
+        "cards": len(collection),
+        "value": round(float(worth.value), 2),
+        "low": round(float(worth.low), 2),
+        "high": round(float(worth.high), 2),
+        "paid": round(float(collection.column("paid").sum()), 2),
+        "profit": round(player["profit"], 2),
+        "rows": jsonable(collection.rows(limit=rows)) if rows > 0 else [],
+    }
+
+
+# ---------- Live runs ----------
+
+class LiveRun:
+    __slots__ = ("state", "sync", "lock", "dirty")
+
+    def __init__(self, state: RunState, sync: SessionSync):
+        self.state = state
+        self.sync = sync
+        self.lock = threading.Lock()
+        self.dirty = False
+
+
+class RunCache:
+    """The runs this process is serving, written back to the session store in the background."""
+
+    def __init__(self, store, capacity: int = MAX_LIVE_RUNS, flush_interval: float = FLUSH_INTERVAL_SECONDS):
+        self.store = store
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._runs: "OrderedDict[str, LiveRun]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.conflicts = 0
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._run_flusher, name="api-flush", daemon=True)
+            self._flusher.start()
+
+    def _add(self, live: LiveRun):
+        with self._lock:
+            self._runs[live.sync.run_id] = live
+            evicted = []
+            while len(self._runs) > self.capacity:
+                evicted.append(self._runs.popitem(last=False)[1])
+        for old in evicted:
+            with old.lock:
+                self._save(old)
+
+    def create(self, build: dict) -> LiveRun:
+        player = base_player_state()
+        for key in BUILD_KEYS:
+            if key in build:
+                player[key] = copy.deepcopy(build[key])
+        if player["daily"] is not None:
+            player["daily"] = today()  # the Daily National is always today's
+        state = RunState(player=player, rng=random.Random(player["seed"]))
+        try:
+            with bind_session(state):
+                problems = actions.lock_build()
+        except (TypeError, KeyError, AttributeError) as exc:
+            raise ApiError(400, f"malformed build: {exc!r}") from exc
+        if problems:
+            raise ApiError(400, " ".join(problems))
+        live = LiveRun(state, SessionSync(self.store, player["run_id"]))
+        self._add(live)
+        with live.lock:
+            self.changed(live)
+        return live
+
+    def get(self, run_id: str) -> LiveRun:
+        with self._lock:
+            live = self._runs.get(run_id)
+            if live is not None:
+                self._runs.move_to_end(run_id)
+        if live is None:
+            state = RunState()
+            sync = SessionSync(self.store, run_id)
+            if not sync.pull(state):
+                raise ApiError(404, f"no run {run_id!r}")
+            with self._lock:
+                live = self._runs.get(run_id)  # another request may have loaded it meanwhile
+            if live is None:
+                live = LiveRun(state, sync)
+                self._add(live)
+        return live
+
+    def refresh(self, live: LiveRun):
+        """Pick up changes another worker (or the browser) saved. Call with the run's lock held."""
+        if not live.dirty:
+            live.sync.pull(live.state)
+
+    def changed(self, live: LiveRun):
+        """Note that a run changed. Call with the run's lock held."""
+        live.dirty = True
+        if self.flush_interval <= 0 or not self._cached(live):
+            # Evicted while this request held it: the flusher won't see it again
+            self._save(live)
+
+    def _cached(self, live: LiveRun) -> bool:
+        with self._lock:
+            return self._runs.get(live.sync.run_id) is live
+
+    def _save(self, live: LiveRun):
+        if not live.dirty:
+            return
+        try:
+            live.sync.push(live.state)
+            self.saves += 1
+        except VersionConflict:
+            # The other writer wins, as in the UI
+            self.conflicts += 1
+            live.sync.pull(live.state)
+        live.dirty = False
+        if live.state.player["build_locked"] and not live.state.player.get("imported"):
+            get_leaderboard().submit(live.state.player)
+
+    def flush(self):
+        with self._lock:
+            runs = [live for live in self._runs.values() if live.dirty]
+        for live in runs:
+            with live.lock:
+                self._save(live)
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = len(self._runs)
+            dirty = sum(run.dirty for run in self._runs.values())
+        return {"live_runs": live, "unsaved": dirty, "saves": self.saves, "conflicts": self.conflicts}
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+
+# ---------- Routes ----------
+
+RUN_PATH = re.compile(r"^/runs/([0-9a-f]{32})(/actions|/collection|/floor)?$")
+
+
+def _apply(state, request) -> dict:
+    if not isinstance(request, dict) or not isinstance(request.get("action"), str):
+        raise ApiError(400, 'each action needs the form {"action": name, "args": [...]}')
+    name, args = request["action"], request.get("args", [])
+    action = ACTIONS.get(name)
+    if action is None:
+        raise ApiError(400, f"unknown action {name!r}; use one of {', '.join(ACTIONS)}")
+    if not isinstance(args, list):
+        raise ApiError(400, "args must be a list")
+    log = state.player["log"]
+    before = len(log)
+    try:
+        result = action(*args)
+    except (TypeError, ValueError, KeyError, IndexError, StopIteration) as exc:
+        raise ApiError(400, f"bad arguments for {name}: {exc}") from exc
+    return {"action": name, "ok": len(log) > before, "result": jsonable(result)}
+
+
+class Api:
+    def __init__(self, runs: RunCache):
+        self.runs = runs
+
+    def handle(self, method: str, target: str, body: Optional[bytes]) -> Tuple[int, dict]:
+        url = urlparse(target)
+        if url.path == "/health" and method == "GET":
+            return 200, {"ok": True, **self.runs.stats()}
+        if url.path == "/runs" and method == "POST":
+            payload = _json(body)
+            if not isinstance(payload, dict) or not isinstance(payload.get("build", {}), dict):
+                raise ApiError(400, 'expected {"build": {...}}')
+            live = self.runs.create(payload.get("build", {}))
+            return 201, {"run_id": live.sync.run_id, "run": run_view(live.state)}
+
+        match = RUN_PATH.match(url.path)
+        if match is None:
+            raise ApiError(404, f"no route {url.path}")
+        run_id, sub = match.groups()
+        live = self.runs.get(run_id)
+
+        if sub == "/actions":
+            if method != "POST":
+                raise ApiError(405, "POST actions")
+            payload = _json(body)
+            batch = payload if isinstance(payload, list) else [payload]
+            if len(batch) > MAX_BATCH:
+                raise ApiError(400, f"at most {MAX_BATCH} actions per request")
+            with live.lock:
+                self.runs.refresh(live)
+                results = []
+                try:
+                    with bind_session(live.state), actions.batched():
+                        for request in batch:
+                            results.append(_apply(live.state, request))
+                finally:
+                    if any(r["ok"] for r in results):
+                        self.runs.changed(live)
+                return 200, {"results": results, "run": run_view(live.state)}
+
+        if method != "GET":
+            raise ApiError(405, f"GET {url.path}")
+        rows = _rows(url.query) if sub == "/collection" else 0
+        with live.lock:
+            self.runs.refresh(live)
+            if sub == "/collection":
+                return 200, collection_view(live.state, rows)
+            if sub == "/floor":
+                return 200, floor_view(live.state)
+            return 200, run_view(live.state)
+
+
+def _rows(query: str) -> int:
+    raw = parse_qs(query).get("rows", ["0"])[0] or "0"
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        raise ApiError(400, f"rows must be a whole number, not {raw!r}") from None
+
+
+def _json(body: Optional[bytes]):
+    try:
+        return json.loads(body or b"{}")
+    except ValueError as exc:
+        raise ApiError(400, f"body isn't JSON: {exc}") from exc
+
+
+# ---------- HTTP ----------
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients don't reconnect per action
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    api: Api = None
+
+    def _respond(self, status: int, payload: dict):
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method: str):
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._respond(413, {"error": "request body too large"})
+            self.close_connection = True
+            return
+        if length:
+            body = self.rfile.read(length)
+        try:
+            status, payload = self.api.handle(method, self.path, body)
+        except ApiError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+        except ValueError as exc:
+            status, payload = 400, {"error": str(exc)}
+        except Exception as exc:  # keep serving; the client gets a 500 rather than a dropped connection
+            self.log_error("%s %s failed: %r", method, self.path, exc)
+            status, payload = 500, {"error": "internal error"}
+        self._respond(status, payload)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        pass  # one line per action is too much; errors still reach stderr
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, store=None,
+          flush_interval: float = FLUSH_INTERVAL_SECONDS) -> ThreadingHTTPServer:
+    """A server ready for ``serve_forever``; its ``runs`` cache needs closing afterwards."""
+    get_catalog()  # load the shared data now, not on the first request
+    get_comps()
+    get_valuation()
+    runs = RunCache(store or get_session_store(), flush_interval=flush_interval)
+    handler = type("ApiHandler", (Handler,), {"api": Api(runs)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.runs = runs
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the game engine over JSON/HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL_SECONDS,
+                        help="seconds between saves of changed runs (0: save on every request)")
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port, flush_interval=args.flush_interval)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.runs.close()
+
+
+if __name__ == "__main__":
+    main()
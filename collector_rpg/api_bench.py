@@ -0,0 +1,155 @@
+"""Throughput benchmark for the HTTP API.
+
+Starts a server in a child process (or uses ``--url``), then has each
+client thread open a keep-alive connection and play a run for
+``--seconds``: walk to a table, chat twice, offer 70% of the ask, walk
+away if that didn't close it, again and again. It starts a new run when
+cash runs low. Reports requests and actions per second, plus latency
+percentiles per request.
+
+    python -m collector_rpg.api_bench --clients 8 --seconds 10
+    python -m collector_rpg.api_bench --batch   # walk and chats in one request
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import socket
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from .rules import ZONES
+from .tournament import DEFAULT_BUILD
+
+MIN_CASH = 200.0
+
+
+def _serve_child(port_pipe, flush_interval: float):
+    from .api import serve
+
+    server = serve(port=0, flush_interval=flush_interval)
+    port_pipe.send(server.server_address[1])
+    try:
+        server.serve_forever()
+    finally:
+        server.runs.close()
+
+
+class Client:
+    def __init__(self, host: str, port: int):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.conn.connect()
+        self.conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.latencies: List[float] = []
+        self.actions = 0
+        self.errors = 0
+
+    def call(self, method: str, path: str, body=None) -> Optional[dict]:
+        data = None if body is None else json.dumps(body)
+        headers = {"Content-Type": "application/json"} if data else {}
+        start = time.perf_counter()
+        self.conn.request(method, path, body=data, headers=headers)
+        response = self.conn.getresponse()
+        payload = json.loads(response.read())
+        self.latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            self.errors += 1
+            return None
+        return payload
+
+    def play(self, deadline: float, batch: bool):
+        run_id, view, n = None, None, 0
+        while time.perf_counter() < deadline:
+            if view is None or view["cash"] < MIN_CASH:
+                reply = self.call("POST", "/runs", {"build": DEFAULT_BUILD})
+                run_id, view = reply["run_id"], reply["run"]
+            zone = ZONES[n % 4]  # Trade Night is a market, not a floor table
+            n += 1
+            walk = [{"action": "walk", "args": [zone]},
+                    {"action": "move", "args": ["friendly_chat"]},
+                    {"action": "move", "args": ["friendly_chat"]}]
+            if batch:
+                # The offer is priced from the table, so only the opening moves can share a request
+                view = self._send(run_id, walk)
+            else:
+                for step in walk:
+                    view = self._send(run_id, step)
+            enc = view and view["encounter"]
+            if enc and enc["active"]:
+                ask = sum(c["ask_price"] for c in enc["cards"])
+                view = self._send(run_id, {"action": "offer", "args": [round(min(ask * 0.7, view["cash"]), 2)]})
+                if view and view["encounter"]["active"]:
+                    view = self._send(run_id, {"action": "walk_away", "args": []})
+
+    def _send(self, run_id: str, actions) -> Optional[dict]:
+        reply = self.call("POST", f"/runs/{run_id}/actions", actions)
+        self.actions += len(actions) if isinstance(actions, list) else 1
+        return reply and reply["run"]
+
+
+def run_bench(host: str, port: int, clients: int, seconds: float, batch: bool) -> dict:
+    workers = [Client(host, port) for _ in range(clients)]
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=c.play, args=(deadline, batch)) for c in workers]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    lat = np.array([x for c in workers for x in c.latencies]) * 1000.0
+    return {
+        "requests": len(lat),
+        "actions": sum(c.actions for c in workers),
+        "errors": sum(c.errors for c in workers),
+        "seconds": elapsed,
+        "rps": len(lat) / elapsed,
+        "aps": sum(c.actions for c in workers) / elapsed,
+        **{f"p{q}": float(np.percentile(lat, q)) for q in (50, 90, 99)},
+        "max": float(lat.max()) if len(lat) else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HTTP API against a local server.")
+    parser.add_argument("--url", default=None, help="server to hit (default: start one in a child process)")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent connections")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch", action="store_true", help="send each table's opening moves as one request")
+    parser.add_argument("--flush-interval", type=float, default=None,
+                        help="for the child server: seconds between saves (0: save on every request)")
+    args = parser.parse_args(argv)
+
+    child = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        from .api import FLUSH_INTERVAL_SECONDS
+
+        flush = FLUSH_INTERVAL_SECONDS if args.flush_interval is None else args.flush_interval
+        parent, child_end = multiprocessing.Pipe()
+        child = multiprocessing.Process(target=_serve_child, args=(child_end, flush), daemon=True)
+        child.start()
+        host, port = "127.0.0.1", parent.recv()
+
+    try:
+        r = run_bench(host, port, args.clients, args.seconds, args.batch)
+    finally:
+        if child is not None:
+            child.terminate()
+            child.join()
+
+    print(f"{r['requests']:,} requests, {r['actions']:,} actions in {r['seconds']:.1f}s "
+          f"({args.clients} clients{', batched' if args.batch else ''}, {r['errors']} errors)")
+    print(f"  {r['rps']:,.0f} requests/s, {r['aps']:,.0f} actions/s")
+    print(f"  latency ms: p50 {r['p50']:.2f}  p90 {r['p90']:.2f}  p99 {r['p99']:.2f}  max {r['max']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Big Dollar Box bins: thousands of cheap cards, scanned for sleepers.
+
+A bin is a handful of parallel arrays over catalog ids. Scans and top-k picks
+use ``np.argpartition`` on those arrays, and only the cards you actually pull
+out of the bin are turned into ``Card`` objects.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from .catalog import SET_NAMES, Catalog, get_catalog
+from .rules import (
+    Card,
+    Encounter,
+    as_of,
+    compute_action_budget,
+    init_encounter_state,
+)
+from .valuation import get_valuation
+
+BIN_MIN_SIZE = 500
+BIN_MAX_SIZE = 5_000
+BIN_STOCK_MAX_VALUE = 25.0
+BIN_PRICE_POINTS = np.array([1.0, 2.0, 3.0, 5.0], dtype=np.float32)
+SLEEPERS_PER_SCAN = 5
+
+
+@dataclass
+class DollarBin:
+    card_ids: np.ndarray  # int32 catalog ids
+    asks: np.ndarray      # float32 sticker price
+    values: np.ndarray    # float32 catalog value (the valuation service adds the market)
+    scanned: np.ndarray   # bool, cards you've already flipped through
+    scans_left: int
+    found: List[dict] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.card_ids)
+
+
+def scans_for(player: dict) -> int:
+    return 1 + player["attributes"]["Hustle"] // 25
+
+
+def generate_bin(player: dict, size: Optional[int] = None,
+                 catalog: Optional[Catalog] = None, rng=None) -> DollarBin:
+    catalog = catalog or get_catalog()
+    rng = rng or np.random.default_rng()
+    size = int(size or rng.integers(BIN_MIN_SIZE, BIN_MAX_SIZE + 1))
+
+    # Dollar boxes are filled from cheap non-vintage stock
+    pool = np.flatnonzero((catalog.era_idx != 0) & (catalog.base_value < BIN_STOCK_MAX_VALUE))
+    card_ids = rng.choice(pool, size=size).astype(np.int32)
+    values = catalog.base_value[card_ids]
+    current = values * get_valuation().quote(card_ids, as_of(player)).value
+
+    # The dealer eyeballs each card at today's prices and tags it at the
+    # nearest box price, capped at the top price point, which is where
+    # sleepers come from.
+    guess = current * rng.uniform(0.5, 1.5, size=size).astype(np.float32)
+    tier = np.searchsorted(BIN_PRICE_POINTS, guess).clip(0, len(BIN_PRICE_POINTS) - 1)
+    asks = BIN_PRICE_POINTS[tier]
+
+    return DollarBin(
+        card_ids=card_ids,
+        asks=asks,
+        values=values,
+        scanned=np.zeros(size, dtype=bool),
+        scans_left=scans_for(player),
+    )
+
+
+def scan_bin(b: DollarBin, player: dict, k: int = SLEEPERS_PER_SCAN, rng=None) -> List[dict]:
+    """Flip through part of the bin and surface the k best-looking sleepers.
+
+    Hustle sets how much of the bin one scan covers; Card Knowledge sets how
+    close your value read is to the truth.
+    """
+    rng = rng or np.random.default_rng()
+    attrs = player["attributes"]
+    if b.scans_left <= 0:
+        return []
+
+    unseen = np.flatnonzero(~b.scanned)
+    if len(unseen) == 0:
+        return []
+
+    depth = int(len(b) * (0.1 + 0.4 * attrs["Hustle"] / 100.0))
+    take = rng.permutation(unseen)[:max(1, depth)]
+    # Copy on write: undo snapshots share the previous array
+    b.scanned = b.scanned.copy()
+    b.scanned[take] = True
+    b.scans_left -= 1
+
+    sigma = 0.9 - 0.7 * attrs["Card Knowledge"] / 100.0
+    current = b.values[take] * get_valuation().quote(b.card_ids[take], as_of(player)).value
+    est = current * np.exp(rng.normal(0.0, sigma, size=len(take))).astype(np.float32)
+    edge = est - b.asks[take]
+
+    k = min(k, len(take))
+    top = np.argpartition(-edge, k - 1)[:k]
+    top = top[np.argsort(-edge[top])]
+
+    catalog = get_catalog()
+    hits = []
+    for i in top:
+        pos = int(take[i])
+        cid = int(b.card_ids[pos])
+        hits.append({
+            "pos": pos,
+            "card": f"{catalog.player_name(cid)} {catalog.year[cid]}",
+            "set": SET_NAMES[int(catalog.set_idx[cid])],
+            "ask": float(b.asks[pos]),
+            "read": round(float(est[i]), 2),
+        })
+    b.found = sorted(b.found + hits, key=lambda h: h["ask"] - h["read"])
+    return hits
+
+
+def bin_cards(b: DollarBin, positions: List[int]) -> List[Card]:
+    catalog = get_catalog()
+    return [catalog.card(int(b.card_ids[pos]), b.asks[pos], b.values[pos]) for pos in positions]
+
+
+def bin_encounter(b: DollarBin, positions: List[int], player: dict) -> Encounter:
+    """Take picked cards to the dealer's counter as a regular encounter."""
+    cards = bin_cards(b, positions)
+    enc = Encounter(
+        npc_type="Dealer",
+        mood="neutral",
+        zone="Dollar Boxes",
+        cards=cards,
+        round=1,
+        active=True,
+        history=[f"You pull {len(cards)} cards out of a {len(b)}-card bin and bring them to the Dealer."],
+    )
+    init_encounter_state(enc)
+    enc.max_actions = compute_action_budget(player)
+    enc.mode = "normal"
+
+    picked = set(positions)
+    b.found = [h for h in b.found if h["pos"] not in picked]
+    return enc
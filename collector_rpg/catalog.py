@@ -0,0 +1,147 @@
+"""Procedural card catalog, stored column-wise in NumPy arrays.
+
+Cards are addressed by integer id. Only ``card()`` builds a ``Card``; bins,
+scans and valuations work on the arrays directly. The first ids are the
+featured cards that the zone tables always put out.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .models import Card
+
+CATALOG_SIZE = 50_000
+CATALOG_SEED = 1987
+
+ERAS = ["Vintage", "Junk Wax", "Modern"]
+
+# name, era, first year, last year, typical value of a base card
+SETS = [
+    ("Topps", "Vintage", 1952, 1979, 40.0),
+    ("Bowman", "Vintage", 1948, 1975, 35.0),
+    ("Fleer", "Junk Wax", 1981, 1994, 1.5),
+    ("Upper Deck", "Junk Wax", 1989, 1999, 2.0),
+    ("Score", "Junk Wax", 1988, 1998, 1.0),
+    ("Hoops", "Modern", 2010, 2025, 1.5),
+    ("Donruss", "Modern", 2014, 2025, 2.0),
+    ("Mosaic", "Modern", 2019, 2025, 4.0),
+    ("Optic", "Modern", 2016, 2025, 6.0),
+    ("Select", "Modern", 2013, 2025, 6.0),
+    ("Prizm", "Modern", 2012, 2025, 8.0),
+    ("National Promo", "Modern", 2015, 2025, 10.0),
+]
+
+SET_NAMES = [s[0] for s in SETS]
+SET_ERA = np.array([ERAS.index(s[1]) for s in SETS], dtype=np.int8)
+
+# card kind label, value multiplier, share of the catalog
+KINDS = [
+    ("Base", 1.0, 0.70),
+    ("Rookie", 3.0, 0.15),
+    ("Insert", 1.6, 0.10),
+    ("Parallel", 2.5, 0.05),
+]
+
+# name, player, year, set, value; ids 0.. in this order
+FEATURED_CARDS = [
+    ("HOF RB Rookie", "Legend RB", 1958, "Topps", 500.0),
+    ("Iconic OF RC", "Legend OF", 1952, "Topps", 1500.0),
+    ("Star QB Rookie", "Star QB", 2020, "Prizm", 250.0),
+    ("Young Star RC", "Young Star", 2022, "Select", 120.0),
+    ("Sleeper WR", "WR Prospect", 2023, "Donruss", 5.0),
+    ("Bench Shooter", "Role Player", 2021, "Hoops", 2.0),
+    ("Show Exclusive", "Promo Player", 2025, "National Promo", 40.0),
+    ("PC Parallel", "Your PC Guy", 2019, "Optic", 80.0),
+    ("Random RC", "Random Rookie", 2021, "Mosaic", 25.0),
+]
+
+ZONE_FEATURED = {
+    "Vintage Alley": [0, 1],
+    "Modern Showcases": [2, 3],
+    "Dollar Boxes": [4, 5],
+    "Corporate Pavilion": [6],
+    "Trade Night": [7, 8],
+}
+
+FIRST_NAMES = [
+    "Mickey", "Hank", "Willie", "Sandy", "Bo", "Deion", "Ken", "Chipper", "Derek", "Shohei",
+    "Patrick", "Josh", "Joe", "Jalen", "Trae", "Luka", "Zion", "Victor", "Connor", "Wayne",
+]
+LAST_NAMES = [
+    "Mantle", "Aaron", "Mays", "Koufax", "Jackson", "Sanders", "Griffey", "Jones", "Jeter", "Ohtani",
+    "Mahomes", "Allen", "Burrow", "Hurts", "Young", "Doncic", "Williamson", "Wembanyama", "McDavid", "Gretzky",
+]
+
+
+@dataclass
+class Catalog:
+    set_idx: np.ndarray     # int8 index into SETS
+    year: np.ndarray        # int16
+    player_idx: np.ndarray  # int16 index into FIRST_NAMES x LAST_NAMES, -1 for featured
+    kind_idx: np.ndarray    # int8 index into KINDS
+    base_value: np.ndarray  # float32 value before any market movement
+
+    def __len__(self) -> int:
+        return len(self.base_value)
+
+    @property
+    def era_idx(self) -> np.ndarray:
+        return SET_ERA[self.set_idx]
+
+    def player_name(self, card_id: int) -> str:
+        if card_id < len(FEATURED_CARDS):
+            return FEATURED_CARDS[card_id][1]
+        pi = int(self.player_idx[card_id])
+        return f"{FIRST_NAMES[pi // len(LAST_NAMES)]} {LAST_NAMES[pi % len(LAST_NAMES)]}"
+
+    def card(self, card_id: int, ask_price: float, true_value: float = None) -> Card:
+        player = self.player_name(card_id)
+        if card_id < len(FEATURED_CARDS):
+            name = FEATURED_CARDS[card_id][0]
+        else:
+            name = f"{player} {KINDS[int(self.kind_idx[card_id])][0]}"
+        value = float(self.base_value[card_id]) if true_value is None else float(true_value)
+        return Card(
+            name=name,
+            player=player,
+            year=int(self.year[card_id]),
+            set_name=SET_NAMES[int(self.set_idx[card_id])],
+            true_value=round(value, 2),
+            ask_price=round(float(ask_price), 2),
+            card_id=int(card_id),
+        )
+
+
+def build_catalog(size: int = CATALOG_SIZE, seed: int = CATALOG_SEED) -> Catalog:
+    rng = np.random.default_rng(seed)
+
+    set_idx = rng.integers(0, len(SETS), size=size).astype(np.int8)
+    first = np.array([s[2] for s in SETS], dtype=np.int16)[set_idx]
+    last = np.array([s[3] for s in SETS], dtype=np.int16)[set_idx]
+    year = (first + rng.random(size) * (last - first + 1)).astype(np.int16)
+
+    player_idx = rng.integers(0, len(FIRST_NAMES) * len(LAST_NAMES), size=size).astype(np.int16)
+    kind_idx = rng.choice(len(KINDS), size=size, p=[k[2] for k in KINDS]).astype(np.int8)
+
+    scale = np.array([s[4] for s in SETS], dtype=np.float32)[set_idx]
+    kind_mul = np.array([k[1] for k in KINDS], dtype=np.float32)[kind_idx]
+    # Heavy right tail: most cards are commons, a few are chase cards
+    value = scale * kind_mul * np.exp(rng.normal(0.0, 1.0, size=size)).astype(np.float32)
+    base_value = np.maximum(0.25, np.round(value, 2)).astype(np.float32)
+
+    for i, (name, _player, card_year, set_name, card_value) in enumerate(FEATURED_CARDS):
+        set_idx[i] = SET_NAMES.index(set_name)
+        year[i] = card_year
+        player_idx[i] = -1
+        kind_idx[i] = 1 if "Rookie" in name or "RC" in name else 0
+        base_value[i] = card_value
+
+    return Catalog(set_idx, year, player_idx, kind_idx, base_value)
+
+
+@lru_cache(maxsize=1)
+def get_catalog() -> Catalog:
+    """Process-wide catalog, built once and shared read-only by every session."""
+    return build_catalog()
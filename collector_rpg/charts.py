@@ -0,0 +1,147 @@
+"""Collection charts, downsampled on the server so their size doesn't grow with the collection.
+
+- Portfolio: what the cards cost and what they're worth today, added up in
+  the order they were picked up. Each line is cut to ``CURVE_POINTS`` points
+  with Largest-Triangle-Three-Buckets (``lttb``), which keeps the jumps a
+  big pickup makes.
+- Composition: today's value by zone, era and set, the biggest
+  ``COMPOSITION_GROUPS`` groups and the rest as "Other".
+- Margins: value today minus paid, per card, binned into ``MARGIN_BINS``
+  bins between the 1st and 99th percentile (the tails go in the end bins).
+
+Collection rows don't record which lot they came from, so margins are per
+card rather than per deal.
+
+``collection_figures`` returns the Plotly figures as JSON. The last
+``FIGURE_CACHE`` results are kept by collection version and valuation date,
+so a rerun that hasn't bought anything (and hasn't moved the clock) reuses
+them.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .catalog import SETS
+from .valuation import get_valuation
+
+CURVE_POINTS = 500
+MARGIN_BINS = 40
+COMPOSITION_GROUPS = 12
+FIGURE_CACHE = 32
+
+SET_ERA = {name: era for name, era, *_ in SETS}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: ``points`` of the series that keep its shape.
+
+    The first and last points are kept. The points in between are split
+    into ``points - 2`` buckets, and each bucket keeps the point making the
+    biggest triangle with the point kept before it and the average of the
+    next bucket.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return x, y
+    every = (n - 2) / (points - 2)
+    edges = (np.arange(points - 1) * every).astype(np.int64) + 1  # bucket i is edges[i]:edges[i + 1]
+    edges[-1] = n - 1
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - x[nlo:nhi].mean()) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (y[nlo:nhi].mean() - ay))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def binned(values: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Bin centers and counts; the range is the 1st to 99th percentile, with the tails in the end bins."""
+    if not len(values):
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    lo, hi = np.percentile(values, [1, 99])
+    if hi <= lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    counts, edges = np.histogram(np.clip(values, lo, hi), bins=bins, range=(lo, hi))
+    return (edges[:-1] + edges[1:]) / 2, counts
+
+
+def grouped(labels: List[str], weights: np.ndarray, top: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """(group, total weight, count) for the ``top`` heaviest groups, then "Other"; heaviest first."""
+    names, inverse = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    totals = np.bincount(inverse, weights=weights, minlength=len(names))
+    counts = np.bincount(inverse, minlength=len(names))
+    order = np.argsort(-totals, kind="stable")
+    head, tail = order[:top], order[top:]
+    groups = [str(name) for name in names[head]]
+    if len(tail):
+        groups.append("Other")
+        return groups, np.append(totals[head], totals[tail].sum()), np.append(counts[head], counts[tail].sum())
+    return groups, totals[head], counts[head]
+
+
+def _layout(fig, **kwargs):
+    fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), height=260, **kwargs)
+    return fig.to_json()
+
+
+def _build(collection, as_of) -> Dict[str, str]:
+    import plotly.graph_objects as go  # only the pages draw charts
+
+    rows = collection.rows()
+    value = get_valuation().value_collection(collection, as_of).value
+    paid = collection.column("paid")
+    order = np.arange(1, len(rows) + 1, dtype=np.float64)
+
+    figures = {}
+    fig = go.Figure()
+    for name, series in (("Paid", np.cumsum(paid)), ("Worth today", np.cumsum(value))):
+        x, y = lttb(order, series, CURVE_POINTS)
+        fig.add_trace(go.Scatter(x=x, y=np.round(y, 2), mode="lines", name=name))
+    figures["portfolio"] = _layout(fig, xaxis_title="Cards picked up", yaxis_title="$",
+                                   legend=dict(orientation="h", y=1.1))
+
+    by = {
+        "zone": [r.get("zone") or "Unknown" for r in rows],
+        "era": [SET_ERA.get(r.get("set_name"), "Other") for r in rows],
+        "set": [r.get("set_name") or "Unknown" for r in rows],
+    }
+    for key, labels in by.items():
+        groups, totals, counts = grouped(labels, value, COMPOSITION_GROUPS)
+        fig = go.Figure(go.Bar(
+            x=np.round(totals, 2)[::-1], y=groups[::-1], orientation="h",
+            text=[f"{c:,} cards" for c in counts[::-1]],
+        ))
+        figures[key] = _layout(fig, xaxis_title="Worth today ($)")
+
+    centers, counts = binned(value - paid, MARGIN_BINS)
+    fig = go.Figure(go.Bar(x=np.round(centers, 2), y=counts))
+    figures["margins"] = _layout(fig, xaxis_title="Margin per card ($)", yaxis_title="Cards", bargap=0.05)
+    return figures
+
+
+_cache: "OrderedDict[tuple, Dict[str, str]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def collection_figures(collection, as_of) -> Dict[str, str]:
+    """Figure JSON by chart: portfolio, zone, era, set and margins."""
+    key = (collection.version, tuple(as_of))
+    with _lock:
+        figures = _cache.get(key)
+        if figures is not None:
+            _cache.move_to_end(key)
+            return figures
+    figures = _build(collection, as_of)
+    with _lock:
+        _cache[key] = figures
+        while len(_cache) > FIGURE_CACHE:
+            _cache.popitem(last=False)
+    return figures
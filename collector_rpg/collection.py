@@ -0,0 +1,117 @@
+"""Player collection: row dicts for display, NumPy columns for math.
+
+``player["collection"]`` holds one of these. It behaves like the list of
+card dicts it replaced (iterate, ``len``, ``append``/``extend``), and keeps
+the numeric columns in growable arrays so valuations and aggregates never
+loop over rows. ``version`` changes on every change, for caches keyed on it.
+Versions come from one process-wide counter, so a collection that was
+truncated back (undo) and then changed differently never reuses a version.
+"""
+
+import itertools
+import time
+from typing import Iterable, List
+
+import numpy as np
+
+NUMERIC_COLUMNS = {
+    "card_id": np.int64,   # -1 when the card isn't from the catalog
+    "true_value": np.float64,
+    "ask_price": np.float64,
+    "paid": np.float64,
+}
+
+# Started from the clock so collections unpickled from another worker don't collide
+_versions = itertools.count(time.time_ns())
+
+
+class Collection:
+    def __init__(self, rows: Iterable[dict] = ()):
+        self._rows: List[dict] = []
+        self._cols = {name: np.empty(16, dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+        self.version = 0
+        self.extend(rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __getitem__(self, idx):
+        return self._rows[idx]
+
+    def __bool__(self) -> bool:
+        return bool(self._rows)
+
+    def __getstate__(self):
+        # Only the filled part of each column; spare capacity is garbage
+        n = len(self._rows)
+        return {"rows": self._rows, "cols": {k: v[:n] for k, v in self._cols.items()}, "version": self.version}
+
+    def __setstate__(self, state):
+        self._rows = state["rows"]
+        n = len(self._rows)
+        self._cols = {}
+        for name, filled in state["cols"].items():
+            arr = np.empty(max(16, n), dtype=filled.dtype)
+            arr[:n] = filled
+            self._cols[name] = arr
+        self.version = state["version"]
+
+    def _grow(self, need: int):
+        cap = len(self._cols["card_id"])
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for name, arr in self._cols.items():
+            grown = np.empty(cap, dtype=arr.dtype)
+            grown[:len(self._rows)] = arr[:len(self._rows)]
+            self._cols[name] = grown
+
+    def append(self, row: dict):
+        self.extend([row])
+
+    def extend(self, rows: Iterable[dict]):
+        rows = list(rows)
+        if not rows:
+            return
+        start = len(self._rows)
+        end = start + len(rows)
+        self._grow(end)
+        # One slice assignment per column; setting array cells one by one is far slower
+        cols = self._cols
+        cols["card_id"][start:end] = [-1 if r.get("card_id") is None else r["card_id"] for r in rows]
+        cols["true_value"][start:end] = [r.get("true_value", 0.0) for r in rows]
+        cols["ask_price"][start:end] = [r.get("ask_price", 0.0) for r in rows]
+        cols["paid"][start:end] = [r.get("paid", r.get("ask_price", 0.0)) for r in rows]
+        self._rows.extend(rows)
+        self.version = next(_versions)
+
+    def pop(self, idx: int) -> dict:
+        """Remove and return one row (e.g. a card listed for sale)."""
+        n = len(self._rows)
+        if idx < 0:
+            idx += n
+        row = self._rows.pop(idx)
+        for arr in self._cols.values():
+            arr[idx:n - 1] = arr[idx + 1:n]
+        self.version = next(_versions)
+        return row
+
+    def truncate(self, n: int, version: int) -> List[dict]:
+        """Drop the rows past ``n`` and return them; the collection is back at ``version``."""
+        tail = self._rows[n:]
+        del self._rows[n:]
+        self.version = version
+        return tail
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of a numeric column."""
+        view = self._cols[name][:len(self._rows)]
+        view.flags.writeable = False
+        return view
+
+    def rows(self, limit: int = None) -> List[dict]:
+        return self._rows if limit is None else self._rows[-limit:]
@@ -0,0 +1,283 @@
+"""Streaming import and export of a collection as CSV, JSON lines or Parquet.
+
+Files have one card per row with the columns in ``FIELDS``. ``set`` is the
+card's set name, ``paid`` what the collector paid (it defaults to
+``ask_price``), and ``card_id`` the catalog id when the card is from the
+catalog. Missing ``zone`` defaults to ``IMPORT_ZONE``.
+
+Both directions work in chunks of ``CHUNK_ROWS``, so neither the file nor a
+second copy of the collection is ever held in memory at once. On import,
+each chunk is validated and appended with ``Collection.extend``, which fills
+the numeric columns the valuations run on. A bad row is skipped and
+reported, and the rest of the file still loads.
+
+Parquet goes through ``pyarrow``, which is imported only when needed (it
+comes with Streamlit).
+"""
+
+import csv
+import io
+import json
+import math
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .catalog import get_catalog
+from .collection import Collection
+
+FIELDS = ("name", "player", "year", "set", "true_value", "ask_price", "paid", "zone", "card_id")
+REQUIRED = ("name", "year", "set", "true_value", "ask_price")
+FORMATS = ("csv", "jsonl", "parquet")
+CHUNK_ROWS = 10_000
+MAX_IMPORT_ROWS = 250_000
+MAX_REPORTED_ERRORS = 20
+IMPORT_ZONE = "Imported"
+YEAR_RANGE = (1860, 2100)
+
+Source = Union[str, Path, BinaryIO]
+
+
+class CollectionFileError(ValueError):
+    """The file can't be read as a collection at all."""
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    added: int = 0
+    rejected: int = 0
+    truncated: bool = False  # stopped at MAX_IMPORT_ROWS
+    errors: List[str] = field(default_factory=list)
+
+    def reject(self, line: int, problem: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Row {line}: {problem}")
+
+
+def format_for(filename: str) -> str:
+    suffix = Path(filename).suffix.lower().lstrip(".")
+    fmt = {"ndjson": "jsonl", "json": "jsonl", "pq": "parquet"}.get(suffix, suffix)
+    if fmt not in FORMATS:
+        raise CollectionFileError(f"Unknown collection file type {suffix!r}; use one of {', '.join(FORMATS)}.")
+    return fmt
+
+
+def _binary(source: Source, mode: str):
+    """(file object, whether we opened it)."""
+    if isinstance(source, (str, Path)):
+        return open(source, mode), True
+    return source, False
+
+
+# ---------- Reading ----------
+
+def _read_csv(fh: BinaryIO) -> Iterator[dict]:
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        missing = [c for c in REQUIRED if c not in (reader.fieldnames or ()) and not
+                   (c == "set" and "set_name" in (reader.fieldnames or ()))]
+        if missing:
+            raise CollectionFileError(f"CSV is missing column(s): {', '.join(missing)}.")
+        yield from reader
+    finally:
+        text.detach()  # leave the caller's file open
+
+
+def _read_jsonl(fh: BinaryIO) -> Iterator[dict]:
+    for line in fh:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # Bad lines go on as a marker so validation reports them with their row number
+        yield row if isinstance(row, dict) else {"_bad": f"not a JSON object: {line[:60]!r}"}
+
+
+def _read_parquet(fh: BinaryIO) -> Iterator[dict]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - pyarrow ships with streamlit
+        raise CollectionFileError("Parquet needs the pyarrow package.") from exc
+    try:
+        pf = pq.ParquetFile(fh)
+    except Exception as exc:
+        raise CollectionFileError(f"Not a Parquet file: {exc}") from exc
+    names = set(pf.schema_arrow.names)
+    missing = [c for c in REQUIRED if c not in names and not (c == "set" and "set_name" in names)]
+    if missing:
+        raise CollectionFileError(f"Parquet file is missing column(s): {', '.join(missing)}.")
+    for batch in pf.iter_batches(batch_size=CHUNK_ROWS):
+        yield from batch.to_pylist()
+
+
+READERS = {"csv": _read_csv, "jsonl": _read_jsonl, "parquet": _read_parquet}
+
+
+def _number(raw: dict, key: str, default=None) -> float:
+    value = raw.get(key)
+    if value is None or value == "":
+        if default is None:
+            raise ValueError(f"{key} is missing")
+        return default
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} {value!r} isn't a number") from None
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"{key} must be zero or more")
+    return value
+
+
+def _text(raw: dict, key: str, default: Optional[str] = None) -> str:
+    value = raw.get(key)
+    value = "" if value is None else str(value).strip()
+    if not value:
+        if default is None:
+            raise ValueError(f"{key} is missing")
+        return default
+    return value
+
+
+def validate_row(raw: dict, n_catalog: int) -> dict:
+    """A file row as a collection row; raises ``ValueError`` saying what's wrong."""
+    if "_bad" in raw:
+        raise ValueError(raw["_bad"])
+    year = _number(raw, "year")
+    if year != int(year) or not YEAR_RANGE[0] <= year <= YEAR_RANGE[1]:
+        raise ValueError(f"year {raw.get('year')!r} isn't a card year")
+    ask = _number(raw, "ask_price")
+    card_id = raw.get("card_id")
+    if card_id is not None and card_id != "":
+        card_id = _number(raw, "card_id")
+        if card_id != int(card_id) or card_id >= n_catalog:
+            raise ValueError(f"card_id {raw.get('card_id')!r} isn't in the catalog")
+        card_id = int(card_id)
+    else:
+        card_id = None
+    return {
+        "name": _text(raw, "name"),
+        "player": _text(raw, "player", ""),
+        "year": int(year),
+        "set_name": _text(raw, "set", raw.get("set_name") or None),
+        "true_value": _number(raw, "true_value"),
+        "ask_price": ask,
+        "card_id": card_id,
+        "paid": round(_number(raw, "paid", ask), 2),
+        "zone": _text(raw, "zone", IMPORT_ZONE),
+    }
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_collection(collection: Collection, source: Source, fmt: str,
+                      max_rows: int = MAX_IMPORT_ROWS) -> ImportReport:
+    """Append the cards in ``source`` to ``collection``, a chunk at a time."""
+    if fmt not in READERS:
+        raise CollectionFileError(f"Unknown collection format {fmt!r}.")
+    n_catalog = len(get_catalog())
+    report = ImportReport()
+    fh, owned = _binary(source, "rb")
+    try:
+        for chunk in _chunks(READERS[fmt](fh), CHUNK_ROWS):
+            good = []
+            for raw in chunk:
+                report.read += 1
+                if report.read > max_rows:
+                    report.read -= 1
+                    report.truncated = True
+                    break
+                try:
+                    good.append(validate_row(raw, n_catalog))
+                except ValueError as exc:
+                    report.reject(report.read, str(exc))
+            collection.extend(good)
+            report.added += len(good)
+            if report.truncated:
+                break
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise CollectionFileError(f"Couldn't read the file: {exc}") from exc
+    finally:
+        if owned:
+            fh.close()
+    return report
+
+
+# ---------- Writing ----------
+
+def export_row(row: dict) -> Tuple:
+    return (
+        row.get("name", ""),
+        row.get("player", ""),
+        row.get("year"),
+        row.get("set_name", ""),
+        row.get("true_value", 0.0),
+        row.get("ask_price", 0.0),
+        row.get("paid", row.get("ask_price", 0.0)),
+        row.get("zone") or IMPORT_ZONE,
+        row.get("card_id"),
+    )
+
+
+def _write_csv(rows: Iterable[dict], fh: BinaryIO):
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(text)
+        writer.writerow(FIELDS)
+        for chunk in _chunks(rows, CHUNK_ROWS):
+            writer.writerows(export_row(r) for r in chunk)
+        text.flush()
+    finally:
+        text.detach()
+
+
+def _write_jsonl(rows: Iterable[dict], fh: BinaryIO):
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    for chunk in _chunks(rows, CHUNK_ROWS):
+        fh.write("".join(encode(dict(zip(FIELDS, export_row(r)))) + "\n" for r in chunk).encode())
+
+
+def _write_parquet(rows: Iterable[dict], fh: BinaryIO):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - pyarrow ships with streamlit
+        raise CollectionFileError("Parquet needs the pyarrow package.") from exc
+    schema = pa.schema([
+        ("name", pa.string()), ("player", pa.string()), ("year", pa.int32()), ("set", pa.string()),
+        ("true_value", pa.float64()), ("ask_price", pa.float64()), ("paid", pa.float64()),
+        ("zone", pa.string()), ("card_id", pa.int64()),
+    ])
+    with pq.ParquetWriter(fh, schema) as writer:
+        for chunk in _chunks(rows, CHUNK_ROWS):
+            columns = list(zip(*(export_row(r) for r in chunk)))
+            writer.write_batch(pa.record_batch([pa.array(col, type=f.type) for col, f in zip(columns, schema)],
+                                               schema=schema))
+
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def export_collection(collection: Collection, dest: Source, fmt: str) -> int:
+    """Write every card in ``collection`` to ``dest``; returns the row count."""
+    if fmt not in WRITERS:
+        raise CollectionFileError(f"Unknown collection format {fmt!r}.")
+    fh, owned = _binary(dest, "wb")
+    try:
+        WRITERS[fmt](iter(collection), fh)
+    finally:
+        if owned:
+            fh.close()
+    return len(collection)
@@ -0,0 +1,131 @@
+"""Local comps store: simulated sales history for every catalog card.
+
+Sales are kept in CSR form, one flat ``days``/``prices`` pair of arrays with
+``offsets[card_id]:offsets[card_id + 1]`` marking each card's series, sorted
+by day. The arrays live in ``.npy`` files that are memory-mapped read-only, so
+every session in the process (and every worker on the box) shares one copy
+through the page cache. Range queries are a ``searchsorted`` on one card's
+slice.
+
+Day 0 is the morning the show opens; history runs back ``HISTORY_DAYS``.
+"""
+
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from . import DATA_DIR
+from .catalog import CATALOG_SEED, CATALOG_SIZE, get_catalog
+from .models import Card
+
+HISTORY_DAYS = 365
+COMP_WINDOW_DAYS = 30
+COMPS_SEED = 2024
+
+
+@dataclass
+class CompsStore:
+    offsets: np.ndarray  # int64, len(catalog) + 1
+    days: np.ndarray     # float32, sorted within each card
+    prices: np.ndarray   # float32
+
+    def _series(self, card_id: int):
+        lo, hi = int(self.offsets[card_id]), int(self.offsets[card_id + 1])
+        return self.days[lo:hi], self.prices[lo:hi]
+
+    def sales_count(self, card_id: int) -> int:
+        return int(self.offsets[card_id + 1] - self.offsets[card_id])
+
+    def last_n(self, card_id: int, n: int, before_day: float = 0.0) -> np.ndarray:
+        days, prices = self._series(card_id)
+        end = int(np.searchsorted(days, before_day, side="right"))
+        return np.asarray(prices[max(0, end - n):end])
+
+    def window(self, card_id: int, start_day: float, end_day: float) -> np.ndarray:
+        days, prices = self._series(card_id)
+        lo = int(np.searchsorted(days, start_day, side="left"))
+        hi = int(np.searchsorted(days, end_day, side="right"))
+        return np.asarray(prices[lo:hi])
+
+    def median(self, card_id: int, start_day: float, end_day: float) -> Optional[float]:
+        sales = self.window(card_id, start_day, end_day)
+        return float(np.median(sales)) if len(sales) else None
+
+
+def simulate_history(base_value: np.ndarray, seed: int = COMPS_SEED):
+    """Sales history for every card: cheap cards trade more, prices drift."""
+    rng = np.random.default_rng(seed)
+    n = len(base_value)
+
+    rate = np.clip(40.0 / np.sqrt(base_value), 2.0, 60.0)
+    counts = rng.poisson(rate)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    card_of_sale = np.repeat(np.arange(n), counts)
+    days = rng.uniform(-HISTORY_DAYS, 0.0, size=len(card_of_sale)).astype(np.float32)
+    order = np.lexsort((days, card_of_sale))
+    days = days[order]
+
+    # Each card trends up or down over the year; sales scatter around the trend
+    trend = rng.normal(0.0, 0.3, size=n)
+    drift = np.exp(trend[card_of_sale] * days / HISTORY_DAYS)
+    noise = np.exp(rng.normal(0.0, 0.15, size=len(days)))
+    prices = np.round(base_value[card_of_sale] * drift * noise, 2).astype(np.float32)
+
+    return offsets, days, prices
+
+
+def _store_dir() -> Path:
+    return DATA_DIR / f"comps-{CATALOG_SIZE}-{CATALOG_SEED}-{COMPS_SEED}"
+
+
+def _write_atomic(path: Path, arr: np.ndarray):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".npy")
+    with os.fdopen(fd, "wb") as fh:
+        np.save(fh, arr)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=1)
+def get_comps() -> CompsStore:
+    """Process-wide comps store, simulated once and then memory-mapped."""
+    root = _store_dir()
+    names = ("offsets", "days", "prices")
+    if not all((root / f"{name}.npy").exists() for name in names):
+        root.mkdir(parents=True, exist_ok=True)
+        arrays = simulate_history(get_catalog().base_value)
+        for name, arr in zip(names, arrays):
+            _write_atomic(root / f"{name}.npy", arr)
+    return CompsStore(*(np.load(root / f"{name}.npy", mmap_mode="r") for name in names))
+
+
+def comp_strength(cards: List[Card], day: int) -> Optional[float]:
+    """How hard recent comps undercut the ask, from -1 (back the dealer) to 1.
+
+    Compares the ask on the table with the median sale over the last
+    ``COMP_WINDOW_DAYS`` for every catalog card that has comps. Returns None
+    when no card on the table has any.
+    """
+    store = get_comps()
+    now = float(day - 1)
+    total_ask = total_comp = 0.0
+    for c in cards:
+        if c.card_id is None:
+            continue
+        med = store.median(c.card_id, now - COMP_WINDOW_DAYS, now)
+        if med is None:
+            recent = store.last_n(c.card_id, 5, now)
+            if not len(recent):
+                continue
+            med = float(np.median(recent))
+        total_ask += c.ask_price
+        total_comp += med
+    if total_ask <= 0:
+        return None
+    return max(-1.0, min(1.0, (total_ask - total_comp) / total_ask * 3.0))
@@ -0,0 +1,358 @@
+"""Game balance tables, loaded from a versioned JSON file.
+
+``game_config.json`` next to this module holds the zones, NPC types and
+their behaviour, moods, the big stages, influencers and Whale, the special
+tactics, the XP thresholds, each zone's XP factor, how long floor dealers
+take to restock and the daily show events. Set ``COLLECTOR_RPG_CONFIG`` to
+use another file.
+
+The file is validated and compiled once into a ``GameConfig``:
+
+- id -> record dicts (``gym``, ``elite``, ``zone_info``, ``npc_info``)
+- zone codes (``zone_code``) and the NumPy arrays indexed by them, for
+  vectorised code
+
+Hot reload: ``get_config()`` checks the file's modification time at most
+every ``CHECK_INTERVAL_SECONDS``. When the file changed, it compiles the new
+version and swaps it in with one reference assignment. Callers that hold a
+``GameConfig`` keep a consistent view until they ask again. A file that
+fails validation is ignored, and the last good config stays live, with the
+error in ``last_error()``, and so is a changed file whose ``version`` isn't
+higher than the live one: bump it with every balance change.
+
+Runs play out under the version they locked in under. Every version that
+goes live is archived under ``DATA_DIR/configs``; ``config_for(version)``
+reads it back, and a run's config is pinned with ``use_config`` (the rules
+bind it along with the session), so ``get_config()`` gives a run in progress
+its own version while new runs get the live one. ``verify`` replays under
+the archived version the same way.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from . import DATA_DIR
+from .market import TIME_BLOCKS
+
+CONFIG_PATH = Path(os.environ.get("COLLECTOR_RPG_CONFIG", Path(__file__).resolve().parent / "game_config.json"))
+ARCHIVE_DIR = DATA_DIR / "configs"
+CHECK_INTERVAL_SECONDS = 2.0
+
+# The rules hard-code these names, so a config can't rename them
+MOODS_EXPECTED = ("happy", "neutral", "grumpy")
+TACTIC_ATTRIBUTES = ("Negotiation", "People Skills", "Card Knowledge", "Hustle")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class GameConfig:
+    version: int
+    path: str
+    zones: Tuple[str, ...]
+    zone_info: Dict[str, dict]           # name -> {"icon", "color", "xp_factor"}
+    zone_code: Dict[str, int]
+    zone_xp_factor: np.ndarray           # by zone code
+    npc_types: Tuple[str, ...]
+    npc_info: Dict[str, dict]            # name -> {"icon", "overask", "min_pct"}
+    moods: Tuple[str, ...]
+    gyms: Tuple[dict, ...]               # in unlock order
+    gym: Dict[str, dict]                 # id -> record
+    elite_four: Tuple[dict, ...]
+    elite: Dict[str, dict]
+    champion: dict
+    special_tactics: Dict[str, dict]     # attribute -> tactic
+    xp_thresholds: Tuple[int, ...]       # XP needed for level i + 1, from 0
+    dealer_restock_blocks: int           # time blocks from a floor purchase to that table's restock
+    show_events: Tuple[dict, ...]        # daily: {"id", "name", "zone", "time_block", "message"}
+
+    # The shapes the rules used to define inline
+    @property
+    def zone_meta(self) -> Dict[str, dict]:
+        return {z: {"icon": i["icon"], "color": i["color"]} for z, i in self.zone_info.items()}
+
+    @property
+    def npc_meta(self) -> Dict[str, dict]:
+        return {n: {"icon": i["icon"]} for n, i in self.npc_info.items()}
+
+    @property
+    def npc_behavior(self) -> Dict[str, dict]:
+        return {n: {"overask": tuple(i["overask"]), "min_pct": i["min_pct"]} for n, i in self.npc_info.items()}
+
+    @property
+    def max_level(self) -> int:
+        return len(self.xp_thresholds)
+
+
+# ---------- Validation ----------
+
+def _require(ok: bool, message: str):
+    if not ok:
+        raise ConfigError(message)
+
+
+def _names(records, what: str) -> Tuple[str, ...]:
+    _require(isinstance(records, list) and records, f"{what} must be a non-empty list")
+    names = tuple(r.get("name") if isinstance(r, dict) else None for r in records)
+    _require(all(isinstance(n, str) and n for n in names), f"every entry in {what} needs a name")
+    _require(len(set(names)) == len(names), f"{what} has duplicate names")
+    return names
+
+
+def _number(record: dict, key: str, where: str, lo: float = 0.0, hi: float = float("inf")) -> float:
+    value = record.get(key)
+    _require(isinstance(value, (int, float)) and not isinstance(value, bool) and lo < value <= hi,
+             f"{where}: {key} must be a number in ({lo}, {hi}]")
+    return float(value)
+
+
+def _bosses(records, what: str, zones: Tuple[str, ...], needs_zone: bool) -> Tuple[dict, ...]:
+    _require(isinstance(records, list) and records, f"{what} must be a non-empty list")
+    seen = set()
+    for r in records:
+        _boss(r, what, zones, needs_zone)
+        _require(r["id"] not in seen, f"{what}: duplicate id {r['id']!r}")
+        seen.add(r["id"])
+    return tuple(dict(r) for r in records)
+
+
+def _boss(r, what: str, zones: Tuple[str, ...], needs_zone: bool):
+    _require(isinstance(r, dict), f"{what} entries must be objects")
+    where = f"{what} {r.get('id')!r}"
+    for key in ("id", "name", "boss", "description"):
+        _require(isinstance(r.get(key), str) and r[key], f"{where}: {key} must be a non-empty string")
+    level = r.get("required_level")
+    _require(isinstance(level, int) and not isinstance(level, bool) and level >= 1,
+             f"{where}: required_level must be a whole number from 1")
+    if needs_zone:
+        _require(r.get("zone") in zones, f"{where}: zone {r.get('zone')!r} isn't one of the zones")
+
+
+def compile_config(raw: dict, path: str = "") -> GameConfig:
+    """Validate a parsed config file and build its lookup tables."""
+    _require(isinstance(raw, dict), "config must be a JSON object")
+    version = raw.get("version")
+    _require(isinstance(version, int) and not isinstance(version, bool) and version >= 1,
+             "version must be a whole number from 1")
+
+    zones = _names(raw.get("zones"), "zones")
+    zone_info = {}
+    for z in raw["zones"]:
+        where = f"zone {z['name']!r}"
+        _require(isinstance(z.get("icon"), str) and isinstance(z.get("color"), str), f"{where}: needs icon and color")
+        zone_info[z["name"]] = {"icon": z["icon"], "color": z["color"],
+                                "xp_factor": _number(z, "xp_factor", where, hi=10.0)}
+
+    npc_types = _names(raw.get("npc_types"), "npc_types")
+    npc_info = {}
+    for n in raw["npc_types"]:
+        where = f"npc type {n['name']!r}"
+        overask = n.get("overask")
+        _require(isinstance(overask, list) and len(overask) == 2
+                 and all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in overask)
+                 and 0 < overask[0] <= overask[1], f"{where}: overask must be [low, high] with 0 < low <= high")
+        npc_info[n["name"]] = {"icon": n.get("icon", "🙂"), "overask": (float(overask[0]), float(overask[1])),
+                               "min_pct": _number(n, "min_pct", where, hi=2.0)}
+
+    moods = raw.get("moods")
+    _require(isinstance(moods, list) and tuple(moods) == MOODS_EXPECTED,
+             f"moods must be {list(MOODS_EXPECTED)} (the offer rules are written for these)")
+
+    gyms = _bosses(raw.get("gyms"), "gyms", zones, needs_zone=True)
+    elite_four = _bosses(raw.get("elite_four"), "elite_four", zones, needs_zone=False)
+    champion = raw.get("champion")
+    _boss(champion, "champion", zones, needs_zone=False)
+
+    tactics = raw.get("special_tactics")
+    _require(isinstance(tactics, dict) and set(tactics) == set(TACTIC_ATTRIBUTES),
+             f"special_tactics needs exactly one tactic for each of {', '.join(TACTIC_ATTRIBUTES)}")
+    for attr, t in tactics.items():
+        _require(isinstance(t, dict) and isinstance(t.get("name"), str) and isinstance(t.get("description"), str),
+                 f"special tactic for {attr}: needs name and description")
+
+    thresholds = raw.get("xp_thresholds")
+    _require(isinstance(thresholds, list) and len(thresholds) >= 2
+             and all(isinstance(t, int) and not isinstance(t, bool) for t in thresholds)
+             and thresholds[0] == 0 and all(a < b for a, b in zip(thresholds, thresholds[1:])),
+             "xp_thresholds must be rising whole numbers starting at 0")
+
+    restock = raw.get("dealer_restock_blocks")
+    _require(isinstance(restock, int) and not isinstance(restock, bool) and restock >= 1,
+             "dealer_restock_blocks must be a whole number from 1")
+
+    events = raw.get("show_events", [])
+    _require(isinstance(events, list), "show_events must be a list")
+    for e in events:
+        _require(isinstance(e, dict), "show_events entries must be objects")
+        where = f"show event {e.get('id')!r}"
+        for key in ("id", "name", "message"):
+            _require(isinstance(e.get(key), str) and e[key], f"{where}: {key} must be a non-empty string")
+        _require(e.get("zone") in zones, f"{where}: zone {e.get('zone')!r} isn't one of the zones")
+        _require(e.get("time_block") in TIME_BLOCKS, f"{where}: time_block must be one of {TIME_BLOCKS}")
+    _require(len({e["id"] for e in events}) == len(events), "show_events has duplicate ids")
+
+    return GameConfig(
+        version=version,
+        path=path,
+        zones=zones,
+        zone_info=zone_info,
+        zone_code={z: i for i, z in enumerate(zones)},
+        zone_xp_factor=np.array([zone_info[z]["xp_factor"] for z in zones]),
+        npc_types=npc_types,
+        npc_info=npc_info,
+        moods=tuple(moods),
+        gyms=gyms,
+        gym={g["id"]: g for g in gyms},
+        elite_four=elite_four,
+        elite={e["id"]: e for e in elite_four},
+        champion=dict(champion),
+        special_tactics={attr: dict(t) for attr, t in tactics.items()},
+        xp_thresholds=tuple(thresholds),
+        dealer_restock_blocks=restock,
+        show_events=tuple(dict(e) for e in events),
+    )
+
+
+def _read(path: Path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError) as exc:
+        raise ConfigError(f"can't read {path}: {exc}") from exc
+
+
+def load_config(path: Path = CONFIG_PATH) -> GameConfig:
+    return compile_config(_read(path), str(path))
+
+
+# ---------- Live config ----------
+
+_lock = threading.Lock()
+_current: Optional[GameConfig] = None
+_current_raw: Optional[dict] = None
+_mtime: Optional[float] = None
+_checked = 0.0
+_error: Optional[str] = None
+_archive: Dict[int, GameConfig] = {}
+_pinned: ContextVar = ContextVar("collector_rpg_config", default=None)
+
+
+def archive_path(version: int) -> Path:
+    return ARCHIVE_DIR / f"game_config-v{version}.json"
+
+
+def _archive_raw(version: int, raw: dict) -> None:
+    """Keep a copy of every version that went live, for runs locked in under it."""
+    path = archive_path(version)
+    if path.exists():
+        return
+    try:
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(raw, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a read-only data dir: this process still has it in memory
+
+
+def reload_config(path: Optional[Path] = None) -> GameConfig:
+    """Load the file now and make it the live config; raises ``ConfigError`` if it's invalid.
+
+    A changed file must carry a higher ``version`` than the live config, or
+    runs locked in under that version would change rules mid-run.
+    """
+    global _current, _current_raw, _mtime, _error
+    path = Path(path or CONFIG_PATH)
+    with _lock:
+        try:
+            mtime = path.stat().st_mtime
+        except OSError as exc:  # mid-way through an editor's save-and-rename
+            raise ConfigError(f"can't read {path}: {exc}") from exc
+        raw = _read(path)
+        if _current is not None and raw == _current_raw:
+            _mtime = mtime  # touched, not changed
+            return _current
+        config = compile_config(raw, str(path))
+        if _current is not None and config.version <= _current.version:
+            raise ConfigError(f"version {config.version} isn't higher than the live version "
+                              f"{_current.version}; bump it with every balance change")
+        _archive_raw(config.version, raw)
+        _archive[config.version] = config
+        _current, _current_raw, _mtime, _error = config, raw, mtime, None  # readers see the old or the new, never a mix
+    return config
+
+
+def live_config() -> GameConfig:
+    """The live config, reloaded if the file changed since the last check."""
+    global _checked, _mtime, _error
+    config = _current
+    if config is None:
+        return reload_config()
+    now = time.monotonic()
+    if now - _checked < CHECK_INTERVAL_SECONDS:
+        return config
+    _checked = now
+    try:
+        mtime = Path(config.path).stat().st_mtime
+    except OSError:
+        return config
+    if mtime != _mtime:
+        try:
+            config = reload_config(Path(config.path))
+        except ConfigError as exc:
+            _mtime, _error = mtime, str(exc)  # don't retry the same broken file on every call
+    return _current
+
+
+def get_config() -> GameConfig:
+    """The config the rules play under: the one pinned for this run, else the live one."""
+    pinned = _pinned.get()
+    return pinned if pinned is not None else live_config()
+
+
+def config_for(version: int) -> GameConfig:
+    """A config by version: the live one, or an earlier one from the archive."""
+    live = live_config()
+    if version == live.version:
+        return live
+    config = _archive.get(version)
+    if config is None:
+        path = archive_path(version)
+        if not path.exists():
+            raise ConfigError(f"config version {version} isn't in the archive at {ARCHIVE_DIR}")
+        config = _archive.setdefault(version, load_config(path))
+    return config
+
+
+def pinned_config() -> Optional[GameConfig]:
+    return _pinned.get()
+
+
+def pin_config(config: Optional[GameConfig]) -> Token:
+    """Have ``get_config()`` return ``config`` in this context (``None``: the live config)."""
+    return _pinned.set(config)
+
+
+@contextmanager
+def use_config(config: Optional[GameConfig]):
+    token = pin_config(config)
+    try:
+        yield config
+    finally:
+        _pinned.reset(token)
+
+
+def last_error() -> Optional[str]:
+    """Why the last reload was rejected, if it was."""
+    return _error
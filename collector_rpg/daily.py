@@ -0,0 +1,115 @@
+"""Daily National: the same floor for every collector on a given day.
+
+A day's schedule is a fixed run of tables (zone, NPC, mood, cards and asks)
+drawn from a seed derived from the date. Each process builds it once, through
+the same ``generate_cards_for_zone`` rules as free roam, priced at the show's
+opening morning. Every session then reads the same schedule. Sessions get
+their own copies of the cards when they sit down, so the shared schedule is
+never touched.
+
+A Daily run also uses the day's seed as its run seed, so counters and boss
+tables line up for everyone who plays the same moves.
+"""
+
+import datetime as dt
+import random
+import threading
+import zlib
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from .models import Card, Encounter
+from .config import get_config
+from .rules import (
+    RunState,
+    bind_session,
+    compute_action_budget,
+    generate_cards_for_zone,
+    init_encounter_state,
+)
+
+DAILY_TABLES = 60
+DAILY_PRICING = {"day": 1, "time_block": "Morning"}
+
+
+@dataclass(frozen=True)
+class DailyTable:
+    zone: str
+    npc_type: str
+    mood: str
+    cards: Tuple[Card, ...]
+
+
+@dataclass(frozen=True)
+class DailySchedule:
+    date: str
+    seed: int
+    tables: Tuple[DailyTable, ...]
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+
+def daily_seed(date: str) -> int:
+    return zlib.crc32(f"daily-national:{date}".encode())
+
+
+def today() -> str:
+    return dt.date.today().isoformat()
+
+
+def build_schedule(date: str, n_tables: int = DAILY_TABLES) -> DailySchedule:
+    dt.date.fromisoformat(date)  # reject anything that isn't a calendar date
+    seed = daily_seed(date)
+    rng = random.Random(seed)
+    config = get_config()
+    tables = []
+    with bind_session(RunState(player=dict(DAILY_PRICING), rng=rng)):
+        for _ in range(n_tables):
+            zone = rng.choice(config.zones)
+            npc_type = rng.choice(config.npc_types)
+            mood = rng.choice(config.moods)
+            cards = tuple(generate_cards_for_zone(zone, npc_type))
+            tables.append(DailyTable(zone, npc_type, mood, cards))
+    return DailySchedule(date, seed, tuple(tables))
+
+
+_schedule_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _cached_schedule(date: str) -> DailySchedule:
+    return build_schedule(date)
+
+
+def get_schedule(date: str) -> DailySchedule:
+    """The process-wide schedule for ``date``, built on first use."""
+    with _schedule_lock:
+        return _cached_schedule(date)
+
+
+def daily_encounter(table: DailyTable, player: dict, number: int) -> Encounter:
+    """Sit down at a Daily table with this session's own copy of the cards."""
+    enc = Encounter(
+        npc_type=table.npc_type,
+        mood=table.mood,
+        zone=table.zone,
+        cards=[replace(c) for c in table.cards],
+        round=1,
+        active=True,
+        history=[
+            f"Daily table {number}: you approach a {table.npc_type} in {table.zone}. "
+            f"They seem {table.mood}."
+        ],
+    )
+    init_encounter_state(enc)
+    enc.max_actions = compute_action_budget(player)
+    enc.mode = "normal"
+    return enc
+
+
+def next_table(player: dict) -> Optional[DailyTable]:
+    schedule = get_schedule(player["daily"])
+    idx = player["daily_next"]
+    return schedule.tables[idx] if idx < len(schedule) else None
@@ -0,0 +1,265 @@
+"""Encounter engine: the negotiation moves, special tactics and table kinds as tables.
+
+Everything a move or tactic does is data:
+
+- ``MOVES`` gives each move's base effect on deal resistance, price and
+  patience, the attribute each effect scales with, and what it is for
+  particular NPC types. ``_move_rows`` compiles that once per NPC type into
+  a tuple indexed by move code (``MOVE_CODE``), so a move is one lookup and
+  a few multiplies.
+- ``TACTICS`` gives each special tactic, by the attribute that unlocked it,
+  an effect from ``EFFECTS`` with its regular and boss numbers.
+- ``KINDS`` describes each kind of table: whether it is a boss table, how it
+  is won and what winning it marks. ``table_kind`` reads the kind off
+  ``enc.mode`` (``"normal"``, ``"stage:<id>"``, ``"influencer:<id>"`` or
+  ``"whale"``).
+
+These are the rules only; ``actions`` checks legality and logs, and its
+``apply_actions`` runs a batch of actions through here in one call.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .comps import comp_strength
+from .config import get_config
+from .models import Card
+from .rules import finalize_deal, mark_big_deal, mark_influencer_won, mark_whale_won, session
+
+# What a move's effects can scale with, by position in _multipliers
+SCALES = ("none", "social", "knowledge", "hustle")
+
+
+@dataclass(frozen=True)
+class Move:
+    name: str
+    label: str
+    line: str                # what the NPC says; {npc} is the NPC type
+    hp: int = 0              # deal resistance
+    price: float = 0.0       # price factor
+    patience: int = 0
+    hp_scale: str = "none"
+    price_scale: str = "none"
+    patience_scale: str = "none"
+    # (NPC types, field overrides); the first match wins
+    npcs: Tuple[Tuple[Tuple[str, ...], Dict[str, object]], ...] = ()
+    others: Dict[str, object] = field(default_factory=dict)  # overrides for NPCs not in ``npcs``
+    comps: bool = False      # the comps on the table replace hp and price (see _comp_effect)
+
+
+MOVES = (
+    Move("friendly_chat", "Friendly chat", "{npc}: 'Love talking cards.' (Deal resistance drops.)",
+         hp=-10, hp_scale="social",
+         npcs=((("Kid Collector", "PC Supercollector"), {"hp": -18}),)),
+    Move("point_flaws", "Point out flaws", "{npc}: 'Fair point.' (Price softens.)",
+         hp=-15, price=-0.06, hp_scale="knowledge", price_scale="knowledge",
+         npcs=((("Dealer", "Flipper"), {"hp": -22, "price": -0.08}),)),
+    Move("lowball_probe", "Lowball probe", "{npc}: 'That's low.'",
+         hp=-8, price=0.05, patience=-1, hp_scale="social", patience_scale="hustle",
+         npcs=((("Dealer", "Flipper"), {}),), others={"hp": 15, "patience": -2}),
+    Move("show_comp", "Show comps", "{npc}: 'Those comps are solid.'",
+         hp=-12, price=-0.05, hp_scale="knowledge", price_scale="knowledge", comps=True),
+)
+MOVE_NAMES = tuple(m.name for m in MOVES)
+MOVE_CODE = {name: code for code, name in enumerate(MOVE_NAMES)}
+
+# Comps that undercut the ask hit harder; comps above it backfire
+COMP_HP = -20
+COMP_PRICE = -0.08
+
+
+@lru_cache(maxsize=None)
+def _move_rows(npc: str) -> tuple:
+    """Each move's (hp, price, patience, their scale codes, line, comps) for ``npc``, by move code."""
+    rows = []
+    for m in MOVES:
+        spec = next((over for types, over in m.npcs if npc in types), m.others)
+        hp, price, patience = (spec.get(k, getattr(m, k)) for k in ("hp", "price", "patience"))
+        scales = (SCALES.index(m.hp_scale), SCALES.index(m.price_scale), SCALES.index(m.patience_scale))
+        rows.append((hp, price, patience, *scales, m.line.format(npc=npc), m.comps))
+    return tuple(rows)
+
+
+def _multipliers(attrs: dict) -> tuple:
+    return (
+        1.0,
+        0.8 + attrs["People Skills"] / 100.0,
+        0.8 + attrs["Card Knowledge"] / 100.0,
+        0.8 + attrs["Hustle"] / 150.0,
+    )
+
+
+def _comp_effect(npc: str, cards: List[Card], day: int, hp: int, price: float, line: str):
+    strength = comp_strength(cards, day)
+    if strength is None:
+        return hp, price, line
+    if strength <= 0:
+        line = f"{npc}: 'Those comps back up my price.'"
+    elif strength < 0.5:
+        line = f"{npc}: 'Okay, the comps are a bit under my number.'"
+    return round(COMP_HP * strength), COMP_PRICE * strength, line
+
+
+def apply_move(move: str):
+    s = session()
+    enc = s.encounter
+    npc = enc.npc_type
+    hp, price, patience, hp_s, price_s, patience_s, line, comps = _move_rows(npc)[MOVE_CODE[move]]
+    if comps:
+        hp, price, line = _comp_effect(npc, enc.cards, s.player["day"], hp, price, line)
+    mul = _multipliers(s.player["attributes"])
+
+    enc.npc_hp = max(0, min(enc.npc_max_hp, enc.npc_hp + int(hp * mul[hp_s])))
+    enc.price_factor = max(0.7, enc.price_factor + price * mul[price_s])
+    enc.patience += int(patience * mul[patience_s])
+    enc.history.append(line)
+
+    if enc.patience <= 0 and enc.active:
+        enc.active = False
+        enc.history.append(f"{npc} has had enough and walks away from the table.")
+
+
+# ---------- Special tactics ----------
+
+def _resistance(enc, player: dict, amount, limit):
+    enc.npc_hp = max(limit, enc.npc_hp - amount)
+
+
+def _mood(enc, player: dict, amount, limit):
+    enc.mood = amount
+
+
+def _price(enc, player: dict, amount, limit):
+    enc.price_factor = max(limit, enc.price_factor - amount)
+
+
+def _reach(enc, player: dict, amount, limit):
+    player["max_cards_visible"] = min(limit, player.get("max_cards_visible", 2) + amount)
+
+
+EFFECTS: Dict[str, Callable] = {
+    "resistance": _resistance,  # deal resistance down by amount, to no less than limit
+    "mood": _mood,              # the NPC's mood becomes amount
+    "price": _price,            # price factor down by amount, to no less than limit
+    "reach": _reach,            # amount more cards visible, up to limit
+}
+
+
+@dataclass(frozen=True)
+class Tactic:
+    attr: str   # the attribute whose level-up unlocked it
+    effect: str
+    regular: Tuple[object, object, str]  # (amount, limit, line)
+    boss: Tuple[object, object, str]
+
+
+TACTICS = (
+    Tactic("Negotiation", "resistance",
+           (20, 0, "the dealer suddenly rethinks their anchor price."),
+           (25, 0, "the boss dealer rethinks their anchor.")),
+    Tactic("People Skills", "mood",
+           ("happy", None, "the table energy shifts in your favor."),
+           ("happy", None, "instantly change the room’s energy.")),
+    Tactic("Card Knowledge", "price",
+           (0.1, 0.75, "your detailed knowledge softens their pricing."),
+           (0.12, 0.7, "your deep knowledge shakes their confidence.")),
+    Tactic("Hustle", "reach",
+           (1, 6, "quickly scan more of the case for hidden value."),
+           (1, 6, "quickly surface another key card from the case.")),
+)
+
+# Attribute -> (regular, boss) as (effect function, amount, limit, line)
+TACTIC_PLAYS = {
+    t.attr: tuple((EFFECTS[t.effect], *play) for play in (t.regular, t.boss)) for t in TACTICS
+}
+
+
+def apply_tactic(tactic: dict, boss: bool) -> bool:
+    """Play an unlocked tactic; False if its attribute has no tactic effect."""
+    plays = TACTIC_PLAYS.get(tactic["from_attr"])
+    if plays is None:
+        return False
+    s = session()
+    enc = s.encounter
+    effect, amount, limit, line = plays[boss]
+    effect(enc, s.player, amount, limit)
+    enc.history.append(f"You use {tactic['name']} and {line}")
+    return True
+
+
+# ---------- Table kinds ----------
+
+@dataclass(frozen=True)
+class TableKind:
+    name: str
+    boss: bool = False
+    objective: str = ""
+    # Won by a deal with at least this margin ($) or margin share of value
+    win_margin: Optional[float] = None
+    win_pct: Optional[float] = None
+    win_line: str = ""
+    mark: Optional[Callable[[str], None]] = None  # called with the table's id on a win
+    entry: Optional[Callable[[object, str], dict]] = None  # (config, id) -> the boss's config entry
+    pancake_verb: str = "quietly consult"
+    walk_line: str = "You walk away from the table."
+
+    def wins(self, margin: float, value: float) -> bool:
+        pct = margin / value if value > 0 else 0.0
+        return ((self.win_margin is not None and margin >= self.win_margin)
+                or (self.win_pct is not None and pct >= self.win_pct))
+
+
+_BOSS = dict(boss=True, pancake_verb="consult", walk_line="You back away from the boss table.")
+
+KINDS = {
+    kind.name: kind for kind in (
+        TableKind("normal"),
+        TableKind(
+            "stage", **_BOSS, win_margin=0,
+            objective="Objective: Leave the table at least break‑even on value to earn the big‑deal badge.",
+            win_line="You’ve proven yourself at this major table. Big deal closed!",
+            mark=mark_big_deal, entry=lambda cfg, ident: cfg.gym[ident],
+        ),
+        TableKind(
+            "influencer", **_BOSS, win_pct=0.10,
+            objective="Objective: Close a deal with roughly 10% or better value edge to win the battle.",
+            win_line="Chat loves it – you out‑negotiated the influencer on stream.",
+            mark=mark_influencer_won, entry=lambda cfg, ident: cfg.elite[ident],
+        ),
+        TableKind(
+            "whale", **_BOSS, win_margin=200, win_pct=0.15,
+            objective="Objective: Land a huge margin (big dollar or high percent) to beat the National Whale.",
+            win_line="You land a legendary margin against the National Whale.",
+            mark=lambda ident: mark_whale_won(), entry=lambda cfg, ident: cfg.champion,
+        ),
+    )
+}
+
+
+@lru_cache(maxsize=1024)
+def _parse_mode(mode: str) -> Tuple[TableKind, str]:
+    kind, _, ident = mode.partition(":")
+    return KINDS.get(kind, KINDS["normal"]), ident
+
+
+def table_kind(enc) -> Tuple[TableKind, str]:
+    """The kind of table ``enc`` is, and the boss's id for stages and influencers."""
+    return _parse_mode(getattr(enc, "mode", None) or "normal")
+
+
+def boss_entry(enc) -> Optional[dict]:
+    """The config entry (name, boss, ...) of the boss at ``enc``, or None at a regular table."""
+    kind, ident = table_kind(enc)
+    return kind.entry(get_config(), ident) if kind.entry else None
+
+
+def close_deal(price_paid: float, cards: Optional[List[Card]] = None,
+               prices: Optional[List[float]] = None):
+    """``finalize_deal``, then mark the boss beaten if the deal wins the table."""
+    enc = session().encounter
+    value, margin = finalize_deal(price_paid, cards, prices)
+    kind, ident = table_kind(enc)
+    if kind.wins(margin, value):
+        kind.mark(ident)
+        enc.history.append(kind.win_line)
@@ -0,0 +1,310 @@
+"""The show floor: thousands of dealer tables in aisles, generated as you visit them.
+
+The layout is the same for every run, like the catalog. Each zone gets a
+block of aisles, with booths on both sides of each aisle. Booths are
+numbered the way shows number them: aisle 4300, booth 4317. Positions
+are stored in metres in NumPy arrays, and a uniform grid over them answers
+"what's near me" by looking only at the cells a query circle touches.
+
+A dealer (NPC type, mood, stock and markups) is drawn from the floor seed
+and the table id the first time anyone visits that table. A small per-process
+cache holds the visited ones, so the other tables cost nothing but their
+position. A run keeps only what it bought at each table
+(``player["floor_sold"]``). Asks follow the market at the moment you sit
+down.
+
+Buying at a table queues its restock ``dealer_restock_blocks`` later on the
+run's schedule (see ``schedule``). A restock clears what the run bought
+there and puts out the dealer's next stock, drawn from (seed, table,
+restock number). The config's show events fire every day at their time
+block and restock every table this run has bought at in their zone. Either
+way only the tables a run has touched are ever looked at.
+
+Walking costs stamina by distance (``WALK_METERS_PER_STAMINA``); a break
+restores it and moves the clock on.
+"""
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .bins import BIN_STOCK_MAX_VALUE
+from .catalog import ERAS, SET_NAMES, ZONE_FEATURED, Catalog, get_catalog
+from .config import get_config
+from .models import Encounter
+from .market import BLOCKS_PER_DAY, TIME_BLOCKS
+from .rules import as_of, compute_action_budget, init_encounter_state
+from .schedule import handles, now, push
+from .valuation import get_valuation
+
+FLOOR_TABLES = 10_000
+FLOOR_SEED = 2025
+BOOTHS_PER_SIDE = 50
+BOOTH_WIDTH = 3.0        # metres along the aisle
+AISLE_SPACING = 8.0      # metres between aisle centre lines
+AISLE_HALF_WIDTH = 1.5   # booth fronts sit this far either side of the centre line
+SECTION_GAP = 12.0       # walkway between zone sections
+ENTRANCE = (0.0, 0.0)
+FIRST_ROW_Y = 10.0
+GRID_CELL = 10.0
+NEARBY_RADIUS = 25.0
+NEARBY_SHOWN = 8
+WALK_METERS_PER_STAMINA = 10.0
+STAMINA_MAX = 100
+TABLE_CARDS = (2, 4)
+FEATURED_SHARE = 0.15    # chance a table also puts out one of its zone's featured cards
+DEALER_CACHE = 4_096
+SHOW_NEWS_KEPT = 20
+
+
+@dataclass(frozen=True)
+class Dealer:
+    table_id: int
+    booth: int
+    zone: str
+    npc_type: str
+    mood: str
+    card_ids: Tuple[int, ...]
+    markups: Tuple[float, ...]  # ask / market value, per card
+
+
+class GridIndex:
+    """Points bucketed into square cells, for radius queries.
+
+    Point ids are sorted by cell, row by row, so the cells of one grid row
+    that a query touches are one contiguous slice of ``order``.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, cell: float):
+        self.x, self.y, self.cell = x, y, cell
+        self.nx = int(x.max() // cell) + 1
+        self.ny = int(y.max() // cell) + 1
+        cells = (y // cell).astype(np.int64) * self.nx + (x // cell).astype(np.int64)
+        self.order = np.argsort(cells, kind="stable")
+        self.start = np.searchsorted(cells[self.order], np.arange(self.nx * self.ny + 1))
+
+    def within(self, x: float, y: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, distances) of the points within ``radius``, nearest first."""
+        cx0 = max(0, int((x - radius) // self.cell))
+        cx1 = min(self.nx - 1, int((x + radius) // self.cell))
+        cy0 = max(0, int((y - radius) // self.cell))
+        cy1 = min(self.ny - 1, int((y + radius) // self.cell))
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        slices = [self.order[self.start[cy * self.nx + cx0]:self.start[cy * self.nx + cx1 + 1]]
+                  for cy in range(cy0, cy1 + 1)]
+        ids = np.concatenate(slices)
+        dist = np.hypot(self.x[ids] - x, self.y[ids] - y)
+        keep = dist <= radius
+        ids, dist = ids[keep], dist[keep]
+        nearest = np.argsort(dist, kind="stable")
+        return ids[nearest], dist[nearest]
+
+
+class ShowFloor:
+    def __init__(self, zones: Tuple[str, ...], n_tables: int = FLOOR_TABLES, seed: int = FLOOR_SEED):
+        self.zones = zones
+        self.seed = seed
+        per_zone = np.full(len(zones), n_tables // len(zones))
+        per_zone[: n_tables % len(zones)] += 1
+
+        # Booths fill each zone's aisles in order: left side, right side, next row
+        per_aisle = 2 * BOOTHS_PER_SIDE
+        zone, aisle, slot = [], [], []
+        first_aisle = 0
+        section_x = np.zeros(len(zones))
+        for z, n in enumerate(per_zone):
+            i = np.arange(n)
+            zone.append(np.full(n, z, dtype=np.int8))
+            aisle.append(first_aisle + i // per_aisle)
+            slot.append(i % per_aisle)
+            section_x[z] = z * SECTION_GAP
+            first_aisle += -(-n // per_aisle)
+        self.zone_code = np.concatenate(zone)
+        aisle, slot = np.concatenate(aisle), np.concatenate(slot)
+
+        side = slot % 2  # 0: left of the aisle, 1: right
+        self.x = SECTION_GAP + section_x[self.zone_code] + aisle * AISLE_SPACING + (2 * side - 1) * AISLE_HALF_WIDTH
+        self.y = FIRST_ROW_Y + (slot // 2) * BOOTH_WIDTH
+        self.booth = (aisle + 1) * 100 + slot + 1
+        self.index = GridIndex(self.x, self.y, GRID_CELL)
+        self._stock: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def position(self, table_id: Optional[int]) -> Tuple[float, float]:
+        if table_id is None:
+            return ENTRANCE
+        return float(self.x[table_id]), float(self.y[table_id])
+
+    def distance(self, from_table: Optional[int], to_table: int) -> float:
+        x, y = self.position(from_table)
+        return math.hypot(self.x[to_table] - x, self.y[to_table] - y)
+
+    def nearby(self, table_id: Optional[int], radius: float = NEARBY_RADIUS,
+               limit: int = NEARBY_SHOWN) -> List[Tuple[int, float]]:
+        """(table id, metres) of the tables around ``table_id`` (or the entrance), nearest first."""
+        x, y = self.position(table_id)
+        ids, dist = self.index.within(x, y, radius)
+        if table_id is not None:
+            ids, dist = ids[ids != table_id], dist[ids != table_id]
+        return [(int(i), float(d)) for i, d in zip(ids[:limit], dist[:limit])]
+
+    def table_at(self, booth: int) -> Optional[int]:
+        """Table id of a booth number; booths rise with table id."""
+        i = int(np.searchsorted(self.booth, booth))
+        return i if i < len(self.booth) and self.booth[i] == booth else None
+
+    def zone_of(self, table_id: int) -> str:
+        return self.zones[self.zone_code[table_id]]
+
+    def stock(self, zone: int, catalog: Catalog) -> np.ndarray:
+        """Catalog ids a zone's dealers sell from."""
+        if zone not in self._stock:
+            era, value = catalog.era_idx, catalog.base_value
+            name = self.zones[zone]
+            if name == "Vintage Alley":
+                mask = era == ERAS.index("Vintage")
+            elif name == "Modern Showcases":
+                mask = (era == ERAS.index("Modern")) & (value >= 5.0)
+            elif name == "Dollar Boxes":
+                mask = (era != ERAS.index("Vintage")) & (value < BIN_STOCK_MAX_VALUE)
+            elif name == "Corporate Pavilion":
+                mask = catalog.set_idx == SET_NAMES.index("National Promo")
+            else:
+                mask = np.ones(len(catalog), dtype=bool)
+            self._stock[zone] = np.flatnonzero(mask)
+        return self._stock[zone]
+
+    def dealer(self, table_id: int, restock: int = 0) -> Dealer:
+        """The dealer at ``table_id`` with the stock they put out after ``restock`` restocks."""
+        return _dealer(self, table_id, restock, get_config().version)
+
+
+@lru_cache(maxsize=DEALER_CACHE)
+def _dealer(floor: ShowFloor, table_id: int, restock: int, config_version: int) -> Dealer:
+    config = get_config()
+    rng = np.random.default_rng((floor.seed, table_id))
+    zone = floor.zone_of(table_id)
+    npc_type = config.npc_types[rng.integers(len(config.npc_types))]
+    mood = config.moods[rng.integers(len(config.moods))]
+    if restock:
+        rng = np.random.default_rng((floor.seed, table_id, restock))  # same dealer, new stock
+
+    n = int(rng.integers(TABLE_CARDS[0], TABLE_CARDS[1] + 1))
+    card_ids = [int(c) for c in rng.choice(floor.stock(int(floor.zone_code[table_id]), get_catalog()), n, replace=False)]
+    featured = ZONE_FEATURED.get(zone, [])
+    if featured and rng.random() < FEATURED_SHARE:
+        pick = int(featured[rng.integers(len(featured))])
+        if pick not in card_ids:
+            card_ids[0] = pick
+    lo, hi = config.npc_info.get(npc_type, {"overask": (1.1, 1.4)})["overask"]
+    markups = rng.uniform(lo, hi, size=n)
+    return Dealer(table_id, int(floor.booth[table_id]), zone, npc_type, mood,
+                  tuple(card_ids), tuple(round(float(m), 4) for m in markups))
+
+
+@lru_cache(maxsize=2)
+def _floor_for(zones: Tuple[str, ...]) -> ShowFloor:
+    return ShowFloor(zones)
+
+
+def get_floor() -> ShowFloor:
+    """The process-wide floor for the live config's zones."""
+    return _floor_for(get_config().zones)
+
+
+def walk_cost(meters: float) -> int:
+    return max(1, math.ceil(meters / WALK_METERS_PER_STAMINA))
+
+
+def table_stock(dealer: Dealer, player: dict) -> List[int]:
+    """Positions in the dealer's stock that this run hasn't bought yet."""
+    sold = set(player.get("floor_sold", {}).get(str(dealer.table_id), ()))
+    return [i for i, cid in enumerate(dealer.card_ids) if cid not in sold]
+
+
+def table_encounter(dealer: Dealer, player: dict) -> Optional[Encounter]:
+    """Sit down at a floor table, priced at the market now; None if it's sold out."""
+    left = table_stock(dealer, player)
+    if not left:
+        return None
+    catalog = get_catalog()
+    ids = np.array([dealer.card_ids[i] for i in left])
+    current = get_valuation().quote(ids, as_of(player)).value * catalog.base_value[ids]
+    cards = [catalog.card(int(cid), float(value) * dealer.markups[i])
+             for i, cid, value in zip(left, ids, current)]
+    enc = Encounter(
+        npc_type=dealer.npc_type,
+        mood=dealer.mood,
+        zone=dealer.zone,
+        cards=cards,
+        round=1,
+        active=True,
+        history=[f"You stop at booth {dealer.booth}: a {dealer.npc_type} in {dealer.zone}. "
+                 f"They seem {dealer.mood}."],
+    )
+    init_encounter_state(enc)
+    enc.max_actions = compute_action_budget(player)
+    enc.mode = "normal"
+    enc.table_id = dealer.table_id
+    return enc
+
+
+def dealer_for(player: dict, table_id: int) -> Dealer:
+    """The dealer at ``table_id`` as this run finds them, after its restocks."""
+    return get_floor().dealer(table_id, player.get("floor_restocks", {}).get(str(table_id), 0))
+
+
+# Floor entries in the player map table id (str) -> immutable values, and are
+# replaced rather than edited, so undo's shallow copies stay independent.
+
+def mark_sold(player: dict, table_id: int, card_ids: List[int]):
+    """Record cards bought at a floor table and queue its restock."""
+    key = str(table_id)
+    sold = player.setdefault("floor_sold", {})
+    sold[key] = tuple(sold.get(key, ())) + tuple(int(c) for c in card_ids)
+    due = player.setdefault("floor_restock_due", {})
+    if key not in due:
+        due[key] = now(player) + get_config().dealer_restock_blocks
+        push(player, due[key], "restock", table_id)
+
+
+def _restock(player: dict, key: str):
+    player["floor_sold"].pop(key, None)
+    player["floor_restock_due"].pop(key, None)  # a queued restock for it is now stale
+    restocks = player.setdefault("floor_restocks", {})
+    restocks[key] = restocks.get(key, 0) + 1
+
+
+@handles("restock")
+def _restock_due(player: dict, tick: int, table_id: int):
+    key = str(table_id)
+    if player.get("floor_restock_due", {}).get(key) == tick:
+        _restock(player, key)
+
+
+@handles("show_event")
+def _show_event(player: dict, tick: int, event_id: str):
+    event = next((e for e in get_config().show_events if e["id"] == event_id), None)
+    if event is None:
+        return  # gone from the config; it stops recurring
+    floor = get_floor()
+    for key in [k for k in player.get("floor_sold", {}) if floor.zone_of(int(k)) == event["zone"]]:
+        _restock(player, key)
+    news = player.setdefault("show_news", [])
+    news.append(f"Day {player['day']} {player['time_block']}: {event['message']}")
+    del news[:-SHOW_NEWS_KEPT]
+    push(player, tick + BLOCKS_PER_DAY, "show_event", event_id)
+
+
+def start_show(player: dict):
+    """Queue the first time each of the config's show events comes round."""
+    clock = now(player)
+    for event in get_config().show_events:
+        tick = clock - clock % BLOCKS_PER_DAY + TIME_BLOCKS.index(event["time_block"])
+        push(player, tick if tick > clock else tick + BLOCKS_PER_DAY, "show_event", event["id"])
@@ -0,0 +1,282 @@
+"""Server-wide leaderboard shared by every session in a worker.
+
+Each category keeps a bounded top-K heap of each run's best score. Writers
+take one short lock and then publish a fresh sorted tuple. Readers only grab
+that tuple, so a page render never waits on a submission. Rows are persisted
+to SQLite write-behind: submissions are coalesced per run, and a background
+thread upserts them in batches on its own connection.
+
+Every row also keeps the run's seed, build and action log so ``verify`` can
+replay it. Any update clears ``verified``, putting the run back in the queue.
+Every ``REFRESH_INTERVAL_SECONDS`` the flusher rebuilds the boards from the
+file, so runs the verifier rejected drop off and runs it passed show as
+verified; entries not checked yet carry ``verified=None``.
+"""
+
+import atexit
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from . import DATA_DIR
+
+LEADERBOARD_PATH = DATA_DIR / "leaderboard.sqlite3"
+TOP_K = 25
+FLUSH_INTERVAL_SECONDS = 1.0
+REFRESH_INTERVAL_SECONDS = 30.0
+
+# category -> (row column, higher is better, label)
+CATEGORIES = {
+    "profit": ("profit", True, "Best trip profit"),
+    "xp": ("xp", True, "Most XP"),
+    "whale": ("whale_tick", False, "Fastest National Whale"),
+}
+
+SCORE_COLUMNS = ("name", "profit", "xp", "level", "badges", "elite", "champion", "whale_tick")
+REPLAY_COLUMNS = ("seed", "build", "log")
+COLUMNS = ("run_id",) + SCORE_COLUMNS + REPLAY_COLUMNS + ("updated_at",)
+
+SCHEMA = {
+    "run_id": "TEXT PRIMARY KEY",
+    "name": "TEXT",
+    "profit": "REAL",
+    "xp": "INTEGER",
+    "level": "INTEGER",
+    "badges": "INTEGER",
+    "elite": "INTEGER",
+    "champion": "INTEGER",
+    "whale_tick": "INTEGER",
+    "seed": "INTEGER",
+    "build": "TEXT",   # JSON
+    "log": "TEXT",     # JSON
+    "updated_at": "REAL",
+    "verified": "INTEGER",  # NULL pending, 1 replayed fine, 0 failed
+    "verify_note": "TEXT",
+}
+
+# Keep each run's best-ever scores on disk, matching what the heaps hold
+UPSERT_SQL = (
+    f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+    "ON CONFLICT(run_id) DO UPDATE SET "
+    "name = excluded.name, "
+    "profit = max(runs.profit, excluded.profit), "
+    "xp = max(runs.xp, excluded.xp), "
+    "level = max(runs.level, excluded.level), "
+    "badges = max(runs.badges, excluded.badges), "
+    "elite = max(runs.elite, excluded.elite), "
+    "champion = max(runs.champion, excluded.champion), "
+    "whale_tick = coalesce(min(runs.whale_tick, excluded.whale_tick), runs.whale_tick, excluded.whale_tick), "
+    "seed = excluded.seed, "
+    "build = excluded.build, "
+    "log = excluded.log, "
+    "updated_at = excluded.updated_at, "
+    "verified = NULL, "
+    "verify_note = NULL"
+)
+
+
+@dataclass(frozen=True)
+class Entry:
+    run_id: str
+    name: str
+    score: float
+    level: int
+    verified: Optional[bool] = None  # None until the verifier has replayed it
+
+
+class TopK:
+    """Best ``k`` scores, one per run, with an immutable sorted snapshot."""
+
+    def __init__(self, k: int, higher_is_better: bool = True):
+        self.k = k
+        self.sign = 1 if higher_is_better else -1
+        self._heap = []  # (key, seq, entry); the root is the weakest kept score
+        self._keys: Dict[str, float] = {}
+        self._seq = 0
+        self.snapshot: Tuple[Entry, ...] = ()
+
+    def offer(self, entry: Entry) -> bool:
+        key = self.sign * entry.score
+        old = self._keys.get(entry.run_id)
+        if old is not None:
+            if key <= old:
+                return False
+            self._heap = [item for item in self._heap if item[2].run_id != entry.run_id]
+            heapq.heapify(self._heap)
+        elif len(self._heap) >= self.k and key <= self._heap[0][0]:
+            return False
+
+        self._seq += 1
+        # Ties go to whoever got there first
+        item = (key, -self._seq, entry)
+        if len(self._heap) >= self.k:
+            _, _, dropped = heapq.heapreplace(self._heap, item)
+            del self._keys[dropped.run_id]
+        else:
+            heapq.heappush(self._heap, item)
+        self._keys[entry.run_id] = key
+        self.snapshot = tuple(item[2] for item in sorted(self._heap, reverse=True))
+        return True
+
+
+def score_key(player: dict) -> tuple:
+    """The run and its leaderboard scores, without copying the log; equal keys mean nothing to submit."""
+    return (player["run_id"], player["name"], round(float(player["profit"]), 2), int(player["xp"]),
+            int(player["level"]), len(player["badges"]), len(player["elite_defeated"]),
+            bool(player["champion_defeated"]), player.get("whale_tick"))
+
+
+def player_row(player: dict) -> dict:
+    return {
+        "run_id": player["run_id"],
+        "name": player["name"] or "Collector",
+        "profit": round(float(player["profit"]), 2),
+        "xp": int(player["xp"]),
+        "level": int(player["level"]),
+        "badges": len(player["badges"]),
+        "elite": len(player["elite_defeated"]),
+        "champion": int(bool(player["champion_defeated"])),
+        "whale_tick": player.get("whale_tick"),
+        "seed": player.get("seed"),
+        "build": player.get("build"),
+        "log": list(player.get("log", ())),
+        "updated_at": time.time(),
+    }
+
+
+def db_values(row: dict) -> tuple:
+    return tuple(json.dumps(row[c]) if c in ("build", "log") else row[c] for c in COLUMNS)
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the runs table, adding any columns an older file is missing."""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS runs ({', '.join(f'{c} {t}' for c, t in SCHEMA.items())})")
+    have = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+    for column, decl in SCHEMA.items():
+        if column not in have:
+            conn.execute(f"ALTER TABLE runs ADD COLUMN {column} {decl}")
+
+
+class Leaderboard:
+    def __init__(self, db_path: Path, k: int = TOP_K, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 refresh_interval: float = REFRESH_INTERVAL_SECONDS):
+        self.db_path = Path(db_path)
+        self.k = k
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # a refresh must not read the file mid-flush
+        self._pending: Dict[str, dict] = {}
+        self._last: Dict[str, tuple] = {}
+        self._stop = threading.Event()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            ensure_schema(conn)
+            self._boards = self._load(conn)
+
+        self._flusher = threading.Thread(target=self._run_flusher, name="leaderboard-flush", daemon=True)
+        self._flusher.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _load(self, conn: sqlite3.Connection) -> Dict[str, TopK]:
+        """Fresh boards from the file, leaving out runs that failed verification."""
+        boards = {cat: TopK(self.k, higher) for cat, (_, higher, _) in CATEGORIES.items()}
+        for cat, (column, higher, _) in CATEGORIES.items():
+            order = "DESC" if higher else "ASC"
+            rows = conn.execute(
+                f"SELECT run_id, name, {column}, level, verified FROM runs "
+                f"WHERE {column} IS NOT NULL AND verified IS NOT 0 ORDER BY {column} {order} LIMIT ?",
+                (self.k,),
+            )
+            for run_id, name, score, level, verified in rows:
+                boards[cat].offer(Entry(run_id, name, score, level, None if verified is None else True))
+        return boards
+
+    @staticmethod
+    def _offer(boards: Dict[str, TopK], row: dict):
+        for cat, (column, _, _) in CATEGORIES.items():
+            if row[column] is not None:
+                boards[cat].offer(Entry(row["run_id"], row["name"], row[column], row["level"]))
+
+    def submit(self, player: dict):
+        row = player_row(player)
+        run_id = row["run_id"]
+        fingerprint = tuple(row[c] for c in SCORE_COLUMNS) + (len(row["log"]),)
+        with self._lock:
+            if self._last.get(run_id) == fingerprint:
+                return
+            self._last[run_id] = fingerprint
+            self._offer(self._boards, row)
+            self._pending[run_id] = row
+
+    def top(self, category: str) -> Tuple[Entry, ...]:
+        """Current top-K for a category, best first. Lock-free."""
+        return self._boards[category].snapshot
+
+    def flush(self, conn: Optional[sqlite3.Connection] = None):
+        own = conn is None
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            conn = conn or self._connect()
+            try:
+                with conn:
+                    conn.executemany(UPSERT_SQL, [db_values(row) for row in batch.values()])
+            finally:
+                if own:
+                    conn.close()
+
+    def refresh(self, conn: Optional[sqlite3.Connection] = None):
+        """Rebuild the boards from the file, picking up the verifier's verdicts."""
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            with self._flush_lock:
+                boards = self._load(conn)
+                with self._lock:
+                    # Submissions not flushed yet aren't in the file
+                    for row in self._pending.values():
+                        self._offer(boards, row)
+                    self._boards = boards
+        finally:
+            if own:
+                conn.close()
+
+    def _run_flusher(self):
+        conn = self._connect()
+        refreshed = time.monotonic()
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush(conn)
+                if time.monotonic() - refreshed >= self.refresh_interval:
+                    self.refresh(conn)
+                    refreshed = time.monotonic()
+            self.flush(conn)
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join()
+
+
+@lru_cache(maxsize=1)
+def get_leaderboard() -> Leaderboard:
+    """The worker's leaderboard; flushed on interpreter exit."""
+    board = Leaderboard(LEADERBOARD_PATH)
+    atexit.register(board.close)
+    return board
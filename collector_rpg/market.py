@@ -0,0 +1,109 @@
+"""Show-wide card market: per-set and per-era price indices over show time.
+
+The market steps once per time block (three ticks a day). Each tick moves a
+handful of log indices: a mean-reverting random walk per set and per era,
+National Promo hype that spikes with the Corporate Pavilion's drop and then
+decays, and a modern-era demand spike while Trade Night runs. The drop and
+Trade Night happen in the time blocks of the config's ``pavilion_drop`` and
+``trade_night_open`` show events, the same entries that restock the floor;
+without the event there's no spike. A card's price ratio is ``exp(index)``
+of its set, so repricing the whole catalog is one gather.
+
+Ticks are computed lazily, in order, once per process for each pair of
+event blocks, and every session reads the same history whatever day its own
+run is on.
+"""
+
+import threading
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from .catalog import ERAS, SET_ERA, SET_NAMES, get_catalog
+
+MARKET_SEED = 77
+TIME_BLOCKS = ["Morning", "Afternoon", "Evening"]
+BLOCKS_PER_DAY = len(TIME_BLOCKS)
+
+SET_VOL = 0.02
+ERA_VOL = np.array([0.005, 0.01, 0.02])  # Vintage, Junk Wax, Modern
+REVERSION = 0.97
+
+PROMO_SET = SET_NAMES.index("National Promo")
+PAVILION_DROP = 0.25   # log hype added when the Pavilion drops promos
+HYPE_DECAY = 0.5
+TRADE_NIGHT_SPIKE = 0.06  # log demand bump for Modern cards while Trade Night runs
+MODERN = ERAS.index("Modern")
+
+# Show events (by config id) that move prices
+PAVILION_EVENT = "pavilion_drop"
+TRADE_NIGHT_EVENT = "trade_night_open"
+
+
+def tick_for(day: int, time_block: str) -> int:
+    return (day - 1) * BLOCKS_PER_DAY + TIME_BLOCKS.index(time_block)
+
+
+class Market:
+    def __init__(self, seed: int = MARKET_SEED, pavilion_block: Optional[int] = None,
+                 trade_night_block: Optional[int] = None):
+        self.pavilion_block = pavilion_block        # time block index of the Pavilion drop, if any
+        self.trade_night_block = trade_night_block  # and of Trade Night
+        self._rng = np.random.default_rng(seed)
+        self._set_walk = np.zeros(len(SET_NAMES))
+        self._era_walk = np.zeros(len(ERAS))
+        self._hype = np.zeros(len(SET_NAMES))
+        self._history = [np.zeros(len(SET_NAMES))]  # per tick: log index per set
+        self._lock = threading.Lock()
+
+    def _step(self, tick: int):
+        block = tick % BLOCKS_PER_DAY
+        rng = self._rng
+
+        self._set_walk = REVERSION * self._set_walk + rng.normal(0.0, SET_VOL, len(SET_NAMES))
+        self._era_walk = REVERSION * self._era_walk + rng.normal(0.0, ERA_VOL)
+
+        self._hype *= HYPE_DECAY
+        if block == self.pavilion_block:
+            self._hype[PROMO_SET] += PAVILION_DROP
+
+        level = self._set_walk + self._era_walk[SET_ERA] + self._hype
+        if block == self.trade_night_block:
+            level = level + TRADE_NIGHT_SPIKE * (SET_ERA == MODERN)
+        self._history.append(level)
+
+    def set_index(self, tick: int) -> np.ndarray:
+        """Log index per set at ``tick``, advancing the market if needed."""
+        tick = max(0, tick)
+        if tick >= len(self._history):
+            with self._lock:
+                while len(self._history) <= tick:
+                    self._step(len(self._history))
+        return self._history[tick]
+
+    def card_ratio(self, tick: int, set_idx: np.ndarray = None) -> np.ndarray:
+        """Price ratio vs catalog value for every card (or for ``set_idx``)."""
+        set_idx = get_catalog().set_idx if set_idx is None else set_idx
+        return np.exp(self.set_index(tick)).astype(np.float32)[set_idx]
+
+    def movers(self, tick: int) -> list:
+        """Per-set change since the show opened, for display."""
+        level = self.set_index(tick)
+        return [
+            {"Set": name, "Era": ERAS[SET_ERA[i]], "Change": f"{(np.exp(level[i]) - 1) * 100:+.1f}%"}
+            for i, name in enumerate(SET_NAMES)
+        ]
+
+
+@lru_cache(maxsize=4)
+def _market(pavilion_block: Optional[int], trade_night_block: Optional[int]) -> Market:
+    return Market(pavilion_block=pavilion_block, trade_night_block=trade_night_block)
+
+
+def get_market() -> Market:
+    """The market every session in this process trades against, for the live config's show events."""
+    from .config import get_config  # config imports TIME_BLOCKS from here
+
+    blocks = {e["id"]: TIME_BLOCKS.index(e["time_block"]) for e in get_config().show_events}
+    return _market(blocks.get(PAVILION_EVENT), blocks.get(TRADE_NIGHT_EVENT))
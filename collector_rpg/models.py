@@ -0,0 +1,26 @@
+"""Data models shared by the rules, the catalog and the tools built on them."""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class Card:
+    name: str
+    player: str
+    year: int
+    set_name: str
+    true_value: float
+    ask_price: float
+    card_id: Optional[int] = None  # catalog id, when the card came from the catalog
+
+
+@dataclass
+class Encounter:
+    npc_type: str
+    mood: str
+    zone: str
+    cards: List[Card]
+    round: int
+    active: bool
+    history: List[str]
@@ -0,0 +1,147 @@
+"""Budget-constrained lot optimizer for cherry-picking multi-card tables.
+
+Each card gets its own offer, and the NPC judges each one on its own. The
+player never sees true values, only a read whose noise shrinks with Card
+Knowledge, so an offer of ``m`` times the expected floor is accepted with
+probability ``Phi(ln(m) / sigma)``. A level's expected margin is
+E[(true - offer) if accepted]: the joint expectation over the read's noise,
+with a declined offer earning 0, not the margin given that it lands. The
+offers that land are the ones where the read ran high, so the value counted
+is only from those outcomes. Choosing one offer level (or no offer) per card
+to maximise expected margin within the cash on hand is a multiple-choice
+knapsack. It is solved exactly with a vectorised DP over budget buckets, and
+greedily by margin per dollar when the table is too big for the DP.
+"""
+
+import math
+import random
+import zlib
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+import numpy as np
+
+from .rules import Card, Encounter, card_values, offer_threshold_pct
+
+# Offer levels as multiples of the expected acceptance floor
+OFFER_LEVELS = np.array([0.85, 0.95, 1.0, 1.05, 1.15, 1.3])
+BUDGET_BUCKETS = 2_000
+DP_MAX_CELLS = 6_000_000  # cards x levels x buckets before falling back to greedy
+
+
+@dataclass
+class LotPlan:
+    picks: List[Tuple[int, float]] = field(default_factory=list)  # (card index, offer)
+    expected_margin: float = 0.0
+    method: str = "dp"
+
+    @property
+    def total_offer(self) -> float:
+        return sum(offer for _, offer in self.picks)
+
+
+def read_sigma(player: dict) -> float:
+    return 0.45 - 0.35 * player["attributes"]["Card Knowledge"] / 100.0
+
+
+def card_read(card: Card, value: float, sigma: float) -> float:
+    """The player's read on a card worth ``value``, stable across reruns and processes."""
+    key = f"{card.name}|{card.year}|{card.set_name}|{card.ask_price}".encode()
+    z = random.Random(zlib.crc32(key)).gauss(0.0, 1.0)
+    return round(value * math.exp(sigma * z), 2)
+
+
+def _phi(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.vectorize(math.erf)(z / math.sqrt(2.0)))
+
+
+def _expected_gain(reads: np.ndarray, floor_pct: float, sigma: float) -> np.ndarray:
+    """E[(true - offer) if accepted] per card and offer level.
+
+    With true = read * X and ln X ~ N(0, sigma), an offer at level m lands
+    when X <= m, and E[X; X <= m] = exp(sigma^2 / 2) * Phi((ln m - sigma^2) / sigma).
+    """
+    s = max(sigma, 1e-6)
+    log_m = np.log(OFFER_LEVELS)
+    value_share = math.exp(s * s / 2.0) * _phi((log_m - s * s) / s)
+    cost_share = OFFER_LEVELS * floor_pct * _phi(log_m / s)
+    return reads[:, None] * (value_share - cost_share)[None, :]
+
+
+def _solve_dp(prices: np.ndarray, gain: np.ndarray, cash: float) -> np.ndarray:
+    n, n_levels = prices.shape
+    unit = max(cash / BUDGET_BUCKETS, 0.01)
+    cap = int(cash / unit)
+    weights = np.ceil(prices / unit).astype(np.int64)
+
+    best = np.zeros(cap + 1)
+    choice = np.full((n, cap + 1), -1, dtype=np.int8)
+    for i in range(n):
+        cand = best.copy()
+        for lvl in range(n_levels):
+            w, g = weights[i, lvl], gain[i, lvl]
+            if g <= 0 or w > cap:
+                continue
+            shifted = np.full(cap + 1, -np.inf)
+            shifted[w:] = best[:cap + 1 - w] + g
+            better = shifted > cand
+            cand[better] = shifted[better]
+            choice[i, better] = lvl
+        best = cand
+
+    picked = np.full(n, -1, dtype=np.int64)
+    c = int(np.argmax(best))
+    for i in range(n - 1, -1, -1):
+        lvl = choice[i, c]
+        if lvl >= 0:
+            picked[i] = lvl
+            c -= weights[i, lvl]
+    return picked
+
+
+def _solve_greedy(prices: np.ndarray, gain: np.ndarray, cash: float) -> np.ndarray:
+    n = len(prices)
+    lvl = np.argmax(gain, axis=1)
+    g = gain[np.arange(n), lvl]
+    w = prices[np.arange(n), lvl]
+    order = np.argsort(-(g / np.maximum(w, 0.01)))
+
+    picked = np.full(n, -1, dtype=np.int64)
+    spent = 0.0
+    for i in order:
+        if g[i] <= 0:
+            break
+        if spent + w[i] <= cash:
+            picked[i] = lvl[i]
+            spent += w[i]
+    return picked
+
+
+def optimize_lot(enc: Encounter, player: dict, cash: float,
+                 indices: List[int] = None) -> LotPlan:
+    """Pick which cards to offer on, and at what price, within ``cash``."""
+    indices = list(range(len(enc.cards))) if indices is None else list(indices)
+    if not indices or cash <= 0:
+        return LotPlan()
+
+    sigma = read_sigma(player)
+    floor_pct = offer_threshold_pct(enc, player)
+    cards = [enc.cards[i] for i in indices]
+    values = card_values(cards).value
+    reads = np.array([card_read(c, v, sigma) for c, v in zip(cards, values)])
+
+    prices = np.round(reads[:, None] * floor_pct * OFFER_LEVELS[None, :], 2)
+    gain = _expected_gain(reads, floor_pct, sigma)
+
+    n_cells = len(indices) * len(OFFER_LEVELS) * BUDGET_BUCKETS
+    if n_cells <= DP_MAX_CELLS:
+        picked, method = _solve_dp(prices, gain, cash), "dp"
+    else:
+        picked, method = _solve_greedy(prices, gain, cash), "greedy"
+
+    plan = LotPlan(method=method)
+    for row, lvl in enumerate(picked):
+        if lvl >= 0:
+            plan.picks.append((indices[row], float(prices[row, lvl])))
+            plan.expected_margin += float(gain[row, lvl])
+    return plan
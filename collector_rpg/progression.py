@@ -0,0 +1,267 @@
+"""Progression analyzer: how many deals it takes to level up and unlock the bosses.
+
+Simulates XP for a whole population of builds at once, one deal per step,
+with the same formula as ``xp_for_deal`` and the same level-up rule as
+``add_xp``. Each level gained grows Hustle by 3, so a deal that clears two
+thresholds grows it by 6, and that feeds the next deal's XP. Every player is a row in a few
+NumPy arrays. Only players still below the level cap are stepped, so the
+population thins out as it levels.
+
+A deal's margin is drawn from a normal distribution (``DealModel``). The
+defaults are roughly what the tournament bots clear per deal on the floor.
+The zone is either drawn at random or the build's best lane. Builds are
+drawn with random attribute and subject splits (see ``sample_builds``).
+
+The report gives, for each level, the share of players who reach it and
+the deals it takes them. It also gives unlock curves for the level gates of
+the big stages, influencers and the Whale. A gate above the level cap can't
+be unlocked at all, and the report says so.
+
+    python -m collector_rpg.progression --players 1000000 --deals 300
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import get_config
+from .rules import ATTR_BUDGET, STAT_MAX, SUBJECT_BUDGET, base_player_state, subject_score_for_zone
+
+SUBJECTS = tuple(base_player_state()["subjects"])
+ATTRIBUTES = tuple(base_player_state()["attributes"])
+CURVE_POINTS = (10, 25, 50, 100, 200)
+
+
+@dataclass
+class DealModel:
+    margin_mean: float = 100.0
+    margin_sd: float = 150.0
+    zones: Optional[Tuple[str, ...]] = None  # default: every zone
+    pick: str = "random"                     # or "lane": always the build's best zone
+    trade_share: float = 0.0                 # share of deals that are Trade Night trades
+
+
+@dataclass
+class Builds:
+    hustle: np.ndarray    # (players,)
+    subjects: np.ndarray  # (players, len(SUBJECTS))
+
+
+def sample_builds(n: int, rng: np.random.Generator, concentration: float = 2.0) -> Builds:
+    """Random builds: budgets split by a Dirichlet draw, rounded and capped at ``STAT_MAX``.
+
+    Lower ``concentration`` gives more lopsided builds. Rounding and the cap
+    can leave a build a few points off its budget, which is fine for
+    estimating curves.
+    """
+    attrs = rng.dirichlet(np.full(len(ATTRIBUTES), concentration), size=n) * ATTR_BUDGET
+    subjects = rng.dirichlet(np.full(len(SUBJECTS), concentration), size=n) * SUBJECT_BUDGET
+    hustle = np.minimum(np.round(attrs[:, ATTRIBUTES.index("Hustle")]), STAT_MAX)
+    return Builds(hustle=hustle, subjects=np.minimum(np.round(subjects), STAT_MAX))
+
+
+def builds_from(players: Sequence[dict]) -> Builds:
+    """The builds of actual player states (or build snapshots)."""
+    return Builds(
+        hustle=np.array([float(p["attributes"]["Hustle"]) for p in players]),
+        subjects=np.array([[float(p["subjects"][s]) for s in SUBJECTS] for p in players]),
+    )
+
+
+def lane_weights(zones: Sequence[str]) -> np.ndarray:
+    """(zone, subject) weights with ``subjects @ weights.T`` equal to ``subject_score_for_zone``.
+
+    The score is linear in the subjects, so each column is read off by
+    scoring one subject point at a time.
+    """
+    unit = dict.fromkeys(SUBJECTS, 0)
+    weights = np.zeros((len(zones), len(SUBJECTS)))
+    for j, s in enumerate(SUBJECTS):
+        unit[s] = 1
+        weights[:, j] = [subject_score_for_zone(z, unit) for z in zones]
+        unit[s] = 0
+    return weights
+
+
+@dataclass
+class ProgressionReport:
+    players: int
+    deals: int
+    thresholds: Tuple[int, ...]
+    reached: np.ndarray  # (players, levels): deals it took to reach each level, -1 if it wasn't
+    seconds: float
+
+    @property
+    def max_level(self) -> int:
+        return len(self.thresholds)
+
+    def unlock_curve(self, level: int) -> np.ndarray:
+        """Share of players at ``level`` or above after 0..``deals`` deals."""
+        if level > self.max_level:
+            return np.zeros(self.deals + 1)
+        col = self.reached[:, level - 1]
+        counts = np.bincount(col[col >= 0], minlength=self.deals + 1)
+        return np.cumsum(counts) / self.players
+
+    def time_to_level(self, quantiles=(10, 50, 90)) -> List[dict]:
+        rows = []
+        for level in range(1, self.max_level + 1):
+            col = self.reached[:, level - 1]
+            hit = col[col >= 0]
+            row = {"Level": level, "XP": self.thresholds[level - 1], "Reached": len(hit) / self.players}
+            qs = np.percentile(hit, quantiles) if len(hit) else [np.nan] * len(quantiles)
+            row.update({f"p{q}": float(v) for q, v in zip(quantiles, qs)})
+            rows.append(row)
+        return rows
+
+    def gates(self) -> List[dict]:
+        """Level gates of the big stages, influencers and Whale, in unlock order."""
+        cfg = get_config()
+        bosses = ([("Big stage", g) for g in cfg.gyms] + [("Influencer", e) for e in cfg.elite_four]
+                  + [("Whale", cfg.champion)])
+        rows = []
+        for kind, boss in bosses:
+            level = boss["required_level"]
+            curve = self.unlock_curve(level)
+            col = self.reached[:, level - 1] if level <= self.max_level else np.empty(0)
+            hit = col[col >= 0]
+            rows.append({
+                "Gate": boss["name"],
+                "Kind": kind,
+                "Level": level,
+                "Reachable": level <= self.max_level,
+                "Reached": float(curve[-1]),
+                "Median deals": float(np.median(hit)) if len(hit) else None,
+                **{f"By {d}": float(curve[min(d, self.deals)]) for d in CURVE_POINTS},
+            })
+        return rows
+
+    def gate_curves(self) -> Dict[str, np.ndarray]:
+        return {row["Gate"]: self.unlock_curve(row["Level"]) for row in self.gates()}
+
+
+def simulate(players: int = 100_000, deals: int = 300, model: Optional[DealModel] = None,
+             builds: Optional[Builds] = None, seed: int = 0) -> ProgressionReport:
+    """Play ``deals`` deals for each of ``players`` builds and record when each level is reached."""
+    model = model or DealModel()
+    cfg = get_config()
+    rng = np.random.default_rng(seed)
+    builds = builds or sample_builds(players, rng)
+    players = len(builds.hustle)
+    thresholds = np.asarray(cfg.xp_thresholds)
+    max_level = cfg.max_level
+
+    zone_factor = cfg.zone_xp_factor
+    lane_bonus = 1.0 + 0.5 * (builds.subjects @ lane_weights(cfg.zones).T)  # (players, zone code)
+    allowed = np.array([cfg.zone_code[z] for z in (model.zones or cfg.zones)])
+    best_lane = allowed[np.argmax(zone_factor[allowed] * lane_bonus[:, allowed], axis=1)]
+    trade_zone = cfg.zone_code.get("Trade Night")
+    if model.trade_share > 0 and trade_zone is None:
+        raise ValueError("trade_share needs a Trade Night zone in the config")
+
+    start = time.perf_counter()
+    # State for the players still below the cap, compacted as they reach it
+    ids = np.arange(players)
+    xp = np.zeros(players, dtype=np.int64)
+    level = np.ones(players, dtype=np.int64)
+    hustle = builds.hustle.astype(float)
+    hustle_bonus = 1.0 + hustle / 500.0
+    next_at = np.append(thresholds, np.iinfo(np.int64).max)  # XP for the level after each; the cap never levels
+    next_xp = next_at[level]
+    lane_flat = lane_bonus.ravel()
+    row = ids * lane_bonus.shape[1]  # offset of each player's row in lane_flat
+    reached = np.full((players, max_level), -1, dtype=np.int32)
+    reached[:, 0] = 0
+    capped = 0
+
+    for deal in range(1, deals + 1):
+        k = len(ids)
+        if not k:
+            break
+        if model.pick == "lane":
+            zone = best_lane[ids]
+        else:
+            zone = allowed[rng.integers(len(allowed), size=k)]
+        if model.trade_share > 0:
+            trade = rng.random(k) < model.trade_share
+            zone = np.where(trade, trade_zone, zone)
+
+        # xp_for_deal, term for term and in the same order
+        gain = rng.standard_normal(k)
+        gain *= model.margin_sd
+        gain += model.margin_mean
+        gain /= 20.0
+        np.clip(gain, 0.0, 40.0, out=gain)  # margin_xp
+        gain += 5
+        gain *= zone_factor[zone]
+        if model.trade_share > 0:
+            gain *= np.where(trade, 1.3, 1.0)
+        gain *= hustle_bonus
+        gain *= lane_flat.take(row + zone)
+        xp += gain.astype(np.int64)
+
+        # add_xp: every threshold the deal clears is a level gained
+        up = np.flatnonzero(xp >= next_xp)
+        if len(up):
+            old, new = level[up], np.searchsorted(thresholds, xp[up], side="right")
+            for lvl in range(2, max_level + 1):
+                crossed = (old < lvl) & (new >= lvl)
+                reached[ids[up[crossed]], lvl - 1] = deal
+            level[up] = new
+            hustle[up] = np.minimum(STAT_MAX, hustle[up] + 3 * (new - old))
+            hustle_bonus[up] = 1.0 + hustle[up] / 500.0
+            next_xp[up] = next_at[new]
+            capped += int(np.count_nonzero(new == max_level))
+            if capped * 8 > k:
+                keep = level < max_level
+                ids, row, xp, level, hustle, hustle_bonus, next_xp = (
+                    a[keep] for a in (ids, row, xp, level, hustle, hustle_bonus, next_xp))
+                capped = 0
+
+    return ProgressionReport(players=players, deals=deals, thresholds=tuple(cfg.xp_thresholds),
+                             reached=reached, seconds=time.perf_counter() - start)
+
+
+def _pct(x: float) -> str:
+    return f"{x:6.1%}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate XP progression for a population of builds.")
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--deals", type=int, default=300, help="deals per player")
+    parser.add_argument("--margin-mean", type=float, default=DealModel.margin_mean, help="mean margin per deal ($)")
+    parser.add_argument("--margin-sd", type=float, default=DealModel.margin_sd)
+    parser.add_argument("--zones", nargs="+", default=None, help="zones to deal in (default: all)")
+    parser.add_argument("--pick", choices=("random", "lane"), default="random",
+                        help="zone for each deal: at random, or always the build's best lane")
+    parser.add_argument("--trade-share", type=float, default=0.0, help="share of deals that are Trade Night trades")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    model = DealModel(margin_mean=args.margin_mean, margin_sd=args.margin_sd,
+                      zones=tuple(args.zones) if args.zones else None, pick=args.pick,
+                      trade_share=args.trade_share)
+    report = simulate(args.players, args.deals, model, seed=args.seed)
+    print(f"{report.players:,} players, up to {report.deals} deals each, in {report.seconds:.1f}s")
+    print()
+    print(f"{'level':>5} {'xp':>6} {'reached':>8} {'p10':>6} {'p50':>6} {'p90':>6}   (deals)")
+    for row in report.time_to_level():
+        print(f"{row['Level']:5} {row['XP']:6,} {_pct(row['Reached']):>8} "
+              f"{row['p10']:6.0f} {row['p50']:6.0f} {row['p90']:6.0f}")
+    print()
+    print(f"{'gate':<24} {'lvl':>3} {'median':>7} " + " ".join(f"{'by ' + str(d):>7}" for d in CURVE_POINTS))
+    for row in report.gates():
+        if not row["Reachable"]:
+            print(f"{row['Gate']:<24} {row['Level']:3}  unreachable: the level cap is {report.max_level}")
+            continue
+        median = f"{row['Median deals']:7.0f}" if row["Median deals"] is not None else f"{'-':>7}"
+        print(f"{row['Gate']:<24} {row['Level']:3} {median} "
+              + " ".join(f"{_pct(row['By ' + str(d)]):>7}" for d in CURVE_POINTS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""HTML fragments the pages draw on every rerun, rendered once and kept.
+
+The templates are dedented and joined into single strings when this module
+is imported, so each process does that once. The style block and banner
+never change, so they are finished strings. The zone cards and encounter
+header depend on a few inputs (zones and their icons, day and time block,
+zone, NPC type and mood). They are cached by those inputs with
+``lru_cache``, and a rerun whose inputs haven't changed gets back the string
+it had before.
+
+``stats`` gives each cached fragment's hits, misses and hit rate for the
+Analytics page.
+"""
+
+from functools import lru_cache
+from textwrap import dedent
+from typing import Dict, Tuple
+
+
+def _compile(template: str) -> str:
+    return dedent(template).strip()
+
+
+GLOBAL_CSS = _compile("""
+    <style>
+    .stApp {
+        background-image: radial-gradient(circle at top left, #ffffff 0, #f7f7ff 50%, #f0f0ff 100%);
+    }
+    .stTable tbody tr:nth-child(even) {
+        background-color: #fafaff;
+    }
+    .stTable th {
+        background-color: #f0f0ff !important;
+    }
+    button[kind="primary"] {
+        border-radius: 999px !important;
+        font-weight: 600 !important;
+    }
+    </style>
+""")
+
+BANNER = _compile("""
+    <div style="
+        padding:0.45rem 0.9rem;
+        background:linear-gradient(90deg,#ffeb99,#ffd6cc);
+        border-radius:0.6rem;
+        border:1px solid #f0c36a;
+        margin-bottom:0.8rem;">
+        <span style="color:#b22222; font-weight:700;">National Collector RPG</span>
+        <span style="color:#555; margin-left:0.4rem;">• The National Sports Collectors Convention</span>
+    </div>
+""")
+
+_ZONE_CARD = _compile("""
+    <div style="
+        padding:0.6rem 0.9rem;
+        margin-bottom:0.45rem;
+        border-radius:0.7rem;
+        border:1px solid #e0e0ff;
+        background-color:#ffffff;">
+        <span style="font-size:1.1rem; margin-right:0.4rem;">{icon}</span>
+        <span style="font-weight:600;">{name}</span>
+    </div>
+""")
+
+_ENCOUNTER_HEADER = _compile("""
+    <div style="
+        margin-top:0.4rem;
+        padding:0.4rem 0.7rem;
+        background-color:#ffffff;
+        border-radius:0.6rem;
+        border:1px solid #e0e0ff;">
+        <span style="color:#777;">Day {day} • {time_block} • </span>
+        <span>{zone_icon} {zone}</span><br/>
+        <span style="color:#b20000;">{npc_icon} {appears}</span>
+        <span style="color:#555;"> They seem {mood}.</span>
+    </div>
+""")
+
+_GAUGE_LABEL = _compile("""
+    <div style="margin-top:0.5rem; margin-bottom:0.15rem; color:#777; font-size:0.8rem;">
+        {label}
+    </div>
+""")
+
+
+@lru_cache(maxsize=64)
+def zone_cards(zones: Tuple[Tuple[str, str], ...]) -> str:
+    """The Show Floor's zone list, one card per ``(icon, name)``."""
+    return "\n".join(_ZONE_CARD.format(icon=icon, name=name) for icon, name in zones)
+
+
+@lru_cache(maxsize=4096)
+def encounter_header(day: int, time_block: str, zone: str, zone_icon: str,
+                     npc_icon: str, appears: str, mood: str) -> str:
+    return _ENCOUNTER_HEADER.format(day=day, time_block=time_block, zone=zone, zone_icon=zone_icon,
+                                    npc_icon=npc_icon, appears=appears, mood=mood)
+
+
+@lru_cache(maxsize=64)
+def gauge_label(label: str) -> str:
+    return _GAUGE_LABEL.format(label=label)
+
+
+FRAGMENTS = {"zone_cards": zone_cards, "encounter_header": encounter_header, "gauge_label": gauge_label}
+
+
+def stats() -> Dict[str, dict]:
+    """Hits, misses, entries held and hit rate of each cached fragment in this process."""
+    out = {}
+    for name, fn in FRAGMENTS.items():
+        info = fn.cache_info()
+        calls = info.hits + info.misses
+        out[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize,
+                     "hit_rate": info.hits / calls if calls else 0.0}
+    return out
@@ -0,0 +1,678 @@
+"""Game rules shared by the Streamlit pages and headless tools.
+
+Rules read and write the active run through ``session()``. Inside the app
+that is ``st.session_state``; batch jobs bind their own state holder with
+``bind_session`` so they never touch a live player's session.
+"""
+
+import copy
+import datetime as dt
+import random
+import secrets
+import uuid
+from bisect import bisect_right
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, field
+from typing import List, Optional, Tuple
+
+from .catalog import ZONE_FEATURED, get_catalog
+from .collection import Collection
+from .config import (
+    ConfigError,
+    GameConfig,
+    config_for,
+    get_config,
+    live_config,
+    pin_config,
+    pinned_config,
+    use_config,
+)
+from .market import tick_for
+from .models import Card, Encounter
+from .schedule import run_due
+from .telemetry import emit
+from .undo import Timeline
+from .valuation import Quote, get_valuation
+
+# ---------- Session binding ----------
+
+@dataclass
+class RunState:
+    """Plain state holder with the same shape as ``st.session_state``."""
+    player: dict = field(default_factory=dict)
+    encounter: Optional[Encounter] = None
+    rng: Optional[random.Random] = None
+    dollar_bin: Optional[object] = None
+
+
+_bound_session: ContextVar = ContextVar("collector_rpg_session", default=None)
+
+
+def session():
+    bound = _bound_session.get()
+    if bound is not None:
+        return bound
+    import streamlit as st
+    return st.session_state
+
+
+@contextmanager
+def bind_session(state):
+    """Make ``state`` the session, playing under the config its run locked in under."""
+    player = getattr(state, "player", None) or {}
+    config = run_config(player) if player.get("build_locked") else pinned_config()
+    token = _bound_session.set(state)
+    try:
+        with use_config(config):  # also undoes a pin made by locking in while bound
+            yield state
+    finally:
+        _bound_session.reset(token)
+
+
+def run_config(player: dict) -> GameConfig:
+    """The config a locked-in run plays under: the version it locked in under."""
+    version = player["build"].get("config_version")
+    if version is not None:
+        try:
+            return config_for(version)
+        except ConfigError:
+            pass  # not archived here (a wiped data dir): play on under the live rules
+    return live_config()
+
+
+def pin_run_config(player: dict) -> None:
+    """Pin the run's config for the rest of this context; the live one until it locks in."""
+    pin_config(run_config(player) if player.get("build_locked") else None)
+
+
+def run_rng():
+    """The run's seeded RNG, so a seed and action log replay exactly.
+
+    Callers with no run RNG bound (old sessions, ad-hoc scripts) get the
+    global ``random`` module.
+    """
+    return getattr(session(), "rng", None) or random
+
+
+# ---------- Core tables ----------
+# Zones, NPC types, moods, bosses and special tactics come from the game
+# config (see ``config``). The old constant names still work and read the
+# live config; the rules themselves call ``get_config()`` so a hot reload
+# takes effect on the next action. A locked-in run keeps the version it
+# locked in under (``bind_session`` pins it).
+
+_CONFIG_NAMES = {
+    "ZONES": lambda c: list(c.zones),
+    "ZONE_META": lambda c: c.zone_meta,
+    "NPC_TYPES": lambda c: list(c.npc_types),
+    "NPC_META": lambda c: c.npc_meta,
+    "NPC_BEHAVIOR": lambda c: c.npc_behavior,
+    "MOODS": lambda c: list(c.moods),
+    "GYMS": lambda c: list(c.gyms),
+    "ELITE_FOUR": lambda c: list(c.elite_four),
+    "CHAMPION": lambda c: c.champion,
+    "SPECIAL_TACTICS": lambda c: c.special_tactics,
+}
+
+
+def __getattr__(name):
+    if name in _CONFIG_NAMES:
+        return _CONFIG_NAMES[name](get_config())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ---------- Build rules ----------
+
+ATTR_BUDGET = 250
+SUBJECT_BUDGET = 300
+STAT_MAX = 100
+STARTING_CASH_RANGE = (100.0, 10000.0)
+BUILD_KEYS = ("name", "favorite", "cash", "goals", "attributes", "subjects", "daily")
+
+
+def build_problems(build: dict) -> List[str]:
+    """What's wrong with a collector build; empty when it can be locked in."""
+    problems = []
+    if not build.get("name"):
+        problems.append("Collector needs a name.")
+    for key, budget in (("attributes", ATTR_BUDGET), ("subjects", SUBJECT_BUDGET)):
+        stats = build.get(key, {})
+        if set(stats) != set(base_player_state()[key]):
+            problems.append(f"Unknown {key}.")
+            continue
+        if any(not isinstance(v, int) or not 0 <= v <= STAT_MAX for v in stats.values()):
+            problems.append(f"{key.capitalize()} must be whole numbers from 0 to {STAT_MAX}.")
+        if sum(stats.values()) != budget:
+            problems.append(f"{key.capitalize()} must add up to {budget}.")
+    lo, hi = STARTING_CASH_RANGE
+    if not lo <= build.get("cash", 0.0) <= hi:
+        problems.append(f"Starting cash must be between ${lo:.0f} and ${hi:.0f}.")
+    if build.get("daily") is not None:
+        try:
+            dt.date.fromisoformat(build["daily"])
+        except (TypeError, ValueError):
+            problems.append("Unknown Daily National date.")
+    return problems
+
+
+def build_snapshot(player: dict) -> dict:
+    """The build as locked in, with the config version the run is played under."""
+    build = copy.deepcopy({key: player[key] for key in BUILD_KEYS})
+    build["config_version"] = get_config().version
+    return build
+
+
+# ---------- Game helpers ----------
+
+def base_player_state():
+    return {
+        "run_id": uuid.uuid4().hex,
+        "seed": secrets.randbits(63),
+        "log": [],  # actions since the build was locked, for replay
+        "name": "",
+        "favorite": "",
+        "cash": 1000.0,
+        "stamina": 100,
+        "day": 1,
+        "time_block": "Morning",
+        "xp": 0,
+        "level": 1,
+        "goals": {
+            "target_pc_card": "",
+            "profit_target": 400.0,
+        },
+        "collection": Collection(),
+        "imported": 0,  # cards seeded from a file before the build was locked; such runs are unranked
+        "profit": 0.0,
+        "build_locked": False,
+        "build": None,  # snapshot taken when the build is locked in
+        "daily": None,  # date of the Daily National being played, if any
+        "daily_next": 0,
+        "floor_table": None,  # show floor table you're standing at; None is the entrance
+        "floor_sold": {},  # floor table id (str) -> catalog ids bought there since its last restock
+        "floor_restocks": {},  # floor table id (str) -> restocks so far
+        "floor_restock_due": {},  # floor table id (str) -> tick of its pending restock
+        "schedule": [],  # pending show events, a heap (see ``schedule``)
+        "schedule_seq": 0,
+        "show_news": [],  # show events so far, as lines for the pages
+        "orders": {},  # open Trade Night orders by id, with what's held in escrow
+        "badges": [],
+        "elite_defeated": [],
+        "champion_defeated": False,
+        "whale_tick": None,  # show time (in time blocks) when the Whale fell
+        "attributes": {
+            "Negotiation": 50,
+            "People Skills": 50,
+            "Card Knowledge": 50,
+            "Hustle": 50,
+        },
+        "subjects": {
+            "Vintage Baseball": 0,
+            "Vintage Football": 0,
+            "Vintage Basketball": 0,
+            "Vintage Hockey": 0,
+            "Modern Baseball": 0,
+            "Modern Football": 0,
+            "Modern Basketball": 0,
+            "Modern Hockey": 0,
+            "Soccer": 0,
+            "Other / TCG / Non‑sport": 0,
+        },
+        "unlocked_tactics": [],
+        "max_cards_visible": 2,
+    }
+
+
+def init_state():
+    s = session()
+    s.player = base_player_state()
+    s.encounter = None
+    s.rng = random.Random(s.player["seed"])
+    s.timeline = Timeline()
+
+
+def advance_flavor_time():
+    time_order = ["Morning", "Afternoon", "Evening"]
+    p = session().player
+    idx = time_order.index(p["time_block"])
+    if idx < len(time_order) - 1:
+        p["time_block"] = time_order[idx + 1]
+    else:
+        p["time_block"] = "Morning"
+        p["day"] += 1
+    run_due(p)
+
+
+def compute_action_budget(player: dict) -> int:
+    """Number of tactical actions allowed in an encounter."""
+    lvl = player["level"]
+    attrs = player["attributes"]
+    avg_attr = (attrs["Negotiation"] + attrs["People Skills"] +
+                attrs["Card Knowledge"] + attrs["Hustle"]) / 4.0
+    return int(4 + lvl // 2 + avg_attr / 40)  # base 4, +level, +up to ~+3 from stats
+
+
+def as_of(player: dict) -> tuple:
+    """Pricing moment for the valuation service."""
+    return (player["day"], player["time_block"])
+
+
+def card_values(cards: List[Card]) -> Quote:
+    """Current value estimates for cards, from the shared valuation service."""
+    return get_valuation().value_cards(cards, as_of(session().player))
+
+
+def level_for_xp(xp: int) -> int:
+    """Level reached with ``xp``: one per threshold cleared."""
+    return bisect_right(get_config().xp_thresholds, xp)
+
+
+def level_band(level: int) -> Tuple[int, Optional[int]]:
+    """XP where ``level`` starts, and where the next one does (None at the cap)."""
+    thresholds = get_config().xp_thresholds
+    start = thresholds[min(max(level, 1), len(thresholds)) - 1]
+    return start, (thresholds[level] if level < len(thresholds) else None)
+
+
+def add_xp(amount: int):
+    p = session().player
+    old_level = p["level"]
+
+    p["xp"] += amount
+    new_level = max(old_level, level_for_xp(p["xp"]))
+
+    if new_level > old_level:
+        p["level"] = new_level
+        for level in range(old_level + 1, new_level + 1):
+            emit("level_up", p.get("run_id"), level, p["xp"])
+        advance_flavor_time()
+
+        # A big deal can clear several thresholds at once; each level gained pays out
+        for level in range(old_level + 1, new_level + 1):
+            _level_rewards(p, level)
+
+
+def _level_rewards(p: dict, level: int):
+    # Passive skill growth
+    attrs = p["attributes"]
+    growth = 3
+    for key in attrs:
+        attrs[key] = min(100, attrs[key] + growth)
+
+    # See more cards at the table (up to 5 baseline)
+    p["max_cards_visible"] = min(5, p.get("max_cards_visible", 2) + 1)
+
+    # Unlock a special tactic based on current top attribute
+    top_attr = max(attrs, key=lambda k: attrs[k])
+    tactic = get_config().special_tactics.get(top_attr)
+    if tactic:
+        if tactic["name"] not in [t["name"] for t in p["unlocked_tactics"]]:
+            p["unlocked_tactics"].append(
+                {"name": tactic["name"], "from_attr": top_attr, "level": level}
+            )
+
+
+def subject_score_for_zone(zone: str, subjects: dict) -> float:
+    if zone == "Vintage Alley":
+        total = (
+            subjects["Vintage Baseball"] +
+            subjects["Vintage Football"] +
+            subjects["Vintage Basketball"] +
+            subjects["Vintage Hockey"]
+        )
+        return total / 400.0
+    if zone == "Modern Showcases":
+        total = (
+            subjects["Modern Baseball"] +
+            subjects["Modern Football"] +
+            subjects["Modern Basketball"] +
+            subjects["Modern Hockey"] +
+            subjects["Soccer"]
+        )
+        return total / 500.0
+    if zone == "Dollar Boxes":
+        total = (
+            subjects["Modern Baseball"] +
+            subjects["Modern Football"] +
+            subjects["Modern Basketball"] +
+            subjects["Modern Hockey"] +
+            subjects["Soccer"] +
+            subjects["Other / TCG / Non‑sport"]
+        )
+        return total / 600.0
+    if zone == "Corporate Pavilion":
+        return sum(subjects.values()) / 1000.0
+    if zone == "Trade Night":
+        total = sum(subjects.values()) + subjects["Other / TCG / Non‑sport"]
+        return total / 1100.0
+    return 0.0
+
+
+def xp_for_deal(player: dict, zone: str, margin: float, is_trade: bool, is_sale: bool = False) -> int:
+    attrs = player["attributes"]
+    subjects = player["subjects"]
+    hustle = attrs["Hustle"]
+
+    base = 5
+
+    zone_info = get_config().zone_info.get(zone)
+    zone_factor = zone_info["xp_factor"] if zone_info else 1.0
+
+    margin_xp = max(0.0, margin / 20.0)
+    margin_xp = min(margin_xp, 40.0)
+
+    trade_bonus = 1.3 if is_trade else 1.0
+    if is_sale:
+        trade_bonus = 0.9
+
+    hustle_bonus = 1.0 + hustle / 500.0
+    zone_subj = subject_score_for_zone(zone, subjects)
+    lane_bonus = 1.0 + 0.5 * zone_subj
+
+    return int((base + margin_xp) * zone_factor * trade_bonus * hustle_bonus * lane_bonus)
+
+
+def grant_xp_for_deal(zone: str, margin: float, is_trade: bool, is_sale: bool = False):
+    player = session().player
+    total_xp = xp_for_deal(player, zone, margin, is_trade, is_sale)
+    emit("deal", player.get("run_id"), zone, round(margin, 2), total_xp, is_trade, is_sale)
+    if total_xp > 0:
+        add_xp(total_xp)
+
+
+def generate_cards_for_zone(zone: str, npc_type: str) -> List[Card]:
+    catalog = get_catalog()
+    card_ids = ZONE_FEATURED.get(zone, ZONE_FEATURED["Trade Night"])
+
+    behavior = get_config().npc_info.get(npc_type, {"overask": (1.1, 1.4)})
+    lo, hi = behavior["overask"]
+    rng = run_rng()
+
+    # Asks follow today's market, not the catalog's list value
+    current = get_valuation().quote(card_ids, as_of(session().player)).value * catalog.base_value[card_ids]
+
+    cards = []
+    for card_id, value in zip(card_ids, current):
+        ask = round(float(value) * rng.uniform(lo, hi), 2)
+        cards.append(catalog.card(card_id, ask))
+    return cards
+
+
+def init_encounter_state(enc: Encounter, tough_multiplier: float = 1.0):
+    enc.npc_hp = int(100 * tough_multiplier)
+    enc.npc_max_hp = int(100 * tough_multiplier)
+    enc.price_factor = 1.0 * tough_multiplier
+    enc.patience = 5 + int(2 * tough_multiplier)
+
+    # per-encounter action meta
+    enc.pancake_used = False
+    enc.actions_used = 0
+    enc.max_actions = 999  # will be set when encounter starts
+
+
+def build_encounter(zone: str, player: dict) -> Encounter:
+    """Regular floor encounter (non-boss), not yet placed in the session."""
+    rng = run_rng()
+    config = get_config()
+    npc_type = rng.choice(config.npc_types)
+    mood = rng.choice(config.moods)
+    cards = generate_cards_for_zone(zone, npc_type)
+    enc = Encounter(
+        npc_type=npc_type,
+        mood=mood,
+        zone=zone,
+        cards=cards,
+        round=1,
+        active=True,
+        history=[f"You approach a {npc_type} in {zone}. They seem {mood}."],
+    )
+    init_encounter_state(enc)
+    enc.max_actions = compute_action_budget(player)
+    enc.mode = "normal"
+    return enc
+
+
+def start_encounter(zone: str):
+    """Regular floor encounter (non-boss)."""
+    s = session()
+    s.encounter = build_encounter(zone, s.player)
+
+
+def has_big_deal(stage_id: str) -> bool:
+    return stage_id in session().player["badges"]
+
+
+def stage_unlocked(player: dict, stage_id: str) -> bool:
+    gym = get_config().gym[stage_id]
+    return player["level"] >= gym["required_level"] and stage_id not in player["badges"]
+
+
+def influencer_unlocked(player: dict, influencer_id: str) -> bool:
+    config = get_config()
+    elite = config.elite[influencer_id]
+    return (
+        player["level"] >= elite["required_level"]
+        and len(player["badges"]) >= len(config.gyms)
+        and influencer_id not in player["elite_defeated"]
+    )
+
+
+def whale_unlocked(player: dict) -> bool:
+    return len(player["elite_defeated"]) >= len(get_config().elite_four) and not player["champion_defeated"]
+
+
+def mark_big_deal(stage_id: str):
+    player = session().player
+    if stage_id not in player["badges"]:
+        player["badges"].append(stage_id)
+        emit("boss_win", player.get("run_id"), "stage", stage_id)
+        add_xp(50)
+
+
+def mark_influencer_won(influencer_id: str):
+    player = session().player
+    if influencer_id not in player["elite_defeated"]:
+        player["elite_defeated"].append(influencer_id)
+        emit("boss_win", player.get("run_id"), "influencer", influencer_id)
+        add_xp(75)
+
+
+def mark_whale_won():
+    player = session().player
+    if not player["champion_defeated"]:
+        player["champion_defeated"] = True
+        player["whale_tick"] = tick_for(player["day"], player["time_block"])
+        emit("boss_win", player.get("run_id"), "whale", "whale")
+        add_xp(100)
+
+
+def start_stage_battle(stage_id: str):
+    config = get_config()
+    gym = config.gym[stage_id]
+    npc_type = "PC Supercollector"
+    mood = run_rng().choice(config.moods)
+    zone = gym["zone"]
+
+    cards = generate_cards_for_zone(zone, npc_type)
+    for c in cards:
+        c.true_value *= 2
+    for c, value in zip(cards, card_values(cards).value):
+        c.ask_price = round(float(value) * run_rng().uniform(1.1, 1.3), 2)
+
+    enc = Encounter(
+        npc_type=npc_type,
+        mood=mood,
+        zone=zone,
+        cards=cards,
+        round=1,
+        active=True,
+        history=[f"You sit down at the {gym['name']} with {gym['boss']}."],
+    )
+    init_encounter_state(enc, tough_multiplier=1.3)
+    enc.max_actions = compute_action_budget(session().player)
+    enc.mode = f"stage:{stage_id}"
+    session().encounter = enc
+
+
+def start_influencer_battle(influencer_id: str):
+    elite = get_config().elite[influencer_id]
+    npc_type = "Dealer"
+    mood = "neutral"
+    zone = "Modern Showcases"
+    cards = generate_cards_for_zone(zone, npc_type)
+    for c in cards:
+        c.true_value *= 3
+    for c, value in zip(cards, card_values(cards).value):
+        c.ask_price = round(float(value) * run_rng().uniform(1.05, 1.25), 2)
+
+    enc = Encounter(
+        npc_type=npc_type,
+        mood=mood,
+        zone=zone,
+        cards=cards,
+        round=1,
+        active=True,
+        history=[f"You’re on camera with {elite['boss']} ({elite['name']})."],
+    )
+    init_encounter_state(enc, tough_multiplier=1.6)
+    enc.max_actions = compute_action_budget(session().player)
+    enc.mode = f"influencer:{influencer_id}"
+    session().encounter = enc
+
+
+def start_whale_battle():
+    champ = get_config().champion
+    npc_type = "PC Supercollector"
+    mood = "neutral"
+    zone = "Modern Showcases"
+    cards = generate_cards_for_zone(zone, npc_type)
+    for c in cards:
+        c.true_value *= 4
+    for c, value in zip(cards, card_values(cards).value):
+        c.ask_price = round(float(value) * run_rng().uniform(1.05, 1.2), 2)
+
+    enc = Encounter(
+        npc_type=npc_type,
+        mood=mood,
+        zone=zone,
+        cards=cards,
+        round=1,
+        active=True,
+        history=[f"You approach {champ['boss']} – the biggest buyer in the room."],
+    )
+    init_encounter_state(enc, tough_multiplier=2.0)
+    enc.max_actions = compute_action_budget(session().player)
+    enc.mode = "whale"
+    session().encounter = enc
+
+
+def offer_threshold_pct(enc: Encounter, player: dict) -> float:
+    """Share of true value the NPC needs to see before accepting."""
+    attrs = player["attributes"]
+    subjects = player["subjects"]
+    neg = attrs["Negotiation"]
+
+    behavior = get_config().npc_info.get(enc.npc_type, {"min_pct": 0.85})
+    base_min_pct = behavior["min_pct"]
+
+    zone_subj = subject_score_for_zone(enc.zone, subjects)
+    if enc.npc_type == "PC Supercollector":
+        base_min_pct -= 0.03 * zone_subj
+    elif enc.npc_type == "Flipper":
+        modern_focus = (
+            subjects["Modern Baseball"] +
+            subjects["Modern Football"] +
+            subjects["Modern Basketball"] +
+            subjects["Modern Hockey"] +
+            subjects["Soccer"]
+        ) / 500.0
+        base_min_pct -= 0.02 * modern_focus
+
+    mood_factor = {
+        "happy": base_min_pct - 0.05,
+        "neutral": base_min_pct,
+        "grumpy": base_min_pct + 0.05,
+    }[enc.mood]
+
+    hp_factor = max(0.5, enc.npc_hp / enc.npc_max_hp)
+    effective_min_pct = mood_factor * enc.price_factor * hp_factor
+
+    neg_discount = (neg - 50) / 500.0
+    zone_subj_discount = zone_subj * 0.08
+
+    return max(0.6, effective_min_pct - neg_discount - zone_subj_discount)
+
+
+def evaluate_offer(offer: float, enc: Optional[Encounter] = None,
+                   cards: Optional[List[Card]] = None) -> str:
+    """Judge an offer for ``cards`` (default: the whole table)."""
+    enc = enc or session().encounter
+    player = session().player
+    lot = enc.cards if cards is None else cards
+    total_true = float(card_values(lot).value.sum())
+
+    threshold = total_true * offer_threshold_pct(enc, player)
+
+    if offer >= threshold:
+        return "accept"
+    elif offer >= threshold * 0.8:
+        return "counter"
+    else:
+        return "reject"
+
+
+def collection_entries(cards: List[Card], price_paid: float, zone: str,
+                       prices: Optional[List[float]] = None) -> List[dict]:
+    """Collection rows for a bought lot; a lot price is split by ask."""
+    if prices is None:
+        total_ask = sum(c.ask_price for c in cards)
+        if total_ask > 0:
+            prices = [price_paid * c.ask_price / total_ask for c in cards]
+        else:
+            prices = [price_paid / len(cards)] * len(cards)
+    return [
+        {**asdict(c), "paid": round(paid, 2), "zone": zone}
+        for c, paid in zip(cards, prices)
+    ]
+
+
+def finalize_deal(price_paid: float, cards: Optional[List[Card]] = None,
+                  prices: Optional[List[float]] = None):
+    """Buy ``cards`` (default: the whole table) for ``price_paid``.
+
+    A partial lot leaves the rest of the table in play; ``prices`` gives the
+    per-card split when the player made per-card offers.
+    """
+    enc = session().encounter
+    player = session().player
+    lot = enc.cards if cards is None else cards
+    total_true = float(card_values(lot).value.sum())
+
+    player["cash"] -= price_paid
+    player["profit"] += (total_true - price_paid)
+    player["collection"].extend(collection_entries(lot, price_paid, enc.zone, prices))
+
+    bought = {id(c) for c in lot}
+    remaining = [c for c in enc.cards if id(c) not in bought]
+    if remaining:
+        enc.cards = remaining
+        enc.history.append(
+            f"Deal done on {len(lot)} card(s) at ${price_paid:.2f}. Estimated value ${total_true:.2f}."
+        )
+    else:
+        enc.active = False
+        enc.history.append(
+            f"Deal done at ${price_paid:.2f}. Estimated value ${total_true:.2f}."
+        )
+
+    margin = total_true - price_paid
+    grant_xp_for_deal(enc.zone, margin, is_trade=False, is_sale=False)
+    return total_true, margin
+
+
+def compute_collection_value(collection: Collection, player: Optional[dict] = None) -> Quote:
+    """Current total value of a collection, with its 95% range."""
+    player = player or session().player
+    q = get_valuation().value_collection(collection, as_of(player))
+    return Quote(value=q.value.sum(), low=q.low.sum(), high=q.high.sum())
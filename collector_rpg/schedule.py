@@ -0,0 +1,56 @@
+"""Per-run event queue: things that happen when the show clock reaches them.
+
+A run's pending events live in ``player["schedule"]``, a heap of
+``(tick, seq, kind, arg)`` ordered by show time (``market.tick_for``), with
+``seq`` keeping events that fall on the same tick in the order they were
+queued. ``advance_flavor_time`` calls ``run_due`` after it moves the clock,
+which pops only the events that are due. However many dealers a floor has,
+moving time costs nothing for the ones with nothing queued.
+
+The module that owns an event's state registers its handler under the
+event's kind when it is imported (``floor`` handles dealer restocks and
+show events). ``actions`` imports every such module, and only actions queue
+events. Handlers get ``(player, tick, arg)`` and may queue more events.
+
+The heap is a plain list of tuples in the player, so it is saved, replayed
+and snapshotted for undo with the rest of the run.
+"""
+
+import heapq
+from typing import Callable, Dict
+
+from .market import tick_for
+
+HANDLERS: Dict[str, Callable[[dict, int, object], None]] = {}
+
+
+def handles(kind: str):
+    """Register the decorated function as the handler for ``kind`` events."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def now(player: dict) -> int:
+    return tick_for(player["day"], player["time_block"])
+
+
+def push(player: dict, tick: int, kind: str, arg=None):
+    seq = player.get("schedule_seq", 0)
+    player["schedule_seq"] = seq + 1
+    heapq.heappush(player.setdefault("schedule", []), (tick, seq, kind, arg))
+
+
+def run_due(player: dict) -> int:
+    """Handle every event due by the run's current show time; returns how many ran."""
+    heap = player.get("schedule")
+    if not heap:
+        return 0
+    clock = now(player)
+    ran = 0
+    while heap and heap[0][0] <= clock:
+        tick, _, kind, arg = heapq.heappop(heap)
+        HANDLERS[kind](player, tick, arg)
+        ran += 1
+    return ran
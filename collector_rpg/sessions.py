@@ -0,0 +1,358 @@
+"""Shared session store, so any Streamlit worker can pick up any run.
+
+A run's state (player, encounter, RNG and Dollar Box bin) is pickled,
+compressed and saved under its run id with a version number. A save names
+the version it started from and fails with ``VersionConflict`` if another
+worker got there first. Three backends share one interface:
+
+- ``memory``: a dict in this process (one worker, like keeping it all in
+  ``st.session_state``)
+- ``sqlite:///path/to/file``: one file that every worker on the box shares
+- ``redis://host:port/db``: any server that speaks the Redis protocol
+
+Pick one with ``COLLECTOR_RPG_SESSIONS``; the default is ``memory``.
+
+Each rerun, ``SessionSync.pull`` asks the store for the run's version only and
+downloads the state only when another worker has moved it on.
+``SessionSync.push`` writes only when the state actually changed. Once the
+build is locked in, every change goes through a logged action or an undo
+step, and each calls ``mark_changed``, so push compares that revision instead
+of pickling the run. Before then the Intro page edits the player directly,
+and push compares the pickle. The collection, usually the bulk of a run, is
+pickled again only when its ``version`` moves.
+"""
+
+import itertools
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from . import DATA_DIR
+
+RUN_KEYS = ("player", "encounter", "rng", "dollar_bin")
+SESSION_TTL_SECONDS = 7 * 24 * 3600
+COMPRESS_LEVEL = 1
+
+
+class VersionConflict(Exception):
+    """Another worker saved the run since we last read it."""
+
+
+class RedisError(Exception):
+    pass
+
+
+# What a store raises when its backend is unreachable or fails
+STORE_ERRORS = (OSError, RedisError, sqlite3.Error)
+
+# Started from the clock, like collection versions, so a run pulled from
+# another worker doesn't collide with ours
+_revisions = itertools.count(time.time_ns())
+
+
+def mark_changed(player: dict):
+    """Note that a locked-in run changed, so the next ``SessionSync.push`` saves it."""
+    player["revision"] = next(_revisions)
+
+
+# ---------- Serialisation ----------
+
+def _dump(obj) -> bytes:
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+
+
+def _load(blob: bytes):
+    return pickle.loads(zlib.decompress(blob))
+
+
+def _pickle_rest(state) -> bytes:
+    """Everything in a run but the collection, uncompressed (cheap to compare)."""
+    rest = {key: getattr(state, key, None) for key in RUN_KEYS}
+    rest["player"] = {k: v for k, v in state.player.items() if k != "collection"}
+    return pickle.dumps(rest, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def dump_run(state, collection_blob: Optional[bytes] = None) -> Tuple[bytes, bytes]:
+    """(collection blob, everything-else blob) for a session's run keys."""
+    if collection_blob is None:
+        collection_blob = _dump(state.player["collection"])
+    return collection_blob, zlib.compress(_pickle_rest(state), COMPRESS_LEVEL)
+
+
+def pack(collection_blob: bytes, rest_blob: bytes) -> bytes:
+    return len(collection_blob).to_bytes(4, "little") + collection_blob + rest_blob
+
+
+def unpack(blob: bytes) -> dict:
+    n = int.from_bytes(blob[:4], "little")
+    run = _load(blob[4 + n:])
+    run["player"]["collection"] = _load(blob[4:4 + n])
+    return run
+
+
+# ---------- Backends ----------
+
+class MemoryStore:
+    def __init__(self):
+        self._runs: Dict[str, Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, run_id: str) -> int:
+        entry = self._runs.get(run_id)
+        return entry[0] if entry else 0
+
+    def get(self, run_id: str) -> Optional[Tuple[int, bytes]]:
+        return self._runs.get(run_id)
+
+    def put(self, run_id: str, blob: bytes, expected: int) -> int:
+        with self._lock:
+            if self.version(run_id) != expected:
+                raise VersionConflict(run_id)
+            self._runs[run_id] = (expected + 1, blob)
+        return expected + 1
+
+
+class SqliteStore:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id TEXT PRIMARY KEY, version INTEGER NOT NULL, blob BLOB NOT NULL, updated_at REAL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self, run_id: str) -> int:
+        row = self._conn().execute("SELECT version FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, run_id: str) -> Optional[Tuple[int, bytes]]:
+        row = self._conn().execute("SELECT version, blob FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def put(self, run_id: str, blob: bytes, expected: int) -> int:
+        with self._conn() as conn:
+            if expected == 0:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO runs (run_id, version, blob, updated_at) VALUES (?, 1, ?, ?)",
+                    (run_id, blob, time.time()),
+                )
+            else:
+                cur = conn.execute(
+                    "UPDATE runs SET version = version + 1, blob = ?, updated_at = ? "
+                    "WHERE run_id = ? AND version = ?",
+                    (blob, time.time(), run_id, expected),
+                )
+        if cur.rowcount != 1:
+            raise VersionConflict(run_id)
+        return expected + 1
+
+
+class _Resp:
+    """Just enough of the Redis protocol (RESP2) for the store."""
+
+    def __init__(self, host: str, port: int, db: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if db:
+            self.call("SELECT", db)
+
+    def send(self, *args):
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.sock.sendall(b"".join(out))
+
+    def read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self.reader.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self.read() for _ in range(n)]
+        raise RedisError(f"unexpected reply {line!r}")
+
+    def call(self, *args):
+        self.send(*args)
+        return self.read()
+
+
+class RedisStore:
+    """Versioned runs in Redis hashes, saved with WATCH/MULTI/EXEC."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 prefix: str = "collector_rpg:run:", timeout: float = 5.0):
+        self.host, self.port, self.db = host, port, db
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> _Resp:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _Resp(self.host, self.port, self.db, self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, *args):
+        try:
+            return self._conn().call(*args)
+        except (OSError, ConnectionError):
+            self._local.conn = None  # reconnect once
+            return self._conn().call(*args)
+
+    def version(self, run_id: str) -> int:
+        v = self._call("HGET", self.prefix + run_id, "version")
+        return int(v) if v is not None else 0
+
+    def get(self, run_id: str) -> Optional[Tuple[int, bytes]]:
+        v, blob = self._call("HMGET", self.prefix + run_id, "version", "blob")
+        return (int(v), blob) if v is not None else None
+
+    def put(self, run_id: str, blob: bytes, expected: int) -> int:
+        try:
+            return self._put(run_id, blob, expected)
+        except (OSError, ConnectionError):
+            self._local.conn = None  # reconnect once
+        if self.get(run_id) == (expected + 1, blob):
+            return expected + 1  # the save went through; only its reply was lost
+        return self._put(run_id, blob, expected)
+
+    def _put(self, run_id: str, blob: bytes, expected: int) -> int:
+        key = self.prefix + run_id
+        conn = self._conn()
+        conn.call("WATCH", key)
+        try:
+            current = conn.call("HGET", key, "version")
+            if (int(current) if current is not None else 0) != expected:
+                raise VersionConflict(run_id)
+            # Pipeline the transaction: one round trip
+            for cmd in (("MULTI",), ("HSET", key, "version", expected + 1, "blob", blob),
+                        ("EXPIRE", key, SESSION_TTL_SECONDS), ("EXEC",)):
+                conn.send(*cmd)
+            replies = [conn.read() for _ in range(4)]
+        except VersionConflict:
+            conn.call("UNWATCH")
+            raise
+        except (OSError, ConnectionError):
+            self._local.conn = None
+            raise
+        if replies[-1] is None:
+            raise VersionConflict(run_id)
+        return expected + 1
+
+
+def store_from_url(url: str):
+    parsed = urlparse(url)
+    if url == "memory" or parsed.scheme == "memory":
+        return MemoryStore()
+    if parsed.scheme == "sqlite":
+        return SqliteStore(Path(parsed.path) if parsed.path else DATA_DIR / "sessions.sqlite3")
+    if parsed.scheme == "redis":
+        db = int(parsed.path.lstrip("/") or 0)
+        return RedisStore(parsed.hostname or "localhost", parsed.port or 6379, db)
+    raise ValueError(f"Unknown session store {url!r}")
+
+
+@lru_cache(maxsize=1)
+def get_session_store():
+    return store_from_url(os.environ.get("COLLECTOR_RPG_SESSIONS", "memory"))
+
+
+# ---------- Per-session sync ----------
+
+class SessionSync:
+    """Keeps one browser session's run in step with the shared store."""
+
+    def __init__(self, store, run_id: str):
+        self.store = store
+        self.run_id = run_id
+        self.version = 0
+        self._saved_rest: Optional[bytes] = None  # uncompressed pickle of the last save, before lock-in
+        self._saved_revision: Optional[tuple] = None  # (revision, log length) of the last save, after
+        self._collection: Tuple[int, int, Optional[bytes]] = (0, -1, None)  # (id, version, blob)
+
+    def _collection_blob(self, collection) -> bytes:
+        key = (id(collection), collection.version)
+        if self._collection[:2] != key:
+            self._collection = key + (_dump(collection),)
+        return self._collection[2]
+
+    def pull(self, state) -> bool:
+        """Load the run if the store has a newer version; True if it did."""
+        if self.store.version(self.run_id) == self.version:
+            return False
+        entry = self.store.get(self.run_id)
+        if entry is None:
+            return False
+        self.version, blob = entry
+        run = unpack(blob)
+        for key in RUN_KEYS:
+            setattr(state, key, run.get(key))
+        n = int.from_bytes(blob[:4], "little")
+        self._saved_rest = zlib.decompress(blob[4 + n:])
+        self._saved_revision = _revision(state.player)
+        self._collection = (id(state.player["collection"]), state.player["collection"].version, blob[4:4 + n])
+        return True
+
+    def push(self, state) -> bool:
+        """Save the run if it changed; raises ``VersionConflict`` if it moved under us."""
+        collection = state.player["collection"]
+        before = self._collection[:2]
+        collection_blob = self._collection_blob(collection)
+        revision = _revision(state.player)
+        if revision is not None:
+            unchanged = revision == self._saved_revision
+            rest = None
+        else:
+            rest = _pickle_rest(state)
+            unchanged = rest == self._saved_rest
+        if unchanged and self._collection[:2] == before and self.version:
+            return False
+        if rest is None:
+            rest = _pickle_rest(state)
+        blob = pack(collection_blob, zlib.compress(rest, COMPRESS_LEVEL))
+        self.version = self.store.put(self.run_id, blob, self.version)
+        self._saved_rest, self._saved_revision = rest, revision
+        return True
+
+
+def _revision(player: dict) -> Optional[tuple]:
+    """What ``push`` compares for a locked-in run; None before lock-in."""
+    if not player["build_locked"]:
+        return None
+    return player.get("revision"), len(player["log"])
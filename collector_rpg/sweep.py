@@ -0,0 +1,155 @@
+"""Auto-sweep: resolve a run of floor encounters in one batched call.
+
+Every table goes through the same ``build_encounter``/``evaluate_offer`` rules
+as the Encounter page. Cash, profit, collection and XP are applied once at the
+end, so XP for the whole sweep is scored against the build you started with.
+Each table still reports its ``encounter_start``, ``offer`` and ``deal``
+events (mode ``"sweep"``), so the analytics count sweep play too.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from .config import get_config
+from .rules import (
+    ZONES,
+    add_xp,
+    build_encounter,
+    card_values,
+    collection_entries,
+    evaluate_offer,
+    run_rng,
+    session,
+    xp_for_deal,
+)
+from .telemetry import emit
+
+MAX_SWEEP_ENCOUNTERS = 500
+MAX_SWEEP_OFFERS = 10  # offers per table
+
+
+@dataclass
+class SweepRules:
+    zones: Tuple[str, ...] = tuple(ZONES)
+    opening_pct: float = 0.6     # first offer, as a share of the table's ask
+    max_pct_of_ask: float = 0.8  # never offer more than this share of ask
+    offers_per_table: int = 3
+    encounters: int = 25
+    cash_reserve: float = 0.0
+
+
+def _number(x) -> bool:
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def sweep_problems(rules: SweepRules) -> List[str]:
+    """What's wrong with a set of sweep rules; empty when they can be run."""
+    problems = []
+    if not all(isinstance(z, str) for z in rules.zones):
+        problems.append("Zones must be zone names.")
+    for name in ("opening_pct", "max_pct_of_ask"):
+        pct = getattr(rules, name)
+        if not _number(pct) or not 0 < pct <= 1:
+            problems.append(f"{name} must be a share of the ask above 0 and at most 1.")
+    offers = rules.offers_per_table
+    if not isinstance(offers, int) or isinstance(offers, bool) or not 1 <= offers <= MAX_SWEEP_OFFERS:
+        problems.append(f"offers_per_table must be a whole number from 1 to {MAX_SWEEP_OFFERS}.")
+    if not isinstance(rules.encounters, int) or isinstance(rules.encounters, bool) or rules.encounters < 0:
+        problems.append("encounters must be a whole number, 0 or more.")
+    if not _number(rules.cash_reserve) or not rules.cash_reserve >= 0:
+        problems.append("cash_reserve can't be negative.")
+    return problems
+
+
+@dataclass
+class SweepSummary:
+    encounters: int = 0
+    deals: int = 0
+    walked: int = 0
+    skipped: int = 0
+    spent: float = 0.0
+    value: float = 0.0
+    xp: int = 0
+    by_zone: Dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def margin(self) -> float:
+        return self.value - self.spent
+
+
+def _offer_ladder(total_ask: float, rules: SweepRules):
+    steps = min(max(1, rules.offers_per_table), MAX_SWEEP_OFFERS)
+    lo, hi = min(rules.opening_pct, rules.max_pct_of_ask), rules.max_pct_of_ask
+    if steps == 1:
+        return [round(total_ask * hi, 2)]
+    return [round(total_ask * (lo + (hi - lo) * i / (steps - 1)), 2) for i in range(steps)]
+
+
+def run_sweep(rules: SweepRules) -> SweepSummary:
+    player = session().player
+    live = get_config().zones
+    zones = [z for z in rules.zones if z in live] or list(live)
+
+    cash = player["cash"]
+    reserve = max(0.0, rules.cash_reserve)  # a deal never takes cash below 0
+    bought = []
+    summary = SweepSummary()
+    rng = run_rng()
+    run_id = player["run_id"]
+
+    for _ in range(min(rules.encounters, MAX_SWEEP_ENCOUNTERS)):
+        zone = rng.choice(zones)
+        enc = build_encounter(zone, player)
+        emit("encounter_start", run_id, zone, enc.npc_type, enc.mood, "sweep")
+        summary.encounters += 1
+        row = summary.by_zone.setdefault(
+            zone, {"Zone": zone, "Tables": 0, "Deals": 0, "Spent ($)": 0.0, "Value ($)": 0.0}
+        )
+        row["Tables"] += 1
+
+        total_ask = sum(c.ask_price for c in enc.cards)
+        ladder = _offer_ladder(total_ask, rules)
+        if ladder[0] > cash - reserve:
+            summary.skipped += 1
+            continue
+
+        price = None
+        for offer in ladder:
+            if offer > cash - reserve:
+                break
+            result = evaluate_offer(offer, enc)
+            emit("offer", run_id, result, zone, enc.npc_type, enc.mood, offer)
+            if result == "accept":
+                price = offer
+                break
+            if result == "reject":
+                # Same mood slide as a rejected offer on the Encounter page
+                if enc.mood == "happy":
+                    enc.mood = "neutral"
+                elif enc.mood == "neutral":
+                    enc.mood = "grumpy"
+
+        if price is None:
+            summary.walked += 1
+            continue
+
+        value = float(card_values(enc.cards).value.sum())
+        xp = max(0, xp_for_deal(player, zone, value - price, is_trade=False))
+        emit("deal", run_id, zone, round(value - price, 2), xp, False, False)
+        cash -= price
+        bought.extend(collection_entries(enc.cards, price, zone))
+        summary.deals += 1
+        summary.spent += price
+        summary.value += value
+        summary.xp += xp
+        row["Deals"] += 1
+        row["Spent ($)"] = round(row["Spent ($)"] + price, 2)
+        row["Value ($)"] = round(row["Value ($)"] + value, 2)
+
+    # Apply the whole sweep to the run in one go
+    player["cash"] = cash
+    player["profit"] += summary.margin
+    player["collection"].extend(bought)
+    if summary.xp > 0:
+        add_xp(summary.xp)
+    return summary
@@ -0,0 +1,275 @@
+"""Game telemetry: typed events, buffered in memory and written to disk.
+
+Rules, actions and pages call ``emit(kind, run_id, *fields)``, with the
+fields in the order ``EVENTS`` lists for that kind. Emitting only appends a
+tuple to an in-memory queue, so it costs well under a microsecond and never
+blocks. When the queue is full, new events are dropped and counted instead.
+
+A background thread drains the queue every ``FLUSH_INTERVAL_SECONDS`` and
+appends each batch as one gzip member to a JSON-lines file under
+``DATA_DIR/telemetry``. It starts a new file once the current one passes
+``MAX_FILE_BYTES``. Every line holds ``ts``, ``kind``, ``run_id`` and the
+kind's fields by name. Set ``COLLECTOR_RPG_TELEMETRY=off`` to turn it off.
+
+Set ``COLLECTOR_RPG_TELEMETRY_FORMAT=parquet`` to write Parquet instead
+(needs pyarrow, which Streamlit installs). There is one column per field
+name in ``COLUMN_TYPES``, null where a kind doesn't have it, and each batch
+is a row group. A Parquet file can't be appended to once it is closed, so
+the current file is written as ``.part`` and renamed when it rotates or the
+process exits. A crash loses that file, where the JSON-lines output loses
+nothing that was flushed.
+
+Listeners added with ``subscribe`` get each batch of records as it is
+written; the analytics rollups are kept up to date this way.
+
+Replays (see ``verify``) run under ``muted()`` so they don't count a run's
+events twice.
+"""
+
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import DATA_DIR
+
+TELEMETRY_DIR = DATA_DIR / "telemetry"
+QUEUE_CAPACITY = 100_000
+BATCH_SIZE = 5_000
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_FILE_BYTES = 8 * 1024 * 1024
+FORMATS = ("jsonl", "parquet")
+TELEMETRY_FORMAT = os.environ.get("COLLECTOR_RPG_TELEMETRY_FORMAT", "jsonl")
+
+# kind -> field names, in the order emit() takes them
+EVENTS: Dict[str, Tuple[str, ...]] = {
+    "run_start": ("daily",),
+    "encounter_start": ("zone", "npc_type", "mood", "mode"),
+    "move": ("move", "zone", "npc_type", "mood"),
+    "offer": ("verdict", "zone", "npc_type", "mood", "offer"),
+    "deal": ("zone", "margin", "xp", "is_trade", "is_sale"),
+    "level_up": ("level", "xp"),
+    "boss_win": ("boss", "boss_id"),
+    "page_view": ("page",),
+    "undo": ("op", "step", "nbytes"),
+}
+
+# Parquet column -> pyarrow type name, for every field any kind has
+COLUMN_TYPES: Dict[str, str] = {
+    "ts": "float64", "kind": "string", "run_id": "string", "daily": "string",
+    "zone": "string", "npc_type": "string", "mood": "string", "mode": "string", "move": "string",
+    "verdict": "string", "offer": "float64", "margin": "float64", "xp": "int64",
+    "is_trade": "bool_", "is_sale": "bool_", "level": "int64", "boss": "string", "boss_id": "string",
+    "page": "string", "op": "string", "step": "int64", "nbytes": "int64",
+}
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in COLUMN_TYPES.items()])
+
+
+def to_record(event: tuple) -> Optional[dict]:
+    """Queued tuple -> named record, or None if it doesn't match ``EVENTS``."""
+    ts, kind, run_id, fields = event
+    names = EVENTS.get(kind)
+    if names is None or len(names) != len(fields):
+        return None
+    return {"ts": round(ts, 3), "kind": kind, "run_id": run_id, **dict(zip(names, fields))}
+
+
+class Telemetry:
+    def __init__(self, out_dir: Path, capacity: int = QUEUE_CAPACITY, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS, max_file_bytes: int = MAX_FILE_BYTES,
+                 fmt: str = "jsonl"):
+        if fmt not in FORMATS:
+            raise ValueError(f"telemetry format must be one of {FORMATS}, not {fmt!r}")
+        self.out_dir = Path(out_dir)
+        self.fmt = fmt
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self._queue = deque()  # append and popleft are atomic; no lock on the hot path
+        self.dropped = 0    # approximate: bumped without a lock
+        self.written = 0
+        self.malformed = 0
+        self.listener_errors = 0
+        self.files = 0
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        self._path: Optional[Path] = None
+        self._writer = None  # Parquet only: the open writer for self._path's ".part" file
+        self._schema = _arrow_schema() if fmt == "parquet" else None
+        self._stop = threading.Event()
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._flusher = threading.Thread(target=self._run_flusher, name="telemetry-flush", daemon=True)
+        self._flusher.start()
+
+    def emit(self, kind: str, run_id: Optional[str], fields: tuple):
+        if len(self._queue) < self.capacity:
+            self._queue.append((time.time(), kind, run_id, fields))
+        else:
+            self.dropped += 1
+
+    def subscribe(self, listener: Callable[[List[dict]], None]):
+        """Call ``listener(records)`` from the flusher with every batch."""
+        self._listeners.append(listener)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._queue), "written": self.written, "dropped": self.dropped,
+                "malformed": self.malformed, "listener_errors": self.listener_errors, "files": self.files}
+
+    def _drain(self) -> List[tuple]:
+        batch = []
+        pop = self._queue.popleft
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(pop())
+        except IndexError:
+            pass
+        return batch
+
+    def _file(self) -> Path:
+        if self._path is None or self._path.stat().st_size >= self.max_file_bytes:
+            stamp = time.strftime("%Y%m%dT%H%M%S")
+            self.files += 1
+            self._path = self.out_dir / f"events-{stamp}-{os.getpid()}-{self.files:04d}.jsonl.gz"
+            self._path.touch()
+        return self._path
+
+    def flush(self):
+        """Write out everything queued so far."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            records = [record for record in map(to_record, batch) if record is not None]
+            self.malformed += len(batch) - len(records)
+            if not records:
+                continue
+            if self.fmt == "parquet":
+                self._write_parquet(records)
+            else:
+                # One complete gzip member per batch, so a crash never leaves a torn file
+                data = gzip.compress(("\n".join(map(_encode, records)) + "\n").encode(), compresslevel=6)
+                with open(self._file(), "ab") as fh:
+                    fh.write(data)
+            self.written += len(records)
+            for listener in self._listeners:
+                try:
+                    listener(records)
+                except Exception:  # a broken listener must not stop the log
+                    self.listener_errors += 1
+
+    def _write_parquet(self, records: List[dict]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._writer is not None and self._part().stat().st_size >= self.max_file_bytes:
+            self._finish_parquet()
+        if self._writer is None:
+            stamp = time.strftime("%Y%m%dT%H%M%S")
+            self.files += 1
+            self._path = self.out_dir / f"events-{stamp}-{os.getpid()}-{self.files:04d}.parquet"
+            self._writer = pq.ParquetWriter(self._part(), self._schema, compression="zstd")
+        self._writer.write_table(pa.Table.from_pylist(records, schema=self._schema))
+
+    def _part(self) -> Path:
+        return self._path.with_name(self._path.name + ".part")
+
+    def _finish_parquet(self):
+        self._writer.close()
+        self._writer = None
+        os.replace(self._part(), self._path)
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join()
+        if self._writer is not None:
+            self._finish_parquet()
+
+
+class _Off:
+    def emit(self, kind, run_id, fields):
+        pass
+
+    def subscribe(self, listener):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+@lru_cache(maxsize=1)
+def get_telemetry():
+    """The worker's telemetry sink; flushed on interpreter exit."""
+    if os.environ.get("COLLECTOR_RPG_TELEMETRY", "").lower() in ("0", "off", "false"):
+        return _Off()
+    from .analytics import get_analytics  # analytics imports the rules, which import us
+    sink = Telemetry(TELEMETRY_DIR, fmt=TELEMETRY_FORMAT)
+    sink.subscribe(get_analytics().apply)
+    atexit.register(sink.close)
+    return sink
+
+
+_muted: ContextVar = ContextVar("collector_rpg_telemetry_muted", default=False)
+_sink = None  # get_telemetry(), looked up once so emit() skips the cache call
+
+
+def emit(kind: str, run_id: Optional[str], *fields):
+    """Queue one event (see ``EVENTS`` for each kind's fields). Never blocks."""
+    global _sink
+    if _muted.get():
+        return
+    if _sink is None:
+        _sink = get_telemetry()
+    _sink.emit(kind, run_id, fields)
+
+
+@contextmanager
+def muted():
+    """Emit nothing inside this block (replays, what-if runs)."""
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def event_files(out_dir: Path = TELEMETRY_DIR) -> List[Path]:
+    """Written event files in either format, oldest first (unfinished ``.part`` files aren't listed)."""
+    out_dir = Path(out_dir)
+    return sorted([*out_dir.glob("events-*.jsonl.gz"), *out_dir.glob("events-*.parquet")])
+
+
+def read_events(paths) -> Iterator[dict]:
+    for path in paths:
+        if Path(path).suffix == ".parquet":
+            yield from _read_parquet(path)
+            continue
+        with gzip.open(path, "rt") as fh:
+            for line in fh:
+                yield json.loads(line)
+
+
+def _read_parquet(path) -> Iterator[dict]:
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE):
+        for row in batch.to_pylist():
+            names = EVENTS.get(row["kind"], ())
+            yield {"ts": row["ts"], "kind": row["kind"], "run_id": row["run_id"], **{n: row[n] for n in names}}
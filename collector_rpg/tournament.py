@@ -0,0 +1,502 @@
+"""Strategy tournament: negotiation bots played against each other on shared seeds.
+
+A game is one seeded encounter: a floor table from ``start_encounter``, or a
+big stage, influencer or Whale table from its boss starter. Every strategy
+plays every game on its own fresh run with the same seed. So they all sit
+down at the same cards, NPC and mood and see the same counters, and all
+play through ``actions`` like the Encounter page does. A strategy only sees
+what a player sees: its read of the cards (see ``optimizer.card_read``),
+never their true value. It can make at most ``MAX_OFFERS`` offers a table.
+
+Each pair of strategies is matched on each game. A boss win beats no win;
+otherwise the bigger profit wins. Elo ratings are computed from those
+matches in game order, so the same results always give the same ratings.
+
+Games are spread over a process pool in chunks. Each finished chunk is
+written to a SQLite checkpoint, so a tournament that stops can be resumed
+and skips the games already played. Every game is played under the config
+version the tournament started with. The checkpoint records that version,
+so a checkpoint from before a balance change won't be resumed.
+
+    python -m collector_rpg.tournament --games 2000 --checkpoint t.sqlite3
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sqlite3
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import closing
+from dataclasses import dataclass, field
+from itertools import combinations
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import DATA_DIR, actions
+from .catalog import get_catalog
+from .comps import get_comps
+from .encounter import apply_move
+from .optimizer import card_read, optimize_lot, read_sigma
+from .config import GameConfig, config_for, get_config, use_config
+from .rules import (
+    RunState,
+    base_player_state,
+    bind_session,
+    card_values,
+    offer_threshold_pct,
+    start_encounter,
+    start_influencer_battle,
+    start_stage_battle,
+    start_whale_battle,
+)
+from .telemetry import muted
+from .valuation import get_valuation
+
+TOURNAMENT_DIR = DATA_DIR / "tournaments"
+MAX_OFFERS = 3
+CHUNK_GAMES = 25
+ELO_START = 1500.0
+ELO_K = 16.0
+PROFIT_TIE = 0.01
+SEARCH_DEPTH = 2
+
+# A balanced build, rich enough to sit down at every boss table
+DEFAULT_BUILD = {
+    "name": "Bot",
+    "favorite": "",
+    "cash": 5000.0,
+    "goals": {"target_pc_card": "", "profit_target": 400.0},
+    "attributes": {"Negotiation": 63, "People Skills": 62, "Card Knowledge": 63, "Hustle": 62},
+    "subjects": {k: 30 for k in base_player_state()["subjects"]},
+    "daily": None,
+}
+
+
+STARTERS = {
+    "floor": start_encounter,
+    "stage": start_stage_battle,
+    "influencer": start_influencer_battle,
+    "whale": lambda _: start_whale_battle(),
+}
+
+RESULT_FIELDS = ("profit", "spent", "deal", "boss_win", "xp", "moves", "offers")
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS results (game INTEGER NOT NULL, strategy TEXT NOT NULL, "
+    "profit REAL NOT NULL, spent REAL NOT NULL, deal INTEGER NOT NULL, boss_win INTEGER NOT NULL, "
+    "xp INTEGER NOT NULL, moves INTEGER NOT NULL, offers INTEGER NOT NULL, PRIMARY KEY (game, strategy))",
+)
+INSERT_SQL = f"INSERT OR IGNORE INTO results (game, strategy, {', '.join(RESULT_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class TournamentError(Exception):
+    pass
+
+
+# ---------- Seats ----------
+
+class Seat:
+    """A strategy's view of its table: the player's reads and the actions it may take."""
+
+    def __init__(self, state: RunState):
+        self.state = state
+        self.offers = 0
+        self.moves = 0
+
+    @property
+    def player(self) -> dict:
+        return self.state.player
+
+    @property
+    def table(self):
+        enc = self.state.encounter
+        return enc if enc is not None and enc.active else None
+
+    @property
+    def actions_left(self) -> int:
+        enc = self.table
+        return 0 if enc is None else enc.max_actions - enc.actions_used
+
+    @property
+    def offers_left(self) -> int:
+        return MAX_OFFERS - self.offers if self.table is not None else 0
+
+    def visible(self) -> List[int]:
+        enc = self.table
+        return [] if enc is None else list(range(min(len(enc.cards), self.player.get("max_cards_visible", 2))))
+
+    def read(self, enc=None) -> float:
+        """The player's read on the whole table."""
+        enc = enc or self.table
+        sigma = read_sigma(self.player)
+        return float(sum(card_read(c, v, sigma) for c, v in zip(enc.cards, card_values(enc.cards).value)))
+
+    def floor(self, enc=None) -> float:
+        """Read times the share of value the NPC wants to see right now."""
+        enc = enc or self.table
+        return self.read(enc) * offer_threshold_pct(enc, self.player)
+
+    def move(self, name: str) -> bool:
+        done = actions.move(name)
+        self.moves += done
+        return done
+
+    def offer(self, price: float) -> Optional[str]:
+        if self.offers_left <= 0:
+            return None
+        price = round(min(price, self.player["cash"]), 2)
+        verdict, _ = actions.make_offer(price)
+        self.offers += verdict is not None
+        return verdict
+
+    def card_offers(self, offers: Dict[int, float]) -> Optional[Dict[int, str]]:
+        if self.offers_left <= 0:
+            return None
+        verdicts = actions.make_card_offers(offers)
+        self.offers += verdicts is not None
+        return verdicts
+
+    def walk_away(self):
+        actions.walk_away()
+
+
+# ---------- Strategies ----------
+
+def _ladder(seat: Seat, levels: Sequence[float]):
+    """Whole-table offers at rising multiples of the floor read, then walk."""
+    for level in levels:
+        if seat.table is None or seat.offers_left <= 0:
+            return
+        if seat.offer(seat.floor() * level) in (None, "accept"):
+            return
+    seat.walk_away()
+
+
+def always_friendly(seat: Seat):
+    while seat.actions_left > 0 and seat.move("friendly_chat"):
+        pass
+    _ladder(seat, (0.9, 1.0, 1.1))
+
+
+def flaws_then_comps(seat: Seat):
+    half = seat.actions_left // 2
+    for i in range(seat.actions_left):
+        if seat.table is None or not seat.move("point_flaws" if i < half else "show_comp"):
+            break
+    _ladder(seat, (0.9, 1.0, 1.1))
+
+
+def lowball_first(seat: Seat):
+    seat.move("lowball_probe")
+    _ladder(seat, (0.7, 0.85, 1.0))
+
+
+def _solve_rounds(seat: Seat):
+    """Per-card offers from the lot optimizer until nothing is worth offering."""
+    while seat.table is not None and seat.offers_left > 0:
+        plan = optimize_lot(seat.table, seat.player, seat.player["cash"], seat.visible())
+        if not plan.picks or plan.expected_margin <= 0:
+            break
+        if seat.card_offers(dict(plan.picks)) is None:
+            break
+    if seat.table is not None:
+        seat.walk_away()
+
+
+def solver(seat: Seat):
+    _solve_rounds(seat)
+
+
+def _lot_value(seat: Seat, enc) -> float:
+    if not enc.active:
+        return 0.0
+    visible = list(range(min(len(enc.cards), seat.player.get("max_cards_visible", 2))))
+    return optimize_lot(enc, seat.player, seat.player["cash"], visible).expected_margin
+
+
+def _search(seat: Seat, enc, depth: int) -> float:
+    """Best expected margin reachable with up to ``depth`` more moves."""
+    best = _lot_value(seat, enc)
+    if depth == 0 or not enc.active or enc.actions_used >= enc.max_actions:
+        return best
+    for name in actions.MOVES:
+        best = max(best, _search(seat, _after(seat, enc, name), depth - 1))
+    return best
+
+
+def _after(seat: Seat, enc, name: str):
+    """The encounter as it would be after ``name``; moves don't draw on the RNG."""
+    trial = copy.copy(enc)
+    trial.history = []
+    with bind_session(RunState(player=seat.player, encounter=trial)):
+        apply_move(name)
+    trial.actions_used += 1
+    return trial
+
+
+def search(seat: Seat):
+    """Look ``SEARCH_DEPTH`` moves ahead; take the best first move until stopping is best."""
+    while seat.table is not None and seat.actions_left > 0:
+        enc = seat.table
+        stay = _lot_value(seat, enc)
+        scored = [(_search(seat, _after(seat, enc, name), SEARCH_DEPTH - 1), name) for name in actions.MOVES]
+        value, name = max(scored)
+        if value <= stay or not seat.move(name):
+            break
+    _solve_rounds(seat)
+
+
+STRATEGIES: Dict[str, Callable[[Seat], None]] = {
+    "friendly": always_friendly,
+    "flaws_comps": flaws_then_comps,
+    "lowball": lowball_first,
+    "solver": solver,
+    "search": search,
+}
+
+
+# ---------- Games ----------
+
+def scenarios(config: Optional[GameConfig] = None) -> Tuple[Tuple[str, str, int], ...]:
+    """(kind, id, level the player has reached by then) from the game config; games cycle through these."""
+    config = config or get_config()
+    return (
+        *(("floor", zone, 1) for zone in config.zones),
+        *(("stage", g["id"], g["required_level"]) for g in config.gyms),
+        *(("influencer", e["id"], e["required_level"]) for e in config.elite_four),
+        ("whale", config.champion["id"], config.champion["required_level"]),
+    )
+
+
+def game_seed(base_seed: int, game: int) -> int:
+    return zlib.crc32(f"{base_seed}:{game}".encode()) << 31 | game
+
+
+def play(strategy: str, game: int, base_seed: int, build: dict, config_version: Optional[int] = None) -> dict:
+    """One strategy's result on one game, under the given config version (default: the live one)."""
+    config = get_config() if config_version is None else config_for(config_version)
+    cycle = scenarios(config)
+    kind, ident, level = cycle[game % len(cycle)]
+    player = base_player_state()
+    player.update(copy.deepcopy(build))
+    player["seed"] = game_seed(base_seed, game)
+    state = RunState(player=player, rng=random.Random(player["seed"]))
+    cash = player["cash"]
+
+    with bind_session(state), use_config(config), muted():
+        problems = actions.lock_build()
+        if problems:
+            raise TournamentError("bad build: " + " ".join(problems))
+        player["level"] = level
+        player["max_cards_visible"] = min(5, 1 + level)
+        STARTERS[kind](ident)
+        seat = Seat(state)
+        STRATEGIES[strategy](seat)
+
+    boss_win = (ident in player["badges"] or ident in player["elite_defeated"]
+                or (kind == "whale" and player["champion_defeated"]))
+    return {
+        "profit": round(player["profit"], 2),
+        "spent": round(cash - player["cash"], 2),
+        "deal": int(len(player["collection"]) > 0),
+        "boss_win": int(boss_win),
+        "xp": player["xp"],
+        "moves": seat.moves,
+        "offers": seat.offers,
+    }
+
+
+def play_chunk(tasks: List[Tuple[int, str]], base_seed: int, build: dict,
+               config_version: Optional[int] = None) -> List[tuple]:
+    """Result rows for (game, strategy) pairs, in the checkpoint's column order."""
+    rows = []
+    for game, strategy in tasks:
+        result = play(strategy, game, base_seed, build, config_version)
+        rows.append((game, strategy, *(result[k] for k in RESULT_FIELDS)))
+    return rows
+
+
+def _warm_worker():
+    get_catalog()
+    get_comps()
+    get_valuation()
+
+
+# ---------- Checkpoint ----------
+
+def open_checkpoint(path: Path, config: dict) -> sqlite3.Connection:
+    """Open (or start) a checkpoint; refuses one made with different settings."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    with conn:
+        for stmt in SCHEMA:
+            conn.execute(stmt)
+        saved = dict(conn.execute("SELECT key, value FROM config"))
+        wanted = {k: json.dumps(v, sort_keys=True) for k, v in config.items()}
+        changed = [k for k in wanted if k in saved and saved[k] != wanted[k]]
+        if not changed:
+            conn.executemany("INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)", wanted.items())
+    if changed:
+        conn.close()
+        raise TournamentError(f"{path} was played with a different {', '.join(changed)}; use a new checkpoint")
+    return conn
+
+
+def _pending(conn: sqlite3.Connection, games: int, strategies: Sequence[str]) -> List[Tuple[int, str]]:
+    done = set(conn.execute("SELECT game, strategy FROM results WHERE game < ?", (games,)))
+    return [(g, s) for g in range(games) for s in strategies if (g, s) not in done]
+
+
+# ---------- Ratings ----------
+
+@dataclass
+class Standing:
+    strategy: str
+    rating: float = ELO_START
+    games: int = 0
+    profit: float = 0.0
+    deals: int = 0
+    boss_games: int = 0
+    boss_wins: int = 0
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    head_to_head: Dict[str, float] = field(default_factory=dict)  # opponent -> score share
+
+    @property
+    def mean_profit(self) -> float:
+        return self.profit / self.games if self.games else 0.0
+
+
+def outcome(a: tuple, b: tuple) -> float:
+    """Match score for ``a`` against ``b`` (1, 0.5 or 0); each is (boss_win, profit)."""
+    if a[0] != b[0]:
+        return 1.0 if a[0] > b[0] else 0.0
+    if abs(a[1] - b[1]) <= PROFIT_TIE:
+        return 0.5
+    return 1.0 if a[1] > b[1] else 0.0
+
+
+def standings(rows: Iterable[tuple], strategies: Sequence[str],
+              config: Optional[GameConfig] = None) -> List[Standing]:
+    """Totals and Elo ratings from (game, strategy, profit, deal, boss_win) rows, best first."""
+    table = {s: Standing(s) for s in strategies}
+    cycle = scenarios(config)
+    by_game: Dict[int, Dict[str, tuple]] = {}
+    for game, strategy, profit, deal, boss_win in rows:
+        if strategy not in table:
+            continue
+        by_game.setdefault(game, {})[strategy] = (boss_win, profit)
+        st = table[strategy]
+        st.games += 1
+        st.profit += profit
+        st.deals += deal
+        if cycle[game % len(cycle)][0] != "floor":
+            st.boss_games += 1
+            st.boss_wins += boss_win
+
+    scores = {(a, b): [0.0, 0] for a, b in combinations(strategies, 2)}
+    for game in sorted(by_game):
+        played = by_game[game]
+        for a, b in combinations(strategies, 2):
+            if a not in played or b not in played:
+                continue
+            sa, ra, rb = outcome(played[a], played[b]), table[a].rating, table[b].rating
+            expected = 1.0 / (1.0 + 10 ** ((rb - ra) / 400.0))
+            table[a].rating += ELO_K * (sa - expected)
+            table[b].rating -= ELO_K * (sa - expected)
+            table[a].wins += sa == 1.0
+            table[a].losses += sa == 0.0
+            table[b].wins += sa == 0.0
+            table[b].losses += sa == 1.0
+            table[a].draws += sa == 0.5
+            table[b].draws += sa == 0.5
+            scores[(a, b)][0] += sa
+            scores[(a, b)][1] += 1
+    for (a, b), (score, n) in scores.items():
+        if n:
+            table[a].head_to_head[b] = score / n
+            table[b].head_to_head[a] = 1.0 - score / n
+    return sorted(table.values(), key=lambda st: -st.rating)
+
+
+def read_standings(conn: sqlite3.Connection, strategies: Sequence[str], games: int,
+                   config: Optional[GameConfig] = None) -> List[Standing]:
+    rows = conn.execute("SELECT game, strategy, profit, deal, boss_win FROM results WHERE game < ? "
+                        "ORDER BY game, strategy", (games,))
+    return standings(rows, strategies, config)
+
+
+# ---------- Runner ----------
+
+def run_tournament(checkpoint: Path, games: int, strategies: Sequence[str] = tuple(STRATEGIES),
+                   seed: int = 0, build: Optional[dict] = None, workers: Optional[int] = None,
+                   chunk: int = CHUNK_GAMES, progress: Optional[Callable[[int, int], None]] = None) -> List[Standing]:
+    """Play every game not yet in ``checkpoint`` and return the standings.
+
+    ``progress(done, total)`` is called as chunks finish.
+    """
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        raise TournamentError(f"unknown strategy: {', '.join(unknown)}")
+    build = build or DEFAULT_BUILD
+    # Every game is played under this version, even if the config is reloaded meanwhile
+    config = get_config()
+    settings = {"seed": seed, "build": build, "config_version": config.version}
+    with closing(open_checkpoint(checkpoint, settings)) as conn:
+        tasks = _pending(conn, games, strategies)
+        per_chunk = max(1, chunk * len(strategies))
+        chunks = [tasks[i:i + per_chunk] for i in range(0, len(tasks), per_chunk)]
+        total, done = len(tasks), 0
+
+        if chunks:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+                # Keep a few chunks per worker in flight rather than queueing the whole tournament
+                limit = 4 * workers
+                queue, running = iter(chunks), set()
+                while True:
+                    for part in queue:
+                        running.add(pool.submit(play_chunk, part, seed, build, config.version))
+                        if len(running) >= limit:
+                            break
+                    if not running:
+                        break
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        rows = future.result()
+                        with conn:
+                            conn.executemany(INSERT_SQL, rows)
+                        done += len(rows)
+                        if progress is not None:
+                            progress(done, total)
+        return read_standings(conn, strategies, games, config)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play negotiation strategies against each other.")
+    parser.add_argument("--games", type=int, default=len(scenarios()) * 20, help="games per strategy")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--seed", type=int, default=0, help="base seed for the shared games")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--checkpoint", type=Path, default=None,
+                        help=f"results file to write and resume from (default: {TOURNAMENT_DIR}/seed-<seed>.sqlite3)")
+    args = parser.parse_args(argv)
+
+    checkpoint = args.checkpoint or TOURNAMENT_DIR / f"seed-{args.seed}.sqlite3"
+    table = run_tournament(checkpoint, args.games, args.strategies, seed=args.seed, workers=args.workers,
+                           progress=lambda done, total: print(f"\r{done:,}/{total:,} games", end="", flush=True))
+    print()
+    print(f"{'strategy':<12} {'elo':>6} {'games':>6} {'profit/g':>9} {'deals':>6} {'boss':>9} {'W-D-L':>16}")
+    for st in table:
+        print(f"{st.strategy:<12} {st.rating:6.0f} {st.games:6,} {st.mean_profit:9.2f} {st.deals:6,} "
+              f"{st.boss_wins:4}/{st.boss_games:<4} {st.wins:>5}-{st.draws}-{st.losses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""Trade Night market: player-to-player bids and asks on collection cards.
+
+One order book per catalog card, matched with price-time priority. Each
+order is for a single card, so an incoming order fills at most once, at the
+resting order's price. Books are guarded by a fixed set of striped locks
+(``card_id % ORDER_STRIPES``), so sessions trading different cards never
+wait on each other. Cancelled orders are dropped lazily when they reach the
+top of their heap.
+
+The engine never touches a session's state. Each fill, and each resting
+order cancelled by self-trade prevention, is published to the owning run's
+mailbox on the broker. The session settles it on its next rerun (see
+``actions.settle_fills``). The default broker is in-process. Set
+``COLLECTOR_RPG_BROKER=sqlite`` to use a SQLite mailbox under ``DATA_DIR``
+that every worker on the box shares.
+
+Books live in the worker that took the order. Order ids, and how each
+order closed (filled or cancelled), come from the trade ledger: a SQLite
+file under ``DATA_DIR``, whatever the mailbox transport. The first close of
+an order wins. A session that comes back on a worker whose book doesn't hold
+its order closes it as cancelled and takes its escrow back. The worker that
+does hold it then can't fill it, and ``verify`` replays a run's fills
+against the same ledger from its own process.
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import DATA_DIR
+
+LEDGER_PATH = DATA_DIR / "trade_ledger.sqlite3"
+ORDER_STRIPES = 64
+BID, ASK = "bid", "ask"
+
+
+def mailbox(run_id: str) -> str:
+    return f"trades:{run_id}"
+
+
+# ---------- Ledger ----------
+
+class TradeLedger:
+    """Order ids and how each order closed, in a SQLite file every process shares."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS order_ids (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS closed_orders ("
+                "order_id INTEGER PRIMARY KEY, run_id TEXT NOT NULL, payload TEXT NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Keyed by pid too: a forked verifier worker must not reuse its parent's connection
+        conn, pid = getattr(self._local, "conn", (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    def next_order_id(self) -> int:
+        with self._conn() as conn:
+            return conn.execute("INSERT INTO order_ids DEFAULT VALUES").lastrowid
+
+    def close(self, order_id: int, run_id: str, message: dict) -> bool:
+        """Record how an order closed; False if it had already closed."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO closed_orders (order_id, run_id, payload) VALUES (?, ?, ?)",
+                (order_id, run_id, json.dumps(message)),
+            )
+        return cur.rowcount == 1
+
+    def closed(self, order_id: int) -> Optional[Tuple[str, dict]]:
+        """(run id, message) an order closed with, or None while it's open."""
+        row = self._conn().execute(
+            "SELECT run_id, payload FROM closed_orders WHERE order_id = ?", (order_id,)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+
+# ---------- Brokers ----------
+
+class _Broker:
+    """Mailboxes; order ids and closes go through to the trade ledger."""
+
+    def __init__(self, ledger: TradeLedger):
+        self.ledger = ledger
+
+    def next_order_id(self) -> int:
+        return self.ledger.next_order_id()
+
+    def close(self, order_id: int, run_id: str, message: dict) -> bool:
+        return self.ledger.close(order_id, run_id, message)
+
+    def closed(self, order_id: int) -> Optional[Tuple[str, dict]]:
+        return self.ledger.closed(order_id)
+
+
+class LocalBroker(_Broker):
+    """In-process mailboxes: one deque per topic."""
+
+    def __init__(self, ledger: TradeLedger):
+        super().__init__(ledger)
+        self._boxes: Dict[str, deque] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def publish(self, topic: str, message: dict):
+        with self._lock:
+            self._boxes[topic].append(message)
+
+    def poll(self, topic: str) -> List[dict]:
+        with self._lock:
+            box = self._boxes.pop(topic, None)
+        return list(box) if box else []
+
+
+class SqliteBroker(_Broker):
+    """Cross-worker stand-in: mailboxes in a shared SQLite file."""
+
+    def __init__(self, db_path: Path, ledger: TradeLedger):
+        super().__init__(ledger)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, payload TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_topic ON messages (topic, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, topic: str, message: dict):
+        with self._conn() as conn:
+            conn.execute("INSERT INTO messages (topic, payload) VALUES (?, ?)", (topic, json.dumps(message)))
+
+    def poll(self, topic: str) -> List[dict]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "DELETE FROM messages WHERE topic = ? RETURNING id, payload", (topic,)
+            ).fetchall()
+        return [json.loads(payload) for _, payload in sorted(rows)]
+
+
+# ---------- Order book ----------
+
+@dataclass(eq=False)
+class Order:
+    order_id: int
+    run_id: str
+    side: str
+    card_id: int
+    price: float
+    row: Optional[dict] = None  # the collection row an ask is selling
+    placed_at: float = field(default_factory=time.time)
+    live: bool = True
+
+
+class OrderBook:
+    __slots__ = ("bids", "asks", "n_bids", "n_asks")
+
+    def __init__(self):
+        self.bids = []  # (-price, order_id, order): best price, then oldest
+        self.asks = []  # (price, order_id, order)
+        self.n_bids = 0
+        self.n_asks = 0
+
+    @staticmethod
+    def _top(heap) -> Optional[Order]:
+        while heap and not heap[0][2].live:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def best_bid(self) -> Optional[Order]:
+        return self._top(self.bids)
+
+    def best_ask(self) -> Optional[Order]:
+        return self._top(self.asks)
+
+    def match(self, order: Order):
+        """Cross ``order`` against the book; rest it if nothing fills.
+
+        Returns (resting order it filled against or None, own orders cancelled).
+        """
+        cancelled = []
+        if order.side == BID:
+            heap, crosses = self.asks, lambda top: top.price <= order.price
+        else:
+            heap, crosses = self.bids, lambda top: top.price >= order.price
+
+        while True:
+            top = self._top(heap)
+            if top is None or not crosses(top):
+                break
+            heapq.heappop(heap)
+            top.live = False
+            self._count(top, -1)
+            if top.run_id == order.run_id:
+                # Self-trade prevention: the older order makes way
+                cancelled.append(top)
+                continue
+            order.live = False
+            return top, cancelled
+
+        if order.side == BID:
+            heapq.heappush(self.bids, (-order.price, order.order_id, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.order_id, order))
+        self._count(order, 1)
+        return None, cancelled
+
+    def _count(self, order: Order, delta: int):
+        if order.side == BID:
+            self.n_bids += delta
+        else:
+            self.n_asks += delta
+
+
+class TradeNight:
+    def __init__(self, broker, stripes: int = ORDER_STRIPES):
+        self.broker = broker
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._books: Dict[int, OrderBook] = {}
+        self._orders: Dict[int, Order] = {}
+        self._by_run: Dict[str, Set[int]] = defaultdict(set)
+        self._index_lock = threading.Lock()
+
+    def _stripe(self, card_id: int) -> threading.Lock:
+        return self._stripes[card_id % len(self._stripes)]
+
+    def _book(self, card_id: int) -> OrderBook:
+        book = self._books.get(card_id)
+        if book is None:
+            book = self._books.setdefault(card_id, OrderBook())
+        return book
+
+    def _index(self, add=(), drop=()):
+        with self._index_lock:
+            for order in add:
+                self._orders[order.order_id] = order
+                self._by_run[order.run_id].add(order.order_id)
+            for order in drop:
+                self._orders.pop(order.order_id, None)
+                ids = self._by_run.get(order.run_id)
+                if ids is not None:
+                    ids.discard(order.order_id)
+                    if not ids:
+                        del self._by_run[order.run_id]
+
+    def place(self, run_id: str, side: str, card_id: int, price: float,
+              row: Optional[dict] = None) -> Order:
+        order = Order(self.broker.next_order_id(), run_id, side, card_id, price, row)
+        messages = []
+        with self._stripe(card_id):
+            book = self._book(card_id)
+            while True:
+                resting, cancelled = book.match(order)
+                for own in cancelled:
+                    message = {"type": "cancelled", "order_id": own.order_id}
+                    if self.broker.close(own.order_id, own.run_id, message):
+                        messages.append((own.run_id, message))
+                if resting is None:
+                    self._index(add=[order], drop=cancelled)
+                    break
+                self._index(drop=[resting] + cancelled)
+                fill = {"type": "fill", "card_id": card_id, "price": resting.price,
+                        "row": (resting if side == BID else order).row}
+                resting_fill = {**fill, "order_id": resting.order_id, "side": resting.side}
+                if self.broker.close(resting.order_id, resting.run_id, resting_fill):
+                    order_fill = {**fill, "order_id": order.order_id, "side": side}
+                    self.broker.close(order.order_id, run_id, order_fill)
+                    messages += [(resting.run_id, resting_fill), (run_id, order_fill)]
+                    break
+                order.live = True  # its session closed the resting order from another worker
+
+        for owner, message in messages:
+            self.broker.publish(mailbox(owner), message)
+        return order
+
+    def cancel(self, order_id: int, run_id: str) -> bool:
+        """Pull a resting order; False if it already filled or isn't yours."""
+        order = self._orders.get(order_id)
+        if order is None or order.run_id != run_id:
+            return False
+        with self._stripe(order.card_id):
+            if not order.live:
+                return False
+            order.live = False
+            self._book(order.card_id)._count(order, -1)
+            self._index(drop=[order])
+            return self.broker.close(order_id, run_id, {"type": "cancelled", "order_id": order_id})
+
+    def open_orders(self, run_id: str) -> List[Order]:
+        with self._index_lock:
+            return [self._orders[i] for i in sorted(self._by_run.get(run_id, ()))]
+
+    def listings(self, limit: int = 50) -> List[dict]:
+        """Top of book for every card with resting orders; cards for sale first, cheapest first."""
+        rows = []
+        for card_id, book in list(self._books.items()):
+            with self._stripe(card_id):
+                ask, bid = book.best_ask(), book.best_bid()
+                if ask is None and bid is None:
+                    continue
+                rows.append({
+                    "card_id": card_id,
+                    "best_ask": ask.price if ask else None,
+                    "asks": book.n_asks,
+                    "best_bid": bid.price if bid else None,
+                    "bids": book.n_bids,
+                })
+        rows.sort(key=lambda r: (r["best_ask"] is None, r["best_ask"] or 0.0, r["card_id"]))
+        return rows[:limit]
+
+
+@lru_cache(maxsize=1)
+def get_ledger() -> TradeLedger:
+    return TradeLedger(LEDGER_PATH)
+
+
+@lru_cache(maxsize=1)
+def get_broker():
+    if os.environ.get("COLLECTOR_RPG_BROKER") == "sqlite":
+        return SqliteBroker(DATA_DIR / "broker.sqlite3", get_ledger())
+    return LocalBroker(get_ledger())
+
+
+@lru_cache(maxsize=1)
+def get_trade_night() -> TradeNight:
+    """The Trade Night market every session in this worker trades on."""
+    return TradeNight(get_broker())
@@ -0,0 +1,261 @@
+"""Undo, redo and named what-if branches for a locked-in run.
+
+``actions`` snapshots the run after every action onto a ``Timeline``.
+Snapshots share everything they can with the live run:
+
+- The collection and the action log only ever grow between snapshots, so a
+  snapshot keeps just their lengths (and the collection's ``version``).
+  Undo truncates them and parks the dropped rows on the step being left;
+  redo appends them back. Either way the cost is the rows one action added,
+  whatever the size of the collection.
+- Cards, Dollar Box arrays and collection rows are never changed in place
+  (a bin scan replaces its arrays), so snapshots hold them by reference.
+- The small containers in the player (attributes, badges, tactics, ...) and
+  the encounter's history are copied, and the run RNG is packed into
+  2.5 KB of bytes.
+
+Taking a different action after an undo throws the redo steps away and forks
+the run: it gets a new ``run_id``, so the leaderboard and the session store
+treat it as a new run and the old run keeps the log it was scored on.
+Trade Night orders involve other players, so placing or settling one starts
+the timeline afresh, and undo is off while any order is open.
+
+A named branch is a full, self-contained copy of one moment (collection and
+log copied by reference to their rows). Switching to a branch forks the run
+the same way.
+"""
+
+import copy
+import sys
+import uuid
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from .collection import Collection
+from .sessions import mark_changed
+from .telemetry import emit
+
+UNDO_LIMIT = 200  # steps kept; the oldest fall off
+
+# Player values the timeline handles itself rather than copying
+SHARED_KEYS = ("collection", "log", "run_id")
+
+
+def _pack_rng(rng) -> Optional[tuple]:
+    if rng is None or not hasattr(rng, "getstate"):
+        return None
+    version, internal, gauss = rng.getstate()
+    return version, array("I", internal).tobytes(), gauss
+
+
+def _unpack_rng(rng, packed: tuple):
+    version, internal, gauss = packed
+    rng.setstate((version, tuple(array("I", internal)), gauss))
+
+
+def _copy_player(player: dict) -> dict:
+    """The player minus the shared keys, with its small containers copied."""
+    return {k: (copy.copy(v) if isinstance(v, (list, dict)) else v)
+            for k, v in player.items() if k not in SHARED_KEYS}
+
+
+def _copy_encounter(enc):
+    # copy.copy, not dataclasses.replace: encounters carry attributes outside their fields
+    if enc is None:
+        return None
+    enc = copy.copy(enc)
+    enc.history = list(enc.history)
+    return enc
+
+
+@dataclass
+class Snapshot:
+    action: str                 # the action that led here
+    player: dict                # see _copy_player
+    rows: int                   # collection length and version
+    version: int
+    log: int                    # action log length
+    encounter: Optional[object]
+    rng: Optional[tuple]
+    dollar_bin: Optional[object]
+    nbytes: int = 0
+    # Filled in while this step is undone: what redo appends back
+    tail_rows: Optional[List[dict]] = None
+    tail_log: Optional[list] = None
+
+
+def _sizeof(snap: Snapshot) -> int:
+    """Bytes this snapshot holds on its own (shared objects aren't counted)."""
+    size = sys.getsizeof(snap.player) + sum(
+        sys.getsizeof(v) for v in snap.player.values() if isinstance(v, (list, dict))
+    )
+    if snap.encounter is not None:
+        size += sys.getsizeof(snap.encounter.history) + sum(map(sys.getsizeof, snap.encounter.history))
+    if snap.rng is not None:
+        size += len(snap.rng[1])
+    for tail in (snap.tail_rows, snap.tail_log):
+        if tail:
+            size += sys.getsizeof(tail)
+    return size
+
+
+@dataclass
+class Branch:
+    name: str
+    snapshot: Snapshot
+    rows: List[dict]
+    log: list
+    nbytes: int
+
+
+class Timeline:
+    def __init__(self, limit: int = UNDO_LIMIT):
+        self.limit = limit
+        self.steps: Deque[Snapshot] = deque()
+        self.cursor = -1
+        self.branches: Dict[str, Branch] = {}
+        self.nbytes = 0  # held by steps and branches beyond what they share with the run
+
+    def _push(self, snap: Snapshot):
+        if len(self.steps) >= self.limit:
+            self.nbytes -= self.steps.popleft().nbytes
+        self.steps.append(snap)
+        self.nbytes += snap.nbytes
+        self.cursor = len(self.steps) - 1
+
+    def _resize(self, snap: Snapshot):
+        old, snap.nbytes = snap.nbytes, _sizeof(snap)
+        self.nbytes += snap.nbytes - old
+
+    # ----- Recording -----
+
+    def _take(self, state, action: str) -> Snapshot:
+        player = state.player
+        snap = Snapshot(
+            action=action,
+            player=_copy_player(player),
+            rows=len(player["collection"]),
+            version=player["collection"].version,
+            log=len(player["log"]),
+            encounter=_copy_encounter(state.encounter),
+            rng=_pack_rng(getattr(state, "rng", None)),
+            dollar_bin=copy.copy(getattr(state, "dollar_bin", None)),
+        )
+        snap.nbytes = _sizeof(snap)
+        return snap
+
+    def reset(self, state, action: str = "start"):
+        """Forget every step; the run as it is now becomes the first one."""
+        self.nbytes -= sum(snap.nbytes for snap in self.steps)
+        self.steps.clear()
+        self._push(self._take(state, action))
+
+    def record(self, state, action: str):
+        """Snapshot the run after ``action``; forks the run if it undid anything first."""
+        if self.cursor < 0:
+            return
+        if self.undone:
+            for _ in range(len(self.steps) - 1 - self.cursor):
+                self.nbytes -= self.steps.pop().nbytes
+            fork(state.player)
+        self._push(self._take(state, action))
+
+    # ----- Undo / redo -----
+
+    @property
+    def undone(self) -> bool:
+        """True while there are steps to redo (the run is behind its latest state)."""
+        return self.cursor < len(self.steps) - 1
+
+    def can_undo(self, state) -> bool:
+        return self.cursor > 0 and not state.player.get("orders")
+
+    def can_redo(self) -> bool:
+        return self.undone
+
+    def _restore(self, state, snap: Snapshot):
+        player = state.player
+        keep = {k: player[k] for k in SHARED_KEYS}
+        player.clear()
+        player.update(_copy_player(snap.player))
+        player.update(keep)
+        mark_changed(player)
+        state.encounter = _copy_encounter(snap.encounter)
+        if snap.rng is not None and getattr(state, "rng", None) is not None:
+            _unpack_rng(state.rng, snap.rng)
+        state.dollar_bin = copy.copy(snap.dollar_bin)
+
+    def undo(self, state) -> bool:
+        if not self.can_undo(state):
+            return False
+        leaving, target = self.steps[self.cursor], self.steps[self.cursor - 1]
+        player = state.player
+        leaving.tail_rows = player["collection"].truncate(target.rows, target.version)
+        leaving.tail_log = player["log"][target.log:]
+        del player["log"][target.log:]
+        self._resize(leaving)
+        self._restore(state, target)
+        self.cursor -= 1
+        emit("undo", player["run_id"], "undo", self.cursor, self.nbytes)
+        return True
+
+    def redo(self, state) -> bool:
+        if not self.can_redo():
+            return False
+        target = self.steps[self.cursor + 1]
+        player = state.player
+        player["collection"].extend(target.tail_rows)
+        player["collection"].version = target.version
+        player["log"].extend(target.tail_log)
+        target.tail_rows = target.tail_log = None
+        self._resize(target)
+        self._restore(state, target)
+        self.cursor += 1
+        emit("undo", player["run_id"], "redo", self.cursor, self.nbytes)
+        return True
+
+    # ----- Branches -----
+
+    def save_branch(self, name: str, state) -> Optional[Branch]:
+        player = state.player
+        if self.cursor < 0 or player.get("orders"):
+            return None
+        snap = self._take(state, f"branch {name}")
+        rows = list(player["collection"].rows())
+        log = list(player["log"])
+        branch = Branch(name, snap, rows, log, snap.nbytes + sys.getsizeof(rows) + sys.getsizeof(log))
+        old = self.branches.get(name)
+        self.nbytes += branch.nbytes - (old.nbytes if old else 0)
+        self.branches[name] = branch
+        emit("undo", player["run_id"], "branch", self.cursor, self.nbytes)
+        return branch
+
+    def switch_branch(self, name: str, state) -> bool:
+        """Go to a saved branch; it carries on as a new run."""
+        branch = self.branches.get(name)
+        if branch is None or state.player.get("orders"):
+            return False
+        player = state.player
+        player["collection"] = Collection(branch.rows)
+        player["log"] = list(branch.log)
+        self._restore(state, branch.snapshot)
+        fork(player)
+        self.reset(state, f"branch {name}")
+        emit("undo", player["run_id"], "switch", self.cursor, self.nbytes)
+        return True
+
+    def stats(self) -> dict:
+        return {"steps": len(self.steps), "cursor": self.cursor, "branches": len(self.branches),
+                "bytes": self.nbytes}
+
+
+def fork(player: dict):
+    """Give the run a new id; the old one keeps its log on the leaderboard."""
+    player["run_id"] = uuid.uuid4().hex
+
+
+def timeline_for(state) -> Optional[Timeline]:
+    """The session's timeline, if it keeps one (headless replays don't)."""
+    return getattr(state, "timeline", None)
@@ -0,0 +1,137 @@
+"""Process-wide valuation service.
+
+Quotes are multipliers on a card's own ``true_value``, so boss-table premiums
+and old collection rows revalue the same way as fresh catalog cards. For each
+pricing moment (show day and time block) the service builds one catalog-wide
+table of point multipliers from the market index and 95% interval bounds,
+with the interval width taken from recent comps dispersion. Tables sit in a
+small LRU with a TTL, and a batch lookup is a single fancy-index into the
+current table.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from .comps import get_comps
+from .market import get_market, tick_for
+
+SPREAD_WINDOW_DAYS = 90
+NO_COMPS_HALF_WIDTH = 0.5    # log-space half width when a card has no recent sales
+MIN_HALF_WIDTH = 0.05
+MAX_HALF_WIDTH = 0.7
+
+AsOf = Tuple[int, str]  # (show day, time block)
+
+
+@dataclass
+class Quote:
+    value: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+
+
+@lru_cache(maxsize=4)
+def _comp_half_width(day: int) -> np.ndarray:
+    """Log half width of the 95% interval per card, from comps up to ``day``."""
+    store = get_comps()
+    now = float(day - 1)
+    in_window = (store.days >= now - SPREAD_WINDOW_DAYS) & (store.days <= now)
+    logp = np.log(np.maximum(store.prices, 0.01)) * in_window
+
+    def per_card(x):
+        cs = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+        return cs[store.offsets[1:]] - cs[store.offsets[:-1]]
+
+    n = per_card(in_window)
+    s1 = per_card(logp)
+    s2 = per_card(logp * logp)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.where(n > 1, (s2 - s1 * s1 / np.maximum(n, 1)) / np.maximum(n - 1, 1), 0.0)
+        half = 1.96 * np.sqrt(np.maximum(var, 0.0) / np.maximum(n, 1))
+    half = np.where(n > 1, half, NO_COMPS_HALF_WIDTH)
+    return np.clip(half, MIN_HALF_WIDTH, MAX_HALF_WIDTH).astype(np.float32)
+
+
+class ValuationService:
+    def __init__(self, ttl_seconds: float = 60.0, max_tables: int = 8):
+        self.ttl_seconds = ttl_seconds
+        self.max_tables = max_tables
+        self._tables: "OrderedDict[AsOf, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ----- table building -----
+
+    def _ratio(self, as_of: AsOf) -> np.ndarray:
+        """Current value over catalog value, per catalog card."""
+        return get_market().card_ratio(tick_for(*as_of))
+
+    def _half_width(self, as_of: AsOf) -> np.ndarray:
+        return _comp_half_width(as_of[0])
+
+    def _table(self, as_of: AsOf):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tables.get(as_of)
+            if entry is not None and entry[0] > now:
+                self._tables.move_to_end(as_of)
+                self.hits += 1
+                return entry[1:]
+            self.misses += 1
+
+        ratio = self._ratio(as_of)
+        half = self._half_width(as_of)
+        table = (ratio, ratio * np.exp(-half), ratio * np.exp(half))
+
+        with self._lock:
+            self._tables[as_of] = (now + self.ttl_seconds,) + table
+            self._tables.move_to_end(as_of)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return table
+
+    def invalidate(self):
+        with self._lock:
+            self._tables.clear()
+
+    # ----- batch API -----
+
+    def quote(self, card_ids: np.ndarray, as_of: AsOf) -> Quote:
+        """Multipliers for a batch of catalog ids; -1 (no catalog card) quotes 1.0."""
+        ids = np.asarray(card_ids, dtype=np.int64)
+        ratio, low, high = self._table(as_of)
+        known = ids >= 0
+        safe = np.where(known, ids, 0)
+        return Quote(
+            value=np.where(known, ratio[safe], 1.0),
+            low=np.where(known, low[safe], 1.0),
+            high=np.where(known, high[safe], 1.0),
+        )
+
+    def value(self, card_ids: np.ndarray, base_values: np.ndarray, as_of: AsOf) -> Quote:
+        """Dollar estimates for cards whose own value is ``base_values``."""
+        q = self.quote(card_ids, as_of)
+        base = np.asarray(base_values, dtype=np.float64)
+        return Quote(value=base * q.value, low=base * q.low, high=base * q.high)
+
+    def value_cards(self, cards: Iterable, as_of: AsOf) -> Quote:
+        cards = list(cards)
+        ids = np.fromiter((-1 if c.card_id is None else c.card_id for c in cards), np.int64, len(cards))
+        base = np.fromiter((c.true_value for c in cards), np.float64, len(cards))
+        return self.value(ids, base, as_of)
+
+    def value_collection(self, collection, as_of: AsOf) -> Quote:
+        return self.value(collection.column("card_id"), collection.column("true_value"), as_of)
+
+
+@lru_cache(maxsize=1)
+def get_valuation() -> ValuationService:
+    """The one valuation service shared by every session in this process."""
+    return ValuationService()
@@ -0,0 +1,206 @@
+"""Replay verification for leaderboard runs.
+
+A submitted run carries its seed, the build it locked in and its action log.
+``verify`` replays that log through ``actions`` on a fresh run state bound
+with ``bind_session``, under the config version the build records (read
+back from the config archive; a run from a version this verifier doesn't
+have is rejected). The build must pass the Intro page's rules, every
+logged action must still be legal when replayed, and the claimed scores must
+be ones the replay actually reached. A Trade Night fill must match the one
+the trade ledger recorded for that order of this run. The ledger is a file
+under ``DATA_DIR``; a verifier that can't see it leaves runs that traded
+pending rather than failing them. ``verify_all`` fans a queue of
+submissions out over a process pool. Each worker loads the shared catalog
+and comps once, up front.
+
+    python -m collector_rpg.verify            # check every pending leaderboard run
+"""
+
+import argparse
+import copy
+import json
+import random
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from .actions import ACTIONS, lock_build
+from .catalog import get_catalog
+from .comps import get_comps
+from .config import ConfigError, config_for, use_config
+from .leaderboard import LEADERBOARD_PATH, ensure_schema, player_row
+from .rules import RunState, base_player_state, bind_session
+from .telemetry import muted
+from .tradenight import LEDGER_PATH
+
+PROFIT_TOLERANCE = 0.01
+VERIFY_CHUNKSIZE = 16
+MAX_LOG_LENGTH = 50_000
+
+
+class ReplayError(Exception):
+    pass
+
+
+class LedgerUnavailable(ReplayError):
+    """The run traded, and this process can't see the trade ledger to check its fills."""
+
+
+@dataclass
+class Submission:
+    run_id: str
+    seed: int
+    build: dict
+    log: list
+    claimed: dict  # leaderboard row: profit, xp, level, badges, elite, champion, whale_tick
+
+
+@dataclass
+class Verdict:
+    run_id: str
+    ok: bool
+    note: str = ""
+    pending: bool = False  # couldn't be checked here; leave it queued
+
+
+def submission_for(player: dict) -> Submission:
+    """What a live run would submit right now."""
+    return Submission(
+        run_id=player["run_id"],
+        seed=player["seed"],
+        build=player["build"],
+        log=list(player["log"]),
+        claimed=player_row(player),
+    )
+
+
+def replay(seed: int, build: dict, log: list, run_id: Optional[str] = None) -> Tuple[dict, float]:
+    """Play a run back from scratch; returns the final player and peak profit."""
+    if len(log) > MAX_LOG_LENGTH:
+        raise ReplayError(f"log has {len(log)} actions (max {MAX_LOG_LENGTH})")
+
+    if not LEDGER_PATH.exists() and any(entry[0] == "settle" for entry in log):
+        raise LedgerUnavailable(f"no trade ledger at {LEDGER_PATH} to check the run's Trade Night fills")
+
+    version = build.get("config_version")
+    if version is None:
+        raise ReplayError("the build doesn't record its config version; can't replay it")
+    try:
+        config = config_for(version)
+    except ConfigError as exc:
+        raise ReplayError(f"played under config version {version}, "
+                          f"which this verifier doesn't have: {exc}") from exc
+
+    player = base_player_state()
+    player.update(copy.deepcopy({key: value for key, value in build.items() if key != "config_version"}))
+    player["seed"] = seed
+    if run_id is not None:
+        player["run_id"] = run_id  # Trade Night fills are checked against the run that made them
+    state = RunState(player=player, rng=random.Random(seed))
+
+    with bind_session(state), use_config(config), muted():
+        problems = lock_build()
+        if problems:
+            raise ReplayError("bad build: " + " ".join(problems))
+        peak = player["profit"]
+        for step, entry in enumerate(log):
+            name, *args = entry
+            action = ACTIONS.get(name)
+            if action is None:
+                raise ReplayError(f"unknown action {name!r} at step {step}")
+            before = len(player["log"])
+            action(*args)
+            if len(player["log"]) == before:
+                raise ReplayError(f"{name} at step {step} isn't legal on replay")
+            peak = max(peak, player["profit"])
+    return player, peak
+
+
+def verify(sub: Submission) -> Verdict:
+    try:
+        player, peak = replay(sub.seed, sub.build, sub.log, sub.run_id)
+    except LedgerUnavailable as exc:
+        return Verdict(sub.run_id, False, str(exc), pending=True)
+    except ReplayError as exc:
+        return Verdict(sub.run_id, False, str(exc))
+    except Exception as exc:  # a malformed log can fail anywhere in the rules
+        return Verdict(sub.run_id, False, f"replay crashed: {exc!r}")
+
+    got = player_row(player)
+    claimed = sub.claimed
+    if claimed["profit"] > round(peak, 2) + PROFIT_TOLERANCE:
+        return Verdict(sub.run_id, False, f"claimed profit {claimed['profit']:.2f}, replay peaked at {peak:.2f}")
+    for key in ("xp", "level", "badges", "elite", "champion", "whale_tick"):
+        if claimed[key] != got[key]:
+            return Verdict(sub.run_id, False, f"claimed {key} {claimed[key]!r}, replay reached {got[key]!r}")
+    return Verdict(sub.run_id, True)
+
+
+def _warm_worker():
+    get_catalog()
+    get_comps()
+
+
+def verify_all(submissions: Iterable[Submission], workers: Optional[int] = None,
+               chunksize: int = VERIFY_CHUNKSIZE) -> Iterator[Verdict]:
+    """Verify submissions on a process pool, yielding verdicts in input order."""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+        yield from pool.map(verify, submissions, chunksize=chunksize)
+
+
+# ---------- Leaderboard queue ----------
+
+PENDING_SQL = (
+    "SELECT run_id, seed, build, log, profit, xp, level, badges, elite, champion, whale_tick, updated_at "
+    "FROM runs WHERE verified IS NULL AND log IS NOT NULL ORDER BY updated_at"
+)
+# Only stamp the version we replayed; a newer upsert has already re-queued the run
+MARK_SQL = "UPDATE runs SET verified = ?, verify_note = ? WHERE run_id = ? AND updated_at = ?"
+
+
+def pending(conn: sqlite3.Connection, limit: Optional[int] = None):
+    sql = PENDING_SQL + (f" LIMIT {int(limit)}" if limit else "")
+    for run_id, seed, build, log, *scores, updated_at in conn.execute(sql).fetchall():
+        claimed = dict(zip(("profit", "xp", "level", "badges", "elite", "champion", "whale_tick"), scores))
+        sub = Submission(run_id, seed, json.loads(build or "null") or {}, json.loads(log), claimed)
+        yield sub, updated_at
+
+
+def verify_pending(db_path: Path, workers: Optional[int] = None,
+                   limit: Optional[int] = None) -> Tuple[int, int, int]:
+    """Verify every pending run in a leaderboard file; returns (passed, failed, left pending)."""
+    with closing(sqlite3.connect(db_path, timeout=30)) as conn:
+        with conn:
+            ensure_schema(conn)
+        queue = list(pending(conn, limit))
+        versions = {sub.run_id: updated_at for sub, updated_at in queue}
+        passed = failed = left = 0
+        marks = []
+        for verdict in verify_all((sub for sub, _ in queue), workers=workers):
+            if verdict.pending:
+                left += 1
+                continue
+            passed += verdict.ok
+            failed += not verdict.ok
+            marks.append((int(verdict.ok), verdict.note, verdict.run_id, versions[verdict.run_id]))
+        with conn:
+            conn.executemany(MARK_SQL, marks)
+    return passed, failed, left
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay and verify pending leaderboard runs.")
+    parser.add_argument("--db", type=Path, default=LEADERBOARD_PATH, help="leaderboard file (default: the app's)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--limit", type=int, default=None, help="verify at most this many runs")
+    args = parser.parse_args(argv)
+
+    passed, failed, left = verify_pending(args.db, workers=args.workers, limit=args.limit)
+    print(f"{passed} run(s) verified, {failed} rejected, {left} left pending.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import copy
+import os
+import random
+import tempfile
+
+# The engine reads these on import; keep test runs out of the real data dir
+os.environ.setdefault("COLLECTOR_RPG_DATA", tempfile.mkdtemp(prefix="collector_rpg_test_"))
+os.environ.setdefault("COLLECTOR_RPG_TELEMETRY", "off")
+
+import pytest  # noqa: E402
+
+from collector_rpg import actions  # noqa: E402
+from collector_rpg.rules import RunState, base_player_state, bind_session  # noqa: E402
+from collector_rpg.tournament import DEFAULT_BUILD  # noqa: E402
+from collector_rpg.tradenight import get_broker, get_trade_night  # noqa: E402
+from collector_rpg.undo import Timeline  # noqa: E402
+
+
+def new_run(seed: int = 7, **build) -> RunState:
+    player = base_player_state()
+    player.update(copy.deepcopy(DEFAULT_BUILD))
+    player.update(build)
+    player["seed"] = seed
+    state = RunState(player=player, rng=random.Random(seed))
+    state.timeline = Timeline()
+    return state
+
+
+@pytest.fixture
+def run():
+    """A locked-in run with the default build, bound as the session."""
+    state = new_run()
+    with bind_session(state):
+        assert actions.lock_build() == []
+        yield state
+
+
+@pytest.fixture
+def market():
+    """A fresh Trade Night market and broker."""
+    get_trade_night.cache_clear()
+    get_broker.cache_clear()
+    yield get_trade_night()
+    get_trade_night.cache_clear()
+    get_broker.cache_clear()
@@ -0,0 +1,118 @@
+"""A Redis stand-in for tests: the handful of commands ``RedisStore`` sends, over real RESP2 sockets.
+
+Hashes only, per numbered database, with WATCH/MULTI/EXEC checked against a
+per-key write counter. EXPIRE is accepted and ignored. Anything else is an
+error reply, as a real server would send for a command it doesn't know.
+"""
+
+import socket
+import socketserver
+import threading
+from collections import defaultdict
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def _reply(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, Exception):
+            return b"-ERR %s\r\n" % str(value).encode()
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._reply(v) for v in value)
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        server = self.server
+        server.clients.add(self.connection)
+        db, watched, queued = 0, {}, None
+        try:
+            while True:
+                args = self._command()
+                if args is None:
+                    return
+                name = args[0].upper()
+                with server.lock:
+                    if name == b"SELECT":
+                        db, out = int(args[1]), "OK"
+                    elif name == b"WATCH":
+                        watched = {(db, k): server.writes[db, k] for k in args[1:]}
+                        out = "OK"
+                    elif name == b"UNWATCH":
+                        watched, out = {}, "OK"
+                    elif name == b"MULTI":
+                        queued, out = [], "OK"
+                    elif name == b"EXEC":
+                        if any(server.writes[key] != n for key, n in watched.items()):
+                            out = None
+                            self.wfile.write(b"*-1\r\n")
+                        else:
+                            out = [server.run(db, cmd) for cmd in queued]
+                        queued, watched = None, {}
+                        if out is None:
+                            continue
+                    elif queued is not None:
+                        queued.append(args)
+                        out = "QUEUED"
+                    else:
+                        out = server.run(db, args)
+                self.wfile.write(self._reply(out))
+        finally:
+            server.clients.discard(self.connection)
+
+
+class MiniRedis(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.hashes = defaultdict(dict)   # (db, key) -> {field: value}
+        self.writes = defaultdict(int)    # (db, key) -> writes so far, for WATCH
+        self.clients = set()
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.02}, daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def run(self, db: int, args: list):
+        name, key = args[0].upper(), (db, args[1]) if len(args) > 1 else None
+        if name == b"PING":
+            return "PONG"
+        if name == b"HGET":
+            return self.hashes[key].get(args[2])
+        if name == b"HMGET":
+            return [self.hashes[key].get(f) for f in args[2:]]
+        if name == b"HSET":
+            fields = args[2:]
+            self.hashes[key].update(zip(fields[::2], fields[1::2]))
+            self.writes[key] += 1
+            return len(fields) // 2
+        if name == b"EXPIRE":
+            return 1
+        return ValueError(f"unknown command '{args[0].decode()}'")
+
+    def drop_clients(self):
+        """Close every client connection, as a server restart would."""
+        for conn in list(self.clients):
+            conn.shutdown(socket.SHUT_RDWR)
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
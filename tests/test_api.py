@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from collector_rpg import actions
+from collector_rpg.api import Api, ApiError, RunCache
+from collector_rpg.rules import RunState, bind_session
+from collector_rpg.sessions import MemoryStore, SessionSync
+from collector_rpg.tournament import DEFAULT_BUILD
+
+
+@pytest.fixture
+def api():
+    runs = RunCache(MemoryStore(), flush_interval=0)
+    yield Api(runs)
+    runs.close()
+
+
+def _run(api) -> str:
+    status, payload = api.handle("POST", "/runs", json.dumps({"build": DEFAULT_BUILD}).encode())
+    assert status == 201
+    return payload["run_id"]
+
+
+def _act(api, run_id, *batch):
+    body = json.dumps([{"action": name, "args": list(args)} for name, *args in batch]).encode()
+    status, payload = api.handle("POST", f"/runs/{run_id}/actions", body)
+    assert status == 200
+    return payload
+
+
+def test_collection_rows(api):
+    run_id = _run(api)
+    _act(api, run_id, ("sweep", {"zones": ["Vintage Alley"], "encounters": 5}))
+    status, view = api.handle("GET", f"/runs/{run_id}/collection?rows=2", None)
+    assert status == 200 and len(view["rows"]) == min(2, view["cards"])
+    assert api.handle("GET", f"/runs/{run_id}/collection?rows=-3", None)[1]["rows"] == []
+
+
+@pytest.mark.parametrize("query", ["rows=abc", "rows=1.5", "rows=%20"])
+def test_a_bad_rows_count_is_a_400(api, query):
+    run_id = _run(api)
+    with pytest.raises(ApiError) as err:
+        api.handle("GET", f"/runs/{run_id}/collection?{query}", None)
+    assert err.value.status == 400
+
+
+def test_unknown_runs_and_routes_are_404s(api):
+    for target in ("/runs/" + "0" * 32, "/nope"):
+        with pytest.raises(ApiError) as err:
+            api.handle("GET", target, None)
+        assert err.value.status == 404
+
+
+def test_a_batch_reports_each_action(api):
+    run_id = _run(api)
+    payload = _act(api, run_id, ("walk", "Vintage Alley"), ("move", "nope"), ("offer", 1e9))
+    assert [r["ok"] for r in payload["results"]] == [True, False, False]
+
+
+def test_market_actions_are_not_open_to_clients(api):
+    run_id = _run(api)
+    fill = {"type": "fill", "order_id": 1, "price": 1e6, "side": "ask", "card_id": 0, "row": {"card_id": 0}}
+    body = json.dumps({"action": "settle", "args": [fill]}).encode()
+    with pytest.raises(ApiError) as err:
+        api.handle("POST", f"/runs/{run_id}/actions", body)
+    assert err.value.status == 400
+
+
+def test_a_run_evicted_while_in_use_keeps_its_actions():
+    store = MemoryStore()
+    runs = RunCache(store, capacity=1, flush_interval=60.0)
+    api = Api(runs)
+    try:
+        first = _run(api)
+        live = runs.get(first)  # a request has it, but hasn't taken its lock yet
+        _run(api)               # another request's run evicts it
+        with live.lock:
+            with bind_session(live.state):
+                assert actions.walk_to("Vintage Alley")
+            runs.changed(live)
+        loaded = RunState()
+        assert SessionSync(store, first).pull(loaded)
+        assert loaded.player["log"][-1] == ["walk", "Vintage Alley"]
+    finally:
+        runs.close()
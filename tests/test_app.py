@@ -0,0 +1,91 @@
+import io
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from collector_rpg import actions  # noqa: E402
+from collector_rpg.leaderboard import Leaderboard  # noqa: E402
+from collector_rpg.rules import bind_session  # noqa: E402
+from collector_rpg.sessions import MemoryStore, mark_changed  # noqa: E402
+
+from conftest import new_run  # noqa: E402
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+
+
+def _locked_app(monkeypatch) -> AppTest:
+    monkeypatch.chdir(APP.parent)  # the Intro page loads its art by relative path
+    at = AppTest.from_file(str(APP), default_timeout=120).run()
+    at.text_input[0].set_value("Tester").run()
+    at.slider[0].set_value(100).run()
+    for i in range(4, 10):
+        at.slider[i].set_value(50).run()
+    next(b for b in at.button if b.label.startswith("Lock in build")).click().run()
+    assert not at.exception
+    assert at.session_state.player["build_locked"]
+    return at
+
+
+def test_analytics_is_for_operators_only(monkeypatch):
+    monkeypatch.delenv("COLLECTOR_RPG_OPERATOR", raising=False)
+    at = _locked_app(monkeypatch)
+    assert "Analytics" not in at.radio[0].options
+
+    monkeypatch.setenv("COLLECTOR_RPG_OPERATOR", "1")
+    at.run()
+    assert "Analytics" in at.radio[0].options
+
+
+def test_the_run_is_submitted_only_when_its_score_changes(monkeypatch):
+    submitted = []
+    original = Leaderboard.submit
+    monkeypatch.setattr(Leaderboard, "submit", lambda self, p: (submitted.append(p["xp"]), original(self, p)))
+    at = _locked_app(monkeypatch)
+    count = len(submitted)
+    assert count == 1
+    at.run()
+    at.run()
+    assert len(submitted) == count
+
+    at.session_state.player["xp"] += 5
+    at.run()
+    assert len(submitted) == count + 1
+
+
+def test_a_fill_from_another_session_is_settled_and_announced(monkeypatch, market):
+    seller = new_run(seed=21)
+    with bind_session(seller):
+        rows = b"name,year,set,true_value,ask_price,card_id\nA,1999,Topps,5,4,5\nB,1999,Topps,5,4,5\n"
+        assert actions.seed_collection(io.BytesIO(rows), "csv").added == 2
+        assert actions.lock_build() == []
+        assert actions.post_ask(0, 1000.0)  # puts the card on the board
+
+    at = _locked_app(monkeypatch)
+    at.radio[0].set_value("Show Floor").run()
+    next(s for s in at.selectbox if "Trade Night" in s.options).set_value("Trade Night").run()
+    at.number_input(key="tn_bid_price").set_value(10.0).run()
+    next(b for b in at.button if b.label == "Post bid").click().run()
+    assert at.session_state.player["orders"]
+
+    with bind_session(seller):
+        assert actions.post_ask(0, 10.0)  # crosses the resting bid
+    at.run()
+    assert not at.session_state.player["orders"]
+    assert any("Trade Night: you bought" in i.value for i in at.info)
+
+
+def test_a_store_outage_doesnt_break_the_rerun(monkeypatch):
+    at = _locked_app(monkeypatch)
+
+    def unreachable(self, run_id, blob, expected):
+        raise ConnectionRefusedError("session store is down")
+
+    monkeypatch.setattr(MemoryStore, "put", unreachable)
+    at.session_state.player["xp"] += 5
+    mark_changed(at.session_state.player)
+    at.run()
+    assert not at.exception
+    assert any("Couldn't reach the session store" in w.value for w in at.warning)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from collector_rpg import actions
+from collector_rpg.bins import BIN_PRICE_POINTS, SLEEPERS_PER_SCAN, generate_bin, scan_bin, scans_for
+from collector_rpg.catalog import get_catalog
+from collector_rpg.verify import submission_for, verify
+
+
+def test_a_bin_is_cheap_modern_stock_at_box_prices(run):
+    b = generate_bin(run.player, size=2000, rng=np.random.default_rng(1))
+    catalog = get_catalog()
+    assert len(b) == 2000 and b.scans_left == scans_for(run.player)
+    assert (catalog.era_idx[b.card_ids] != 0).all()
+    assert np.isin(b.asks, BIN_PRICE_POINTS).all()
+
+
+def test_scans_surface_the_best_reads_and_never_repeat_cards(run):
+    b = generate_bin(run.player, size=3000, rng=np.random.default_rng(2))
+    rng = np.random.default_rng(3)
+    seen = set()
+    while b.scans_left:
+        before = b.scanned.copy()
+        hits = scan_bin(b, run.player, rng=rng)
+        assert len(hits) == SLEEPERS_PER_SCAN
+        edges = [h["read"] - h["ask"] for h in hits]
+        assert edges == sorted(edges, reverse=True)
+        positions = {h["pos"] for h in hits}
+        assert not positions & seen and not before[list(positions)].any()
+        seen |= positions
+    assert scan_bin(b, run.player, rng=rng) == []
+
+
+def test_a_bin_run_replays(run):
+    assert actions.find_bin()
+    hits = actions.scan_dollar_bin()
+    assert hits
+    assert actions.take_bin_picks([hits[0]["pos"]])
+    assert not actions.take_bin_picks([hits[0]["pos"]])  # already at the counter
+    actions.make_offer(float(run.encounter.cards[0].ask_price))
+    assert verify(submission_for(run.player)).ok
+
+
+def test_picks_must_come_from_the_shown_sleepers(run):
+    assert actions.find_bin()
+    hits = actions.scan_dollar_bin()
+    shown = {h["pos"] for h in hits}
+    hidden = next(pos for pos in range(len(run.dollar_bin)) if pos not in shown)
+    assert not actions.take_bin_picks([hidden])
+    assert not actions.take_bin_picks([])
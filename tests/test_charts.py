@@ -0,0 +1,59 @@
+import numpy as np
+
+from collector_rpg.catalog import get_catalog
+from collector_rpg.charts import CURVE_POINTS, binned, collection_figures, grouped, lttb
+from collector_rpg.collection import Collection
+
+NOW = (1, "Morning")
+
+
+def _collection(n, seed=0):
+    catalog, rng = get_catalog(), np.random.default_rng(seed)
+    ids = rng.integers(0, len(catalog), n)
+    return Collection({"card_id": int(i), "true_value": float(catalog.base_value[i]), "set_name": "Topps",
+                       "ask_price": 1.0, "paid": float(rng.uniform(0, 20)), "zone": f"Zone {i % 7}"}
+                      for i in ids)
+
+
+def test_lttb_keeps_the_ends_and_the_spikes():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 300)
+    y[4321] = 50.0
+    sx, sy = lttb(x, y, 200)
+    assert len(sx) == 200 and (sx[0], sx[-1]) == (0.0, 9999.0)
+    assert (np.diff(sx) > 0).all() and 4321.0 in sx
+    short = np.arange(5.0)
+    assert lttb(short, short, 10)[0] is short
+
+
+def test_binned_counts_everything_and_clips_the_tails():
+    values = np.concatenate([np.linspace(-10, 10, 1000), [1e6, -1e6]])
+    centers, counts = binned(values, 20)
+    assert len(centers) == 20 and counts.sum() == len(values)
+    assert counts[0] >= 2 and counts[-1] >= 2
+    assert binned(np.array([3.0, 3.0]), 4)[1].sum() == 2
+    assert len(binned(np.empty(0), 4)[0]) == 0
+
+
+def test_grouped_folds_the_tail_into_other():
+    labels = ["a", "b", "c", "d", "a"]
+    groups, totals, counts = grouped(labels, np.array([1.0, 5.0, 2.0, 0.5, 1.0]), top=2)
+    assert groups == ["b", "a", "Other"]
+    assert list(totals) == [5.0, 2.0, 2.5] and list(counts) == [1, 2, 2]
+
+
+def test_figures_are_cached_by_collection_version():
+    coll = _collection(100)
+    first = collection_figures(coll, NOW)
+    assert set(first) == {"portfolio", "zone", "era", "set", "margins"}
+    assert collection_figures(coll, NOW) is first
+    coll.extend(_collection(1, seed=1))
+    assert collection_figures(coll, NOW) is not first
+    assert collection_figures(coll, (2, "Morning")) is not collection_figures(coll, NOW)
+
+
+def test_payloads_stay_bounded_as_the_collection_grows():
+    small = collection_figures(_collection(CURVE_POINTS * 2), NOW)
+    large = collection_figures(_collection(100_000, seed=2), NOW)
+    for chart in small:
+        assert len(large[chart]) < 1.5 * len(small[chart]) + 2000
@@ -0,0 +1,87 @@
+import io
+
+import numpy as np
+import pytest
+
+from collector_rpg import actions
+from collector_rpg.collection import Collection
+from collector_rpg.collection_io import (
+    FORMATS,
+    IMPORT_ZONE,
+    CollectionFileError,
+    export_collection,
+    format_for,
+    import_collection,
+)
+from collector_rpg.rules import bind_session
+
+from conftest import new_run
+
+
+def _rows(n):
+    return [{"name": f"Card {i}", "player": f"Player {i}", "year": 1990 + i % 30, "set_name": "Topps",
+             "true_value": 2.5 * i, "ask_price": 2.0 * i, "paid": 1.5 * i, "zone": "Dollar Boxes",
+             "card_id": i if i % 2 else None} for i in range(n)]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_a_collection_round_trips(fmt):
+    original = Collection(_rows(120))
+    buf = io.BytesIO()
+    assert export_collection(original, buf, fmt) == 120
+    buf.seek(0)
+
+    loaded = Collection()
+    report = import_collection(loaded, buf, fmt)
+    assert (report.read, report.added, report.rejected) == (120, 120, 0)
+    assert list(loaded) == list(original)
+    for column in ("card_id", "true_value", "ask_price", "paid"):
+        np.testing.assert_array_equal(loaded.column(column), original.column(column))
+
+
+def test_bad_rows_are_skipped_and_reported():
+    csv = (b"name,year,set,true_value,ask_price,card_id\n"
+           b"Good,1999,Topps,5,4,\n"
+           b"Cheap,1999,Topps,-1,4,\n"
+           b"Future,3000,Topps,5,4,\n"
+           b"Phantom,1999,Topps,5,4,99999999\n"
+           b",1999,Topps,5,4,\n")
+    coll = Collection()
+    report = import_collection(coll, io.BytesIO(csv), "csv")
+    assert (report.added, report.rejected) == (1, 4)
+    assert report.errors[0] == "Row 2: true_value must be zero or more"
+    assert coll[0]["zone"] == IMPORT_ZONE and coll[0]["paid"] == 4.0
+
+
+def test_unreadable_files_raise():
+    with pytest.raises(CollectionFileError, match="missing column"):
+        import_collection(Collection(), io.BytesIO(b"name,year\nX,1999\n"), "csv")
+    with pytest.raises(CollectionFileError, match="Parquet"):
+        import_collection(Collection(), io.BytesIO(b"not parquet"), "parquet")
+    report = import_collection(Collection(), io.BytesIO(b"{oops\n[1]\n"), "jsonl")
+    assert report.rejected == 2
+    with pytest.raises(CollectionFileError):
+        format_for("cards.xlsx")
+    assert format_for("cards.NDJSON") == "jsonl"
+
+
+def test_imports_stop_at_the_row_limit():
+    buf = io.BytesIO()
+    export_collection(Collection(_rows(50)), buf, "jsonl")
+    buf.seek(0)
+    coll = Collection()
+    report = import_collection(coll, buf, "jsonl", max_rows=30)
+    assert report.truncated and report.added == len(coll) == 30
+
+
+def test_seeding_only_before_the_build_is_locked():
+    buf = io.BytesIO()
+    export_collection(Collection(_rows(10)), buf, "csv")
+    state = new_run()
+    with bind_session(state):
+        buf.seek(0)
+        assert actions.seed_collection(buf, "csv").added == 10
+        assert actions.lock_build() == []
+        buf.seek(0)
+        assert actions.seed_collection(buf, "csv") is None
+    assert state.player["imported"] == len(state.player["collection"]) == 10
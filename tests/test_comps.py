@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from collector_rpg.catalog import get_catalog
+from collector_rpg.comps import COMP_WINDOW_DAYS, CompsStore, comp_strength, get_comps, simulate_history
+
+
+@pytest.fixture(scope="module")
+def small():
+    base = np.array([3.0, 40.0, 900.0, 12.5])
+    return base, CompsStore(*simulate_history(base, seed=5))
+
+
+def test_history_is_sorted_per_card(small):
+    base, store = small
+    assert store.offsets[0] == 0 and store.offsets[-1] == len(store.days)
+    for card_id in range(len(base)):
+        days, _ = store._series(card_id)
+        assert (np.diff(days) >= 0).all() and (days <= 0).all()
+
+
+def test_range_queries_match_a_scan(small):
+    base, store = small
+    for card_id in range(len(base)):
+        days, prices = store._series(card_id)
+        for start, end in ((-30, 0), (-200, -100), (-400, 1), (-5, -5)):
+            expect = prices[(days >= start) & (days <= end)]
+            np.testing.assert_array_equal(store.window(card_id, start, end), expect)
+        np.testing.assert_array_equal(store.last_n(card_id, 4, -50.0), prices[days <= -50.0][-4:])
+
+
+def test_median_is_none_without_sales(small):
+    _, store = small
+    assert store.median(0, 10.0, 20.0) is None
+
+
+def test_the_process_store_is_memory_mapped_and_reloads():
+    store = get_comps()
+    assert isinstance(store.prices, np.memmap)
+    assert len(store.offsets) == len(get_catalog()) + 1
+    get_comps.cache_clear()
+    again = get_comps()
+    np.testing.assert_array_equal(again.offsets, store.offsets)
+
+
+def test_comp_strength_follows_the_ask():
+    catalog, store = get_catalog(), get_comps()
+    card_id = next(i for i in range(len(catalog)) if store.median(i, -COMP_WINDOW_DAYS - 1, -1.0))
+    med = store.median(card_id, -COMP_WINDOW_DAYS - 1, -1.0)
+
+    assert comp_strength([catalog.card(card_id, med * 2)], day=0) == 1.0
+    assert comp_strength([catalog.card(card_id, med * 0.5)], day=0) == -1.0
+    assert comp_strength([catalog.card(card_id, med)], day=0) == pytest.approx(0.0, abs=1e-6)
+    assert comp_strength([], day=0) is None
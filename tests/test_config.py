@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+from collector_rpg import actions, config
+from collector_rpg.config import CONFIG_PATH, ConfigError, get_config, last_error, reload_config
+from collector_rpg.rules import bind_session
+from collector_rpg.sweep import SweepRules
+from collector_rpg.verify import submission_for, verify
+from conftest import new_run
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    """A private copy of the game config, live, with its own archive."""
+    for name, value in {"_current": None, "_current_raw": None, "_mtime": None, "_checked": 0.0,
+                        "_error": None, "_archive": {}}.items():
+        monkeypatch.setattr(config, name, value)
+    monkeypatch.setattr(config, "ARCHIVE_DIR", tmp_path / "configs")
+    monkeypatch.setattr(config, "CHECK_INTERVAL_SECONDS", 0.0)
+    path = tmp_path / "game_config.json"
+    path.write_text(CONFIG_PATH.read_text(encoding="utf-8"), encoding="utf-8")
+    reload_config(path)
+    return path
+
+
+def _edit(path, **changes):
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    raw.update(changes)
+    path.write_text(json.dumps(raw), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))  # a new mtime whatever the clock resolution
+
+
+def test_an_edit_without_a_version_bump_is_rejected(config_file):
+    live = get_config()
+    _edit(config_file, dealer_restock_blocks=live.dealer_restock_blocks + 1)
+    assert get_config() is live
+    assert "isn't higher than the live version" in last_error()
+    _edit(config_file, version=live.version + 1, dealer_restock_blocks=live.dealer_restock_blocks + 1)
+    assert get_config().version == live.version + 1 and last_error() is None
+
+
+def test_a_touched_file_is_not_a_change(config_file):
+    live = get_config()
+    _edit(config_file)
+    assert get_config() is live and last_error() is None
+
+
+def test_a_vanished_file_keeps_the_live_config(config_file):
+    live = get_config()
+    config_file.unlink()  # an editor's save, between its delete and its rename
+    with pytest.raises(ConfigError):
+        reload_config(config_file)
+    assert get_config() is live
+    config_file.write_text(json.dumps({**json.loads(CONFIG_PATH.read_text(encoding="utf-8")),
+                                       "version": live.version + 1}), encoding="utf-8")
+    assert get_config().version == live.version + 1
+
+
+def test_a_run_keeps_its_config_through_a_balance_change(config_file):
+    state = new_run()
+    with bind_session(state):
+        assert actions.lock_build() == []
+        old = get_config()
+    _edit(config_file, version=old.version + 1, dealer_restock_blocks=old.dealer_restock_blocks + 3)
+    assert get_config().version == old.version + 1
+    with bind_session(state):
+        assert get_config() is old
+        assert actions.walk_to("Dollar Boxes")
+        assert actions.sweep(SweepRules(encounters=20)).deals > 0
+        sub = submission_for(state.player)
+    assert state.player["build"]["config_version"] == old.version
+    assert verify(sub).ok
+
+
+def test_a_verifier_reads_old_versions_from_the_archive(config_file):
+    state = new_run()
+    with bind_session(state):
+        assert actions.lock_build() == []
+        assert actions.walk_to("Dollar Boxes")
+        actions.sweep(SweepRules(encounters=20))
+        sub = submission_for(state.player)
+    old = get_config().version
+    _edit(config_file, version=old + 1)
+    assert get_config().version == old + 1
+    config._archive.clear()  # a fresh verifier process only has the files
+    assert config.archive_path(old).exists()
+    assert verify(sub).ok
+    sub.build["config_version"] = old + 50
+    verdict = verify(sub)
+    assert not verdict.ok and "config version" in verdict.note
@@ -0,0 +1,68 @@
+import pytest
+
+from collector_rpg import actions
+from collector_rpg.daily import DAILY_TABLES, build_schedule, daily_seed, get_schedule
+from collector_rpg.rules import bind_session
+from collector_rpg.verify import submission_for, verify
+
+from conftest import new_run
+
+DATE = "2026-07-30"
+
+
+def _daily_run(seed):
+    state = new_run(seed, daily=DATE)
+    with bind_session(state):
+        assert actions.lock_build() == []
+    return state
+
+
+def test_the_schedule_is_fixed_by_the_date():
+    assert build_schedule(DATE) == build_schedule(DATE)
+    assert build_schedule(DATE).tables != build_schedule("2026-07-31").tables
+    assert len(build_schedule(DATE)) == DAILY_TABLES
+    with pytest.raises(ValueError):
+        build_schedule("tomorrow")
+
+
+def test_every_session_reads_one_schedule():
+    assert get_schedule(DATE) is get_schedule(DATE)
+
+
+def test_players_share_the_seed_and_tables_but_not_the_cards():
+    a, b = _daily_run(1), _daily_run(2)
+    assert a.player["seed"] == b.player["seed"] == daily_seed(DATE)
+    for state in (a, b):
+        with bind_session(state):
+            assert actions.next_daily_table()
+    assert a.encounter.cards == b.encounter.cards
+    assert a.encounter.cards[0] is not b.encounter.cards[0]
+
+    shared = get_schedule(DATE).tables[0].cards[0]
+    a.encounter.cards[0].ask_price += 100
+    assert get_schedule(DATE).tables[0].cards[0] == shared
+
+
+def test_the_daily_floor_is_fixed_and_runs_out():
+    state = _daily_run(1)
+    with bind_session(state):
+        assert not actions.walk_to("Dollar Boxes")
+        for _ in range(DAILY_TABLES):
+            assert actions.next_daily_table()
+        assert not actions.next_daily_table()
+    assert state.player["daily_next"] == DAILY_TABLES
+
+
+def test_a_daily_run_verifies():
+    state = _daily_run(3)
+    with bind_session(state):
+        actions.next_daily_table()
+        actions.make_offer(float(sum(c.ask_price for c in state.encounter.cards)))
+        actions.next_daily_table()
+    assert verify(submission_for(state.player)).ok
+
+
+def test_an_unknown_date_is_refused():
+    state = new_run(daily="not a date")
+    with bind_session(state):
+        assert actions.lock_build() == ["Unknown Daily National date."]
@@ -0,0 +1,88 @@
+import copy
+
+import pytest
+
+from collector_rpg import actions
+from collector_rpg.encounter import (
+    KINDS,
+    MOVE_CODE,
+    MOVES,
+    _move_rows,
+    apply_tactic,
+    boss_entry,
+    table_kind,
+)
+from collector_rpg.models import Encounter
+from collector_rpg.rules import GYMS, bind_session
+
+
+def _enc(mode):
+    enc = Encounter("Dealer", "neutral", "Vintage Alley", [], 1, True, [])
+    enc.mode = mode
+    return enc
+
+
+def test_moves_compile_with_their_npc_overrides():
+    dealer, kid = _move_rows("Dealer"), _move_rows("Kid Collector")
+    assert dealer[MOVE_CODE["point_flaws"]][:2] == (-22, -0.08)
+    assert kid[MOVE_CODE["point_flaws"]][:2] == (-15, -0.06)
+    assert kid[MOVE_CODE["friendly_chat"]][0] == -18
+    # Lowball only works on dealers and flippers; everyone else takes offence
+    assert kid[MOVE_CODE["lowball_probe"]][:3] == (15, 0.05, -2)
+    assert len(dealer) == len(MOVES)
+
+
+def test_table_kinds_come_from_the_mode():
+    stage = GYMS[0]["id"]
+    assert table_kind(_enc(f"stage:{stage}")) == (KINDS["stage"], stage)
+    assert table_kind(_enc("whale"))[0] is KINDS["whale"]
+    assert table_kind(_enc("normal"))[0] is KINDS["normal"] and table_kind(_enc("bogus"))[0] is KINDS["normal"]
+    assert boss_entry(_enc(f"stage:{stage}"))["name"] == GYMS[0]["name"]
+    assert boss_entry(_enc("normal")) is None
+
+
+@pytest.mark.parametrize("kind, margin, value, won", [
+    ("stage", 0.0, 100.0, True),
+    ("stage", -0.01, 100.0, False),
+    ("influencer", 10.0, 100.0, True),
+    ("influencer", 9.0, 100.0, False),
+    ("whale", 200.0, 5000.0, True),   # big dollars
+    ("whale", 30.0, 150.0, True),     # or a big percent
+    ("whale", 100.0, 1000.0, False),
+    ("normal", 1000.0, 10.0, False),
+])
+def test_boss_tables_are_won_by_their_margin(kind, margin, value, won):
+    assert KINDS[kind].wins(margin, value) is won
+
+
+def test_tactics_play_their_regular_or_boss_numbers(run):
+    assert actions.visit_table(0)
+    enc = run.encounter
+    enc.price_factor = 0.8
+    assert apply_tactic({"name": "Deep Dive", "from_attr": "Card Knowledge"}, boss=False)
+    assert enc.price_factor == 0.75  # down 0.1, floored at 0.75
+    assert apply_tactic({"name": "Deep Dive", "from_attr": "Card Knowledge"}, boss=True)
+    assert enc.price_factor == pytest.approx(0.7)
+    assert apply_tactic({"name": "Read the Room", "from_attr": "People Skills"}, boss=False)
+    assert enc.mood == "happy"
+    assert not apply_tactic({"name": "Luck", "from_attr": "Luck"}, boss=False)
+
+
+def test_a_batch_plays_like_the_same_actions_one_by_one(run):
+    twin = copy.deepcopy(run)
+    plan = [["visit", 0], ["move", "friendly_chat"], ["move", "point_flaws"], ["offer", 1.0]]
+    batch = actions.apply_actions(plan)
+    with bind_session(twin):
+        single = [actions.ACTIONS[name](*args) for name, *args in plan]
+    assert batch == single
+    assert run.encounter.history == twin.encounter.history and run.player["log"] == twin.player["log"]
+    assert run.timeline.undo(run) and run.encounter is None  # the whole batch was one step
+
+
+def test_stages_open_at_their_level(run):
+    stage = GYMS[0]
+    run.player["level"] = stage["required_level"] - 1
+    assert not actions.sit_down(stage["id"])
+    run.player["level"] = stage["required_level"]
+    assert actions.sit_down(stage["id"])
+    assert table_kind(run.encounter) == (KINDS["stage"], stage["id"])
@@ -0,0 +1,67 @@
+import numpy as np
+
+from collector_rpg import actions
+from collector_rpg.config import get_config
+from collector_rpg.floor import GridIndex, dealer_for, get_floor, walk_cost
+from collector_rpg.verify import submission_for, verify
+
+
+def test_grid_queries_match_a_scan():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 300, 2000), rng.uniform(0, 120, 2000)
+    index = GridIndex(x, y, 10.0)
+    for qx, qy, r in ((150, 60, 25), (0, 0, 40), (299, 119, 5), (-50, -50, 10)):
+        ids, dist = index.within(qx, qy, r)
+        brute = np.flatnonzero(np.hypot(x - qx, y - qy) <= r)
+        assert sorted(ids) == sorted(brute)
+        assert (np.diff(dist) >= 0).all()
+
+
+def test_nearby_tables_are_close_and_nearest_first():
+    floor = get_floor()
+    near = floor.nearby(1234)
+    assert near and all(t != 1234 for t, _ in near)
+    assert [d for _, d in near] == sorted(d for _, d in near)
+    assert all(abs(floor.distance(1234, t) - d) < 1e-9 for t, d in near)
+
+
+def test_booth_numbers_and_zones_line_up():
+    floor = get_floor()
+    assert len(floor) == 10_000
+    for table in (0, 99, 100, 5000, len(floor) - 1):
+        assert floor.table_at(int(floor.booth[table])) == table
+    assert floor.table_at(1) is None
+    assert list(floor.zone_code) == sorted(floor.zone_code)  # each zone is one block of aisles
+
+
+def test_dealers_are_fixed_by_the_table_and_restocks():
+    floor = get_floor()
+    first, again, restocked = floor.dealer(42), floor.dealer(42), floor.dealer(42, restock=1)
+    assert first is again
+    assert (restocked.npc_type, restocked.mood, restocked.zone) == (first.npc_type, first.mood, first.zone)
+    assert restocked.card_ids != first.card_ids
+
+
+def test_walking_costs_stamina_by_distance(run):
+    floor = get_floor()
+    far = len(floor) - 1
+    run.player["stamina"] = walk_cost(floor.distance(None, far)) - 1
+    assert not actions.visit_table(far)
+    assert actions.visit_table(0)
+    assert run.player["stamina"] == walk_cost(floor.distance(None, far)) - 1 - walk_cost(floor.distance(None, 0))
+    assert run.player["floor_table"] == 0
+
+
+def test_bought_cards_leave_the_table_until_it_restocks(run):
+    assert actions.visit_table(0)
+    cards = run.encounter.cards
+    assert actions.make_offer(float(sum(c.ask_price for c in cards)) * 2)
+    assert "0" in run.player["floor_sold"]
+    assert not actions.visit_table(0)  # sold out for this run
+
+    for _ in range(get_config().dealer_restock_blocks):
+        assert actions.visit_table(1) and actions.take_break()  # the walk leaves room for a break
+    assert run.player["floor_restocks"]["0"] == 1
+    assert actions.visit_table(0)
+    assert [c.card_id for c in run.encounter.cards] == list(dealer_for(run.player, 0).card_ids)
+    assert verify(submission_for(run.player)).ok
@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from collector_rpg.leaderboard import Entry, Leaderboard, TopK
+from collector_rpg.rules import base_player_state
+
+
+def _player(run_id, profit=0.0, xp=0, whale_tick=None):
+    p = base_player_state()
+    p.update(run_id=run_id, name=run_id.upper(), profit=profit, xp=xp, seed=1, build={}, log=[])
+    if whale_tick is not None:
+        p["whale_tick"] = whale_tick
+    return p
+
+
+@pytest.fixture
+def board(tmp_path):
+    b = Leaderboard(tmp_path / "board.sqlite3", k=3, flush_interval=60.0)
+    yield b
+    b.close()
+
+
+def test_topk_keeps_each_runs_best_score():
+    top = TopK(3)
+    for run_id, score in (("a", 5), ("b", 9), ("c", 1), ("d", 7), ("a", 4), ("c", 8)):
+        top.offer(Entry(run_id, run_id, score, 1))
+    assert [(e.run_id, e.score) for e in top.snapshot] == [("b", 9), ("c", 8), ("d", 7)]
+    assert not top.offer(Entry("e", "e", 7, 1))  # ties go to whoever got there first
+
+
+def test_topk_lower_is_better():
+    top = TopK(2, higher_is_better=False)
+    for run_id, tick in (("a", 9), ("b", 4), ("c", 6), ("a", 2)):
+        top.offer(Entry(run_id, run_id, tick, 1))
+    assert [e.run_id for e in top.snapshot] == ["a", "b"]
+
+
+def test_boards_survive_a_restart_at_their_best(board, tmp_path):
+    board.submit(_player("a", profit=50.0, xp=10, whale_tick=12))
+    board.submit(_player("b", profit=80.0, xp=5))
+    board.flush()
+    board.submit(_player("a", profit=20.0, xp=30, whale_tick=15))
+    board.close()
+
+    again = Leaderboard(tmp_path / "board.sqlite3", k=3, flush_interval=60.0)
+    try:
+        assert [(e.run_id, e.score) for e in again.top("profit")] == [("b", 80.0), ("a", 50.0)]
+        assert [(e.run_id, e.score) for e in again.top("xp")] == [("a", 30), ("b", 5)]
+        assert [(e.run_id, e.score) for e in again.top("whale")] == [("a", 12)]
+    finally:
+        again.close()
+
+
+def test_runs_that_failed_verification_stay_off_the_boards(board, tmp_path):
+    board.submit(_player("a", profit=50.0))
+    board.submit(_player("b", profit=10.0))
+    board.flush()
+    with sqlite3.connect(board.db_path) as conn:
+        conn.execute("UPDATE runs SET verified = 0 WHERE run_id = 'a'")
+    again = Leaderboard(board.db_path, k=3, flush_interval=60.0)
+    try:
+        assert [e.run_id for e in again.top("profit")] == ["b"]
+    finally:
+        again.close()
+
+
+def test_concurrent_submissions_keep_the_true_top(board):
+    def submit(start):
+        for i in range(start, 400, 8):
+            board.submit(_player(f"r{i}", profit=float(i)))
+
+    threads = [threading.Thread(target=submit, args=(s,)) for s in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [e.score for e in board.top("profit")] == [399.0, 398.0, 397.0]
+    board.flush()
+    with sqlite3.connect(board.db_path) as conn:
+        assert conn.execute("SELECT count(*) FROM runs").fetchone()[0] == 400
+
+
+def test_refresh_drops_rejected_runs_and_marks_verified_ones(board):
+    for run_id, profit in (("a", 50.0), ("b", 10.0), ("c", 5.0)):
+        board.submit(_player(run_id, profit=profit))
+    assert [e.verified for e in board.top("profit")] == [None, None, None]
+    board.flush()
+    with sqlite3.connect(board.db_path) as conn:
+        conn.execute("UPDATE runs SET verified = 0 WHERE run_id = 'a'")
+        conn.execute("UPDATE runs SET verified = 1 WHERE run_id = 'b'")
+    board.submit(_player("d", profit=7.0))  # not flushed yet
+
+    board.refresh()
+    assert [(e.run_id, e.verified) for e in board.top("profit")] == [("b", True), ("d", None), ("c", None)]
+
+
+def test_the_flusher_refreshes_on_its_own(tmp_path):
+    board = Leaderboard(tmp_path / "board.sqlite3", k=3, flush_interval=0.02, refresh_interval=0.05)
+    try:
+        board.submit(_player("a", profit=50.0))
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with sqlite3.connect(board.db_path) as conn:
+                if conn.execute("UPDATE runs SET verified = 0 WHERE run_id = 'a'").rowcount:
+                    break
+            time.sleep(0.02)
+        while board.top("profit") and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert board.top("profit") == ()
+    finally:
+        board.close()
@@ -0,0 +1,71 @@
+import dataclasses
+
+import numpy as np
+
+from collector_rpg import market
+from collector_rpg.catalog import get_catalog
+from collector_rpg.config import get_config
+from collector_rpg.market import MODERN, PROMO_SET, SET_ERA, TIME_BLOCKS, Market, get_market, tick_for
+
+
+def _event_block(event_id):
+    return next(TIME_BLOCKS.index(e["time_block"]) for e in get_config().show_events if e["id"] == event_id)
+
+
+def test_the_live_market_follows_the_configs_show_events():
+    live = get_market()
+    assert live.pavilion_block == _event_block("pavilion_drop")
+    assert live.trade_night_block == _event_block("trade_night_open")
+
+
+def test_promo_hype_lands_in_the_pavilion_drop_block():
+    block = _event_block("pavilion_drop")
+    hyped, calm = Market(pavilion_block=block), Market()
+    for day in (1, 2):
+        for name in TIME_BLOCKS:
+            tick = tick_for(day, name)
+            gap = hyped.set_index(tick)[PROMO_SET] - calm.set_index(tick)[PROMO_SET]
+            other = np.delete(hyped.set_index(tick) - calm.set_index(tick), PROMO_SET)
+            assert np.allclose(other, 0.0)
+            if tick and TIME_BLOCKS.index(name) == block:
+                assert gap >= market.PAVILION_DROP
+            elif tick < block:
+                assert gap == 0.0
+
+
+def test_trade_night_spike_moves_modern_sets_only():
+    block = _event_block("trade_night_open")
+    spiked, calm = Market(trade_night_block=block), Market()
+    tick = tick_for(1, TIME_BLOCKS[block])
+    gap = spiked.set_index(tick) - calm.set_index(tick)
+    assert np.allclose(gap[SET_ERA == MODERN], market.TRADE_NIGHT_SPIKE)
+    assert np.allclose(gap[SET_ERA != MODERN], 0.0)
+
+
+def test_no_pavilion_event_means_no_hype(monkeypatch):
+    events = tuple(e for e in get_config().show_events if e["id"] != "pavilion_drop")
+    config = dataclasses.replace(get_config(), show_events=events)
+    monkeypatch.setattr("collector_rpg.config.get_config", lambda: config)
+    assert get_market().pavilion_block is None
+
+
+def test_ticks_are_the_same_whatever_order_sessions_read_them():
+    ahead, stepwise = Market(), Market()
+    late = ahead.set_index(tick_for(3, "Evening")).copy()
+    for tick in range(tick_for(3, "Evening") + 1):
+        stepwise.set_index(tick)
+    np.testing.assert_array_equal(stepwise.set_index(tick_for(3, "Evening")), late)
+    assert not ahead.set_index(0).any()  # the show opens at catalog value
+
+
+def test_card_ratio_is_each_cards_set_index():
+    m, catalog = Market(), get_catalog()
+    tick = tick_for(2, "Afternoon")
+    ratio = m.card_ratio(tick)
+    assert ratio.shape == (len(catalog),)
+    np.testing.assert_allclose(ratio, np.exp(m.set_index(tick))[catalog.set_idx], rtol=1e-6)
+    np.testing.assert_array_equal(m.card_ratio(tick, catalog.set_idx[:10]), ratio[:10])
+
+
+def test_every_session_shares_one_market():
+    assert get_market() is get_market()
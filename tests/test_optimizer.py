@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+
+from collector_rpg import actions
+from collector_rpg.optimizer import OFFER_LEVELS, _expected_gain, _solve_dp, optimize_lot
+
+
+def test_expected_gain_is_the_joint_expectation():
+    sigma, floor_pct, read = 0.3, 0.9, 100.0
+    x = np.exp(np.random.default_rng(0).normal(0.0, sigma, 400_000))  # true = read * x
+    gain = _expected_gain(np.array([read]), floor_pct, sigma)[0]
+    for lvl, m in enumerate(OFFER_LEVELS):
+        offer = read * floor_pct * m
+        accepted = x <= m
+        joint = np.mean(np.where(accepted, read * x - offer, 0.0))
+        assert abs(gain[lvl] - joint) < 0.3
+
+
+def test_dp_matches_brute_force():
+    rng = np.random.default_rng(4)
+    prices = np.round(rng.uniform(5, 60, (4, len(OFFER_LEVELS))), 2)
+    gain = rng.normal(3, 4, prices.shape)
+    cash = 90.0
+    picked = _solve_dp(prices, gain, cash)
+
+    best = 0.0
+    for choice in itertools.product(range(-1, len(OFFER_LEVELS)), repeat=len(prices)):
+        rows = [(i, lvl) for i, lvl in enumerate(choice) if lvl >= 0]
+        if sum(prices[i, lvl] for i, lvl in rows) <= cash:
+            best = max(best, sum(gain[i, lvl] for i, lvl in rows))
+    got = [(i, lvl) for i, lvl in enumerate(picked) if lvl >= 0]
+    assert sum(prices[i, lvl] for i, lvl in got) <= cash
+    assert sum(gain[i, lvl] for i, lvl in got) >= best - 1e-6
+
+
+def test_a_plan_stays_within_cash(run):
+    assert actions.walk_to("Vintage Alley")
+    enc = run.encounter
+    for cash in (0.0, 15.0, 5000.0):
+        plan = optimize_lot(enc, run.player, cash)
+        assert plan.total_offer <= cash
+        assert all(0 <= i < len(enc.cards) for i, _ in plan.picks)
@@ -0,0 +1,48 @@
+import dataclasses
+import random
+
+from collector_rpg import progression, rules
+from collector_rpg.telemetry import muted
+from collector_rpg.config import get_config
+from collector_rpg.rules import RunState, base_player_state, bind_session, grant_xp_for_deal
+
+
+def test_a_jump_over_several_thresholds_pays_out_every_level(run, monkeypatch):
+    emitted = []
+    monkeypatch.setattr(rules, "emit", lambda kind, *args: emitted.append((kind, *args)))
+    p = run.player
+    attrs, visible = dict(p["attributes"]), p["max_cards_visible"]
+    thresholds = get_config().xp_thresholds
+    rules.add_xp(thresholds[3])  # level 1 -> 4
+    assert p["level"] == 4
+    assert p["attributes"] == {k: min(100, v + 9) for k, v in attrs.items()}
+    assert p["max_cards_visible"] == min(5, visible + 3)
+    assert [e[2] for e in emitted if e[0] == "level_up"] == [2, 3, 4]
+
+
+def test_simulated_levels_match_the_rules(monkeypatch):
+    # Thresholds close enough together that one deal clears several
+    cfg = dataclasses.replace(get_config(), xp_thresholds=(0, 20, 40, 60, 80, 100, 400))
+    for module in (rules, progression):
+        monkeypatch.setattr(module, "get_config", lambda: cfg)
+    players = []
+    rnd = random.Random(3)
+    for _ in range(40):
+        p = base_player_state()
+        p["attributes"] = dict(zip(p["attributes"], (rnd.randint(0, 100) for _ in range(4))))
+        p["subjects"] = {k: rnd.randint(0, 100) for k in p["subjects"]}
+        players.append(p)
+    zone = "Vintage Alley"
+    model = progression.DealModel(margin_mean=2000.0, margin_sd=0.0, zones=(zone,), pick="lane")
+    report = progression.simulate(deals=60, model=model, builds=progression.builds_from(players))
+
+    for i, p in enumerate(players):
+        reached = [0] + [-1] * (cfg.max_level - 1)
+        with bind_session(RunState(player=p, rng=random.Random(0))), muted():
+            for deal in range(1, 61):
+                before = p["level"]
+                grant_xp_for_deal(zone, 2000.0, is_trade=False)
+                for level in range(before + 1, p["level"] + 1):
+                    reached[level - 1] = deal
+        assert list(report.reached[i]) == reached
+
@@ -0,0 +1,26 @@
+from collector_rpg import render
+
+
+def test_fragments_are_rendered_once_per_input():
+    render.encounter_header.cache_clear()
+    args = (2, "Evening", "Vintage Alley", "🏛️", "🧢", "A Dealer waves you over.", "grumpy")
+    first = render.encounter_header(*args)
+    assert render.encounter_header(*args) is first
+    assert "Day 2 • Evening" in first and "They seem grumpy." in first
+    render.encounter_header(*args[:-1], "happy")
+
+    stats = render.stats()["encounter_header"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+
+def test_zone_cards_list_every_zone_in_order():
+    html = render.zone_cards((("💵", "Dollar Boxes"), ("🏛️", "Vintage Alley")))
+    assert html.index("Dollar Boxes") < html.index("Vintage Alley")
+    assert html.count("<div") == 2
+
+
+def test_static_blocks_are_finished_strings():
+    assert render.GLOBAL_CSS.startswith("<style>") and render.GLOBAL_CSS.endswith("</style>")
+    assert "National Collector RPG" in render.BANNER and "{" not in render.BANNER
+    assert set(render.stats()) == set(render.FRAGMENTS)
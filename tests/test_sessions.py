@@ -0,0 +1,159 @@
+import threading
+
+import pytest
+
+from collector_rpg import actions, sessions
+from collector_rpg.rules import RunState, bind_session
+from collector_rpg.sessions import (
+    MemoryStore, RedisError, RedisStore, SessionSync, SqliteStore, VersionConflict, mark_changed, store_from_url,
+)
+from collector_rpg.sweep import SweepRules
+
+from conftest import new_run
+from miniredis import MiniRedis
+
+
+@pytest.fixture
+def redis():
+    server = MiniRedis()
+    yield server
+    server.close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    if request.param == "sqlite":
+        return SqliteStore(tmp_path / "sessions.sqlite3")
+    server = MiniRedis()
+    request.addfinalizer(server.close)
+    return RedisStore("127.0.0.1", server.port)
+
+
+def test_saves_are_versioned(store):
+    assert store.version("r1") == 0 and store.get("r1") is None
+    assert store.put("r1", b"one", 0) == 1
+    assert store.put("r1", b"two", 1) == 2
+    assert store.get("r1") == (2, b"two")
+    with pytest.raises(VersionConflict):
+        store.put("r1", b"stale", 1)
+    assert store.get("r1") == (2, b"two")
+
+
+def test_a_run_moves_between_workers(store):
+    state = new_run()
+    with bind_session(state):
+        actions.lock_build()
+        actions.sweep(SweepRules(encounters=10))
+    saver = SessionSync(store, state.player["run_id"])
+    assert saver.push(state)
+    assert not saver.push(state)  # nothing changed
+
+    other = RunState()
+    loader = SessionSync(store, state.player["run_id"])
+    assert loader.pull(other)
+    assert other.player["log"] == state.player["log"]
+    assert len(other.player["collection"]) == len(state.player["collection"])
+    assert not loader.pull(other)
+
+    # Both save from the same version; the second one conflicts
+    state.player["cash"] -= 1
+    other.player["cash"] -= 2
+    mark_changed(state.player)
+    mark_changed(other.player)
+    assert saver.push(state)
+    with pytest.raises(VersionConflict):
+        loader.push(other)
+
+
+def test_a_locked_run_is_only_pickled_when_it_changed(monkeypatch):
+    state = new_run()
+    sync = SessionSync(MemoryStore(), state.player["run_id"])
+    pickled = []
+    pickle_rest = sessions._pickle_rest
+    monkeypatch.setattr(sessions, "_pickle_rest", lambda s: pickled.append(1) or pickle_rest(s))
+    with bind_session(state):
+        actions.lock_build()
+        assert actions.walk_to("Dollar Boxes")
+        assert sync.push(state) and len(pickled) == 1
+        assert not sync.push(state) and len(pickled) == 1
+        assert actions.visit_table(0)
+        assert sync.push(state) and len(pickled) == 2
+
+
+def test_an_undo_is_saved(store):
+    state = new_run()
+    sync = SessionSync(store, state.player["run_id"])
+    with bind_session(state):
+        actions.lock_build()
+        assert actions.walk_to("Dollar Boxes")
+        assert actions.walk_to("Vintage Alley")
+        assert sync.push(state)
+        assert state.timeline.undo(state)
+    assert sync.push(state)
+    loaded = RunState()
+    assert SessionSync(store, state.player["run_id"]).pull(loaded)
+    assert loaded.player["log"] == [["walk", "Dollar Boxes"]]
+    assert loaded.encounter.zone == "Dollar Boxes"
+
+
+def test_only_one_of_racing_saves_wins(redis):
+    stores = [RedisStore("127.0.0.1", redis.port) for _ in range(8)]
+    for version in range(5):
+        won = []
+
+        def save(store):
+            try:
+                won.append(store.put("race", b"x", version))
+            except VersionConflict:
+                pass
+
+        threads = [threading.Thread(target=save, args=(s,)) for s in stores]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert won == [version + 1]
+
+
+def test_databases_are_kept_apart(redis):
+    one = store_from_url(f"redis://127.0.0.1:{redis.port}/1")
+    two = store_from_url(f"redis://127.0.0.1:{redis.port}/2")
+    one.put("r", b"one", 0)
+    assert two.get("r") is None and one.get("r") == (1, b"one")
+
+
+def test_the_store_reconnects_after_the_server_drops_it(redis):
+    store = RedisStore("127.0.0.1", redis.port)
+    store.put("r", b"one", 0)
+    redis.drop_clients()
+    assert store.get("r") == (1, b"one")
+
+
+def test_a_save_reconnects_after_the_server_drops_it(redis):
+    store = RedisStore("127.0.0.1", redis.port)
+    store.put("r", b"one", 0)
+    redis.drop_clients()
+    assert store.put("r", b"two", 1) == 2
+    assert store.get("r") == (2, b"two")
+
+
+def test_a_save_whose_reply_was_lost_isnt_a_conflict(redis, monkeypatch):
+    store = RedisStore("127.0.0.1", redis.port)
+    store.put("r", b"one", 0)
+    put = store._put
+
+    def committed_then_dropped(*args):
+        put(*args)
+        raise ConnectionError("Redis connection closed")
+
+    monkeypatch.setattr(store, "_put", committed_then_dropped)
+    assert store.put("r", b"two", 1) == 2
+    assert store.get("r") == (2, b"two")
+
+
+def test_error_replies_raise(redis):
+    store = RedisStore("127.0.0.1", redis.port)
+    with pytest.raises(RedisError, match="unknown command"):
+        store._call("FLUSHALL")
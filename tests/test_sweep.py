@@ -0,0 +1,60 @@
+from dataclasses import replace
+
+import pytest
+
+from collector_rpg import actions
+from collector_rpg.sweep import MAX_SWEEP_OFFERS, SweepRules, sweep_problems
+from collector_rpg.verify import submission_for, verify
+
+
+def test_default_rules_are_valid():
+    assert sweep_problems(SweepRules()) == []
+
+
+@pytest.mark.parametrize("change", [
+    {"opening_pct": 0.0},
+    {"opening_pct": 3.0},
+    {"max_pct_of_ask": 1.5},
+    {"max_pct_of_ask": float("nan")},
+    {"cash_reserve": -1e7},
+    {"offers_per_table": 0},
+    {"offers_per_table": MAX_SWEEP_OFFERS + 1},
+    {"offers_per_table": 2.5},
+    {"encounters": -1},
+])
+def test_bad_rules_are_refused_and_not_logged(run, change):
+    log = len(run.player["log"])
+    cash = run.player["cash"]
+    assert actions.sweep(replace(SweepRules(), **change)) is None
+    assert len(run.player["log"]) == log
+    assert run.player["cash"] == cash
+
+
+def test_overpaying_sweep_from_the_review_is_refused(run):
+    rules = {"zones": ["Dollar Boxes"], "opening_pct": 3.0, "max_pct_of_ask": 3.0,
+             "offers_per_table": 3, "encounters": 200, "cash_reserve": -1e7}
+    assert actions.apply_actions([["sweep", rules]]) == [None]
+    assert run.player["cash"] == 5000 and run.player["xp"] == 0
+
+
+def test_sweep_never_spends_below_zero(run):
+    run.player["cash"] = 150.0
+    summary = actions.sweep(SweepRules(opening_pct=1.0, max_pct_of_ask=1.0, encounters=200))
+    assert summary is not None
+    assert run.player["cash"] >= 0
+    assert summary.spent <= 150.0
+
+
+def test_sweep_keeps_the_reserve_and_replays(run):
+    summary = actions.sweep(SweepRules(encounters=50, cash_reserve=4000.0))
+    assert summary.spent <= 1000.0
+    assert run.player["cash"] >= 4000.0
+    assert verify(submission_for(run.player)).ok
+
+
+def test_forged_sweep_in_a_submitted_log_fails_verification(run):
+    sub = submission_for(run.player)
+    sub.log.append(["sweep", {"zones": ["Dollar Boxes"], "opening_pct": 3.0, "max_pct_of_ask": 3.0,
+                              "offers_per_table": 3, "encounters": 200, "cash_reserve": -1e7}])
+    verdict = verify(sub)
+    assert not verdict.ok and "isn't legal" in verdict.note
@@ -0,0 +1,121 @@
+import pytest
+
+from collector_rpg import actions, telemetry
+from collector_rpg.rules import bind_session
+from collector_rpg.sweep import SweepRules
+from collector_rpg.telemetry import Telemetry, emit, event_files, muted, read_events
+
+from conftest import new_run
+
+
+@pytest.fixture
+def sink(tmp_path):
+    t = Telemetry(tmp_path, flush_interval=60.0)
+    yield t
+    t.close()
+
+
+def _written(sink):
+    return list(read_events(event_files(sink.out_dir)))
+
+
+def test_events_are_written_by_name(sink):
+    sink.emit("level_up", "run-1", (3, 120))
+    sink.emit("level_up", "run-1", (3,))          # wrong field count
+    sink.emit("teleport", "run-1", ())           # unknown kind
+    sink.flush()
+    [record] = _written(sink)
+    assert {k: record[k] for k in ("kind", "run_id", "level", "xp")} == \
+        {"kind": "level_up", "run_id": "run-1", "level": 3, "xp": 120}
+    assert sink.stats()["malformed"] == 2
+
+
+def test_a_full_queue_drops_instead_of_blocking(tmp_path):
+    sink = Telemetry(tmp_path, capacity=10, flush_interval=60.0)
+    try:
+        for i in range(25):
+            sink.emit("page_view", None, (f"p{i}",))
+        assert sink.stats()["dropped"] == 15
+        sink.flush()
+        assert [r["page"] for r in _written(sink)] == [f"p{i}" for i in range(10)]
+    finally:
+        sink.close()
+
+
+def test_files_rotate_once_they_pass_the_size_limit(tmp_path):
+    sink = Telemetry(tmp_path, batch_size=50, max_file_bytes=200, flush_interval=60.0)
+    try:
+        for i in range(500):
+            sink.emit("page_view", None, (f"page-{i}",))
+        sink.flush()
+        assert len(event_files(tmp_path)) > 1
+        assert len(_written(sink)) == 500
+    finally:
+        sink.close()
+
+
+def test_every_field_has_a_parquet_column():
+    assert {name for names in telemetry.EVENTS.values() for name in names} <= set(telemetry.COLUMN_TYPES)
+
+
+def test_parquet_output_reads_back_like_the_json_lines(tmp_path):
+    events = [
+        ("level_up", "run-1", (3, 120)),
+        ("offer", "run-1", ("accept", "Dollar Boxes", "Collector", "happy", 12)),
+        ("deal", "run-1", ("Dollar Boxes", 4.5, 11, False, False)),
+        ("page_view", None, ("Intro",)),
+    ]
+    written = {}
+    for fmt in ("jsonl", "parquet"):
+        sink = Telemetry(tmp_path / fmt, batch_size=2, max_file_bytes=1, flush_interval=60.0, fmt=fmt)
+        for kind, run_id, fields in events:
+            sink.emit(kind, run_id, fields)
+        sink.flush()
+        sink.close()
+        assert len(event_files(sink.out_dir)) == 2  # rotated after each batch
+        written[fmt] = [{k: v for k, v in r.items() if k != "ts"} for r in read_events(event_files(sink.out_dir))]
+    assert written["parquet"] == written["jsonl"]
+    assert written["parquet"][1]["offer"] == 12.0
+
+
+def test_a_broken_listener_doesnt_stop_the_log(sink):
+    seen = []
+    sink.subscribe(lambda records: 1 / 0)
+    sink.subscribe(seen.extend)
+    sink.emit("page_view", None, ("Intro",))
+    sink.flush()
+    assert len(seen) == 1 and sink.stats()["listener_errors"] == 1
+    assert len(_written(sink)) == 1
+
+
+def test_the_engine_reports_a_run(sink, monkeypatch):
+    monkeypatch.setattr(telemetry, "_sink", sink)
+    state = new_run()
+    with bind_session(state):
+        actions.lock_build()
+        assert actions.visit_table(0)
+        assert actions.move("friendly_chat")
+        assert actions.make_offer(1.0)
+        with muted():
+            emit("page_view", state.player["run_id"], ("Intro",))
+    sink.flush()
+    kinds = [r["kind"] for r in _written(sink)]
+    assert kinds[:4] == ["run_start", "encounter_start", "move", "offer"]
+    assert "page_view" not in kinds
+
+
+def test_a_sweep_reports_every_table(sink, monkeypatch):
+    monkeypatch.setattr(telemetry, "_sink", sink)
+    state = new_run()
+    with bind_session(state):
+        actions.lock_build()
+        assert actions.walk_to("Dollar Boxes")
+        summary = actions.sweep(SweepRules(encounters=20))
+    sink.flush()
+    records = _written(sink)
+    tables = [r for r in records if r["kind"] == "encounter_start" and r["mode"] == "sweep"]
+    deals = [r for r in records if r["kind"] == "deal"]
+    assert len(tables) == summary.encounters
+    assert len(deals) == summary.deals > 0
+    assert sum(r["xp"] for r in deals) == summary.xp
+    assert sum(r["verdict"] == "accept" for r in records if r["kind"] == "offer") == summary.deals
@@ -0,0 +1,74 @@
+import dataclasses
+
+import pytest
+
+from collector_rpg import tournament
+from collector_rpg.config import get_config
+from collector_rpg.tournament import (
+    DEFAULT_BUILD,
+    ELO_START,
+    STRATEGIES,
+    TournamentError,
+    outcome,
+    play,
+    run_tournament,
+    scenarios,
+    standings,
+)
+
+
+def test_a_game_is_the_same_every_time():
+    for game in range(4):
+        assert play("solver", game, 3, DEFAULT_BUILD) == play("solver", game, 3, DEFAULT_BUILD)
+
+
+def test_boss_wins_beat_profit_and_close_profits_draw():
+    assert outcome((1, -50.0), (0, 500.0)) == 1.0
+    assert outcome((0, 10.0), (0, 10.005)) == 0.5
+    assert outcome((0, 9.0), (0, 10.0)) == 0.0
+
+
+def test_ratings_are_zero_sum_and_follow_the_wins():
+    rows = [(g, s, profit, 1, 0) for g in range(20) for s, profit in (("a", 30.0), ("b", 10.0), ("c", 10.0))]
+    table = {st.strategy: st for st in standings(rows, ("a", "b", "c"))}
+    assert sum(st.rating for st in table.values()) == pytest.approx(3 * ELO_START)
+    assert table["a"].rating > table["b"].rating
+    assert table["a"].head_to_head == {"b": 1.0, "c": 1.0}
+    assert table["b"].head_to_head["c"] == 0.5 and table["b"].draws == 20
+
+
+def test_a_tournament_resumes_from_its_checkpoint(tmp_path, monkeypatch):
+    path = tmp_path / "t.sqlite3"
+    strategies = ("friendly", "lowball")
+    calls = []
+
+    first = run_tournament(path, games=4, strategies=strategies, seed=5, workers=2, chunk=1)
+    assert sum(st.games for st in first) == 8
+
+    again = run_tournament(path, games=6, strategies=strategies, seed=5, workers=2, chunk=1,
+                           progress=lambda done, total: calls.append(total))
+    assert set(calls) == {4}  # only the two new games were played
+    assert sum(st.games for st in again) == 12
+
+    with pytest.raises(TournamentError, match="different seed"):
+        run_tournament(path, games=6, strategies=strategies, seed=6, workers=2)
+    bumped = dataclasses.replace(get_config(), version=get_config().version + 1)
+    monkeypatch.setattr(tournament, "get_config", lambda: bumped)
+    with pytest.raises(TournamentError, match="different config_version"):
+        run_tournament(path, games=6, strategies=strategies, seed=5, workers=2)
+    with pytest.raises(TournamentError, match="unknown strategy"):
+        run_tournament(path, games=6, strategies=("coin_flip",))
+
+
+def test_every_strategy_plays():
+    for strategy in STRATEGIES:
+        result = play(strategy, 0, 1, DEFAULT_BUILD)
+        assert result["moves"] + result["offers"] > 0
+
+
+def test_scenarios_follow_the_config():
+    config = get_config()
+    fewer = dataclasses.replace(config, zones=config.zones[:2], gyms=config.gyms[:1])
+    kinds = [kind for kind, _, _ in scenarios(fewer)]
+    assert kinds == ["floor", "floor", "stage", *["influencer"] * len(config.elite_four), "whale"]
+    assert scenarios() == scenarios(config)
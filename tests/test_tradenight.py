@@ -0,0 +1,162 @@
+import sqlite3
+
+import pytest
+
+from collector_rpg import actions, verify as verify_module
+from collector_rpg.leaderboard import Leaderboard
+from collector_rpg.rules import bind_session
+from collector_rpg.sweep import SweepRules
+from collector_rpg.tradenight import ASK, BID, TradeNight, get_broker
+from collector_rpg.verify import submission_for, verify, verify_pending
+
+from conftest import new_run
+
+
+@pytest.fixture
+def traders(market):
+    """A seller holding a card from a sweep, and a buyer, both locked in."""
+    seller, buyer = new_run(seed=11), new_run(seed=12)
+    for state in (seller, buyer):
+        with bind_session(state):
+            assert actions.lock_build() == []
+    with bind_session(seller):
+        assert actions.sweep(SweepRules(encounters=20)).deals > 0
+    return seller, buyer
+
+
+def _trade(seller, buyer, price=25.0):
+    with bind_session(seller):
+        card_id = seller.player["collection"][0]["card_id"]
+        ask_id = actions.post_ask(0, price)
+    with bind_session(buyer):
+        bid_id = actions.post_bid(card_id, price)
+        assert not buyer.player["orders"]
+    with bind_session(seller):
+        assert [m["type"] for m in actions.settle_fills()] == ["fill"]
+    return ask_id, bid_id
+
+
+def test_a_trade_settles_and_both_runs_verify(traders):
+    seller, buyer = traders
+    cash = seller.player["cash"]
+    _trade(seller, buyer)
+    assert seller.player["cash"] == pytest.approx(cash + 25.0)
+    assert buyer.player["collection"][-1]["zone"] == "Trade Night"
+    assert verify(submission_for(seller.player)).ok
+    assert verify(submission_for(buyer.player)).ok
+
+
+def test_a_forged_ask_price_fails_verification(traders):
+    seller, buyer = traders
+    _trade(seller, buyer)
+    sub = submission_for(seller.player)
+    step = next(i for i, entry in enumerate(sub.log) if entry[0] == "settle")
+    sub.log[step] = ["settle", {**sub.log[step][1], "price": 1e6}]
+    sub.claimed["profit"] += 1e6
+    verdict = verify(sub)
+    assert not verdict.ok and "settle" in verdict.note
+
+
+def test_a_forged_bid_row_fails_verification(traders):
+    seller, buyer = traders
+    _trade(seller, buyer)
+    sub = submission_for(buyer.player)
+    step = next(i for i, entry in enumerate(sub.log) if entry[0] == "settle")
+    message = sub.log[step][1]
+    sub.log[step] = ["settle", {**message, "row": {**message["row"], "true_value": 1e6}}]
+    assert not verify(sub).ok
+
+
+def test_a_fill_from_another_run_fails_verification(traders):
+    seller, buyer = traders
+    _trade(seller, buyer)
+    sub = submission_for(buyer.player)
+    sub.run_id = seller.player["run_id"]
+    assert not verify(sub).ok
+
+
+def test_orders_no_book_holds_are_released(traders, monkeypatch):
+    seller, buyer = traders
+    with bind_session(seller):
+        card_id = seller.player["collection"][0]["card_id"]
+        rows = len(seller.player["collection"])
+        ask_id = actions.post_ask(0, 40.0)
+    old = actions.get_trade_night()
+
+    # The seller comes back on a worker (or after a restart) whose book never saw the ask
+    monkeypatch.setattr(actions, "get_trade_night", lambda: TradeNight(get_broker()))
+    with bind_session(seller):
+        actions.settle_fills()
+        assert seller.player["orders"] == {}
+        assert len(seller.player["collection"]) == rows
+        assert actions.find_bin() and seller.timeline.can_undo(seller)
+        assert verify(submission_for(seller.player)).ok
+
+    # The book that still holds the ask can no longer fill it
+    bid = old.place(buyer.player["run_id"], BID, card_id, 40.0)
+    assert bid.live and get_broker().closed(ask_id)[1]["type"] == "cancelled"
+    assert get_broker().closed(bid.order_id) is None
+
+
+def test_a_filled_order_is_settled_from_the_ledger(traders, monkeypatch):
+    seller, buyer = traders
+    with bind_session(seller):
+        card_id = seller.player["collection"][0]["card_id"]
+        ask_id = actions.post_ask(0, 30.0)
+    with bind_session(buyer):
+        actions.post_bid(card_id, 30.0)
+    get_broker().poll(f"trades:{seller.player['run_id']}")  # the mailbox message went missing
+
+    monkeypatch.setattr(actions, "get_trade_night", lambda: TradeNight(get_broker()))
+    with bind_session(seller):
+        cash = seller.player["cash"]
+        assert [m["order_id"] for m in actions.settle_fills()] == [ask_id]
+        assert seller.player["cash"] == pytest.approx(cash + 30.0)
+
+
+def test_self_trade_and_cancel_close_in_the_ledger(market):
+    night = TradeNight(get_broker())
+    ask = night.place("run-a", ASK, 5, 10.0, {"card_id": 5})
+    bid = night.place("run-a", BID, 5, 12.0)
+    assert get_broker().closed(ask.order_id) == ("run-a", {"type": "cancelled", "order_id": ask.order_id})
+    assert night.cancel(bid.order_id, "run-a")
+    assert not night.cancel(bid.order_id, "run-a")
+    assert get_broker().closed(bid.order_id)[1]["type"] == "cancelled"
+
+
+def test_the_ledger_is_shared_through_its_file(tmp_path):
+    from collector_rpg.tradenight import TradeLedger
+
+    broker, other = TradeLedger(tmp_path / "l.sqlite3"), TradeLedger(tmp_path / "l.sqlite3")
+    first, second = broker.next_order_id(), other.next_order_id()
+    assert second > first
+    assert broker.close(first, "run-a", {"type": "fill", "price": 3.5})
+    assert not other.close(first, "run-b", {"type": "cancelled"})
+    assert other.closed(first) == ("run-a", {"type": "fill", "price": 3.5})
+    assert broker.closed(second) is None
+
+
+def test_trading_runs_verify_from_a_fresh_verifier_process(traders, tmp_path):
+    seller, buyer = traders
+    _trade(seller, buyer)
+    board = Leaderboard(tmp_path / "board.sqlite3", flush_interval=60.0)
+    board.submit(seller.player)
+    board.submit(buyer.player)
+    board.close()
+    # The pool's workers have their own brokers; only the ledger file is shared
+    assert verify_pending(board.db_path, workers=2) == (2, 0, 0)
+
+
+def test_without_the_ledger_trading_runs_stay_pending(traders, tmp_path, monkeypatch):
+    seller, buyer = traders
+    _trade(seller, buyer)
+    monkeypatch.setattr(verify_module, "LEDGER_PATH", tmp_path / "elsewhere.sqlite3")
+    verdict = verify(submission_for(seller.player))
+    assert verdict.pending and not verdict.ok
+
+    board = Leaderboard(tmp_path / "board.sqlite3", flush_interval=60.0)
+    board.submit(seller.player)
+    board.close()
+    assert verify_pending(board.db_path, workers=1) == (0, 0, 1)
+    with sqlite3.connect(board.db_path) as conn:
+        assert conn.execute("SELECT verified FROM runs").fetchone() == (None,)
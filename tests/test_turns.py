@@ -0,0 +1,27 @@
+from collector_rpg import actions
+from collector_rpg.verify import submission_for, verify
+
+
+def test_moves_past_the_budget_are_cut_and_the_offer_is_reported_apart(run):
+    assert actions.walk_to("Vintage Alley")
+    enc = run.encounter
+    enc.actions_used = enc.max_actions - 2
+    moves, offered, lines = actions.play_turn(["friendly_chat"] * 4, 50.0)
+    assert moves == [True, True]
+    assert offered is not None and offered[0] in ("accept", "counter", "reject")
+    assert any("You offer $50.00" in line for line in lines)
+    assert verify(submission_for(run.player)).ok
+
+
+def test_a_turn_is_one_undo_step(run):
+    assert actions.walk_to("Vintage Alley")
+    steps = len(run.timeline.steps)
+    log = len(run.player["log"])
+    actions.play_turn(["friendly_chat", "point_flaws"])
+    assert len(run.timeline.steps) == steps + 1
+    assert run.timeline.undo(run)
+    assert len(run.player["log"]) == log
+
+
+def test_no_offer_without_a_table(run):
+    assert actions.play_turn(["friendly_chat"], 10.0) == ([], None, [])
@@ -0,0 +1,71 @@
+from collector_rpg import actions
+from collector_rpg.collection import Collection
+from collector_rpg.sweep import SweepRules
+from collector_rpg.undo import Timeline
+from collector_rpg.verify import submission_for, verify
+
+
+def _view(run):
+    p = run.player
+    return (p["cash"], p["xp"], len(p["collection"]), list(p["log"]),
+            run.encounter and list(run.encounter.history))
+
+
+def _sweep(run, encounters=10):
+    assert actions.sweep(SweepRules(encounters=encounters)).deals > 0
+
+
+def test_undo_and_redo_step_through_the_run(run):
+    t = run.timeline
+    coll = run.player["collection"]
+    before, version = _view(run), coll.version
+    _sweep(run)
+    after = _view(run)
+    draw = run.rng.random()
+
+    assert t.undo(run) and _view(run) == before and coll.version == version and not t.can_undo(run)
+    assert t.redo(run) and _view(run) == after and not t.can_redo()
+    assert run.rng.random() == draw  # the RNG came back too
+
+
+def test_acting_after_an_undo_forks_the_run(run):
+    t = run.timeline
+    _sweep(run)
+    scored = run.player["run_id"]
+    t.undo(run)
+    assert actions.visit_table(0)
+    assert run.player["run_id"] != scored and not t.can_redo()
+    assert verify(submission_for(run.player)).ok
+
+
+def test_snapshots_dont_copy_the_collection(run):
+    t = run.timeline
+    _sweep(run, encounters=60)
+    assert len(run.player["collection"]) > 20
+    big = t.steps[-1].nbytes
+    assert actions.visit_table(0)
+    assert t.steps[-1].nbytes < big + 2048 and t.stats()["bytes"] == t.nbytes
+
+
+def test_old_steps_fall_off_the_limit(run):
+    run.timeline = t = Timeline(limit=3)
+    t.reset(run)
+    for table in range(5):
+        actions.visit_table(table)
+    assert t.stats()["steps"] == 3
+    assert t.undo(run) and t.undo(run) and not t.undo(run)
+
+
+def test_branches_are_self_contained_and_fork_the_run(run):
+    t = run.timeline
+    _sweep(run)
+    branch_view = _view(run)
+    assert t.save_branch("after sweep", run)
+    _sweep(run)
+    main_id = run.player["run_id"]
+
+    assert t.switch_branch("after sweep", run)
+    assert _view(run) == branch_view and run.player["run_id"] != main_id
+    assert isinstance(run.player["collection"], Collection) and not t.can_undo(run)
+    assert verify(submission_for(run.player)).ok
+    assert not t.switch_branch("nowhere", run)
@@ -0,0 +1,79 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from collector_rpg.catalog import get_catalog
+from collector_rpg.collection import Collection
+from collector_rpg.valuation import ValuationService
+
+NOW = (1, "Morning")
+
+
+def _rows(ids):
+    catalog = get_catalog()
+    return [{"card_id": int(i), "true_value": float(catalog.base_value[i]), "ask_price": 1.0} for i in ids]
+
+
+def test_collection_columns_follow_the_rows():
+    rows = _rows(range(40)) + [{"name": "Custom", "true_value": 9.0, "ask_price": 4.0, "paid": 3.0}]
+    coll = Collection(rows)
+    assert len(coll) == 41 and coll.column("card_id")[-1] == -1 and coll.column("paid")[-1] == 3.0
+
+    v = coll.version
+    popped = coll.pop(5)
+    assert popped["card_id"] == 5 and coll.version != v
+    assert list(coll.column("card_id")[4:6]) == [4, 6]
+
+    restored = pickle.loads(pickle.dumps(coll))
+    np.testing.assert_array_equal(restored.column("true_value"), coll.column("true_value"))
+    restored.append(_rows([3])[0])
+    assert len(restored) == 41 and len(coll) == 40
+
+    with pytest.raises(ValueError):
+        coll.column("paid")[0] = 1.0
+
+
+def test_truncate_rolls_back_rows_and_version():
+    coll = Collection(_rows(range(3)))
+    n, v = len(coll), coll.version
+    coll.extend(_rows(range(3, 6)))
+    tail = coll.truncate(n, v)
+    assert [r["card_id"] for r in tail] == [3, 4, 5]
+    assert len(coll) == 3 and coll.version == v
+
+
+def test_quotes_bracket_the_point_and_leave_custom_cards_alone():
+    svc = ValuationService()
+    q = svc.quote(np.array([0, 1, 2, -1]), NOW)
+    assert (q.low <= q.value).all() and (q.value <= q.high).all()
+    assert (q.value[-1], q.low[-1], q.high[-1]) == (1.0, 1.0, 1.0)
+
+
+def test_batch_collection_and_card_paths_agree():
+    svc = ValuationService()
+    catalog = get_catalog()
+    ids = np.random.default_rng(0).integers(0, len(catalog), 5000)
+    coll = Collection(_rows(ids))
+    by_column = svc.value_collection(coll, NOW)
+    by_card = svc.value_cards([catalog.card(int(i), 1.0) for i in ids[:50]], NOW)
+    np.testing.assert_allclose(by_column.value[:50], by_card.value)
+    single = svc.value(ids[7:8], coll.column("true_value")[7:8], NOW)
+    assert single.value[0] == pytest.approx(by_column.value[7])
+
+
+def test_tables_are_cached_until_they_expire_or_fall_out():
+    svc = ValuationService(ttl_seconds=60.0, max_tables=2)
+    svc.quote([0], NOW)
+    svc.quote([1], NOW)
+    assert (svc.hits, svc.misses) == (1, 1)
+
+    svc.quote([0], (1, "Afternoon"))
+    svc.quote([0], (1, "Evening"))   # evicts NOW, the least recently used
+    svc.quote([0], NOW)
+    assert svc.misses == 4
+
+    stale = ValuationService(ttl_seconds=0.0)
+    stale.quote([0], NOW)
+    stale.quote([0], NOW)
+    assert (stale.hits, stale.misses) == (0, 2)
@@ -0,0 +1,78 @@
+import copy
+import sqlite3
+
+from collector_rpg import actions
+from collector_rpg.config import get_config
+from collector_rpg.leaderboard import Leaderboard
+from collector_rpg.sweep import SweepRules
+from collector_rpg.verify import submission_for, verify, verify_all, verify_pending
+
+
+def _played(run):
+    assert actions.walk_to("Dollar Boxes")
+    assert actions.sweep(SweepRules(encounters=30)).deals > 0
+    return submission_for(run.player)
+
+
+def test_the_build_records_the_config_version(run):
+    assert run.player["build"]["config_version"] == get_config().version
+
+
+def test_an_honest_run_verifies(run):
+    assert verify(_played(run)).ok
+
+
+def test_inflated_scores_are_rejected(run):
+    sub = _played(run)
+    sub.claimed["profit"] += 500
+    assert not verify(sub).ok
+    sub = _played(run)
+    sub.claimed["xp"] += 1
+    assert "xp" in verify(sub).note
+
+
+def test_a_run_from_an_unknown_config_version_is_rejected(run):
+    sub = _played(run)
+    sub.build["config_version"] = get_config().version + 100
+    verdict = verify(sub)
+    assert not verdict.ok and "config version" in verdict.note
+
+
+def test_a_build_without_a_config_version_is_rejected(run):
+    sub = _played(run)
+    del sub.build["config_version"]
+    assert "config version" in verify(sub).note
+
+
+def test_bad_logs_are_rejected_with_the_step(run):
+    sub = _played(run)
+    sub.log.insert(1, ["teleport"])
+    assert verify(sub).note == "unknown action 'teleport' at step 1"
+    sub = _played(run)
+    sub.log.append(["take_bin", [0]])  # no bin was ever found
+    assert "isn't legal on replay" in verify(sub).note
+
+
+def test_verify_all_keeps_input_order(run):
+    honest = _played(run)
+    forged = _played(run)
+    forged.claimed["profit"] += 500
+    forged.run_id = "forged"
+    verdicts = list(verify_all([honest, forged, honest], workers=2, chunksize=1))
+    assert [(v.run_id, v.ok) for v in verdicts] == [(honest.run_id, True), ("forged", False), (honest.run_id, True)]
+
+
+def test_verify_pending_marks_the_queue(run, tmp_path):
+    board = Leaderboard(tmp_path / "board.sqlite3", flush_interval=60.0)
+    _played(run)
+    board.submit(run.player)
+    forged = copy.deepcopy(run.player)
+    forged.update(run_id="forged", profit=run.player["profit"] + 500)
+    board.submit(forged)
+    board.close()
+
+    assert verify_pending(board.db_path, workers=2) == (1, 1, 0)
+    with sqlite3.connect(board.db_path) as conn:
+        marks = dict(conn.execute("SELECT run_id, verified FROM runs"))
+    assert marks == {run.player["run_id"]: 1, "forged": 0}
+    assert verify_pending(board.db_path, workers=2) == (0, 0, 0)